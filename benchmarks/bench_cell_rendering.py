@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+"""Benchmark of scrolling a result table with long geometry values.
+
+The query (polygons of the NYC neighborhoods and census blocks by
+default) is executed with the geometry included as WKT, all rows are
+loaded into a result table drawn with the offscreen Qt platform, and the
+table is scrolled page by page repainting the view. The frames per
+second and the time of sizing the columns to their contents are reported
+for the preview delegate drawing truncated values and for the default
+delegate drawing the full text. With `--synthetic-rows` the queries are
+run against a synthetic geodatabase (see `synthetic_data`) instead.
+
+Usage:
+    python bench_cell_rendering.py [--gdb NYC.gdb] [--frames 200]
+                                   [--sql "SELECT * FROM census_blocks"]
+    python bench_cell_rendering.py --synthetic-rows 10000
+                                   --synthetic-vertices 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QStyledItemDelegate
+
+from geodatabase import Geodatabase
+from synthetic_data import add_synthetic_arguments, benchmark_gdb
+from table import PreviewDelegate, ResultTable
+
+DEFAULT_QUERIES = [
+    'SELECT * FROM neighborhoods',
+    'SELECT * FROM census_blocks',
+]
+
+DELEGATES = [('preview', PreviewDelegate), ('default', QStyledItemDelegate)]
+
+
+# ----------------------------------------------------------------------
+def draw_table(gdb, sql, delegate_class):
+    """Draw table with all rows of the query; return it with sizing time."""
+    layer, errors = gdb.execute_sql(sql, include_geometry=True)
+    if errors:
+        raise ValueError(errors)
+    table = ResultTable()
+    table.view.setItemDelegate(delegate_class(table.view))
+    table.resize(1280, 800)
+    table.draw_result(layer, show_shapes=True)
+    table.load_all_rows()
+    table.show()
+    start_time = time.perf_counter()
+    table.view.resizeColumnsToContents()
+    return table, time.perf_counter() - start_time
+
+
+# ----------------------------------------------------------------------
+def measure_scrolling(table, frames):
+    """Scroll the table page by page; return repainted frames per second."""
+    app = QApplication.instance()
+    scroll_bar = table.view.verticalScrollBar()
+    app.processEvents()
+    start_time = time.perf_counter()
+    for _i in range(frames):
+        if scroll_bar.value() >= scroll_bar.maximum():
+            scroll_bar.setValue(0)
+        else:
+            scroll_bar.setValue(scroll_bar.value() + scroll_bar.pageStep())
+        table.view.viewport().repaint()
+        app.processEvents()
+    return frames / (time.perf_counter() - start_time)
+
+
+# ----------------------------------------------------------------------
+def parse_args(args=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--gdb',
+        default=os.path.join(ROOT, 'src', 'NYC.gdb'),
+        help='geodatabase to run the queries against')
+    parser.add_argument(
+        '--sql',
+        nargs='*',
+        default=DEFAULT_QUERIES,
+        help='queries returning long values such as polygons')
+    parser.add_argument(
+        '--frames', type=int, default=200, help='repaints per table')
+    add_synthetic_arguments(parser)
+    return parser.parse_args(args)
+
+
+# ----------------------------------------------------------------------
+def main(args=None):
+    """Run the benchmark and print frames per second of the delegates."""
+    args = parse_args(args)
+    app = QApplication.instance() or QApplication([])
+    with benchmark_gdb(args) as gdb_path:
+        gdb = Geodatabase(gdb_path)
+        gdb.open_connection()
+        try:
+            run_queries(app, gdb, args.sql, args.frames)
+        finally:
+            gdb.close_connection()
+    return
+
+
+# ----------------------------------------------------------------------
+def run_queries(app, gdb, queries, frames):
+    """Print frames per second of the delegates drawing the queries."""
+    for sql in queries:
+        sys.stdout.write('{sql}\n'.format(sql=sql))
+        for name, delegate_class in DELEGATES:
+            table, sizing_time = draw_table(gdb, sql, delegate_class)
+            fps = measure_scrolling(table, frames)
+            sys.stdout.write(
+                '  {name}: {fps:.1f} frames/sec, column sizing '
+                '{msecs:.1f} ms\n'.format(
+                    name=name, fps=fps, msecs=sizing_time * 1000))
+            table.close()
+            table.deleteLater()
+            app.processEvents()
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+# -*- coding: UTF-8 -*-
+"""Benchmark comparing OGR SQL and SQLite dialects on the sample queries.
+
+The SQL queries are taken from the ```sql blocks of the documentation
+(docs/sample_queries.md and README.md by default) along with their
+variants returning more rows (LIMIT scaled up). Every query is executed
+with each dialect by `ExecuteSQL` of the data source several times on a
+fresh connection, measuring the time it takes to execute the query,
+count the result rows, read the first row, and read all rows. The
+medians and standard deviations are written as a Markdown report.
+
+With `--app-path` the queries are executed by `Geodatabase.execute_sql`
+instead, which serves simple queries from the layer and pushes bounding
+box filters down whatever the dialect; the path taken is reported next
+to the timings of every dialect. With `--synthetic-rows` the queries
+are run against a synthetic geodatabase (see `synthetic_data`) instead.
+
+Usage:
+    python bench_dialects.py [--gdb NYC.gdb] [--repeat 5] [--app-path]
+                             [--output report.md] [docs/sample_queries.md]
+    python bench_dialects.py --synthetic-rows 100000 --synthetic-vertices 500
+"""
+
+import argparse
+import io
+import os
+import re
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from geodatabase import Geodatabase, iter_layer_rows
+from synthetic_data import add_synthetic_arguments, benchmark_gdb
+
+DIALECTS = ['OGRSQL', 'SQLite']
+PHASES = ['execute', 'count', 'first_row', 'full_fetch']
+
+SQL_BLOCK_RE = re.compile(r'^```sql\s*\n(.*?)^```', re.DOTALL | re.MULTILINE)
+HEADING_RE = re.compile(r'^#+\s*(.+)$', re.MULTILINE)
+LIMIT_RE = re.compile(r'\bLIMIT\s+([0-9]+)\s*$', re.IGNORECASE)
+
+BenchQuery = namedtuple('BenchQuery', ['title', 'sql'])
+RunTimings = namedtuple('RunTimings',
+                        PHASES + ['rows', 'execution_path', 'errors'])
+
+
+# ----------------------------------------------------------------------
+def load_queries(paths):
+    """Get queries from ```sql blocks titled by the preceding heading."""
+    queries = []
+    for path in paths:
+        with io.open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        for match in SQL_BLOCK_RE.finditer(text):
+            headings = HEADING_RE.findall(text, 0, match.start())
+            title = headings[-1].strip() if headings else os.path.basename(
+                path)
+            queries.append(BenchQuery(title, match.group(1).strip()))
+    return queries
+
+
+# ----------------------------------------------------------------------
+def get_scaled_variants(query, factors):
+    """Get variants of the query with LIMIT multiplied by the factors."""
+    match = LIMIT_RE.search(query.sql)
+    if not match:
+        return []
+    limit = int(match.group(1))
+    return [
+        BenchQuery('{title} (LIMIT {limit})'.format(
+            title=query.title, limit=limit * factor),
+                   query.sql[:match.start(1)] + str(limit * factor))
+        for factor in factors
+    ]
+
+
+# ----------------------------------------------------------------------
+def run_once(gdb_path, sql, dialect, app_path=False):
+    """Execute query once on a new connection and time every phase.
+
+    The query is executed by the dialect itself unless `app_path` is set.
+    """
+    gdb = Geodatabase(gdb_path)
+    gdb.open_connection()
+    try:
+        start_time = time.perf_counter()
+        if app_path:
+            layer, errors = gdb.execute_sql(sql, dialect)
+        else:
+            layer, errors = execute_with_dialect(gdb, sql, dialect)
+        execute = time.perf_counter() - start_time
+        if errors or layer is None:
+            return RunTimings(execute, 0, 0, 0, 0, None, errors or 'no result')
+
+        start_time = time.perf_counter()
+        rows = len(layer)
+        count = time.perf_counter() - start_time
+
+        layer.ResetReading()
+        start_time = time.perf_counter()
+        layer.GetNextFeature()
+        first_row = time.perf_counter() - start_time
+
+        layer.ResetReading()
+        start_time = time.perf_counter()
+        fetched = sum(1 for _row in iter_layer_rows(layer))
+        full_fetch = time.perf_counter() - start_time
+        return RunTimings(execute, count, first_row, full_fetch,
+                          max(fetched, rows), gdb.last_execution_path, None)
+    finally:
+        gdb.close_connection()
+
+
+# ----------------------------------------------------------------------
+def execute_with_dialect(gdb, sql, dialect):
+    """Execute query by the dialect bypassing the fast path and pushdown.
+
+    Return tuple (layer, errors) like `Geodatabase.execute_sql`.
+    """
+    try:
+        layer = gdb.ds.ExecuteSQL(sql, dialect=dialect)
+    except Exception as err:
+        return None, err.args[0] if err.args else str(err)
+    if layer is not None:
+        gdb.result_sets.append((layer, gdb.ds))
+    gdb.last_execution_path = '{dialect} ExecuteSQL'.format(dialect=dialect)
+    return layer, None
+
+
+# ----------------------------------------------------------------------
+def benchmark_query(gdb_path, query, repeat, warmup=True, app_path=False):
+    """Run query with each dialect; return { dialect: [RunTimings] }."""
+    results = {}
+    for dialect in DIALECTS:
+        if warmup:
+            run_once(gdb_path, query.sql, dialect, app_path)
+        runs = []
+        for _i in range(repeat):
+            run = run_once(gdb_path, query.sql, dialect, app_path)
+            runs.append(run)
+            if run.errors:
+                break
+        results[dialect] = runs
+    return results
+
+
+# ----------------------------------------------------------------------
+def summarize(runs, phase):
+    """Get median and standard deviation of the phase timings in msecs."""
+    values = [getattr(run, phase) * 1000 for run in runs]
+    stdev = statistics.stdev(values) if len(values) > 1 else 0.0
+    return statistics.median(values), stdev
+
+
+# ----------------------------------------------------------------------
+def format_report(gdb_path, repeat, benchmarks, app_path=False):
+    """Format Markdown report with a table per query."""
+    lines = [
+        '# OGR SQL vs SQLite dialect benchmark', '',
+        'Geodatabase: `{gdb}`, {repeat} runs per query and dialect; '
+        'median ± standard deviation in milliseconds.'.format(
+            gdb=gdb_path, repeat=repeat), '',
+        'Queries executed by {how}.'.format(
+            how='the application (fast path and spatial pushdown)'
+            if app_path else 'the dialects directly'), ''
+    ]
+    summary = {dialect: 0 for dialect in DIALECTS}
+    for query, results in benchmarks:
+        lines.extend(['## {title}'.format(title=query.title), '',
+                      '```sql', query.sql, '```', ''])
+        lines.append('| dialect | {phases} | rows | path |'.format(
+            phases=' | '.join(PHASES)))
+        lines.append('|---|{cols}---:|---|'.format(
+            cols='---:|' * len(PHASES)))
+
+        totals = {}
+        for dialect in DIALECTS:
+            runs = results[dialect]
+            if runs[-1].errors:
+                lines.append('| {dialect} | failed |{empty}'.format(
+                    dialect=dialect, empty=' |' * (len(PHASES) + 1)))
+                continue
+            cells = []
+            for phase in PHASES:
+                median, stdev = summarize(runs, phase)
+                cells.append('{median:.1f} ± {stdev:.1f}'.format(
+                    median=median, stdev=stdev))
+            totals[dialect] = sum(
+                summarize(runs, phase)[0]
+                for phase in ('execute', 'full_fetch'))
+            lines.append('| {dialect} | {cells} | {rows} | {path} |'.format(
+                dialect=dialect,
+                cells=' | '.join(cells),
+                rows=runs[-1].rows,
+                path=runs[-1].execution_path or dialect))
+
+        if totals:
+            fastest = min(totals, key=totals.get)
+            summary[fastest] += 1
+            lines.extend([
+                '', 'Faster (execute + full fetch): {dialect}'.format(
+                    dialect=fastest)
+            ])
+        errors = [
+            '{dialect}: {err}'.format(dialect=d, err=results[d][-1].errors)
+            for d in DIALECTS if results[d][-1].errors
+        ]
+        if errors:
+            lines.extend([''] + ['* ' + err for err in errors])
+        lines.append('')
+
+    lines.extend(['## Summary', ''] + [
+        '* {dialect} faster in {count} of {total} queries'.format(
+            dialect=dialect, count=count, total=len(benchmarks))
+        for dialect, count in summary.items()
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+# ----------------------------------------------------------------------
+def parse_args(args=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'queries',
+        nargs='*',
+        default=[
+            os.path.join(ROOT, 'docs', 'sample_queries.md'),
+            os.path.join(ROOT, 'README.md')
+        ],
+        help='Markdown files with ```sql blocks')
+    parser.add_argument(
+        '--gdb',
+        default=os.path.join(ROOT, 'src', 'NYC.gdb'),
+        help='geodatabase to run the queries against')
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='runs per query and dialect')
+    parser.add_argument(
+        '--scale',
+        type=int,
+        nargs='*',
+        default=[10, 100],
+        help='factors to multiply LIMIT of the queries by')
+    parser.add_argument(
+        '--app-path',
+        action='store_true',
+        help='execute the queries the way the application does, serving '
+        'simple queries from the layer and using the spatial index')
+    parser.add_argument('--output', help='Markdown report file')
+    add_synthetic_arguments(parser)
+    return parser.parse_args(args)
+
+
+# ----------------------------------------------------------------------
+def main(args=None):
+    """Run the benchmark and write the report."""
+    args = parse_args(args)
+    queries = []
+    for query in load_queries(args.queries):
+        queries.append(query)
+        queries.extend(get_scaled_variants(query, args.scale))
+
+    benchmarks = []
+    with benchmark_gdb(args) as gdb_path:
+        for idx, query in enumerate(queries, 1):
+            sys.stderr.write('[{idx}/{count}] {title}\n'.format(
+                idx=idx, count=len(queries), title=query.title))
+            benchmarks.append((query,
+                               benchmark_query(gdb_path, query, args.repeat,
+                                               app_path=args.app_path)))
+
+    report = format_report(gdb_path, args.repeat, benchmarks, args.app_path)
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        sys.stdout.write(report)
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+"""Benchmark of the SQL lexer on a large SQL script.
+
+Usage: python bench_sql_lexer.py [script size in MB]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from sql_lexer import tokenize, strip_comments, split_statements
+
+STATEMENT = """
+-- count crimes per neighborhood; the report query
+SELECT
+    Polys.Name AS NeighborhoodName /* the name; of it */
+    , Count(*) AS CrimeCount
+    , 'literal -- with; separators /* inside */' AS Note
+FROM
+  Homicides AS Points
+JOIN
+  "Neighborhoods" AS Polys
+ON
+    ST_Contains(Polys.Shape, Points.Shape) = 1
+GROUP BY
+    Polys.Name;
+"""
+
+
+# ----------------------------------------------------------------------
+def timeit(func, script, repeat=5):
+    """Get best time of calling function with the script."""
+    timings = []
+    for _i in range(repeat):
+        start_time = time.perf_counter()
+        func(script)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+# ----------------------------------------------------------------------
+def main(size_mb=1):
+    """Run the benchmark and print timings of the lexer functions."""
+    script = STATEMENT * int(size_mb * 1024 * 1024 / len(STATEMENT) + 1)
+    print('Script size: {size:.2f} MB, {count} statements'.format(
+        size=len(script) / 1024.0 / 1024.0, count=script.count('SELECT')))
+    for func in (strip_comments, split_statements, tokenize):
+        print('{name:<18} {secs:.3f} secs'.format(
+            name=func.__name__, secs=timeit(func, script)))
+    return
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1)
@@ -0,0 +1,169 @@
+# -*- coding: UTF-8 -*-
+"""Benchmark of the application start-up time.
+
+Every run starts a new Python process (so that all modules are imported
+cold) with the offscreen Qt platform and measures importing the `window`
+module, creating the main window, and opening query tabs (with the user
+data folder pointed at a temporary folder). The medians are
+compared with the time budgets or with a saved baseline; the exit code is
+1 if any of them is exceeded or if modules that should be imported only
+on demand (such as pandas) were imported at start-up.
+
+Usage:
+    python bench_startup.py [--runs 5] [--tabs 5]
+                            [--save-baseline startup.json]
+                            [--baseline startup.json] [--tolerance 0.25]
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+
+PHASES = ['import', 'window', 'new_tab']
+
+# medians in seconds that are considered a regression when exceeded
+DEFAULT_BUDGETS = {'import': 1.5, 'window': 1.0, 'new_tab': 0.25}
+
+# modules which should be imported only when a feature needs them
+LAZY_MODULES = ['pandas', 'numpy', 'tabulate', 'pstats', 'pyarrow']
+
+CHILD_CODE = '''
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, sys.argv[1])
+import cfg
+cfg.user_data_dir = tempfile.mkdtemp(prefix='gdbee-startup-')
+start_time = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+import window
+imported = time.perf_counter()
+app = QApplication([])
+ui = window.Window()
+created = time.perf_counter()
+for _i in range(int(sys.argv[2])):
+    ui.open_new_tab()
+    app.processEvents()
+opened = time.perf_counter()
+print(json.dumps({
+    'import': imported - start_time,
+    'window': created - imported,
+    'new_tab': (opened - created) / max(int(sys.argv[2]), 1),
+    'lazy_modules_loaded': [m for m in json.loads(sys.argv[3])
+                            if m in sys.modules],
+}))
+ui.close()
+if ui.query_history:
+    ui.query_history.close()
+shutil.rmtree(cfg.user_data_dir, ignore_errors=True)
+'''
+
+
+# ----------------------------------------------------------------------
+def run_once(tabs):
+    """Start the application in a new process; return its timings."""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD_CODE, SRC,
+         str(tabs), json.dumps(LAZY_MODULES)],
+        cwd=SRC,
+        env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+# ----------------------------------------------------------------------
+def measure_startup(runs=5, tabs=5):
+    """Get median timings of the start-up phases and lazy modules loaded."""
+    results = [run_once(tabs) for _i in range(runs)]
+    medians = {
+        phase: statistics.median(result[phase] for result in results)
+        for phase in PHASES
+    }
+    lazy_modules_loaded = sorted(
+        set(m for result in results for m in result['lazy_modules_loaded']))
+    return medians, lazy_modules_loaded
+
+
+# ----------------------------------------------------------------------
+def get_limits(baseline=None, tolerance=0.25):
+    """Get time limits of the phases from the baseline or the budgets."""
+    if baseline is None:
+        return dict(DEFAULT_BUDGETS)
+    return {
+        phase: baseline[phase] * (1 + tolerance)
+        for phase in PHASES if phase in baseline
+    }
+
+
+# ----------------------------------------------------------------------
+def find_regressions(medians, lazy_modules_loaded, limits):
+    """Get descriptions of the phases exceeding their limits."""
+    regressions = [
+        '{phase}: {secs:.3f} secs exceeds {limit:.3f} secs'.format(
+            phase=phase, secs=medians[phase], limit=limits[phase])
+        for phase in PHASES
+        if phase in limits and medians[phase] > limits[phase]
+    ]
+    if lazy_modules_loaded:
+        regressions.append('imported at start-up: {modules}'.format(
+            modules=', '.join(lazy_modules_loaded)))
+    return regressions
+
+
+# ----------------------------------------------------------------------
+def parse_args(args=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--runs', type=int, default=5, help='number of application starts')
+    parser.add_argument(
+        '--tabs', type=int, default=5, help='query tabs opened per start')
+    parser.add_argument(
+        '--baseline', help='JSON file with the baseline medians to compare')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.25,
+        help='allowed slowdown relative to the baseline')
+    parser.add_argument(
+        '--save-baseline', help='JSON file to save the medians into')
+    return parser.parse_args(args)
+
+
+# ----------------------------------------------------------------------
+def main(args=None):
+    """Run the benchmark; return exit code 1 on regressions."""
+    args = parse_args(args)
+    medians, lazy_modules_loaded = measure_startup(args.runs, args.tabs)
+    for phase in PHASES:
+        sys.stdout.write('{phase}: {msecs:.1f} ms\n'.format(
+            phase=phase, msecs=medians[phase] * 1000))
+
+    if args.save_baseline:
+        with io.open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(medians, indent=1))
+
+    baseline = None
+    if args.baseline:
+        with io.open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = find_regressions(medians, lazy_modules_loaded,
+                                   get_limits(baseline, args.tolerance))
+    for regression in regressions:
+        sys.stderr.write('Regression: {0}\n'.format(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+# -*- coding: UTF-8 -*-
+"""Generator of large synthetic geodatabases for scale testing.
+
+The datasets mirror the schemas of the NYC sample geodatabase (streets,
+census_blocks, homicides, subway_stations, neighborhoods) and can be made
+arbitrarily large (number of rows), wide (extra fields) and heavy
+(vertices per line or polygon); the geometry type of all datasets can be
+overridden to compare points, lines and polygons. A file geodatabase is
+written with the GDAL OpenFileGDB driver if it supports creating data
+sources (GDAL 3.6+); otherwise a GeoPackage is written instead. The same
+seed always produces the same data.
+
+Usage:
+    python synthetic_data.py big.gdb --rows 1000000
+    python synthetic_data.py wide.gdb --datasets census_blocks
+        --rows 100000 --extra-fields 200 --vertices 2000 --seed 7
+    python synthetic_data.py lines.gdb --geometry-type line --vertices 500
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import ogr
+import osr
+ogr.UseExceptions()
+
+# NYC extent in UTM zone 18N
+EPSG = 26918
+EXTENT = (563000.0, 4483000.0, 610000.0, 4530000.0)
+
+# features written in a single transaction
+TRANSACTION_SIZE = 10000
+
+BORONAMES = ['Manhattan', 'Brooklyn', 'Queens', 'The Bronx', 'Staten Island']
+STREET_TYPES = [
+    'residential', 'primary', 'secondary', 'tertiary', 'motorway',
+    'footway', 'service'
+]
+WORDS = [
+    'Park', 'Main', 'Broadway', 'Church', 'Lexington', 'Madison', 'Grand',
+    'Canal', 'Atlantic', 'Flatbush', 'Jamaica', 'Astoria', 'Fulton',
+    'Bedford', 'Nostrand', 'Ocean', 'Bay', 'Union', 'Court', 'Myrtle'
+]
+COLORS = ['RED', 'GREEN', 'BLUE', 'YELLOW', 'ORANGE', 'PURPLE', 'BROWN']
+WEAPONS = ['gun', 'knife', 'other', 'unknown']
+
+
+# ----------------------------------------------------------------------
+def _name(rnd):
+    """Get random street-like name."""
+    return '{0} {1}'.format(
+        rnd.choice(WORDS), rnd.choice(['St', 'Ave', 'Blvd', 'Pl', 'Rd']))
+
+
+# dataset name: (geometry type, [(field name, field type, value factory)])
+SCHEMAS = {
+    'streets': (ogr.wkbMultiLineString, [
+        ('NAME', ogr.OFTString, _name),
+        ('ONEWAY', ogr.OFTString, lambda rnd: rnd.choice(['yes', 'no'])),
+        ('TYPE', ogr.OFTString, lambda rnd: rnd.choice(STREET_TYPES)),
+    ]),
+    'census_blocks': (ogr.wkbMultiPolygon, [
+        ('BLKID', ogr.OFTString,
+         lambda rnd: '3600{0:011d}'.format(rnd.randrange(10**11))),
+        ('POPN_TOTAL', ogr.OFTReal, lambda rnd: float(rnd.randrange(5000))),
+        ('POPN_WHITE', ogr.OFTReal, lambda rnd: float(rnd.randrange(2000))),
+        ('POPN_BLACK', ogr.OFTReal, lambda rnd: float(rnd.randrange(2000))),
+        ('POPN_NATIV', ogr.OFTReal, lambda rnd: float(rnd.randrange(50))),
+        ('POPN_ASIAN', ogr.OFTReal, lambda rnd: float(rnd.randrange(1000))),
+        ('POPN_OTHER', ogr.OFTReal, lambda rnd: float(rnd.randrange(500))),
+        ('BORONAME', ogr.OFTString, lambda rnd: rnd.choice(BORONAMES)),
+    ]),
+    'homicides': (ogr.wkbPoint, [
+        ('INCIDENT_D', ogr.OFTString, lambda rnd: '{0}/{1:02d}/{2:02d}'.
+         format(rnd.randrange(2003, 2012), rnd.randrange(1, 13),
+                rnd.randrange(1, 29))),
+        ('BORONAME', ogr.OFTString, lambda rnd: rnd.choice(BORONAMES)),
+        ('NUM_VICTIM', ogr.OFTString, lambda rnd: str(rnd.randrange(1, 4))),
+        ('PRIMARY_MO', ogr.OFTString, lambda rnd: rnd.choice(['', 'robbery'])),
+        ('ID', ogr.OFTReal, lambda rnd: float(rnd.randrange(10**6))),
+        ('WEAPON', ogr.OFTString, lambda rnd: rnd.choice(WEAPONS)),
+        ('LIGHT_DARK', ogr.OFTString, lambda rnd: rnd.choice(['L', 'D'])),
+        ('YEAR', ogr.OFTReal, lambda rnd: float(rnd.randrange(2003, 2012))),
+    ]),
+    'subway_stations': (ogr.wkbPoint, [
+        ('ID', ogr.OFTReal, lambda rnd: float(rnd.randrange(10**6))),
+        ('NAME', ogr.OFTString, _name),
+        ('ALT_NAME', ogr.OFTString, lambda rnd: ''),
+        ('CROSS_ST', ogr.OFTString, _name),
+        ('LONG_NAME', ogr.OFTString, _name),
+        ('LABEL', ogr.OFTString, _name),
+        ('BOROUGH', ogr.OFTString, lambda rnd: rnd.choice(BORONAMES)),
+        ('NGHBHD', ogr.OFTString, lambda rnd: rnd.choice(WORDS)),
+        ('ROUTES', ogr.OFTString, lambda rnd: rnd.choice('ABCDEFGJLMNQRWZ')),
+        ('TRANSFERS', ogr.OFTString, lambda rnd: rnd.choice('ABCDEFG')),
+        ('COLOR', ogr.OFTString, lambda rnd: rnd.choice(COLORS)),
+        ('EXPRESS', ogr.OFTString, lambda rnd: rnd.choice(['', 'express'])),
+        ('CLOSED', ogr.OFTString, lambda rnd: ''),
+    ]),
+    'neighborhoods': (ogr.wkbMultiPolygon, [
+        ('BORONAME', ogr.OFTString, lambda rnd: rnd.choice(BORONAMES)),
+        ('NAME', ogr.OFTString, lambda rnd: rnd.choice(WORDS)),
+    ]),
+}
+
+# vertices per feature used if not given explicitly
+DEFAULT_VERTICES = {
+    ogr.wkbMultiLineString: 10,
+    ogr.wkbMultiPolygon: 30,
+}
+
+# geometry types that can be used instead of those of the schemas
+GEOMETRY_TYPES = {
+    'point': ogr.wkbPoint,
+    'line': ogr.wkbMultiLineString,
+    'polygon': ogr.wkbMultiPolygon,
+}
+
+EXTRA_FIELD_TYPES = [
+    (ogr.OFTString, lambda rnd: rnd.choice(WORDS)),
+    (ogr.OFTInteger, lambda rnd: rnd.randrange(10**6)),
+    (ogr.OFTReal, lambda rnd: rnd.random() * 1000),
+]
+
+
+# ----------------------------------------------------------------------
+def get_driver(driver_name=None):
+    """Get OGR driver; OpenFileGDB if it can create data sources."""
+    if driver_name:
+        return ogr.GetDriverByName(driver_name)
+    driver = ogr.GetDriverByName('OpenFileGDB')
+    if driver and driver.GetMetadataItem('DCAP_CREATE') == 'YES':
+        return driver
+    return ogr.GetDriverByName('GPKG')
+
+
+# ----------------------------------------------------------------------
+def get_output_path(path, driver):
+    """Get output path with the extension matching the driver."""
+    root, ext = os.path.splitext(path)
+    if driver.GetName() == 'GPKG' and ext.lower() != '.gpkg':
+        return root + '.gpkg'
+    if driver.GetName() == 'OpenFileGDB' and ext.lower() != '.gdb':
+        return root + '.gdb'
+    return path
+
+
+# ----------------------------------------------------------------------
+def make_geometry_wkt(rnd, geom_type, vertices):
+    """Get WKT of a random geometry within the NYC extent."""
+    xmin, ymin, xmax, ymax = EXTENT
+    x, y = rnd.uniform(xmin, xmax), rnd.uniform(ymin, ymax)
+    if geom_type == ogr.wkbPoint:
+        return 'POINT ({0:.3f} {1:.3f})'.format(x, y)
+
+    if geom_type == ogr.wkbMultiLineString:
+        coords = []
+        angle = rnd.uniform(0, 2 * math.pi)
+        for _i in range(max(vertices, 2)):
+            coords.append('{0:.3f} {1:.3f}'.format(x, y))
+            angle += rnd.uniform(-0.5, 0.5)
+            step = rnd.uniform(5, 50)
+            x, y = x + step * math.cos(angle), y + step * math.sin(angle)
+        return 'MULTILINESTRING (({0}))'.format(', '.join(coords))
+
+    # star-shaped ring around the center point is always a valid polygon
+    radius = rnd.uniform(50, 500)
+    vertices = max(vertices, 3)
+    coords = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius * rnd.uniform(0.6, 1.0)
+        coords.append('{0:.3f} {1:.3f}'.format(x + r * math.cos(angle),
+                                               y + r * math.sin(angle)))
+    coords.append(coords[0])
+    return 'MULTIPOLYGON ((({0})))'.format(', '.join(coords))
+
+
+# ----------------------------------------------------------------------
+def write_dataset(ds,
+                  name,
+                  rows,
+                  extra_fields=0,
+                  vertices=None,
+                  seed=0,
+                  geometry_type=None):
+    """Write a dataset mirroring the NYC schema with random features.
+
+    The geometry type of the schema is replaced with `geometry_type`
+    (one of `GEOMETRY_TYPES`) if given.
+    """
+    geom_type, fields = SCHEMAS[name]
+    if geometry_type:
+        geom_type = GEOMETRY_TYPES[geometry_type]
+    rnd = random.Random('{seed}-{name}'.format(seed=seed, name=name))
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(EPSG)
+    layer = ds.CreateLayer(name, srs, geom_type)
+
+    fields = list(fields)
+    for idx in range(extra_fields):
+        field_type, factory = EXTRA_FIELD_TYPES[idx % len(EXTRA_FIELD_TYPES)]
+        fields.append(('FIELD_{0:03d}'.format(idx + 1), field_type, factory))
+    for field_name, field_type, _factory in fields:
+        layer.CreateField(ogr.FieldDefn(field_name, field_type))
+
+    if vertices is None:
+        vertices = DEFAULT_VERTICES.get(geom_type, 1)
+    defn = layer.GetLayerDefn()
+    layer.StartTransaction()
+    for row in range(rows):
+        feat = ogr.Feature(defn)
+        for field_name, _field_type, factory in fields:
+            feat.SetField(field_name, factory(rnd))
+        feat.SetGeometry(
+            ogr.CreateGeometryFromWkt(
+                make_geometry_wkt(rnd, geom_type, vertices)))
+        layer.CreateFeature(feat)
+        if (row + 1) % TRANSACTION_SIZE == 0:
+            layer.CommitTransaction()
+            layer.StartTransaction()
+    layer.CommitTransaction()
+    return
+
+
+# ----------------------------------------------------------------------
+def create_synthetic_gdb(path,
+                         datasets=None,
+                         rows=1000,
+                         extra_fields=0,
+                         vertices=None,
+                         seed=0,
+                         driver_name=None,
+                         overwrite=False,
+                         geometry_type=None):
+    """Create geodatabase with synthetic datasets; return its path.
+
+    The path extension is changed to .gpkg if the GeoPackage driver is
+    used because the OpenFileGDB driver cannot create data sources.
+    """
+    driver = get_driver(driver_name)
+    path = get_output_path(path, driver)
+    if os.path.exists(path):
+        if not overwrite:
+            raise ValueError('{path} already exists'.format(path=path))
+        driver.DeleteDataSource(path)
+
+    ds = driver.CreateDataSource(path)
+    for name in datasets or sorted(SCHEMAS):
+        write_dataset(ds, name, rows, extra_fields, vertices, seed,
+                      geometry_type)
+    ds = None
+    return path
+
+
+# ----------------------------------------------------------------------
+def add_synthetic_arguments(parser):
+    """Add arguments of running a benchmark on a synthetic geodatabase."""
+    parser.add_argument(
+        '--synthetic-rows',
+        type=int,
+        help='run against a synthetic geodatabase with this many rows '
+        'per dataset instead of --gdb')
+    parser.add_argument(
+        '--synthetic-vertices',
+        type=int,
+        help='vertices per line or polygon of the synthetic geodatabase')
+    parser.add_argument(
+        '--synthetic-geometry-type',
+        choices=sorted(GEOMETRY_TYPES),
+        help='geometry type of all synthetic datasets')
+    return
+
+
+# ----------------------------------------------------------------------
+@contextlib.contextmanager
+def benchmark_gdb(args, datasets=None):
+    """Yield path of the geodatabase a benchmark should run against.
+
+    It is `args.gdb` unless `args.synthetic_rows` is set; a synthetic
+    geodatabase is then created in a temporary folder removed afterwards.
+    """
+    if not args.synthetic_rows:
+        yield args.gdb
+        return
+    folder = tempfile.mkdtemp(prefix='gdbee-synthetic-')
+    try:
+        start_time = time.time()
+        path = create_synthetic_gdb(
+            os.path.join(folder, 'synthetic.gdb'),
+            datasets,
+            args.synthetic_rows,
+            vertices=args.synthetic_vertices,
+            geometry_type=args.synthetic_geometry_type)
+        sys.stderr.write('Created {path} in {secs:.1f} secs\n'.format(
+            path=path, secs=time.time() - start_time))
+        yield path
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+def parse_args(args=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Create a geodatabase with synthetic datasets.')
+    parser.add_argument('path', help='output .gdb (or .gpkg) path')
+    parser.add_argument(
+        '--datasets',
+        nargs='*',
+        choices=sorted(SCHEMAS),
+        help='datasets to create (default: all)')
+    parser.add_argument(
+        '--rows', type=int, default=1000, help='rows per dataset')
+    parser.add_argument(
+        '--extra-fields',
+        type=int,
+        default=0,
+        help='number of extra fields added to each dataset')
+    parser.add_argument(
+        '--vertices',
+        type=int,
+        help='vertices per line or polygon (default: 10 and 30)')
+    parser.add_argument(
+        '--geometry-type',
+        choices=sorted(GEOMETRY_TYPES),
+        help='geometry type of all datasets (default: as in the NYC sample)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument(
+        '--driver',
+        choices=['OpenFileGDB', 'GPKG'],
+        help='OGR driver (default: OpenFileGDB if it can write, else GPKG)')
+    parser.add_argument(
+        '--overwrite',
+        action='store_true',
+        help='replace the output if it exists')
+    return parser.parse_args(args)
+
+
+# ----------------------------------------------------------------------
+def main(args=None):
+    """Command-line entry point."""
+    args = parse_args(args)
+    start_time = time.time()
+    path = create_synthetic_gdb(args.path, args.datasets, args.rows,
+                                args.extra_fields, args.vertices, args.seed,
+                                args.driver, args.overwrite,
+                                args.geometry_type)
+    sys.stderr.write('Created {path} in {secs:.1f} secs\n'.format(
+        path=path, secs=time.time() - start_time))
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 # -*- coding: UTF-8 -*-
 """Configuration parameters to start application with."""
 
+import os
+
 # define if application starts with a tab created with the geodatabase
 # and query executed with the result table drawn
 # set to False when running unit tests
@@ -13,4 +15,20 @@ test_mode = True
 project_name = 'GDBee'
 not_connected_to_gdb_message = 'Not connected to any geodatabase...'
 
-sql_dialects_names = ['SQLite', 'OGRSQL']  # SQLite is used by default
+# SQLite is used by default; Auto picks one of the dialects per statement
+auto_dialect_name = 'Auto'
+sql_dialects_names = ['SQLite', 'OGRSQL', auto_dialect_name]
+
+# folder with user data such as recorded query execution times
+user_data_dir = os.path.join(os.path.expanduser('~'), '.gdbee')
+
+# memory in MB the fetched rows of all result tables may take; the rows
+# of the least recently viewed tables are spilled to disk when exceeded
+result_memory_budget_mb = 1024
+
+# store of the fetched rows: 'memory' keeps them as Python objects, 'arrow'
+# writes them into memory-mapped Arrow IPC files (requires pyarrow)
+result_row_store = 'memory'
+
+# append timings of the query phases to query_timings.jsonl in user_data_dir
+log_query_timings = True
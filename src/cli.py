@@ -0,0 +1,280 @@
+# -*- coding: UTF-8 -*-
+"""Command-line batch runner executing SQL scripts without the GUI.
+
+The runner uses the same comment stripping, statement splitting and
+`Geodatabase.execute_sql` logic as the application but does not import
+PyQt5 so it can be used in scheduled jobs on servers without a display.
+
+Usage examples:
+    python cli.py NYC.gdb query.sql --format csv > result.csv
+    cat query.sql | python cli.py NYC.gdb --dialect OGRSQL --format ndjson
+    python cli.py NYC.gdb query.sql --format parquet --output result.parquet
+    python cli.py "counties/*.gdb" query.sql --processes 8 > result.csv
+"""
+
+import argparse
+import glob
+import io
+import itertools
+import os
+import sys
+import time
+
+from cfg import auto_dialect_name, sql_dialects_names
+from dialect_selector import DialectSelector, get_dialect_timings_path
+from fanout import (SOURCE_COLUMN, format_fanout_report, get_source_name,
+                    iter_row_batches, resolve_gdb_paths, run_fanout)
+from geodatabase import Geodatabase, get_layer_columns, iter_layer_rows
+from result_writers import WRITERS
+from script_runner import ScriptRunner, get_statements
+
+# number of rows read from the OGR layer before being passed to a writer
+WRITE_BATCH_SIZE = 1000
+
+
+# ----------------------------------------------------------------------
+def parse_args(args=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='gdbee',
+        description='Execute SQL statements against a file geodatabase.')
+    parser.add_argument(
+        'gdb',
+        help='path to the file geodatabase or a glob pattern matching '
+        'multiple geodatabases to run the query against each of them')
+    parser.add_argument(
+        'sql_file',
+        nargs='?',
+        default='-',
+        help='file with SQL statements; read from stdin if omitted or "-"')
+    parser.add_argument(
+        '-d',
+        '--dialect',
+        default=sql_dialects_names[0],
+        type=lambda d: {n.lower(): n
+                        for n in sql_dialects_names}.get(d.lower(), d),
+        choices=sql_dialects_names,
+        help='SQL dialect (default: %(default)s)')
+    parser.add_argument(
+        '-f',
+        '--format',
+        default='csv',
+        choices=sorted(WRITERS),
+        help='output format (default: %(default)s)')
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='output file; with multiple statements the statement number '
+        'is appended to the file name; stdout if omitted')
+    parser.add_argument(
+        '--no-geometry',
+        action='store_true',
+        help='do not include WKT of the geometry column in the output')
+    parser.add_argument(
+        '--continue-on-error',
+        action='store_true',
+        help='execute the rest of the statements if a statement fails')
+    parser.add_argument(
+        '-j',
+        '--processes',
+        type=int,
+        help='number of worker processes querying multiple geodatabases '
+        '(default: number of CPUs)')
+    args = parser.parse_args(args)
+    if args.sql_file != '-':
+        try:
+            io.open(args.sql_file, 'rb').close()
+        except (IOError, OSError) as err:
+            parser.error("can't open '{path}': {err}".format(
+                path=args.sql_file, err=err.strerror or err))
+    return args
+
+
+# ----------------------------------------------------------------------
+def get_output_path(output, index, count):
+    """Get output file path for the statement with the given index."""
+    if count == 1:
+        return output
+    root, ext = os.path.splitext(output)
+    return '{root}_{index}{ext}'.format(root=root, index=index, ext=ext)
+
+
+# ----------------------------------------------------------------------
+def write_result(layer, writer_class, out, include_geometry):
+    """Stream rows of the OGR layer into the output; return rows count."""
+    writer = writer_class(out, get_layer_columns(layer, include_geometry))
+    rows = iter_layer_rows(layer, include_geometry)
+    rows_count = 0
+    while True:
+        batch = list(itertools.islice(rows, WRITE_BATCH_SIZE))
+        if not batch:
+            break
+        writer.write_rows(batch)
+        rows_count += len(batch)
+    writer.close()
+    return rows_count
+
+
+# ----------------------------------------------------------------------
+def open_output(args, writer_class, index, count, stdout):
+    """Get output stream (or path for binary formats) for a statement."""
+    if not args.output:
+        return stdout
+    out_path = get_output_path(args.output, index, count)
+    if writer_class.binary:
+        return out_path
+    return io.open(out_path, 'w', encoding='utf-8', newline='')
+
+
+# ----------------------------------------------------------------------
+def close_output(out, stdout):
+    """Close output stream unless it is the standard output."""
+    if out is stdout:
+        stdout.flush()
+    elif hasattr(out, 'close'):
+        out.close()
+    return
+
+
+# ----------------------------------------------------------------------
+def run(args, stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr):
+    """Execute the SQL statements and write the results; return exit code."""
+    writer_class = WRITERS[args.format]
+    if writer_class.binary and not args.output:
+        stderr.write('Output file is required for {fmt} format\n'.format(
+            fmt=args.format))
+        return 2
+
+    if glob.has_magic(args.gdb):
+        gdb_paths = resolve_gdb_paths([args.gdb])
+        if not gdb_paths:
+            stderr.write('No geodatabases match {pattern}\n'.format(
+                pattern=args.gdb))
+            return 2
+    else:
+        gdb_paths = None
+        gdb = Geodatabase(args.gdb)
+        if not gdb.is_valid():
+            stderr.write(
+                'This is not a valid file geodatabase: {path}\n'.format(
+                    path=args.gdb))
+            return 2
+
+    if args.sql_file == '-':
+        sql_script = stdin.read()
+    else:
+        try:
+            with io.open(args.sql_file, 'r', encoding='utf-8') as f:
+                sql_script = f.read()
+        except (IOError, OSError) as err:
+            stderr.write("Cannot read the SQL file '{path}': {err}\n".format(
+                path=args.sql_file, err=err.strerror or err))
+            return 2
+
+    statements = get_statements(sql_script)
+    if gdb_paths:
+        return run_fanout_statements(args, gdb_paths, statements,
+                                     writer_class, stdout, stderr)
+
+    gdb.open_connection()
+    dialect_selector = None
+    if args.dialect == auto_dialect_name:
+        # only the execution is timed here while the application times
+        # fetching too; its timings are read but not updated
+        dialect_selector = DialectSelector(
+            get_dialect_timings_path(), save=False)
+    runner = ScriptRunner(
+        gdb,
+        args.dialect,
+        stop_on_error=not args.continue_on_error,
+        include_geometry=not args.no_geometry,
+        dialect_selector=dialect_selector)
+
+    exit_code = 0
+    results_written = 0
+    for result in runner.iter_results(statements):
+        if result.errors:
+            stderr.write('Statement {idx}: {err}\n'.format(
+                idx=result.index, err=result.errors))
+            exit_code = 1
+            continue
+        if not result.layer:
+            continue
+
+        start_time = time.time()
+        out = open_output(args, writer_class, result.index, len(statements),
+                          stdout)
+        if out is stdout and results_written and args.format == 'csv':
+            stdout.write('\n')
+        rows_count = write_result(result.layer, writer_class, out,
+                                  not args.no_geometry)
+        close_output(out, stdout)
+        results_written += 1
+
+        stderr.write('Statement {idx}: executed with {dialect} in '
+                     '{exec_time:.1f} secs | {rows} rows written in '
+                     '{write_time:.1f} secs\n'.format(
+                         idx=result.index,
+                         dialect=result.dialect,
+                         exec_time=result.exec_time,
+                         rows=rows_count,
+                         write_time=time.time() - start_time))
+
+    gdb.close_connection()
+    return exit_code
+
+
+# ----------------------------------------------------------------------
+def run_fanout_statements(args, gdb_paths, statements, writer_class, stdout,
+                          stderr):
+    """Execute each statement against all geodatabases in parallel.
+
+    Rows of all geodatabases are written into a single output with the
+    source geodatabase name in an extra column; return exit code.
+    """
+    exit_code = 0
+    results_written = 0
+    for index, sql_query in enumerate(statements, 1):
+        start_time = time.time()
+        out, writer, results = None, None, []
+        for result in run_fanout(gdb_paths, sql_query, args.dialect,
+                                 not args.no_geometry, args.processes):
+            results.append(result)
+            if result.errors:
+                exit_code = 1
+                continue
+
+            if writer is None:
+                out = open_output(args, writer_class, index, len(statements),
+                                  stdout)
+                if out is stdout and results_written and args.format == 'csv':
+                    stdout.write('\n')
+                writer = writer_class(out, [(SOURCE_COLUMN, 'String')] +
+                                      result.columns)
+            source_name = get_source_name(result.path)
+            for rows in iter_row_batches(result):
+                for row in rows:
+                    row[SOURCE_COLUMN] = source_name
+                writer.write_rows(rows)
+
+        if writer is not None:
+            writer.close()
+            close_output(out, stdout)
+            results_written += 1
+
+        stderr.write('Statement {idx}: {report}\n'.format(
+            idx=index,
+            report=format_fanout_report(results, time.time() - start_time)))
+        if exit_code and not args.continue_on_error:
+            break
+    return exit_code
+
+
+# ----------------------------------------------------------------------
+def main():
+    """Command-line entry point."""
+    sys.exit(run(parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+# -*- coding: UTF-8 -*-
+"""Statistics of the result columns computed in a single streaming pass.
+
+The rows are processed in batches; for every column the values of a
+batch are converted into a NumPy array once and the count of values and
+nulls, the minimum, maximum and mean, a HyperLogLog estimate of the
+number of distinct values, and a histogram of the numeric values are
+updated with vectorized operations. The statistics can be shown after
+every batch while the rest of the rows are being read.
+"""
+
+import itertools
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# batch of rows the statistics are updated with at a time
+BATCH_SIZE = 5000
+# 2**12 registers estimate the distinct count with about 1.6% error
+HLL_PRECISION = 12
+HISTOGRAM_BINS = 20
+
+NUMERIC = 'numeric'
+TEXT = 'text'
+
+# statistics of a column at a point in time which can be passed between
+# threads while the statistics keep being updated
+StatsSummary = namedtuple('StatsSummary', [
+    'name', 'count', 'nulls', 'min', 'max', 'mean', 'distinct',
+    'histogram_edges', 'histogram_counts'
+])
+
+
+# ----------------------------------------------------------------------
+def get_hashes(values):
+    """Get well mixed 64-bit hashes of the values."""
+    hashes = np.fromiter((hash(value) for value in values),
+                         dtype=np.int64,
+                         count=len(values)).view(np.uint64)
+    # splitmix64 finalizer; hashes of small integers are the integers
+    hashes = hashes + np.uint64(0x9E3779B97F4A7C15)
+    hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(
+        0xBF58476D1CE4E5B9)
+    hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(
+        0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+########################################################################
+class HyperLogLog(object):
+    """Estimator of the number of distinct values."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, precision=HLL_PRECISION):
+        """Initialize HyperLogLog with 2**precision registers."""
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+        return
+
+    # ----------------------------------------------------------------------
+    def add_hashes(self, hashes):
+        """Add 64-bit hashes of the values."""
+        if not len(hashes):
+            return
+        rest_bits = 64 - self.precision
+        indexes = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64(2**rest_bits - 1)
+        # position of the leftmost 1 bit in the rest of the hash
+        _mantissas, bit_lengths = np.frexp(rest.astype(np.float64))
+        ranks = (rest_bits - bit_lengths + 1).astype(np.uint8)
+        np.maximum.at(self.registers, indexes, ranks)
+        return
+
+    # ----------------------------------------------------------------------
+    def estimate(self):
+        """Get estimated number of distinct values added."""
+        registers_count = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers_count)
+        estimate = alpha * registers_count**2 / np.sum(
+            np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * registers_count and zeros:
+            # linear counting is more precise for small counts
+            estimate = registers_count * math.log(registers_count / zeros)
+        return int(round(estimate))
+
+
+########################################################################
+class Histogram(object):
+    """Histogram of numeric values widening its bins as the range grows."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, bins=HISTOGRAM_BINS):
+        """Initialize Histogram with an even number of bins."""
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.start = None
+        self.width = None
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def edges(self):
+        """Get edges of the bins."""
+        if self.start is None:
+            return []
+        return [
+            self.start + i * self.width for i in range(len(self.counts) + 1)
+        ]
+
+    # ----------------------------------------------------------------------
+    def get_bins(self):
+        """Get edges and counts of the bins without empty bins at the ends.
+
+        Widening the bins leaves the ends of the range empty.
+        """
+        filled = np.nonzero(self.counts)[0]
+        if not len(filled):
+            return [], []
+        first, last = filled[0], filled[-1] + 1
+        return self.edges[first:last + 1], self.counts[first:last].tolist()
+
+    # ----------------------------------------------------------------------
+    def _merge_pairs(self):
+        """Get counts of the bins merged pairwise."""
+        return self.counts[0::2] + self.counts[1::2]
+
+    # ----------------------------------------------------------------------
+    def add(self, values):
+        """Add array of finite numeric values."""
+        if not len(values):
+            return
+        low, high = float(values.min()), float(values.max())
+        bins = len(self.counts)
+        if self.start is None:
+            self.start = low
+            self.width = (high - low) / bins or 1.0
+        # the bins are doubled until the values fit
+        while low < self.start:
+            merged = self._merge_pairs()
+            self.start -= self.width * bins
+            self.width *= 2
+            self.counts[:] = 0
+            self.counts[bins // 2:] = merged
+        while high > self.start + self.width * bins:
+            merged = self._merge_pairs()
+            self.width *= 2
+            self.counts[:] = 0
+            self.counts[:bins // 2] = merged
+        indexes = ((values - self.start) / self.width).astype(np.intp)
+        self.counts += np.bincount(
+            np.clip(indexes, 0, bins - 1), minlength=bins)
+        return
+
+
+########################################################################
+class ColumnStats(object):
+    """Statistics of the values of a column."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name):
+        """Initialize ColumnStats of the column with no values."""
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.numeric_count = 0
+        # kind of the values of the first batch with values; batches with
+        # values of another kind are only counted
+        self.kind = None
+        self.distinct = HyperLogLog()
+        self.histogram = Histogram()
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def mean(self):
+        """Get mean of the numeric values; None if there are none."""
+        if not self.numeric_count:
+            return None
+        return self.total / self.numeric_count
+
+    # ----------------------------------------------------------------------
+    @property
+    def distinct_count(self):
+        """Get estimated number of distinct values."""
+        return self.distinct.estimate() if self.count else 0
+
+    # ----------------------------------------------------------------------
+    def get_summary(self):
+        """Get summary of the statistics of the values added so far."""
+        edges, counts = self.histogram.get_bins()
+        return StatsSummary(self.name, self.count, self.nulls, self.min,
+                            self.max, self.mean, self.distinct_count, edges,
+                            counts)
+
+    # ----------------------------------------------------------------------
+    def update(self, values):
+        """Update the statistics with a batch of values."""
+        present = [value for value in values if value is not None]
+        self.nulls += len(values) - len(present)
+        self.count += len(present)
+        if not present:
+            return
+        self.distinct.add_hashes(get_hashes(present))
+
+        is_numeric = all(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            for value in present)
+        kind = NUMERIC if is_numeric else TEXT
+        if self.kind is None:
+            self.kind = kind
+        if kind != self.kind:
+            return
+
+        if kind == NUMERIC:
+            array = np.asarray(present, dtype=np.float64)
+            finite = np.isfinite(array)
+            if not finite.all():
+                # NaN and infinity are only counted
+                array = array[finite]
+                present = [v for v, f in zip(present, finite) if f]
+            if not len(array):
+                return
+            self.total += float(array.sum())
+            self.numeric_count += len(array)
+            self.histogram.add(array)
+            # integers are kept as integers
+            low, high = min(present), max(present)
+        else:
+            present = [str(value) for value in present]
+            low, high = min(present), max(present)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        return
+
+
+# ----------------------------------------------------------------------
+def collect_column_stats(rows, columns, batch_size=BATCH_SIZE):
+    """Compute statistics of the columns of the rows in batches.
+
+    `rows` is an iterable of sequences of values in the order of the
+    columns. Yield tuple (number of rows processed, list of ColumnStats)
+    after every batch.
+    """
+    stats = [ColumnStats(column) for column in columns]
+    rows = iter(rows)
+    processed = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        for column_stats, values in zip(stats, zip(*batch)):
+            column_stats.update(list(values))
+        processed += len(batch)
+        yield processed, stats
+    return
@@ -1,14 +1,44 @@
 # -*- coding: UTF-8 -*-
 """Code completion logic in the text editor."""
 
-import io
+import itertools
+from functools import lru_cache
 from PyQt5.QtWidgets import QCompleter
 from PyQt5.QtCore import Qt
 
-import os
-home = os.path.dirname(os.path.realpath(__file__))
-KEYWORDS=os.path.join(home, r'completer_data\keywords.txt')
-FUNCTIONS=os.path.join(home, r'completer_data\functions.txt')
+from sql_context import get_completion_context, TABLE_CLAUSES, COLUMN_CLAUSES
+from sql_vocabulary import get_functions, get_keywords
+
+
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_standard_items():
+    """Get case variants of the SQL keywords and functions.
+
+    Return tuple (keywords and functions, keywords only); computed once
+    and shared by the completers of all tabs.
+    """
+    lowercase_keywords = list(get_keywords())
+    uppercase_keywords = [k.upper() for k in lowercase_keywords]
+    titlecase_keywords = [k.title() for k in lowercase_keywords]
+
+    titlecase_funcs = list(get_functions())
+    uppercase_funcs = [f.upper() for f in titlecase_funcs]
+    lowercase_funcs = [f.lower() for f in titlecase_funcs]
+
+    all_keywords_and_funcs = [
+        lowercase_keywords,
+        uppercase_keywords,
+        titlecase_keywords,
+        lowercase_funcs,
+        uppercase_funcs,
+        titlecase_funcs,
+    ]
+    standard_items = tuple(
+        keyword for sublist in all_keywords_and_funcs for keyword in sublist)
+    keywords_items = tuple(lowercase_keywords + uppercase_keywords +
+                           titlecase_keywords)
+    return standard_items, keywords_items
 
 
 ########################################################################
@@ -18,30 +48,14 @@ class Completer(object):
     # ----------------------------------------------------------------------
     def __init__(self):
         """Initialize Completer class with the keywords and functions."""
-        with io.open(
-                KEYWORDS, 'r', encoding='utf-8') as f:
-            lowercase_keywords = [k.rstrip().lower() for k in f.readlines()]
-            uppercase_keywords = [k.upper() for k in lowercase_keywords]
-            titlecase_keywords = [k.title() for k in lowercase_keywords]
-
-        with io.open(
-                FUNCTIONS, 'r', encoding='utf-8') as f:
-            titlecase_funcs = [f.rstrip() for f in f.readlines()]
-            uppercase_funcs = [f.upper() for f in titlecase_funcs]
-            lowercase_funcs = [f.lower() for f in titlecase_funcs]
-
-        all_keywords_and_funcs = [
-            lowercase_keywords,
-            uppercase_keywords,
-            titlecase_keywords,
-            lowercase_funcs,
-            uppercase_funcs,
-            titlecase_funcs,
-        ]
+        standard_items, keywords_items = get_standard_items()
+        self.standard_items = list(standard_items)
+        self.keywords_items = list(keywords_items)
 
-        self.standard_items = [
-            keyword for sublist in all_keywords_and_funcs for keyword in sublist
-        ]
+        # geodatabase schemas { lowercase table name: (table, [columns]) }
+        self.gdb_schemas = {}
+        self.all_items = self.standard_items
+        self.context_key = None
 
         self.completer = QCompleter(self.standard_items)
 
@@ -57,11 +71,86 @@ class Completer(object):
         The list of additional strings include geodatabase items.
         """
         cur_items = []
-        titlecase_items = [i.title() for i in items]
-        uppercase_items = [i.upper() for i in items]
-        lowercase_items = [i.lower() for i in items]
-
         cur_items.extend(self.standard_items)
-        cur_items.extend(titlecase_items + uppercase_items + lowercase_items)
+        cur_items.extend(self._get_case_variants(items))
+        self.all_items = cur_items
+        self.context_key = None
         self.completer.model().setStringList(cur_items)
         return
+
+    # ----------------------------------------------------------------------
+    def set_gdb_schemas(self, schemas):
+        """Set geodatabase schemas used for context-aware completion."""
+        self.gdb_schemas = {
+            table.lower(): (table, list(columns))
+            for table, columns in schemas.items()
+        }
+        self.context_key = None
+        return
+
+    # ----------------------------------------------------------------------
+    def update_completion_context(self, text, cursor_pos):
+        """Narrow down completer string list based on the cursor position.
+
+        Only the columns of the tables referenced in the current statement
+        are suggested after `alias.` and within the SELECT/WHERE clauses;
+        only the tables are suggested within the FROM/JOIN clauses.
+        """
+        context = get_completion_context(text, cursor_pos)
+        tables = [
+            self.gdb_schemas[t.lower()][0] for t in context.tables.values()
+            if t.lower() in self.gdb_schemas
+        ]
+
+        if context.qualifier is not None:
+            table = context.tables.get(context.qualifier.lower(),
+                                       context.qualifier)
+            if table.lower() in self.gdb_schemas:
+                key = ('qualified', table.lower())
+            else:
+                key = ('all', )
+        elif context.clause in TABLE_CLAUSES and self.gdb_schemas:
+            key = ('tables', )
+        elif context.clause in COLUMN_CLAUSES and tables:
+            key = ('columns', tuple(sorted(set(tables))),
+                   tuple(sorted(context.tables)))
+        else:
+            key = ('all', )
+
+        if key != self.context_key:
+            self.context_key = key
+            self.completer.model().setStringList(
+                self._get_context_items(key, context, tables))
+        return context
+
+    # ----------------------------------------------------------------------
+    def _get_context_items(self, key, context, tables):
+        """Get completion items matching the completion context."""
+        if key[0] == 'qualified':
+            return self._get_case_variants(self.gdb_schemas[key[1]][1])
+
+        if key[0] == 'tables':
+            return self.keywords_items + self._get_case_variants(
+                [table for table, _cols in self.gdb_schemas.values()])
+
+        if key[0] == 'columns':
+            columns = sorted(
+                set(
+                    itertools.chain.from_iterable(
+                        self.gdb_schemas[t.lower()][1] for t in tables)),
+                key=lambda x: x.lower())
+            tables_names = {t.lower() for t in tables}
+            aliases = [a for a in context.tables if a not in tables_names]
+            return self.standard_items + self._get_case_variants(
+                columns + sorted(set(tables)) + aliases)
+
+        return self.all_items
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _get_case_variants(items):
+        """Get title, upper and lower case variants of the items."""
+        titlecase_items = [i.title() for i in items]
+        uppercase_items = [i.upper() for i in items]
+        lowercase_items = [i.lower() for i in items]
+        return titlecase_items + uppercase_items + lowercase_items
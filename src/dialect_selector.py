@@ -0,0 +1,274 @@
+# -*- coding: UTF-8 -*-
+"""Automatic choice of the SQL dialect for a statement.
+
+The statement is inspected for the features the OGR SQL dialect does not
+support (spatial and other SQLite functions, joins, subqueries, grouping,
+window functions); such statements are always executed with SQLite. So
+are the statements whose conditions may select other rows in OGR SQL
+(`LIKE` case sensitivity, text compared with numbers; see `fast_path`):
+the dialect is chosen only for the statements without conditions and the
+simple queries filtering numeric fields by numbers. For those, the
+execution times of both dialects are recorded per query
+shape (the statement with its literals replaced) as exponentially
+weighted moving averages and the faster dialect is used. A shape not
+seen before is executed with OGR SQL first and with SQLite the next time
+so that both dialects get measured.
+
+OGR SQL reads the rows lazily while SQLite does most of the work up
+front, so the time recorded includes counting and fetching the first
+rows; statements served without the dialect (from the layer directly or
+with a spatial filter pushed down) are not recorded.
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+import cfg
+from fast_path import is_dialect_neutral, parse_simple_query
+from sql_lexer import tokenize, COMMENT_KINDS
+
+SQLITE = 'SQLite'
+OGRSQL = 'OGRSQL'
+
+# file with the timings in the user data folder
+DIALECT_TIMINGS_FILE = 'dialect_timings.json'
+
+# weight of the latest execution time in the moving average
+EWMA_ALPHA = 0.3
+# number of query shapes kept in the timings file
+MAX_SHAPES = 1000
+# phases of the query timer the dialects are compared by
+COMPARED_PHASES = ('execute', 'count', 'first_fetch')
+
+# functions the OGR SQL dialect supports
+OGRSQL_FUNCTIONS = {
+    'count', 'sum', 'avg', 'min', 'max', 'substr', 'cast', 'concat',
+    'hstore_get_value'
+}
+
+# query features the OGR SQL dialect does not support
+OGRSQL_UNSUPPORTED = {
+    'spatial_functions', 'functions', 'join', 'subquery', 'compound',
+    'group_by', 'window', 'case', 'concatenation'
+}
+
+
+# words starting conditions which may select other rows in each dialect
+CONDITION_WORDS = {'where', 'having', 'on', 'using'}
+
+
+# ----------------------------------------------------------------------
+def get_dialect_timings_path():
+    """Get path of the dialect timings file in the user data folder."""
+    return os.path.join(cfg.user_data_dir, DIALECT_TIMINGS_FILE)
+
+
+# ----------------------------------------------------------------------
+def get_query_features(query):
+    """Get set of features of the SQL statement relevant for the dialect."""
+    tokens = [t for t in tokenize(query) if t.kind not in COMMENT_KINDS]
+    features = set()
+    selects = 0
+    for idx, token in enumerate(tokens):
+        next_value = tokens[idx + 1].value if idx + 1 < len(tokens) else None
+        if token.kind == 'word':
+            word = token.value.lower()
+            if next_value == '(' and word not in ('in', 'exists', 'as',
+                                                  'over', 'using', 'on',
+                                                  'values', 'from', 'join'):
+                if word.startswith('st_') or word in ('buildmbr',
+                                                      'geomfromtext'):
+                    features.add('spatial_functions')
+                elif word not in OGRSQL_FUNCTIONS:
+                    features.add('functions')
+            if word == 'select':
+                selects += 1
+            elif word == 'join':
+                features.add('join')
+            elif word in ('union', 'except', 'intersect'):
+                features.add('compound')
+            elif word in ('group', 'having'):
+                features.add('group_by')
+            elif word == 'over':
+                features.add('window')
+            elif word == 'case':
+                features.add('case')
+            elif word == 'limit':
+                features.add('limit')
+        elif token.value == '|' and next_value == '|':
+            features.add('concatenation')
+    if selects > 1:
+        features.add('subquery')
+    return features
+
+
+# ----------------------------------------------------------------------
+def get_query_shape(query):
+    """Get key identifying statements that differ only in the literals."""
+    parts = []
+    for token in tokenize(query):
+        if token.kind in COMMENT_KINDS or token.kind == 'separator':
+            continue
+        if token.kind in ('string', 'number'):
+            parts.append('?')
+        elif token.kind == 'word':
+            parts.append(token.value.lower())
+        else:
+            parts.append(token.value)
+    return hashlib.sha1(' '.join(parts).encode('utf-8')).hexdigest()
+
+
+# ----------------------------------------------------------------------
+def is_query_dialect_neutral(query, field_types=None):
+    """Check if the statement selects the same rows in both dialects.
+
+    Simple queries are checked by `fast_path.is_dialect_neutral` with
+    `field_types` of their table; other statements qualify only if they
+    have no conditions and no string literals.
+    """
+    simple_query = parse_simple_query(query)
+    if simple_query:
+        return is_dialect_neutral(simple_query, field_types or {})
+    for token in tokenize(query):
+        if token.kind == 'string' or (token.kind == 'word' and
+                                      token.value.lower() in CONDITION_WORDS):
+            return False
+    return True
+
+
+########################################################################
+class DialectSelector(object):
+    """Chooser of the SQL dialect learning from recorded execution times."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, timings_path=None, save=True):
+        """Initialize DialectSelector loading the recorded timings.
+
+        The timings are kept in memory only if `timings_path` is None;
+        with `save` off the recorded timings are not written to the file
+        (for instance, in worker processes reading the timings only).
+        """
+        self.timings_path = timings_path
+        self.save = save
+        self.timings = {}
+        if timings_path and os.path.exists(timings_path):
+            try:
+                with io.open(timings_path, 'r', encoding='utf-8') as f:
+                    self.timings = json.load(f)
+            except (IOError, ValueError):
+                self.timings = {}
+        return
+
+    # ----------------------------------------------------------------------
+    def choose(self, query, field_types=None):
+        """Get name of the dialect to execute the statement with.
+
+        `field_types` maps the lowercase field names of the table of a
+        simple query to their OGR type names.
+        """
+        if get_query_features(query) & OGRSQL_UNSUPPORTED:
+            return SQLITE
+        if not is_query_dialect_neutral(query, field_types):
+            return SQLITE
+        if parse_simple_query(query):
+            # served from the layer directly; the dialect does not matter
+            return OGRSQL
+
+        shape_timings = self.timings.get(get_query_shape(query), {})
+        ogrsql, sqlite = shape_timings.get(OGRSQL), shape_timings.get(SQLITE)
+        if ogrsql and ogrsql.get('failed'):
+            return SQLITE
+        if not ogrsql:
+            return OGRSQL
+        if not sqlite:
+            return SQLITE
+        return OGRSQL if ogrsql['ewma'] <= sqlite['ewma'] else SQLITE
+
+    # ----------------------------------------------------------------------
+    def record(self, query, dialect, exec_time):
+        """Record execution time of the statement with the dialect."""
+        if parse_simple_query(query):
+            return
+        shape_timings = self.timings.setdefault(get_query_shape(query), {})
+        dialect_timings = shape_timings.get(dialect)
+        if dialect_timings and 'ewma' in dialect_timings:
+            dialect_timings['ewma'] += EWMA_ALPHA * (
+                exec_time - dialect_timings['ewma'])
+            dialect_timings['runs'] += 1
+        else:
+            shape_timings[dialect] = {'ewma': exec_time, 'runs': 1}
+        shape_timings['updated'] = time.time()
+        self._save()
+        return
+
+    # ----------------------------------------------------------------------
+    def record_timer(self, query, dialect, timer, execution_path=None):
+        """Record time of executing the statement and fetching its rows.
+
+        `timer` is the QueryTimer of the statement; nothing is recorded if
+        the `execution_path` shows the dialect was not used on its own.
+        """
+        if execution_path:
+            return
+        self.record(
+            query, dialect,
+            sum(timer.phases.get(phase, 0.0) for phase in COMPARED_PHASES))
+        return
+
+    # ----------------------------------------------------------------------
+    def record_failure(self, query, dialect):
+        """Record that the dialect could not execute the statement."""
+        shape_timings = self.timings.setdefault(get_query_shape(query), {})
+        shape_timings[dialect] = {'failed': True}
+        shape_timings['updated'] = time.time()
+        self._save()
+        return
+
+    # ----------------------------------------------------------------------
+    def execute(self, gdb, query, include_geometry=True):
+        """Execute statement with the chosen dialect.
+
+        A statement failing with OGR SQL is executed again with SQLite;
+        the time is recorded with `record_timer` once the first rows of
+        the result have been fetched.
+        Return tuple (layer, errors, name of the dialect used).
+        """
+        simple_query = parse_simple_query(query)
+        field_types = None
+        if simple_query and simple_query.where and hasattr(
+                gdb, 'get_field_types'):
+            field_types = gdb.get_field_types(simple_query.table)
+        dialect = self.choose(query, field_types)
+        layer, errors = gdb.execute_sql(
+            query, dialect, include_geometry=include_geometry)
+        if errors and dialect == OGRSQL:
+            self.record_failure(query, dialect)
+            dialect = SQLITE
+            layer, errors = gdb.execute_sql(
+                query, dialect, include_geometry=include_geometry)
+        return layer, errors, dialect
+
+    # ----------------------------------------------------------------------
+    def _save(self):
+        """Write the timings into the file keeping the latest shapes only."""
+        if not self.timings_path or not self.save:
+            return
+        if len(self.timings) > MAX_SHAPES:
+            latest = sorted(
+                self.timings.items(),
+                key=lambda item: item[1].get('updated', 0),
+                reverse=True)[:MAX_SHAPES]
+            self.timings = dict(latest)
+        try:
+            folder = os.path.dirname(self.timings_path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            with io.open(self.timings_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(self.timings, indent=1))
+        except (IOError, OSError):
+            # timings are an optimization only; never fail the query
+            pass
+        return
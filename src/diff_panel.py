@@ -0,0 +1,170 @@
+# -*- coding: UTF-8 -*-
+"""Dockable panel with the differences between two result sets.
+
+The rows of both result sets are read on a worker thread which executes
+their queries again over its own connections to the geodatabases and
+keeps only the hashes of the rows. Results which cannot be executed
+again are compared by the rows fetched into their tables. An interrupted
+worker stops before reading the next batch of rows.
+"""
+
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QLabel,
+                             QTreeWidget, QTreeWidgetItem)
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from geodatabase import iter_query_rows
+from result_diff import (ADDED, CHANGED, REMOVED, DiffInterrupted,
+                         diff_rows, get_common_columns, iter_interruptible)
+
+SAMPLES_HEADERS = ['Change', 'Key']
+
+
+# ----------------------------------------------------------------------
+def get_table_rows(table, columns):
+    """Get tuple (query source, fetched rows) of the result table.
+
+    The query source is None if the query cannot be executed again;
+    the value tuples of the rows fetched are returned instead.
+    """
+    table_data = table.table_data
+    source = getattr(table, 'query_source', None)
+    if source:
+        return source + (table_data.geom_column in columns, ), None
+    return None, [
+        tuple(getattr(row, column, None) for column in columns)
+        for row in table_data.rows
+    ]
+
+
+########################################################################
+class DiffWorker(QThread):
+    """Thread comparing the rows of two result sets."""
+
+    # emitted with the ResultDiff
+    compared = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    # ----------------------------------------------------------------------
+    def __init__(self, columns, old_rows, new_rows, key_column=None,
+                 parent=None):
+        """Initialize DiffWorker with the rows of the result sets.
+
+        `old_rows` and `new_rows` are tuples (query source, fetched rows)
+        as returned by `get_table_rows`.
+        """
+        super(DiffWorker, self).__init__(parent)
+        self.columns = columns
+        self.old_rows = old_rows
+        self.new_rows = new_rows
+        self.key_column = key_column
+        return
+
+    # ----------------------------------------------------------------------
+    def run(self):
+        """Override built-in method."""
+        source_rows = []
+        values = []
+        for source, rows in (self.old_rows, self.new_rows):
+            if source:
+                source_rows.append(iter_query_rows(*source))
+                rows = (tuple(row.get(column) for column in self.columns)
+                        for row in source_rows[-1])
+            values.append(
+                iter_interruptible(rows, self.isInterruptionRequested))
+        key_index = (self.columns.index(self.key_column)
+                     if self.key_column else None)
+        try:
+            self.compared.emit(diff_rows(values[0], values[1], key_index))
+        except DiffInterrupted:
+            pass
+        except Exception as err:
+            self.failed.emit(str(err))
+        finally:
+            for rows in source_rows:
+                # closes the connection if the rows were not all read
+                rows.close()
+        return
+
+
+########################################################################
+class DiffPanel(QDockWidget):
+    """Panel listing the rows added, removed and changed."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, parent=None):
+        """Initialize DiffPanel with no comparison."""
+        super(DiffPanel, self).__init__('Result comparison', parent)
+        self.worker = None
+        self.diff = None
+        self.title = ''
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        self.samples = QTreeWidget()
+        self.samples.setRootIsDecorated(False)
+        self.samples.setHeaderLabels(SAMPLES_HEADERS)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.samples)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+        return
+
+    # ----------------------------------------------------------------------
+    def compare(self, old_table, new_table, key_column=None, title=''):
+        """Start comparing the rows of the result tables.
+
+        The columns of both tables are compared; the rows are matched by
+        the values of `key_column` if given and as a whole otherwise.
+        """
+        self.stop()
+        columns = get_common_columns(old_table.table_data.headers,
+                                     new_table.table_data.headers)
+        if key_column is not None and key_column not in columns:
+            raise ValueError(
+                'Column {0} is not in both result sets'.format(key_column))
+        self.title = title
+        self.diff = None
+        self.samples.clear()
+        self.status_label.setText('Comparing {0}...'.format(title))
+        self.worker = DiffWorker(columns, get_table_rows(old_table, columns),
+                                 get_table_rows(new_table, columns),
+                                 key_column)
+        self.worker.compared.connect(self.show_diff)
+        self.worker.failed.connect(self.show_error)
+        self.worker.start()
+        return
+
+    # ----------------------------------------------------------------------
+    def stop(self):
+        """Stop comparing the rows."""
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker.wait()
+            self.worker = None
+        return
+
+    # ----------------------------------------------------------------------
+    def show_diff(self, diff):
+        """Show the counts of the rows and the keys of the rows changed."""
+        self.diff = diff
+        counts = ('{0}: {1} added, {2} removed, {3} changed, '
+                  '{4} unchanged'.format(self.title, diff.added, diff.removed,
+                                         diff.changed, diff.unchanged))
+        if diff.duplicate_keys:
+            counts += '; {0} rows with a repeated key not compared'.format(
+                diff.duplicate_keys)
+        self.status_label.setText(counts)
+        for kind in (ADDED, REMOVED, CHANGED):
+            for key in diff.samples.get(kind, []):
+                self.samples.addTopLevelItem(
+                    QTreeWidgetItem([kind, str(key)]))
+        return
+
+    # ----------------------------------------------------------------------
+    def show_error(self, errors):
+        """Show why the result sets could not be compared."""
+        self.status_label.setText('Failed: {0}'.format(errors))
+        return
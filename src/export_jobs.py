@@ -0,0 +1,441 @@
+# -*- coding: UTF-8 -*-
+"""Jobs exporting result sets in the background.
+
+Every export is a job run by a thread pool; the job reads the rows of
+the result (executing its query again over its own connection to the
+geodatabase, or taking the rows already fetched if the query cannot be
+executed again), reports the number of rows written, and can be
+cancelled between batches of rows. The text produced (or a note where
+the output has been saved) is written into a temporary file whose path
+is emitted once the job is done, so that the application stays
+responsive and the output is never held in memory as a whole.
+"""
+
+import binascii
+import csv
+import io
+import itertools
+import os
+import tempfile
+from importlib.util import find_spec
+
+import ogr
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from geodatabase import iter_query_rows
+
+QGIS_EXPORT = 'QGIS'
+ARCMAP_EXPORT = 'ArcMap'
+DATAFRAME_EXPORT = 'DataFrame'
+MARKDOWN_EXPORT = 'Markdown'
+
+# rows read between the progress reports and the checks for cancelling
+EXPORT_BATCH_SIZE = 1000
+# Markdown tables with more rows are written into a file
+MARKDOWN_MAX_ROWS = 1000
+# exports run at the same time; the rest wait in the queue
+MAX_RUNNING_JOBS = 2
+
+# arcpy geometry types of the WKT geometry types
+ARCMAP_GEOMETRY_TYPES = {
+    'POINT': 'POINT',
+    'MULTIPOINT': 'MULTIPOINT',
+    'LINESTRING': 'POLYLINE',
+    'MULTILINESTRING': 'POLYLINE',
+    'POLYGON': 'POLYGON',
+    'MULTIPOLYGON': 'POLYGON',
+}
+# fields every feature class has; result columns with these names are
+# added with a suffix
+ARCMAP_RESERVED_FIELDS = ('OBJECTID', 'SHAPE')
+# range of the arcpy LONG fields; larger integers are kept as DOUBLE
+ARCMAP_LONG_RANGE = (-2**31, 2**31)
+
+# tabulate is imported only when exporting into a Markdown table
+tabulate_found = find_spec('tabulate') is not None
+
+
+########################################################################
+class JobCancelled(Exception):
+    """Raised within a job once the user has cancelled it."""
+
+
+# ----------------------------------------------------------------------
+def get_values_kind(kind, value):
+    """Get kind of the column values (int, float or str) adding a value."""
+    if isinstance(value, int) and (ARCMAP_LONG_RANGE[0] <= value <
+                                   ARCMAP_LONG_RANGE[1]):
+        value_kind = int
+    elif isinstance(value, (int, float)):
+        value_kind = float
+    else:
+        value_kind = str
+    if kind is None or kind == value_kind:
+        return value_kind
+    if {kind, value_kind} == {int, float}:
+        return float
+    return str
+
+
+# ----------------------------------------------------------------------
+def get_wkb_hex(wkt):
+    """Get hex encoded WKB of the WKT geometry; empty if it is invalid."""
+    try:
+        geom = ogr.CreateGeometryFromWkt(wkt)
+    except RuntimeError:
+        # raised instead of returning None once OGR exceptions are on
+        geom = None
+    if geom is None:
+        return ''
+    return binascii.hexlify(bytes(geom.ExportToWkb())).decode('ascii')
+
+
+# ----------------------------------------------------------------------
+def get_arcmap_field_type(values_kind, max_length):
+    """Get arcpy field type and length for the kind of the column values."""
+    if values_kind == int:
+        return 'LONG', None
+    if values_kind == float:
+        return 'DOUBLE', None
+    return 'TEXT', max(max_length, 1)
+
+
+# ----------------------------------------------------------------------
+def get_arcmap_snippet(out_csv, geometry_type, fields):
+    """Get arcpy code loading the rows exported into the csv file.
+
+    `fields` is a list of tuples (name, arcpy field type, text length)
+    in the order of the csv columns following the WKB column.
+    """
+    converters = {
+        'LONG': 'int',
+        'DOUBLE': 'float',
+        'TEXT': "lambda value: value.decode('utf-8')",
+    }
+    lines = [
+        'import binascii',
+        'import csv',
+        'import arcpy',
+        '',
+        'csv.field_size_limit(2**31 - 1)',
+        "fc = arcpy.CreateFeatureclass_management("
+        "'in_memory', 'GDBeeLayer', '{0}').getOutput(0)".format(
+            geometry_type),
+    ]
+    names = [
+        name + '_1' if name.upper() in ARCMAP_RESERVED_FIELDS else name
+        for name, _field_type, _length in fields
+    ]
+    for name, (_name, field_type, length) in zip(names, fields):
+        lines.append("arcpy.AddField_management(fc, '{0}', '{1}'{2})".format(
+            name, field_type,
+            ', field_length={0}'.format(length) if length else ''))
+    lines.extend([
+        'converters = [{0}]'.format(', '.join(
+            converters[field_type] for _name, field_type, _length in fields)),
+        "with open(r'{0}', 'rb') as f:".format(out_csv),
+        '\treader = csv.reader(f)',
+        '\tnext(reader)',
+        "\twith arcpy.da.InsertCursor(fc, ['SHAPE@'] + {0}) as cursor:".format(
+            [str(name) for name in names]),
+        '\t\tfor row in reader:',
+        '\t\t\tshape = (arcpy.FromWKB(bytearray(binascii.unhexlify(row[0])))'
+        ' if row[0] else None)',
+        '\t\t\tcursor.insertRow([shape] + [convert(value) if value else None '
+        'for convert, value in zip(converters, row[1:])])',
+    ])
+    return '\n'.join(lines)
+
+
+########################################################################
+class ExportJobSignals(QObject):
+    """Signals of an export job; QRunnable cannot emit signals itself."""
+
+    # rows read so far and total rows of the result
+    progress = pyqtSignal(int, int)
+    # path of the file with the text to show once done
+    finished = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+########################################################################
+class ExportJob(QRunnable):
+    """Job exporting result rows into one of the export formats."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, export_format, headers, total, geom_column=None,
+                 source=None, rows=None):
+        """Initialize ExportJob with the result to export.
+
+        `source` is a tuple (geodatabase path, SQL query, dialect,
+        include geometry) of the query to execute; `rows` are the row
+        dicts exported otherwise. `geom_column` is the geometry column
+        of the rows if they include geometries as WKT.
+        """
+        super(ExportJob, self).__init__()
+        self.setAutoDelete(False)
+        self.export_format = export_format
+        self.headers = headers
+        self.total = total
+        self.geom_column = geom_column
+        self.source = source
+        self.rows = rows
+        self.signals = ExportJobSignals()
+        self.rows_read = 0
+        self.is_cancelled = False
+        self.is_done = False
+        self.output_path = None
+        # files with the exported rows the output refers to
+        self.data_paths = []
+        return
+
+    # ----------------------------------------------------------------------
+    def cancel(self):
+        """Stop the job before the next batch of rows is read."""
+        self.is_cancelled = True
+        return
+
+    # ----------------------------------------------------------------------
+    def iter_batches(self):
+        """Iterate batches of row dicts reporting the progress."""
+        source_rows = iter_query_rows(*self.source) if self.source else None
+        rows = iter(self.rows if source_rows is None else source_rows)
+        try:
+            while True:
+                if self.is_cancelled:
+                    raise JobCancelled()
+                batch = list(itertools.islice(rows, EXPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                self.rows_read += len(batch)
+                self.signals.progress.emit(self.rows_read,
+                                           max(self.total, self.rows_read))
+                yield batch
+        finally:
+            if source_rows is not None:
+                # closes the connection if the rows were not all read
+                source_rows.close()
+        return
+
+    # ----------------------------------------------------------------------
+    def run(self):
+        """Override built-in method."""
+        try:
+            exporter = {
+                QGIS_EXPORT: self.export_qgis,
+                ARCMAP_EXPORT: self.export_arcmap,
+                DATAFRAME_EXPORT: self.export_dataframe,
+                MARKDOWN_EXPORT: self.export_markdown,
+            }[self.export_format]
+            fd, self.output_path = tempfile.mkstemp(prefix='gdbee-export-',
+                                                    suffix='.txt')
+            with io.open(fd, 'w', encoding='utf-8', newline='') as out:
+                exporter(out)
+        except JobCancelled:
+            self.remove_output()
+            self.is_done = True
+            self.signals.cancelled.emit()
+            return
+        except Exception as err:
+            self.remove_output()
+            self.is_done = True
+            self.signals.failed.emit(str(err))
+            return
+        self.is_done = True
+        self.signals.finished.emit(self.output_path)
+        return
+
+    # ----------------------------------------------------------------------
+    def create_data_file(self, suffix):
+        """Create new temporary file for the exported rows.
+
+        Every job writes into files of its own so that the jobs running
+        at the same time never overwrite the files the others refer to.
+        """
+        fd, path = tempfile.mkstemp(prefix='gdbee-export-', suffix=suffix)
+        os.close(fd)
+        self.data_paths.append(path)
+        return path
+
+    # ----------------------------------------------------------------------
+    def remove_output(self, keep_data_files=False):
+        """Remove the files with the output of the job.
+
+        With `keep_data_files` the files with the exported rows are kept
+        for the code pasted from the output which refers to them.
+        """
+        paths = [self.output_path]
+        if not keep_data_files:
+            paths.extend(self.data_paths)
+            self.data_paths = []
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+        self.output_path = None
+        return
+
+    # ----------------------------------------------------------------------
+    def export_qgis(self, out):
+        """Write plain WKT to use with the QuickWKT plugin."""
+        if not self.geom_column:
+            return
+        separator = ''
+        for batch in self.iter_batches():
+            for row in batch:
+                if row.get(self.geom_column):
+                    out.write(separator + row[self.geom_column])
+                    separator = '\n'
+        return
+
+    # ----------------------------------------------------------------------
+    def export_arcmap(self, out):
+        """Write arcpy code to create in_memory layer from a temp csv file.
+
+        The geometries are written as WKB in hex along with the attributes
+        so that the code stays short whatever the number of rows.
+        """
+        if not self.geom_column:
+            return
+        columns = [
+            header for header in self.headers if header != self.geom_column
+        ]
+        kinds = dict.fromkeys(columns)
+        lengths = dict.fromkeys(columns, 0)
+        geometry_type = None
+        out_csv = self.create_data_file('.csv')
+        with io.open(out_csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['WKB'] + columns)
+            for batch in self.iter_batches():
+                for row in batch:
+                    wkt = row.get(self.geom_column)
+                    wkb = get_wkb_hex(wkt) if wkt else ''
+                    if wkb:
+                        if geometry_type is None:
+                            geometry_type = ARCMAP_GEOMETRY_TYPES.get(
+                                wkt.split('(')[0].split()[0].upper())
+                    values = [row.get(column) for column in columns]
+                    for column, value in zip(columns, values):
+                        if value is None:
+                            continue
+                        kinds[column] = get_values_kind(kinds[column], value)
+                        if kinds[column] == str:
+                            lengths[column] = max(lengths[column],
+                                                  len(str(value)))
+                    writer.writerow([wkb] + values)
+        fields = [(column, ) + get_arcmap_field_type(kinds[column],
+                                                     lengths[column])
+                  for column in columns]
+        out.write(
+            get_arcmap_snippet(out_csv, geometry_type or 'POLYGON', fields))
+        return
+
+    # ----------------------------------------------------------------------
+    def export_dataframe(self, out):
+        """Write Python code to create a pandas df using a temp csv file."""
+        out_csv = self.create_data_file('.csv')
+        with io.open(out_csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            # the first column is the index of the data frame
+            writer.writerow([''] + self.headers)
+            index = 1
+            for batch in self.iter_batches():
+                writer.writerows([index + i] +
+                                 [row.get(header) for header in self.headers]
+                                 for i, row in enumerate(batch))
+                index += len(batch)
+        out.write('{0}{1}'.format(
+            'import pandas as pd\n',
+            'df = pd.read_csv(r"{out_csv}", sep=";", index_col=0)'.format(
+                out_csv=out_csv)))
+        return
+
+    # ----------------------------------------------------------------------
+    def export_markdown(self, out):
+        """Write table formatted in Markdown; large tables go into a file."""
+        if not tabulate_found:
+            out.write('Tabulate package is not installed.\n'
+                      'Get it from https://pypi.python.org/pypi/tabulate')
+            return
+        from tabulate import tabulate
+        values = [[row.get(header) for header in self.headers]
+                  for batch in self.iter_batches() for row in batch]
+        s = tabulate(
+            values,
+            headers=self.headers,
+            tablefmt='pipe',
+            floatfmt='.4f',
+            showindex=range(1,
+                            len(values) + 1))
+        if len(values) > MARKDOWN_MAX_ROWS:
+            out_md = self.create_data_file('.md')
+            with io.open(out_md, 'w', encoding='utf-8') as f:
+                f.write(s)
+            out.write('Markdown file is saved at {0}'.format(out_md))
+        else:
+            out.write(s)
+        return
+
+
+########################################################################
+class ExportJobQueue(object):
+    """Queue of export jobs run by a thread pool."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, synchronous=False, max_running=MAX_RUNNING_JOBS):
+        """Initialize ExportJobQueue.
+
+        The jobs are run right away on the calling thread if
+        `synchronous` is set (used by the unit tests).
+        """
+        self.synchronous = synchronous
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_running)
+        self.jobs = []
+        # outputs of the jobs removed from the queue
+        self.output_paths = []
+        return
+
+    # ----------------------------------------------------------------------
+    def submit(self, job):
+        """Queue the job to be run once a thread is free."""
+        self.jobs.append(job)
+        if self.synchronous:
+            job.run()
+        else:
+            self.pool.start(job)
+        return
+
+    # ----------------------------------------------------------------------
+    def remove_done_jobs(self):
+        """Forget the jobs which are done keeping their outputs."""
+        for job in self.jobs:
+            if job.is_done and job.output_path:
+                self.output_paths.append(job.output_path)
+        self.jobs = [job for job in self.jobs if not job.is_done]
+        return
+
+    # ----------------------------------------------------------------------
+    def cancel_all(self):
+        """Cancel all jobs and wait for the running ones to stop."""
+        for job in self.jobs:
+            job.cancel()
+        self.pool.clear()
+        self.pool.waitForDone()
+        return
+
+    # ----------------------------------------------------------------------
+    def remove_outputs(self):
+        """Remove the output files of all jobs shown in the export window.
+
+        The files with the exported rows (the .csv and .md files the code
+        of the output refers to) are left in the temporary folder.
+        """
+        for job in self.jobs:
+            job.remove_output(keep_data_files=True)
+        for path in self.output_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.output_paths = []
+        return
@@ -0,0 +1,218 @@
+# -*- coding: UTF-8 -*-
+"""Execution of the same SQL query across many geodatabases in parallel.
+
+Every geodatabase is queried in a separate worker process; the results
+are yielded as soon as each geodatabase is done so they can be streamed
+into a single result table or an export file. The workers write the rows
+in batches into temporary files which are read back batch by batch, so
+that neither the workers nor the application hold all rows of a
+geodatabase at once.
+"""
+
+import glob
+import itertools
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+from collections import namedtuple
+
+from cfg import auto_dialect_name
+from dialect_selector import DialectSelector, get_dialect_timings_path
+from geodatabase import Geodatabase, get_layer_columns, iter_layer_rows
+
+# column added in front of the result columns naming the source geodatabase
+SOURCE_COLUMN = 'source_gdb'
+# rows written into the rows file of a geodatabase at once
+ROWS_BATCH_SIZE = 1000
+
+# `rows_path` is the file with the rows (None if the query has failed)
+FanoutResult = namedtuple(
+    'FanoutResult',
+    ['path', 'columns', 'rows_path', 'rows_count', 'errors', 'exec_time',
+     'fetch_time'])
+
+
+# ----------------------------------------------------------------------
+def resolve_gdb_paths(patterns):
+    """Get sorted list of unique geodatabase paths matching glob patterns."""
+    paths = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [
+            pattern
+        ]
+        for path in matches:
+            path = os.path.normpath(path)
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+# ----------------------------------------------------------------------
+def get_source_name(path):
+    """Get name identifying the geodatabase in the source column."""
+    return os.path.basename(os.path.normpath(path))
+
+
+# ----------------------------------------------------------------------
+def query_geodatabase(task):
+    """Execute SQL query against a geodatabase writing its rows into a file.
+
+    Run in a worker process; `task` is a tuple
+    (gdb path, SQL query, dialect, include geometry). The rows are read
+    back with `iter_row_batches`.
+    """
+    path, sql_query, dialect, include_geometry = task
+    columns, rows_path, errors = None, None, None
+    rows_count = 0
+    exec_time = fetch_time = 0.0
+    gdb = Geodatabase(path)
+    try:
+        if not gdb.is_valid():
+            errors = 'This is not a valid file geodatabase'
+        else:
+            start_time = time.time()
+            gdb.open_connection()
+            if dialect and dialect.lower() == auto_dialect_name.lower():
+                # workers only read the timings recorded by the application
+                selector = DialectSelector(
+                    get_dialect_timings_path(), save=False)
+                layer, errors, _dialect = selector.execute(
+                    gdb, sql_query, include_geometry)
+            else:
+                layer, errors = gdb.execute_sql(sql_query, dialect,
+                                                include_geometry)
+            exec_time = time.time() - start_time
+            if layer and not errors:
+                start_time = time.time()
+                columns = get_layer_columns(layer, include_geometry)
+                rows_path, rows_count = write_row_batches(
+                    iter_layer_rows(layer, include_geometry))
+                fetch_time = time.time() - start_time
+    except Exception as err:
+        errors = str(err)
+    finally:
+        gdb.close_connection()
+    return FanoutResult(path, columns, rows_path, rows_count, errors,
+                        exec_time, fetch_time)
+
+
+# ----------------------------------------------------------------------
+def write_row_batches(rows):
+    """Write row dicts in batches into a new temporary file.
+
+    Return tuple (path of the file, number of rows written).
+    """
+    handle, path = tempfile.mkstemp(prefix='gdbee-fanout-', suffix='.rows')
+    rows_count = 0
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            while True:
+                batch = list(itertools.islice(rows, ROWS_BATCH_SIZE))
+                if not batch:
+                    break
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                rows_count += len(batch)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, rows_count
+
+
+# ----------------------------------------------------------------------
+def iter_row_batches(result):
+    """Iterate batches of row dicts of the result removing its file after."""
+    if not result.rows_path:
+        return
+    try:
+        with open(result.rows_path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    break
+    finally:
+        os.remove(result.rows_path)
+    return
+
+
+# ----------------------------------------------------------------------
+def remove_rows_files(results):
+    """Remove the files of the results whose rows have not been read."""
+    for result in results:
+        if result.rows_path and os.path.exists(result.rows_path):
+            os.remove(result.rows_path)
+    return
+
+
+# ----------------------------------------------------------------------
+def run_fanout(gdb_paths, sql_query, dialect='sqlite', include_geometry=True,
+               processes=None):
+    """Execute SQL query against every geodatabase using a process pool.
+
+    Yield `FanoutResult` for each geodatabase in the order they finish.
+    If the iteration is stopped early, the rows files of the results
+    yielded but not read and of the workers finished meanwhile are
+    removed.
+    """
+    tasks = [(path, sql_query, dialect, include_geometry)
+             for path in gdb_paths]
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    results = []
+    is_complete = False
+    if processes <= 1:
+        try:
+            for task in tasks:
+                results.append(query_geodatabase(task))
+                yield results[-1]
+            is_complete = True
+        finally:
+            if not is_complete:
+                remove_rows_files(results)
+        return
+
+    # spawned workers do not inherit the state of the GUI process
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(processes)
+    pool_results = pool.imap_unordered(query_geodatabase, tasks)
+    try:
+        for result in pool_results:
+            results.append(result)
+            yield result
+        is_complete = True
+    finally:
+        pool.terminate()
+        if not is_complete:
+            # results of the workers which finished but were not yielded
+            while True:
+                try:
+                    results.append(pool_results.next(timeout=0))
+                except (StopIteration, multiprocessing.TimeoutError):
+                    break
+            remove_rows_files(results)
+    return
+
+
+# ----------------------------------------------------------------------
+def format_fanout_report(results, total_time):
+    """Get text report with execution time and errors per geodatabase."""
+    lines = [
+        'Executed against {count} geodatabases in {secs:.1f} secs'.format(
+            count=len(results), secs=total_time)
+    ]
+    for result in sorted(results, key=lambda r: r.path):
+        if result.errors:
+            details = 'failed: {err}'.format(err=result.errors)
+        else:
+            details = '{exec_time:.1f} secs execute | {fetch_time:.1f} secs ' \
+                'fetch | {rows} rows'.format(
+                    exec_time=result.exec_time,
+                    fetch_time=result.fetch_time,
+                    rows=result.rows_count)
+        lines.append('{name}: {details}'.format(
+            name=get_source_name(result.path), details=details))
+    return '\n'.join(lines)
@@ -0,0 +1,287 @@
+# -*- coding: UTF-8 -*-
+"""Fast path serving simple single table queries directly from the layer.
+
+Queries such as
+
+    SELECT Name, Type FROM streets WHERE Oneway = 'yes' LIMIT 100
+
+do not need a SQL engine: the WHERE clause is set as the attribute filter
+of the source layer (which can use the attribute indexes of the file
+geodatabase), the columns not asked for are not read at all and the
+features are iterated directly. Anything more complex (expressions,
+functions, aliases, ordering, grouping, joins) is executed by the SQL
+dialect as before.
+
+The attribute filter is evaluated by OGR SQL which types and compares
+values differently from SQLite (`TextCol = 5`, `Name < 'b'`), so the
+queries of the other dialects are served from the layer only if their
+filter compares numeric fields with numbers.
+"""
+
+from collections import namedtuple
+
+from sql_lexer import tokenize, COMMENT_KINDS, IDENTIFIER_KINDS
+from sql_context import unquote_identifier
+
+SimpleQuery = namedtuple('SimpleQuery',
+                         ['table', 'columns', 'where', 'where_columns',
+                          'limit'])
+
+# words a WHERE clause may consist of to be used as an attribute filter;
+# LIKE is not here as its case sensitivity differs between the dialects
+FILTER_WORDS = {'and', 'or', 'not', 'in', 'is', 'null', 'between'}
+FILTER_PUNCT = {'=', '<', '>', '!', '(', ')', ',', '-', '+'}
+# words which make a clause not a simple condition on columns
+NOT_FILTER_WORDS = {
+    'select', 'exists', 'like', 'glob', 'match', 'regexp', 'escape',
+    'collate', 'case', 'when', 'then', 'else', 'end', 'cast', 'order',
+    'group', 'having', 'union', 'except', 'intersect', 'window', 'offset'
+}
+# field types compared with numbers the same way by all the dialects
+NUMERIC_FIELD_TYPES = {'Integer', 'Integer64', 'Real'}
+
+
+# ----------------------------------------------------------------------
+def parse_simple_query(query):
+    """Parse `SELECT cols FROM table [WHERE condition] [LIMIT n]` query.
+
+    Return SimpleQuery (with `columns` None for `*`) or None if the query
+    is anything else.
+    """
+    tokens = [
+        t for t in tokenize(query)
+        if t.kind not in COMMENT_KINDS and t.kind != 'separator'
+    ]
+    if len(tokens) < 4 or _word(tokens[0]) != 'select':
+        return None
+
+    pos = 1
+    columns = []
+    if tokens[pos].value == '*':
+        columns = None
+        pos += 1
+    else:
+        while pos < len(tokens) and tokens[pos].kind in IDENTIFIER_KINDS:
+            columns.append(unquote_identifier(tokens[pos].value))
+            pos += 1
+            if pos < len(tokens) and tokens[pos].value == ',':
+                pos += 1
+            else:
+                break
+        if not columns:
+            return None
+
+    if (pos + 1 >= len(tokens) or _word(tokens[pos]) != 'from'
+            or tokens[pos + 1].kind not in IDENTIFIER_KINDS):
+        return None
+    table = unquote_identifier(tokens[pos + 1].value)
+    pos += 2
+
+    where, where_columns = None, []
+    if pos < len(tokens) and _word(tokens[pos]) == 'where':
+        start = pos + 1
+        pos = start
+        while pos < len(tokens) and _word(tokens[pos]) != 'limit':
+            pos += 1
+        where_columns = _get_filter_columns(tokens[start:pos])
+        if where_columns is None:
+            return None
+        where = query[tokens[start].start:tokens[pos - 1].start +
+                      len(tokens[pos - 1].value)]
+
+    limit = None
+    if pos < len(tokens) and _word(tokens[pos]) == 'limit':
+        if pos + 2 != len(tokens) or tokens[pos + 1].kind != 'number':
+            return None
+        try:
+            limit = int(tokens[pos + 1].value)
+        except ValueError:
+            return None
+        pos += 2
+
+    if pos != len(tokens):
+        return None
+    return SimpleQuery(table, columns, where, where_columns, limit)
+
+
+# ----------------------------------------------------------------------
+def _word(token):
+    """Get lowercase value of a word token; None for other tokens."""
+    return token.value.lower() if token.kind == 'word' else None
+
+
+# ----------------------------------------------------------------------
+def _get_filter_columns(tokens):
+    """Get columns used in a condition; None if it is not a simple one."""
+    if not tokens:
+        return None
+    columns = []
+    for idx, token in enumerate(tokens):
+        next_value = tokens[idx + 1].value if idx + 1 < len(tokens) else None
+        if token.kind in IDENTIFIER_KINDS:
+            if _word(token) in FILTER_WORDS:
+                continue
+            if _word(token) in NOT_FILTER_WORDS:
+                return None
+            if next_value in ('(', '.'):
+                return None
+            columns.append(unquote_identifier(token.value))
+        elif token.kind in ('string', 'number'):
+            continue
+        elif token.kind == 'punct' and token.value in FILTER_PUNCT:
+            # `==` is not understood by OGR SQL
+            if token.value == '=' and next_value == '=':
+                return None
+            if token.value == '!' and next_value != '=':
+                return None
+        else:
+            return None
+    return columns
+
+
+# ----------------------------------------------------------------------
+def is_dialect_neutral(simple_query, field_types):
+    """Check if the query filter selects the same rows in all dialects.
+
+    `field_types` maps the lowercase field names to their OGR type names;
+    only filters comparing numeric fields with numbers qualify.
+    """
+    if not simple_query.where:
+        return True
+    if any(token.kind == 'string' for token in tokenize(simple_query.where)):
+        return False
+    return all(
+        field_types.get(column.lower()) in NUMERIC_FIELD_TYPES
+        for column in simple_query.where_columns)
+
+
+# ----------------------------------------------------------------------
+def open_fast_path_layer(ds, simple_query, include_geometry=True,
+                         ogr_sql=True):
+    """Set up layer of the data source to serve a simple query.
+
+    Return FilteredLayer or None if the query references columns or a
+    table that do not exist or, unless `ogr_sql` is set, if its filter
+    may select other rows than the dialect of the query would; raise if
+    the filter cannot be set.
+    """
+    layer = None
+    for idx in range(ds.GetLayerCount()):
+        candidate = ds.GetLayerByIndex(idx)
+        if candidate.GetName().lower() == simple_query.table.lower():
+            layer = candidate
+            break
+    if layer is None:
+        return None
+
+    defn = layer.GetLayerDefn()
+    fields = [defn.GetFieldDefn(i) for i in range(defn.GetFieldCount())]
+    fields_lookup = {field.GetName().lower(): field for field in fields}
+    geom_col = layer.GetGeometryColumn()
+
+    if simple_query.columns is None:
+        selected, with_geometry = fields, bool(geom_col)
+    else:
+        selected, with_geometry = [], False
+        for column in simple_query.columns:
+            name = column.lower()
+            if geom_col and name == geom_col.lower() and not with_geometry:
+                with_geometry = True
+            elif name in fields_lookup and fields_lookup[name].GetName(
+            ) not in [field.GetName() for field in selected]:
+                selected.append(fields_lookup[name])
+            else:
+                return None
+
+    where_columns = {column.lower() for column in simple_query.where_columns}
+    if not where_columns.issubset(fields_lookup):
+        return None
+    if not ogr_sql and not is_dialect_neutral(
+            simple_query, {
+                name: field.GetTypeName()
+                for name, field in fields_lookup.items()
+            }):
+        return None
+
+    # fields used in the filter must be read to evaluate it
+    read_columns = where_columns | {
+        field.GetName().lower()
+        for field in selected
+    }
+    ignored = [
+        field.GetName() for field in fields
+        if field.GetName().lower() not in read_columns
+    ]
+    if not (with_geometry and include_geometry):
+        ignored.append('OGR_GEOMETRY')
+    ignored.append('OGR_STYLE')
+    layer.SetIgnoredFields(ignored)
+    layer.SetAttributeFilter(simple_query.where)
+    layer.ResetReading()
+    return FilteredLayer(layer, selected, geom_col if with_geometry else '',
+                         simple_query.limit)
+
+
+########################################################################
+class FilteredLayer(object):
+    """Source layer with an attribute filter served as a query result.
+
+    Provides the subset of the OGR layer interface the result table and
+    the exporters use.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, layer, fields, geom_column, limit=None):
+        """Initialize FilteredLayer with the selected fields."""
+        self.layer = layer
+        self.schema = fields
+        self.geom_column = geom_column
+        self.limit = limit
+        self.features_read = 0
+        self.features_count = None
+        return
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        """Get number of features matching the filter."""
+        if self.features_count is None:
+            self.features_count = self.layer.GetFeatureCount()
+            if self.limit is not None:
+                self.features_count = min(self.features_count, self.limit)
+        return self.features_count
+
+    # ----------------------------------------------------------------------
+    def GetName(self):  # noqa: N802
+        """Get name of the source layer."""
+        return self.layer.GetName()
+
+    # ----------------------------------------------------------------------
+    def GetGeometryColumn(self):  # noqa: N802
+        """Get geometry column name; empty if it was not selected."""
+        return self.geom_column
+
+    # ----------------------------------------------------------------------
+    def GetNextFeature(self):  # noqa: N802
+        """Get next feature matching the filter; None when exhausted."""
+        if self.limit is not None and self.features_read >= self.limit:
+            return None
+        feat = self.layer.GetNextFeature()
+        if feat:
+            self.features_read += 1
+        return feat
+
+    # ----------------------------------------------------------------------
+    def SetNextByIndex(self, index):  # noqa: N802
+        """Move the cursor to the feature with the index."""
+        self.ResetReading()
+        for _i in range(index):
+            if self.GetNextFeature() is None:
+                break
+        return
+
+    # ----------------------------------------------------------------------
+    def ResetReading(self):  # noqa: N802
+        """Start reading features from the first one."""
+        self.layer.ResetReading()
+        self.features_read = 0
+        return
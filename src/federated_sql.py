@@ -0,0 +1,377 @@
+# -*- coding: UTF-8 -*-
+"""Planning of SQL queries referencing datasets of several geodatabases.
+
+Datasets of attached geodatabases are referenced as `alias.dataset`. The
+query is rewritten to use layers of an OGR virtual data source (VRT) which
+has one layer per referenced dataset; WHERE conditions involving a single
+dataset are pushed down into the VRT layer definition so that only the
+matching rows are read from the source geodatabase before joining.
+"""
+
+from collections import OrderedDict, namedtuple
+from xml.sax.saxutils import escape, quoteattr
+
+from fast_path import NOT_FILTER_WORDS
+from sql_lexer import tokenize, COMMENT_KINDS, IDENTIFIER_KINDS
+from sql_context import NOT_ALIASES, TABLE_CLAUSES, unquote_identifier
+
+FederatedSource = namedtuple('FederatedSource', ['alias', 'path', 'items'])
+FederatedLayer = namedtuple('FederatedLayer',
+                            ['name', 'source', 'table', 'filters'])
+FederatedQuery = namedtuple('FederatedQuery', ['sql', 'layers'])
+
+# words that end the FROM list of a query
+FROM_END_WORDS = {
+    'where', 'group', 'order', 'having', 'limit', 'union', 'except',
+    'intersect', 'window', 'select'
+}
+
+# words that end the WHERE clause of a query
+WHERE_END_WORDS = {
+    'group', 'order', 'having', 'limit', 'window', 'union', 'except',
+    'intersect'
+}
+
+# words and punctuation a condition may consist of to be pushed down;
+# the source geodatabase evaluates the condition with OGR SQL, so LIKE
+# (case sensitivity) and division (integer or float) are not pushed down
+# as their results differ from SQLite; conditions with any of the
+# NOT_FILTER_WORDS stay in the query only
+PUSHDOWN_WORDS = {'and', 'or', 'not', 'in', 'is', 'null', 'between'}
+PUSHDOWN_PUNCT = {'=', '<', '>', '!', '(', ')', ',', '.', '-', '+', '*'}
+
+TableRef = namedtuple('TableRef', ['layer', 'name', 'depth', 'nullable'])
+
+
+# ----------------------------------------------------------------------
+def quote_identifier(name):
+    """Quote identifier so that it can be used in a SQL query."""
+    return '"{0}"'.format(name.replace('"', '""'))
+
+
+# ----------------------------------------------------------------------
+def plan_federated_query(query, sources):
+    """Rewrite query to run against the VRT layers of attached datasets.
+
+    `sources` is an OrderedDict { lowercase alias: FederatedSource } where
+    `items` of a source is a dict { lowercase dataset name: dataset name };
+    unqualified dataset names refer to the first attached geodatabase.
+    """
+    return FederatedQueryPlanner(query, sources).plan()
+
+
+# ----------------------------------------------------------------------
+def build_vrt_xml(layers):
+    """Build XML definition of an OGR VRT data source with given layers."""
+    parts = ['<OGRVRTDataSource>']
+    for layer in layers:
+        parts.append('<OGRVRTLayer name={name}>'.format(
+            name=quoteattr(layer.name)))
+        parts.append('<SrcDataSource>{path}</SrcDataSource>'.format(
+            path=escape(layer.source.path)))
+        if layer.filters:
+            src_sql = 'SELECT * FROM {table} WHERE {where}'.format(
+                table=quote_identifier(layer.table),
+                where=' AND '.join('({0})'.format(f) for f in layer.filters))
+            parts.append('<SrcSQL dialect="OGRSQL">{sql}</SrcSQL>'.format(
+                sql=escape(src_sql)))
+        else:
+            parts.append('<SrcLayer>{table}</SrcLayer>'.format(
+                table=escape(layer.table)))
+        parts.append('</OGRVRTLayer>')
+    parts.append('</OGRVRTDataSource>')
+    return '\n'.join(parts)
+
+
+########################################################################
+class FederatedQueryPlanner(object):
+    """Planner rewriting a single SQL statement for a federated session."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, query, sources):
+        """Initialize FederatedQueryPlanner with the query tokens."""
+        self.sources = sources
+        self.primary = next(iter(sources.values()), None)
+        self.tokens = tokenize(query, skip_whitespace=False)
+        self.sig = [
+            idx for idx, token in enumerate(self.tokens)
+            if token.kind != 'whitespace' and token.kind not in COMMENT_KINDS
+        ]
+        self.depths = []
+        depth = 0
+        for idx in self.sig:
+            value = self.tokens[idx].value
+            if value == ')':
+                depth = max(depth - 1, 0)
+            self.depths.append(depth)
+            if value == '(':
+                depth += 1
+
+        self.refs = []
+        self.layers = OrderedDict()
+        self.replacements = []
+        self.can_push_down = True
+        self.has_foreign_items = False
+        return
+
+    # ----------------------------------------------------------------------
+    def plan(self):
+        """Get FederatedQuery with the rewritten query and VRT layers."""
+        self._collect_table_refs()
+        if self.can_push_down:
+            self._push_down_conditions()
+
+        sql = ''.join(token.value for token in self.tokens)
+        for start, end, text in sorted(self.replacements, reverse=True):
+            sql = '{head}{text}{tail}'.format(
+                head=sql[:self.tokens[start].start],
+                text=text,
+                tail=sql[self.tokens[end].start +
+                         len(self.tokens[end].value):])
+        return FederatedQuery(sql, list(self.layers.values()))
+
+    # ----------------------------------------------------------------------
+    def _token(self, pos):
+        """Get significant token at the position; None if out of range."""
+        if 0 <= pos < len(self.sig):
+            return self.tokens[self.sig[pos]]
+        return None
+
+    # ----------------------------------------------------------------------
+    def _word(self, pos):
+        """Get lowercase word at the position; None if not a word."""
+        token = self._token(pos)
+        if token and token.kind == 'word':
+            return token.value.lower()
+        return None
+
+    # ----------------------------------------------------------------------
+    def _value(self, pos):
+        """Get value of the significant token at the position."""
+        token = self._token(pos)
+        return token.value if token else None
+
+    # ----------------------------------------------------------------------
+    def _is_identifier(self, pos):
+        """Check if the significant token at the position is an identifier."""
+        token = self._token(pos)
+        return bool(token and token.kind in IDENTIFIER_KINDS)
+
+    # ----------------------------------------------------------------------
+    def _collect_table_refs(self):
+        """Find dataset references in FROM/JOIN clauses and rewrite them."""
+        in_from = {}
+        if self._word(0) == 'with':
+            self.can_push_down = False
+
+        pos = 0
+        while pos < len(self.sig):
+            word = self._word(pos)
+            depth = self.depths[pos]
+            expect_table = False
+            nullable = False
+            if word in TABLE_CLAUSES:
+                in_from[depth] = True
+                expect_table = True
+                if word == 'join':
+                    join_words = set()
+                    back = pos - 1
+                    while self._word(back) in {
+                            'left', 'right', 'full', 'outer', 'inner',
+                            'cross', 'natural'
+                    }:
+                        join_words.add(self._word(back))
+                        back -= 1
+                    nullable = 'left' in join_words
+                    if join_words & {'right', 'full'}:
+                        self.can_push_down = False
+            elif self._value(pos) == ',' and in_from.get(depth):
+                expect_table = True
+            elif word in FROM_END_WORDS:
+                in_from[depth] = False
+                if word in {'union', 'except', 'intersect'} and not depth:
+                    self.can_push_down = False
+
+            if expect_table:
+                ref, next_pos = self._parse_table_ref(pos + 1, depth,
+                                                      nullable)
+                if ref:
+                    self.refs.append(ref)
+                    pos = next_pos
+                    continue
+                if not depth:
+                    self.has_foreign_items = True
+            elif self._is_qualified_column(pos):
+                # `alias.dataset.column` -> `dataset.column`
+                self.replacements.append(
+                    (self.sig[pos], self.sig[pos + 1], ''))
+                pos += 2
+                continue
+            pos += 1
+        return
+
+    # ----------------------------------------------------------------------
+    def _is_qualified_column(self, pos):
+        """Check if tokens at the position are `alias.dataset.column`."""
+        token = self._token(pos)
+        return bool(
+            self._is_identifier(pos) and
+            unquote_identifier(token.value).lower() in self.sources and
+            self._value(pos + 1) == '.' and self._is_identifier(pos + 2) and
+            self._value(pos + 3) == '.' and self._value(pos - 1) != '.')
+
+    # ----------------------------------------------------------------------
+    def _parse_table_ref(self, pos, depth, nullable):
+        """Parse dataset reference with an optional alias at the position.
+
+        Return tuple (TableRef, position after the reference); TableRef is
+        None if the tokens do not reference a dataset of attached sources.
+        """
+        token = self._token(pos)
+        if (not self._is_identifier(pos)
+                or token.value.lower() in NOT_ALIASES):
+            return None, pos
+
+        name = unquote_identifier(token.value)
+        if self._value(pos + 1) == '.' and self._is_identifier(pos + 2):
+            source = self.sources.get(name.lower())
+            if source is None:
+                return None, pos
+            table_name = unquote_identifier(self._value(pos + 2))
+            table = source.items.get(table_name.lower())
+            if table is None:
+                raise ValueError('{table} is not found in {alias}'.format(
+                    table=table_name, alias=source.alias))
+            layer_name = '{alias}_{table}'.format(
+                alias=source.alias, table=table)
+            end = pos + 2
+        else:
+            source = self.primary
+            if (source is None or name.lower() not in source.items
+                    or self._value(pos + 1) == '('):
+                return None, pos
+            table = source.items[name.lower()]
+            layer_name = table
+            end = pos
+
+        alias = None
+        next_pos = end + 1
+        if self._word(next_pos) == 'as':
+            next_pos += 1
+        if (self._is_identifier(next_pos)
+                and self._value(next_pos).lower() not in NOT_ALIASES):
+            alias = unquote_identifier(self._value(next_pos))
+            next_pos += 1
+
+        # every reference gets its own layer as conditions are pushed
+        # down per reference, for instance, in self-joins
+        unique_name, suffix = layer_name, 1
+        while unique_name.lower() in {n.lower() for n in self.layers}:
+            suffix += 1
+            unique_name = '{name}_{suffix}'.format(
+                name=layer_name, suffix=suffix)
+        self.layers[unique_name] = FederatedLayer(unique_name, source, table,
+                                                  [])
+
+        text = quote_identifier(unique_name)
+        if not alias and unique_name != table:
+            text = '{layer} AS {table}'.format(
+                layer=text, table=quote_identifier(table))
+        self.replacements.append((self.sig[pos], self.sig[end], text))
+
+        ref = TableRef(unique_name, (alias or table).lower(), depth, nullable)
+        return ref, next_pos
+
+    # ----------------------------------------------------------------------
+    def _push_down_conditions(self):
+        """Push conditions of the outermost WHERE clause down to layers."""
+        top_refs = [ref for ref in self.refs if not ref.depth]
+        if not top_refs:
+            return
+
+        where_pos = None
+        for pos in range(len(self.sig)):
+            if not self.depths[pos] and self._word(pos) == 'where':
+                where_pos = pos
+                break
+        if where_pos is None:
+            return
+
+        conditions, current = [], []
+        in_between = False
+        for pos in range(where_pos + 1, len(self.sig)):
+            word = self._word(pos)
+            depth = self.depths[pos]
+            if not depth and (word in WHERE_END_WORDS
+                              or self._token(pos).kind == 'separator'):
+                break
+            if not depth and word == 'between':
+                in_between = True
+            elif not depth and word == 'and':
+                if in_between:
+                    in_between = False
+                else:
+                    conditions.append(current)
+                    current = []
+                    continue
+            current.append(pos)
+        conditions.append(current)
+
+        for condition in conditions:
+            self._push_down_condition(condition, top_refs)
+        return
+
+    # ----------------------------------------------------------------------
+    def _push_down_condition(self, condition, top_refs):
+        """Push a single condition down to the layer it refers to."""
+        if not condition:
+            return
+        qualifiers, dropped = set(), set()
+        has_unqualified = False
+        for pos in condition:
+            token = self._token(pos)
+            if token.kind in IDENTIFIER_KINDS:
+                if token.kind == 'word' and token.value.lower(
+                ) in PUSHDOWN_WORDS:
+                    continue
+                if token.kind == 'word' and token.value.lower(
+                ) in NOT_FILTER_WORDS:
+                    return
+                if (self._value(pos + 1) == '('
+                        or token.value.lower() == 'select'):
+                    # functions and subqueries are not pushed down
+                    return
+                if self._is_qualified_column(pos):
+                    dropped.update(
+                        range(self.sig[pos], self.sig[pos + 1] + 1))
+                elif self._value(pos + 1) == '.':
+                    qualifiers.add(unquote_identifier(token.value).lower())
+                    dropped.update(
+                        range(self.sig[pos], self.sig[pos + 1] + 1))
+                elif self._value(pos - 1) != '.':
+                    has_unqualified = True
+            elif token.kind in ('string', 'number'):
+                continue
+            elif token.kind != 'punct' or token.value not in PUSHDOWN_PUNCT:
+                return
+
+        if qualifiers:
+            if has_unqualified or len(qualifiers) > 1:
+                return
+            targets = [ref for ref in top_refs if ref.name in qualifiers]
+        elif has_unqualified and not self.has_foreign_items:
+            targets = top_refs
+        else:
+            return
+        if len(targets) != 1 or targets[0].nullable:
+            return
+
+        text = ''.join(
+            ' ' if self.tokens[idx].kind in COMMENT_KINDS else
+            self.tokens[idx].value
+            for idx in range(self.sig[condition[0]], self.sig[condition[-1]] +
+                             1) if idx not in dropped)
+        # the condition is kept in the query as well; pushing it down only
+        # reduces the number of rows read from the source geodatabase
+        self.layers[targets[0].layer].filters.append(text.strip())
+        return
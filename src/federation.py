@@ -0,0 +1,181 @@
+# -*- coding: UTF-8 -*-
+"""Federated session running SQL queries against several geodatabases.
+
+Geodatabases are attached under schema aliases and their datasets are
+referenced in SQL queries as `alias.dataset`, for instance:
+
+    SELECT * FROM DB1.Parcels
+    WHERE Parcels.ID IN (SELECT ID FROM DB2.Parcels)
+
+The session can be used instead of a `Geodatabase` object in a query tab.
+"""
+
+import os
+import re
+from collections import OrderedDict
+
+import ogr
+
+from geodatabase import Geodatabase
+from federated_sql import FederatedSource, build_vrt_xml, plan_federated_query
+ogr.UseExceptions()
+
+ALIAS_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+# ----------------------------------------------------------------------
+def get_default_alias(path):
+    """Get schema alias based on the geodatabase folder name."""
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    alias = re.sub(r'[^A-Za-z0-9_]', '_', name)
+    if not alias or alias[0].isdigit():
+        alias = '_' + alias
+    return alias
+
+
+########################################################################
+class FederatedSession(object):
+    """Session querying datasets of several attached geodatabases."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        """Initialize FederatedSession without any attached geodatabases."""
+        self.sources = OrderedDict()
+        # VRT data source of the last executed query
+        self.ds = None
+        self.last_query = None
+        self.last_execution_path = None
+        # (result layer, VRT data source) of the executed SQL queries
+        self.result_sets = []
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def path(self):
+        """Get description of the attached geodatabases."""
+        return ' | '.join('{alias}: {path}'.format(
+            alias=source.alias, path=source.path)
+                          for source in self.sources.values())
+
+    # ----------------------------------------------------------------------
+    def attach(self, alias, path):
+        """Attach geodatabase under the schema alias.
+
+        Datasets of the first attached geodatabase can be referenced
+        without the alias as well.
+        """
+        if not ALIAS_RE.match(alias or ''):
+            raise ValueError(
+                'Alias should start with a letter and contain only '
+                'letters, digits and underscores')
+        if alias.lower() in self.sources:
+            raise ValueError(
+                'Alias {alias} is already in use'.format(alias=alias))
+
+        gdb = Geodatabase(path)
+        if not gdb.is_valid():
+            raise ValueError('This is not a valid file geodatabase')
+        self.sources[alias.lower()] = FederatedSource(
+            alias, path, {item.lower(): item
+                          for item in gdb.get_items()})
+        return
+
+    # ----------------------------------------------------------------------
+    def detach(self, alias):
+        """Detach geodatabase attached under the schema alias."""
+        self.sources.pop(alias.lower(), None)
+        return
+
+    # ----------------------------------------------------------------------
+    def get_items(self):
+        """Get list of datasets of all attached gdbs as `alias.dataset`."""
+        return [
+            '{alias}.{item}'.format(alias=source.alias, item=item)
+            for source in self.sources.values()
+            for item in source.items.values()
+        ]
+
+    # ----------------------------------------------------------------------
+    def get_schemas(self):
+        """Get schemas of datasets of all attached geodatabases.
+
+        Return dict { alias.layer_name: {column_name: column_type} }
+        """
+        schemas = {}
+        for source in self.sources.values():
+            for item, schema in Geodatabase(source.path).get_schemas().items():
+                schemas['{alias}.{item}'.format(
+                    alias=source.alias, item=item)] = schema
+        return schemas
+
+    # ----------------------------------------------------------------------
+    def is_valid(self):
+        """Check if all attached geodatabases are valid."""
+        return bool(self.sources) and all(
+            Geodatabase(source.path).is_valid()
+            for source in self.sources.values())
+
+    # ----------------------------------------------------------------------
+    def open_connection(self):
+        """Open connection; the VRT data source is built for each query."""
+        return
+
+    # ----------------------------------------------------------------------
+    def close_connection(self):
+        """Close the VRT data sources of the executed queries."""
+        for result, ds in self.result_sets:
+            ds.ReleaseResultSet(result)
+            ds.Destroy()
+        self.result_sets = []
+        self.ds = None
+        return
+
+    # ----------------------------------------------------------------------
+    def release_result(self, layer):
+        """Release result layer of a SQL query closing its VRT data source.
+
+        Return False if the layer is not a result of this session.
+        """
+        for idx, (result, ds) in enumerate(self.result_sets):
+            if result is layer:
+                del self.result_sets[idx]
+                ds.ReleaseResultSet(layer)
+                ds.Destroy()
+                if ds is self.ds:
+                    self.ds = None
+                return True
+        return False
+
+    # ----------------------------------------------------------------------
+    def execute_sql(self, query, dialect='sqlite', include_geometry=True):
+        """Execute SQL query against the attached geodatabases.
+
+        The referenced datasets are exposed as layers of an OGR VRT data
+        source with the single-dataset WHERE conditions pushed down to
+        the source geodatabases; the joins are done by the SQL dialect.
+        Geometries are always read; `include_geometry` is accepted for
+        compatibility with `Geodatabase.execute_sql`. Every query has a VRT
+        data source of its own kept open until its result is released.
+        """
+        try:
+            if not dialect:
+                dialect = 'sqlite'
+            res, errors = None, None
+            self.last_execution_path = None
+            self.last_query = plan_federated_query(query, self.sources)
+            ds = ogr.Open(build_vrt_xml(self.last_query.layers), 0)
+            res = ds.ExecuteSQL(self.last_query.sql, dialect=dialect)
+            if res is None:
+                ds.Destroy()
+                self.ds = None
+            else:
+                self.result_sets.append((res, ds))
+                self.ds = ds
+            pushed_down = sum(
+                len(layer.filters) for layer in self.last_query.layers)
+            self.last_execution_path = 'federated, {count} conditions ' \
+                'pushed down'.format(count=pushed_down)
+        except Exception as err:
+            errors = err.args[0] if err.args else str(err)
+
+        return res, errors
@@ -2,6 +2,10 @@
 """Geodatabase class representing a file geodatabase object."""
 
 import ogr
+
+from fast_path import (FilteredLayer, open_fast_path_layer,
+                       parse_simple_query)
+from spatial_pushdown import find_spatial_filter
 ogr.UseExceptions()
 
 
@@ -14,6 +18,14 @@ class Geodatabase(object):
         """Initialize Geodatabase class with basic properties."""
         self.path = path
         self.ds = None
+        # data sources besides the connection (with spatial or attribute
+        # filters set on their layers, or replaced by a new connection)
+        # kept open until their result sets are released
+        self.extra_sources = []
+        # description of how the last query was executed
+        self.last_execution_path = None
+        # (result layer, data source) of the executed SQL queries
+        self.result_sets = []
         return
 
     # ----------------------------------------------------------------------
@@ -49,6 +61,27 @@ class Geodatabase(object):
             schemas[item] = field_types
         return schemas
 
+    # ----------------------------------------------------------------------
+    def get_field_types(self, table):
+        """Get dict {lowercase field name: OGR type name} of the table.
+
+        The dict is empty if there is no connection or no such table.
+        """
+        if not self.ds:
+            return {}
+        for idx in range(self.ds.GetLayerCount()):
+            layer = self.ds.GetLayerByIndex(idx)
+            if layer.GetName().lower() == table.lower():
+                defn = layer.GetLayerDefn()
+                fields = [
+                    defn.GetFieldDefn(i) for i in range(defn.GetFieldCount())
+                ]
+                return {
+                    field.GetName().lower(): field.GetTypeName()
+                    for field in fields
+                }
+        return {}
+
     # ----------------------------------------------------------------------
     def is_valid(self):
         """Check if .gdb folder provided by user is a valid file gdb."""
@@ -67,9 +100,13 @@ class Geodatabase(object):
         """Open geodatabase for reading.
 
         Need to keep open for interacting with layers returned after
-        running the `ExecuteSQL` method.
+        running the `ExecuteSQL` method. The previous connection is closed
+        once all its result sets are released.
         """
+        if self.ds:
+            self.extra_sources.append(self.ds)
         self.ds = ogr.Open(self.path, 0)
+        self._close_unused_sources()
         return
 
     # ----------------------------------------------------------------------
@@ -77,26 +114,186 @@ class Geodatabase(object):
         """Close connection to geodatabase."""
         if self.ds:
             self.ds.Destroy()
+            self.ds = None
+        for ds in self.extra_sources:
+            ds.Destroy()
+        self.extra_sources = []
+        self.result_sets = []
         return
 
     # ----------------------------------------------------------------------
-    def execute_sql(self, query, dialect='sqlite'):
+    def release_result(self, layer):
+        """Release result layer of a SQL query freeing its cursor.
+
+        The data source opened for the query is closed along with it.
+        Return False if the layer is not a result of this geodatabase.
+        """
+        for idx, (result, ds) in enumerate(self.result_sets):
+            if result is layer:
+                del self.result_sets[idx]
+                # layers served by the fast path belong to the data source
+                if not isinstance(layer, FilteredLayer):
+                    ds.ReleaseResultSet(layer)
+                self._close_unused_sources()
+                return True
+        return False
+
+    # ----------------------------------------------------------------------
+    def _close_unused_sources(self):
+        """Close data sources besides the connection with no result sets."""
+        used = [ds for _result, ds in self.result_sets]
+        sources = []
+        for ds in self.extra_sources:
+            if any(ds is used_ds for used_ds in used):
+                sources.append(ds)
+            else:
+                ds.Destroy()
+        self.extra_sources = sources
+        return
+
+    # ----------------------------------------------------------------------
+    def execute_sql(self, query, dialect='sqlite', include_geometry=True):
         """Execute SQL query against a geodatabase using a `ExecuteSQL` method.
 
         http://gdal.org/python/osgeo.ogr.DataSource-class.html#ExecuteSQL.
+        Simple single table queries are served directly from the layer
+        if the dialect would select the same rows (see `fast_path`);
+        geometries are not read for them unless `include_geometry` is set.
+        A bounding box spatial predicate of a single layer query is applied
+        as a spatial filter on the source layer to use the spatial index.
         """
-        # TODO trigger using spatial index in SQLite?
         try:
             if not dialect:
                 dialect = 'sqlite'
             res, errors = None, None
+            self.last_execution_path = None
+            res = self._execute_fast_path(query, dialect, include_geometry)
+            if res is not None:
+                return res, errors
+
+            spatial_filter = self._get_spatial_filter(query)
             do_commit_transaction = True
             if dialect.lower() == 'sqlite':
                 do_commit_transaction = False
-            res = self.ds.ExecuteSQL(query, dialect=dialect)
+                ds = self.ds
+                if spatial_filter:
+                    # separate data source so that the filter does not affect
+                    # result sets of other queries reading the same layer
+                    ds = ogr.Open(self.path, 0)
+                    self.extra_sources.append(ds)
+                    layer = ds.GetLayerByName(spatial_filter.table)
+                    layer.SetSpatialFilterRect(*spatial_filter.bbox)
+                res = ds.ExecuteSQL(query, dialect=dialect)
+                if res is not None:
+                    self.result_sets.append((res, ds))
+            else:
+                filter_geom = None
+                if spatial_filter:
+                    filter_geom = ogr.CreateGeometryFromWkt(
+                        'POLYGON (({0} {1},{2} {1},{2} {3},{0} {3},{0} {1}))'.
+                        format(*spatial_filter.bbox))
+                res = self.ds.ExecuteSQL(
+                    query, spatialFilter=filter_geom, dialect=dialect)
+                if res is not None:
+                    self.result_sets.append((res, self.ds))
+            if spatial_filter:
+                self.last_execution_path = 'spatial index on {table}'.format(
+                    table=spatial_filter.table)
             if do_commit_transaction:
                 res.CommitTransaction()
         except Exception as err:
             errors = err.args[0]
 
         return res, errors
+
+    # ----------------------------------------------------------------------
+    def _execute_fast_path(self, query, dialect, include_geometry):
+        """Serve simple query from the layer; None if it is not simple.
+
+        Queries of the dialects other than OGR SQL are served only if their
+        filter does not depend on the dialect.
+        """
+        simple_query = parse_simple_query(query)
+        if not simple_query or not self.ds:
+            return None
+
+        # separate data source so that the filter does not affect
+        # result sets of other queries reading the same layer
+        ds = ogr.Open(self.path, 0)
+        try:
+            layer = open_fast_path_layer(ds, simple_query, include_geometry,
+                                         dialect.lower() == 'ogrsql')
+        except Exception:
+            # the filter is not valid OGR SQL; let the dialect handle it
+            layer = None
+        if layer is None:
+            ds.Destroy()
+            return None
+
+        self.extra_sources.append(ds)
+        self.result_sets.append((layer, ds))
+        if simple_query.where:
+            self.last_execution_path = 'attribute filter on {table}'.format(
+                table=layer.GetName())
+        else:
+            self.last_execution_path = 'direct read of {table}'.format(
+                table=layer.GetName())
+        return layer
+
+    # ----------------------------------------------------------------------
+    def _get_spatial_filter(self, query):
+        """Get spatial filter of the query if it targets a geometry column."""
+        spatial_filter = find_spatial_filter(query)
+        if not spatial_filter or not self.ds:
+            return None
+        layer = self.ds.GetLayerByName(spatial_filter.table)
+        if (layer is None or layer.GetGeometryColumn().lower() !=
+                spatial_filter.column.lower()):
+            return None
+        return spatial_filter
+
+
+# ----------------------------------------------------------------------
+def get_layer_columns(layer, include_geometry=True):
+    """Get list of tuples (column name, column type name) of an OGR layer."""
+    columns = [(field.GetName(), field.GetTypeName())
+               for field in layer.schema]
+    geom_col = layer.GetGeometryColumn()
+    if include_geometry and geom_col:
+        columns.append((geom_col, 'Geometry'))
+    return columns
+
+
+# ----------------------------------------------------------------------
+def iter_layer_rows(layer, include_geometry=True):
+    """Iterate OGR layer features as dicts with geometry exported to WKT."""
+    geom_col = layer.GetGeometryColumn()
+    feat = layer.GetNextFeature()
+    while feat:
+        attributes = feat.items()
+        if include_geometry and geom_col:
+            geom = feat.geometry()
+            attributes[geom_col] = geom.ExportToWkt() if geom else None
+        yield attributes
+        feat = layer.GetNextFeature()
+    return
+
+
+# ----------------------------------------------------------------------
+def iter_query_rows(path, sql_query, dialect='sqlite', include_geometry=True):
+    """Execute SQL query over a new connection and iterate its rows.
+
+    Used by the worker threads which must not share the data source of
+    the query tab; the connection is closed once the rows are read.
+    """
+    gdb = Geodatabase(path)
+    gdb.open_connection()
+    try:
+        layer, errors = gdb.execute_sql(sql_query, dialect, include_geometry)
+        if errors or layer is None:
+            raise ValueError(errors or 'The query returned no rows')
+        for row in iter_layer_rows(layer, include_geometry):
+            yield row
+    finally:
+        gdb.close_connection()
+    return
@@ -46,13 +46,65 @@ syntaxhighlighter.py
 #############################################################################
 """
 
-import io
+from collections import OrderedDict
+from functools import lru_cache
+
 from PyQt5.QtCore import Qt, QRegExp
 from PyQt5.QtGui import (QTextCharFormat, QColor, QFont, QSyntaxHighlighter)
 
-import os
-home = os.path.dirname(os.path.realpath(__file__))
-KEYWORDS=os.path.join(home, r'completer_data\keywords.txt')
+from sql_lexer import tokenize_block
+from sql_vocabulary import get_keywords
+
+GDB_HIGHLIGHT_SETTINGS = {
+    'Table': {
+        'Foreground': Qt.black,
+        'FontWeight': QFont.Bold,
+    },
+    'Column': {
+        'Foreground': Qt.darkGray,
+        'FontWeight': QFont.Normal,
+    },
+}
+
+
+# ----------------------------------------------------------------------
+def get_words_regexp(words):
+    """Get case insensitive regexp matching any of the whole words."""
+    alternatives = '|'.join(
+        QRegExp.escape(word)
+        for word in sorted(set(w for w in words if w), key=len, reverse=True))
+    regexp = QRegExp('\\b(?:{0})\\b'.format(alternatives))
+    regexp.setCaseSensitivity(Qt.CaseInsensitive)
+    return regexp
+
+
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_standard_highlight_rules():
+    """Get rules for the SQL keywords, numbers and functions.
+
+    The regexps are compiled once and shared by the highlighters of all
+    tabs; all the keywords are matched with a single regexp.
+    """
+    # SQL keywords to show as bold and blue
+    keyword_format = QTextCharFormat()
+    keyword_format.setForeground(Qt.darkBlue)
+    keyword_format.setFontWeight(QFont.Bold)
+    rules = [(get_words_regexp(get_keywords()), keyword_format)]
+
+    numeric_format = QTextCharFormat()
+    numeric_format.setForeground(Qt.blue)
+    regex = QRegExp(r'\s[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?')
+    rules.append((regex, numeric_format))
+
+    # TODO: highlight parens around such as st_x(shape)
+
+    # function names to show as italic and pink
+    function_format = QTextCharFormat()
+    function_format.setFontItalic(True)
+    function_format.setForeground(QColor(255, 105, 255))
+    rules.append((QRegExp('\\b[A-Za-z0-9_]+(?=\\()'), function_format))
+    return tuple(rules)
 
 
 ########################################################################
@@ -64,126 +116,82 @@ class Highlighter(QSyntaxHighlighter):
         """Initialize Highlighter with basic highlight options."""
         super(Highlighter, self).__init__(parent)
 
-        self.gdb_highlight_settings = {
-            'Table': {
-                'Foreground': Qt.black,
-                'FontWeight': QFont.Bold,
-            },
-            'Column': {
-                'Foreground': Qt.darkGray,
-                'FontWeight': QFont.Normal,
-            },
-        }
+        self.gdb_highlight_settings = GDB_HIGHLIGHT_SETTINGS
+        self.plain_keywords = list(get_keywords())
 
-        # SQL keywords to show as bold and blue
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(Qt.darkBlue)
-        keyword_format.setFontWeight(QFont.Bold)
-
-        with io.open(
-                KEYWORDS, 'r', encoding='utf-8') as f:
-            self.plain_keywords = [k.rstrip() for k in f.readlines()]
-
-        keyword_patterns = [
-            '\\b{0}\\b'.format(plain_keyword)
-            for plain_keyword in self.plain_keywords
-        ]
-
-        self.highlight_rules = []
-        for pattern in keyword_patterns:
-            regexp = QRegExp(pattern)
-            regexp.setCaseSensitivity(Qt.CaseInsensitive)
-            self.highlight_rules.append((regexp, keyword_format))
-
-        numeric_format = QTextCharFormat()
-        numeric_format.setForeground(Qt.blue)
-        regex = QRegExp(r'\s[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?')
-        self.highlight_rules.append((regex, numeric_format))
-
-        # TODO: highlight parens around such as st_x(shape)
-        self.set_highlight_rules_comments()
-        self.multi_line_comment_format = QTextCharFormat()
-        self.multi_line_comment_format.setForeground(Qt.darkGreen)
-
-        self.set_highlight_rules_quotes()
-
-        # function names to show as italic and pink
-        function_format = QTextCharFormat()
-        function_format.setFontItalic(True)
-        function_format.setForeground(QColor(255, 105, 255))
-        self.highlight_rules.append((QRegExp('\\b[A-Za-z0-9_]+(?=\\()'),
-                                     function_format))
-
-        self.comment_start_expression = QRegExp('/\\*')
-        self.comment_end_expression = QRegExp('\\*/')
+        # rules of the geodatabase items { item type: (regexp, format) }
+        self.gdb_highlight_rules = OrderedDict()
+        self.highlight_rules = list(get_standard_highlight_rules())
+
+        # comments and quoted strings are found by the SQL lexer and
+        # formatted after all the rules above so they take precedence
+        self.set_lexer_formats()
         return
 
     # ----------------------------------------------------------------------
-    def set_highlight_rules_quotes(self):
-        """Strings in quotes (both single and double) to show as red."""
+    def set_lexer_formats(self):
+        """Set formats of the comments, quoted strings and parameters.
+
+        Comments (both single- and multi-line) to show as green, strings in
+        quotes (both single and double) to show as red, named parameters
+        to show as magenta.
+        """
+        comment_format = QTextCharFormat()
+        comment_format.setForeground(Qt.darkGreen)
+
         quote_format = QTextCharFormat()
         quote_format.setForeground(Qt.red)
-        self.highlight_rules.append((QRegExp('\".*\"'), quote_format))
-        self.highlight_rules.append((QRegExp("'.*\'"), quote_format))
-        return
 
-    # ----------------------------------------------------------------------
-    def set_highlight_rules_comments(self):
-        """Single- and multi-line comments to show as green."""
-        single_line_comment_format = QTextCharFormat()
-        single_line_comment_format.setForeground(Qt.darkGreen)
-        self.highlight_rules.append((QRegExp('--[^\n]*'),
-                                     single_line_comment_format))
+        parameter_format = QTextCharFormat()
+        parameter_format.setForeground(Qt.darkMagenta)
+
+        self.lexer_formats = {
+            'comment': comment_format,
+            'block_comment': comment_format,
+            'string': quote_format,
+            'quoted_identifier': quote_format,
+            'parameter': parameter_format,
+        }
         return
 
     # ----------------------------------------------------------------------
     def set_highlight_rules_gdb_items(self, items, item_type):
-        """Update highlight rules to include geodatabase datasets."""
-        for item in items:
+        """Update highlight rules to include geodatabase datasets.
+
+        The items replace the items of the same type set before; all of
+        them are matched with a single regexp.
+        """
+        self.gdb_highlight_rules.pop(item_type, None)
+        if items:
             fmt = QTextCharFormat()
             fmt.setForeground(
                 self.gdb_highlight_settings[item_type]['Foreground'])
             fmt.setFontWeight(
                 self.gdb_highlight_settings[item_type]['FontWeight'])
-            regexp = QRegExp('\\b{0}\\b'.format(item))
-            regexp.setCaseSensitivity(Qt.CaseInsensitive)
-            self.highlight_rules.append((regexp, fmt))
-
-        # need to put the single line comment rules afterwards;
-        # otherwise table names are highlighted even when are part of comment
-        self.set_highlight_rules_comments()
-        self.set_highlight_rules_quotes()
+            self.gdb_highlight_rules[item_type] = (get_words_regexp(items),
+                                                   fmt)
+        self.highlight_rules = list(get_standard_highlight_rules()) + list(
+            self.gdb_highlight_rules.values())
         return
 
     # ----------------------------------------------------------------------
     def highlightBlock(self, text):  # noqa: N802
         """Reimplementation of the built-in method."""
-        for pattern, format_ in self.highlight_rules:
-            expression = QRegExp(pattern)
+        # the regexps are shared; each is used to the end before the next
+        for expression, format_ in self.highlight_rules:
             idx = expression.indexIn(text)
             while idx >= 0:
                 length = expression.matchedLength()
                 self.setFormat(idx, length, format_)
                 idx = expression.indexIn(text, idx + length)
 
-        self.setCurrentBlockState(0)
-
-        start_idx = 0
-        if self.previousBlockState() != 1:
-            start_idx = self.comment_start_expression.indexIn(text)
-
-        while start_idx >= 0:
-            end_index = self.comment_end_expression.indexIn(text, start_idx)
-
-            if end_index == -1:
-                self.setCurrentBlockState(1)
-                comment_length = len(text) - start_idx
-            else:
-                matched_length = self.comment_end_expression.matchedLength()
-                comment_length = end_index - start_idx + matched_length
+        # multi-line comments carry over to the next block with state 1
+        tokens, ends_in_block_comment = tokenize_block(
+            text, in_block_comment=self.previousBlockState() == 1)
+        for token in tokens:
+            if token.kind in self.lexer_formats:
+                self.setFormat(token.start, len(token.value),
+                               self.lexer_formats[token.kind])
 
-            self.setFormat(start_idx, comment_length,
-                           self.multi_line_comment_format)
-            start_idx = self.comment_start_expression.indexIn(
-                text, start_idx + comment_length)
+        self.setCurrentBlockState(1 if ends_in_block_comment else 0)
         return
@@ -0,0 +1,206 @@
+# -*- coding: UTF-8 -*-
+"""Persistent history of the executed queries.
+
+Every executed statement is recorded in a SQLite database in the user
+data folder along with the geodatabase, the dialect, the number of rows
+and the timings of the query phases. The query text is indexed with FTS5
+(if the SQLite library supports it; LIKE is used otherwise) so that the
+history can be searched instantly. The statements are also grouped by
+their shape (the statement with its literals replaced) to find the kinds
+of queries that are slow.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+import cfg
+from dialect_selector import get_query_shape
+
+# history database in the user data folder
+HISTORY_FILE = 'history.sqlite'
+
+# number of entries returned by a search by default
+SEARCH_LIMIT = 500
+
+HistoryEntry = namedtuple('HistoryEntry', [
+    'id', 'timestamp', 'sql', 'gdb', 'dialect', 'rows', 'total_ms',
+    'phases', 'shape', 'errors'
+])
+ShapeStats = namedtuple('ShapeStats', [
+    'shape', 'sql', 'runs', 'mean_ms', 'max_ms', 'last_ms', 'last_run'
+])
+
+SEARCH_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS queries (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    sql TEXT NOT NULL,
+    gdb TEXT,
+    dialect TEXT,
+    rows INTEGER,
+    total_ms REAL,
+    phases TEXT,
+    shape TEXT,
+    errors TEXT
+);
+CREATE INDEX IF NOT EXISTS queries_shape ON queries (shape);
+'''
+
+FTS_SCHEMA_SQL = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS queries_fts USING fts5 (
+    sql, gdb, content='queries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS queries_fts_insert AFTER INSERT ON queries
+BEGIN
+    INSERT INTO queries_fts (rowid, sql, gdb)
+    VALUES (new.id, new.sql, new.gdb);
+END;
+CREATE TRIGGER IF NOT EXISTS queries_fts_delete AFTER DELETE ON queries
+BEGIN
+    INSERT INTO queries_fts (queries_fts, rowid, sql, gdb)
+    VALUES ('delete', old.id, old.sql, old.gdb);
+END;
+'''
+
+ENTRY_COLUMNS = ('id, timestamp, sql, gdb, dialect, rows, total_ms, phases, '
+                 'shape, errors')
+
+
+########################################################################
+class QueryHistory(object):
+    """History of the executed queries stored in a SQLite database."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, path=None):
+        """Initialize QueryHistory opening (creating) the database.
+
+        The database in the user data folder is used if `path` is not
+        given.
+        """
+        path = path or os.path.join(cfg.user_data_dir, HISTORY_FILE)
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA_SQL)
+        try:
+            self.conn.executescript(FTS_SCHEMA_SQL)
+            self.use_fts = True
+        except sqlite3.OperationalError:
+            # SQLite library built without FTS5
+            self.use_fts = False
+        self.conn.commit()
+        return
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        """Get number of the recorded queries."""
+        return self.conn.execute('SELECT COUNT(*) FROM queries').fetchone()[0]
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+        return
+
+    # ----------------------------------------------------------------------
+    def add(self, sql, gdb=None, dialect=None, rows=None, phases=None,
+            errors=None, timestamp=None):
+        """Record executed query; return id of the new entry.
+
+        `phases` is a dict { phase: msecs } such as the one recorded by
+        `QueryTimer.to_record`.
+        """
+        phases = phases or {}
+        cursor = self.conn.execute(
+            'INSERT INTO queries (timestamp, sql, gdb, dialect, rows, '
+            'total_ms, phases, shape, errors) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (timestamp or time.time(), sql, gdb, dialect, rows,
+             sum(phases.values()), json.dumps(phases), get_query_shape(sql),
+             errors))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    # ----------------------------------------------------------------------
+    def get(self, entry_id):
+        """Get entry by its id; None if there is no such entry."""
+        row = self.conn.execute(
+            'SELECT {cols} FROM queries WHERE id = ?'.format(
+                cols=ENTRY_COLUMNS), (entry_id, )).fetchone()
+        return self._to_entry(row) if row else None
+
+    # ----------------------------------------------------------------------
+    def search(self, text='', limit=SEARCH_LIMIT):
+        """Get the latest entries with all words of the text as prefixes.
+
+        The words are matched against the query text and the geodatabase
+        path; the latest entries are returned if there are no words.
+        """
+        terms = SEARCH_TERM_RE.findall(text or '')
+        if not terms:
+            rows = self.conn.execute(
+                'SELECT {cols} FROM queries ORDER BY id DESC LIMIT ?'.format(
+                    cols=ENTRY_COLUMNS), (limit, ))
+        elif self.use_fts:
+            match = ' '.join('"{term}"*'.format(term=term) for term in terms)
+            rows = self.conn.execute(
+                'SELECT {cols} FROM queries WHERE id IN '
+                '(SELECT rowid FROM queries_fts WHERE queries_fts MATCH ?) '
+                'ORDER BY id DESC LIMIT ?'.format(cols=ENTRY_COLUMNS),
+                (match, limit))
+        else:
+            condition = ' AND '.join(
+                "(sql LIKE ? ESCAPE '\\' OR gdb LIKE ? ESCAPE '\\')"
+                for _term in terms)
+            params = []
+            for term in terms:
+                pattern = '%{term}%'.format(term=term.replace('_', '\\_'))
+                params.extend([pattern, pattern])
+            rows = self.conn.execute(
+                'SELECT {cols} FROM queries WHERE {condition} '
+                'ORDER BY id DESC LIMIT ?'.format(
+                    cols=ENTRY_COLUMNS, condition=condition),
+                params + [limit])
+        return [self._to_entry(row) for row in rows]
+
+    # ----------------------------------------------------------------------
+    def get_slowest_shapes(self, limit=50, min_runs=1):
+        """Get statistics of the query shapes, slowest on average first.
+
+        Only successfully executed queries are taken into account; the
+        latest query of the shape is used as its sample text.
+        """
+        rows = self.conn.execute(
+            'SELECT shape, '
+            '(SELECT sql FROM queries AS latest WHERE latest.shape = '
+            'queries.shape ORDER BY id DESC LIMIT 1), '
+            'COUNT(*), AVG(total_ms), MAX(total_ms), '
+            '(SELECT total_ms FROM queries AS latest WHERE latest.shape = '
+            'queries.shape ORDER BY id DESC LIMIT 1), MAX(timestamp) '
+            'FROM queries WHERE errors IS NULL GROUP BY shape '
+            'HAVING COUNT(*) >= ? ORDER BY AVG(total_ms) DESC LIMIT ?',
+            (min_runs, limit))
+        return [ShapeStats(*row) for row in rows]
+
+    # ----------------------------------------------------------------------
+    def clear(self):
+        """Remove all entries."""
+        self.conn.execute('DELETE FROM queries')
+        self.conn.commit()
+        return
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _to_entry(row):
+        """Get HistoryEntry from a database row."""
+        values = list(row)
+        values[7] = json.loads(values[7]) if values[7] else {}
+        return HistoryEntry(*values)
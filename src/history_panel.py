@@ -0,0 +1,125 @@
+# -*- coding: UTF-8 -*-
+"""Dockable panel with the searchable history of the executed queries."""
+
+import time
+
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout,
+                             QLineEdit, QComboBox, QTreeWidget,
+                             QTreeWidgetItem, QPushButton)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+RECENT_VIEW = 'Recent queries'
+SLOWEST_VIEW = 'Slowest query shapes'
+
+HISTORY_HEADERS = ['When', 'Query', 'Rows', 'Total, ms', 'Dialect',
+                   'Geodatabase']
+SHAPES_HEADERS = ['Last run', 'Query (latest of the shape)', 'Runs',
+                  'Mean, ms', 'Max, ms', 'Last, ms']
+
+
+# ----------------------------------------------------------------------
+def _format_timestamp(timestamp):
+    """Format timestamp as local date and time."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+# ----------------------------------------------------------------------
+def _format_sql(sql):
+    """Format query text as a single line."""
+    return ' '.join(sql.split())
+
+
+########################################################################
+class HistoryPanel(QDockWidget):
+    """Panel listing the executed queries; double-click runs a query again."""
+
+    # emitted with the query text and the geodatabase path to run it against
+    query_rerun_requested = pyqtSignal(str, str)
+
+    # ----------------------------------------------------------------------
+    def __init__(self, history, parent=None):
+        """Initialize HistoryPanel with the QueryHistory to show."""
+        super(HistoryPanel, self).__init__('History', parent)
+        self.history = history
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText('Search queries')
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self.refresh)
+
+        self.view_combobox = QComboBox()
+        self.view_combobox.addItems([RECENT_VIEW, SLOWEST_VIEW])
+        self.view_combobox.currentIndexChanged.connect(self.refresh)
+
+        self.rerun_button = QPushButton('Run again')
+        self.rerun_button.setToolTip(
+            'Run the selected query in the current tab')
+        self.rerun_button.clicked.connect(self.rerun_selected)
+
+        self.entries = QTreeWidget()
+        self.entries.setRootIsDecorated(False)
+        self.entries.setAlternatingRowColors(True)
+        self.entries.itemDoubleClicked.connect(self.rerun_selected)
+
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(self.search_box)
+        toolbar.addWidget(self.view_combobox)
+        toolbar.addWidget(self.rerun_button)
+
+        layout = QVBoxLayout()
+        layout.addLayout(toolbar)
+        layout.addWidget(self.entries)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+        self.refresh()
+        return
+
+    # ----------------------------------------------------------------------
+    def refresh(self):
+        """Fill the list with the entries matching the search text."""
+        self.entries.clear()
+        if self.view_combobox.currentText() == SLOWEST_VIEW:
+            self.search_box.setEnabled(False)
+            self.entries.setHeaderLabels(SHAPES_HEADERS)
+            for stats in self.history.get_slowest_shapes():
+                item = QTreeWidgetItem([
+                    _format_timestamp(stats.last_run),
+                    _format_sql(stats.sql),
+                    str(stats.runs), '{0:.1f}'.format(stats.mean_ms),
+                    '{0:.1f}'.format(stats.max_ms),
+                    '{0:.1f}'.format(stats.last_ms)
+                ])
+                item.setData(0, Qt.UserRole, (stats.sql, ''))
+                item.setToolTip(1, stats.sql)
+                self.entries.addTopLevelItem(item)
+        else:
+            self.search_box.setEnabled(True)
+            self.entries.setHeaderLabels(HISTORY_HEADERS)
+            for entry in self.history.search(self.search_box.text()):
+                item = QTreeWidgetItem([
+                    _format_timestamp(entry.timestamp),
+                    _format_sql(entry.sql),
+                    '' if entry.rows is None else str(entry.rows),
+                    '{0:.1f}'.format(entry.total_ms or 0), entry.dialect or '',
+                    entry.gdb or ''
+                ])
+                item.setData(0, Qt.UserRole, (entry.sql, entry.gdb or ''))
+                tooltip = entry.sql
+                if entry.errors:
+                    tooltip += '\n\n' + entry.errors
+                    item.setForeground(1, Qt.red)
+                item.setToolTip(1, tooltip)
+                self.entries.addTopLevelItem(item)
+        self.entries.resizeColumnToContents(0)
+        return
+
+    # ----------------------------------------------------------------------
+    def rerun_selected(self, *args):
+        """Request running the selected query again."""
+        item = self.entries.currentItem()
+        if item is None:
+            return
+        sql, gdb = item.data(0, Qt.UserRole)
+        self.query_rerun_requested.emit(sql, gdb)
+        return
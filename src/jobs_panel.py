@@ -0,0 +1,87 @@
+# -*- coding: UTF-8 -*-
+"""Dockable panel listing the export jobs with their progress."""
+
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout,
+                             QTreeWidget, QTreeWidgetItem, QProgressBar,
+                             QPushButton)
+
+JOBS_HEADERS = ['Export', 'Progress', '']
+
+
+########################################################################
+class JobsPanel(QDockWidget):
+    """Panel with a progress bar and a cancel button for every job."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, queue, parent=None):
+        """Initialize JobsPanel with the ExportJobQueue to show."""
+        super(JobsPanel, self).__init__('Export jobs', parent)
+        self.queue = queue
+
+        self.jobs_list = QTreeWidget()
+        self.jobs_list.setRootIsDecorated(False)
+        self.jobs_list.setHeaderLabels(JOBS_HEADERS)
+
+        self.clear_button = QPushButton('Clear finished')
+        self.clear_button.clicked.connect(self.clear_done_jobs)
+        toolbar = QHBoxLayout()
+        toolbar.addStretch()
+        toolbar.addWidget(self.clear_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.jobs_list)
+        layout.addLayout(toolbar)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+        return
+
+    # ----------------------------------------------------------------------
+    def add_job(self, job, title):
+        """Add the job to the list updating its item as it progresses."""
+        item = QTreeWidgetItem([title, '', ''])
+        self.jobs_list.addTopLevelItem(item)
+        progress_bar = QProgressBar()
+        progress_bar.setFormat('%v of %m rows')
+        progress_bar.setMaximum(max(job.total, 1))
+        cancel_button = QPushButton('Cancel')
+        cancel_button.clicked.connect(job.cancel)
+        cancel_button.clicked.connect(
+            lambda: cancel_button.setEnabled(False))
+        self.jobs_list.setItemWidget(item, 1, progress_bar)
+        self.jobs_list.setItemWidget(item, 2, cancel_button)
+        item.job = job
+
+        job.signals.progress.connect(
+            lambda rows, total: (progress_bar.setMaximum(total),
+                                 progress_bar.setValue(rows)))
+        job.signals.finished.connect(
+            lambda path: self._set_job_done(item, 'Done'))
+        job.signals.cancelled.connect(
+            lambda: self._set_job_done(item, 'Cancelled'))
+        job.signals.failed.connect(
+            lambda errors: self._set_job_done(item, 'Failed', errors))
+        self.jobs_list.resizeColumnToContents(0)
+        return
+
+    # ----------------------------------------------------------------------
+    def _set_job_done(self, item, state, details=''):
+        """Replace the cancel button of the job with its final state."""
+        button = self.jobs_list.itemWidget(item, 2)
+        if button:
+            button.setEnabled(False)
+            button.setText(state)
+        if state == 'Done':
+            progress_bar = self.jobs_list.itemWidget(item, 1)
+            progress_bar.setValue(progress_bar.maximum())
+        item.setToolTip(0, details)
+        return
+
+    # ----------------------------------------------------------------------
+    def clear_done_jobs(self):
+        """Remove the jobs which are done from the list and the queue."""
+        for index in reversed(range(self.jobs_list.topLevelItemCount())):
+            if self.jobs_list.topLevelItem(index).job.is_done:
+                self.jobs_list.takeTopLevelItem(index)
+        self.queue.remove_done_jobs()
+        return
@@ -0,0 +1,465 @@
+# -*- coding: UTF-8 -*-
+"""Map preview of the geometries of a result table.
+
+The WKT values of the geometry column are parsed and their bounding
+boxes are put into a grid index in batches as the rows are fetched; while
+the preview is shown, it fetches the rest of the rows of the result into
+the table model itself (the number of features indexed out of all is
+shown until then). Only the features within the visible extent are drawn
+and the features of the rows fetched later are added to the image; if
+they extend the extent the view is fitted to, the view is fitted again
+only once the number of rows indexed has doubled (and when all are) so
+that a large result is not drawn again for every batch. The vertices closer
+to each other than a pixel are dropped for the current zoom level, and
+the features are drawn onto an image in batches in the event loop so
+that the preview stays responsive while a large result is being drawn.
+Dragging moves the drawn image and the features are drawn again once the
+mouse is released.
+"""
+
+import math
+
+from PyQt5.QtCore import Qt, QPoint, QPointF, QTimer, pyqtSignal
+from PyQt5.QtGui import (QBrush, QColor, QImage, QPainter, QPainterPath,
+                         QPen, QTransform)
+from PyQt5.QtWidgets import QWidget
+
+from preview_shapes import (LINE, POINT, get_shape_distance, parse_wkt,
+                            simplify_part)
+from spatial_index import GridIndex
+
+# rows parsed and features drawn at a time before returning to event loop
+INDEX_BATCH_SIZE = 2000
+DRAW_BATCH_SIZE = 2000
+# cells of the grid index along the longer side of the first rows extent
+GRID_CELLS = 64
+ZOOM_FACTOR = 1.25
+# pixels around the cursor a click selects features within
+CLICK_TOLERANCE = 4
+POINT_RADIUS = 3
+MARGIN = 10
+
+FILL_COLOR = QColor(51, 136, 255, 80)
+LINE_COLOR = QColor(51, 102, 204)
+SELECTION_COLOR = QColor(255, 0, 0)
+
+
+########################################################################
+class MapPreview(QWidget):
+    """Widget drawing the geometries of the result table rows."""
+
+    # emitted with the index of the row of the feature clicked
+    feature_selected = pyqtSignal(int)
+
+    # ----------------------------------------------------------------------
+    def __init__(self, parent=None):
+        """Initialize MapPreview with no rows to draw."""
+        super(MapPreview, self).__init__(parent)
+        self.setMinimumSize(200, 200)
+        self.model = None
+        self.geom_column_index = None
+        self.selected_row = None
+        # center of the view in map units and pixels per map unit
+        self.center = None
+        self.scale = None
+        # the view fits the features until the user zooms or pans
+        self.fit_extent = True
+        self.drag_start = None
+        self.drag_offset = QPoint()
+
+        self.work_timer = QTimer(self)
+        self.work_timer.setInterval(0)
+        self.work_timer.timeout.connect(self.do_work)
+        self.clear()
+        return
+
+    # ----------------------------------------------------------------------
+    def clear(self):
+        """Forget the features indexed and drawn."""
+        self.shapes = {}
+        self.index = None
+        self.extent = None
+        self.indexed_rows = 0
+        self.image = None
+        self.pending_rows = []
+        self.paths = {}
+        self.paths_tolerance = None
+        # extent and rows indexed when the image was started
+        self.drawn_extent = None
+        self.drawn_rows = 0
+        return
+
+    # ----------------------------------------------------------------------
+    def set_model(self, model, geom_column_index):
+        """Draw geometries of the column of the result table model."""
+        self.model = model
+        self.geom_column_index = geom_column_index
+        model.rowsInserted.connect(self.schedule_work)
+        model.modelReset.connect(self.reset)
+        self.reset()
+        return
+
+    # ----------------------------------------------------------------------
+    def reset(self):
+        """Index and draw the rows again keeping the view."""
+        self.clear()
+        self.schedule_work()
+        return
+
+    # ----------------------------------------------------------------------
+    def schedule_work(self, *args):
+        """Continue indexing and drawing the rows if the map is shown."""
+        if self.isVisible() and not self.work_timer.isActive():
+            self.work_timer.start()
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def is_busy(self):
+        """Check if there are rows to index or features to draw."""
+        return bool(self.model is not None and
+                    (self.indexed_rows < len(self.model.rows) or
+                     self.pending_rows or self.can_fetch_more() or
+                     (self.fit_extent and self.extent != self.drawn_extent)))
+
+    # ----------------------------------------------------------------------
+    def can_fetch_more(self):
+        """Check if the shown preview has rows to fetch into the model."""
+        return bool(self.model is not None and self.isVisible()
+                    and self.model.canFetchMore())
+
+    # ----------------------------------------------------------------------
+    def get_total_rows(self):
+        """Get number of rows of the result including those not fetched."""
+        return max(
+            getattr(self.model, 'number_layer_rows', 0), len(self.model.rows))
+
+    # ----------------------------------------------------------------------
+    def do_work(self):
+        """Index or draw the next batch of rows; fetch more once drawn."""
+        if self.model is not None and self.indexed_rows < len(
+                self.model.rows):
+            self.index_rows()
+        elif self.pending_rows:
+            self.draw_pending_rows()
+        elif self.can_fetch_more():
+            self.fetch_rows()
+        elif self.fit_extent and self.extent != self.drawn_extent:
+            self.zoom_to_extent()
+        else:
+            self.work_timer.stop()
+            self.update()
+        return
+
+    # ----------------------------------------------------------------------
+    def fetch_rows(self):
+        """Fetch the next batch of the result rows into the model."""
+        last_row = len(self.model.rows) + INDEX_BATCH_SIZE
+        while len(self.model.rows) < last_row and self.model.canFetchMore():
+            fetched_rows = len(self.model.rows)
+            self.model.fetchMore()
+            if len(self.model.rows) == fetched_rows:
+                break
+        return
+
+    # ----------------------------------------------------------------------
+    def index_rows(self):
+        """Parse the geometries of the next rows and index their boxes."""
+        last_row = min(self.indexed_rows + INDEX_BATCH_SIZE,
+                       len(self.model.rows))
+        shapes = {}
+        for row in range(self.indexed_rows, last_row):
+            shape = parse_wkt(
+                self.model.rows.get_value(row, self.geom_column_index))
+            if shape:
+                shapes[row] = shape
+        self.indexed_rows = last_row
+        if not shapes:
+            return
+
+        xmin, ymin, xmax, ymax = zip(*(shape.bbox
+                                       for shape in shapes.values()))
+        batch_extent = (min(xmin), min(ymin), max(xmax), max(ymax))
+        if self.index is None:
+            self.index = GridIndex(
+                max(batch_extent[2] - batch_extent[0],
+                    batch_extent[3] - batch_extent[1]) / GRID_CELLS)
+            self.extent = batch_extent
+        else:
+            self.extent = (min(self.extent[0], batch_extent[0]),
+                           min(self.extent[1], batch_extent[1]),
+                           max(self.extent[2], batch_extent[2]),
+                           max(self.extent[3], batch_extent[3]))
+        for row, shape in shapes.items():
+            self.index.insert(row, shape.bbox)
+        self.shapes.update(shapes)
+
+        refit = (self.fit_extent and self.extent != self.drawn_extent
+                 and self.indexed_rows >= 2 * self.drawn_rows)
+        if self.image is not None and not refit:
+            self.add_pending_rows(shapes)
+        elif self.fit_extent or self.center is None:
+            self.zoom_to_extent()
+        else:
+            self.start_drawing()
+        return
+
+    # ----------------------------------------------------------------------
+    def add_pending_rows(self, shapes):
+        """Draw the visible shapes of new rows over the image drawn."""
+        xmin, ymin, xmax, ymax = self.get_visible_extent()
+        rows = [
+            row for row in sorted(shapes)
+            if (shapes[row].bbox[0] <= xmax and shapes[row].bbox[2] >= xmin
+                and shapes[row].bbox[1] <= ymax
+                and shapes[row].bbox[3] >= ymin)
+        ]
+        # the rows are popped from the end; new rows are drawn on top
+        self.pending_rows[:0] = reversed(rows)
+        self.schedule_work()
+        return
+
+    # ----------------------------------------------------------------------
+    def zoom_to_extent(self):
+        """Fit all the features indexed into the view."""
+        if self.extent is None:
+            return
+        xmin, ymin, xmax, ymax = self.extent
+        self.center = ((xmin + xmax) / 2.0, (ymin + ymax) / 2.0)
+        width = max(self.width() - 2 * MARGIN, 1)
+        height = max(self.height() - 2 * MARGIN, 1)
+        if xmax - xmin or ymax - ymin:
+            self.scale = min(width / (xmax - xmin or 1e-9),
+                             height / (ymax - ymin or 1e-9))
+        else:
+            self.scale = 1.0
+        self.start_drawing()
+        return
+
+    # ----------------------------------------------------------------------
+    def get_transform(self):
+        """Get transformation of the map units into the widget pixels."""
+        return QTransform(self.scale, 0, 0, -self.scale,
+                          self.width() / 2.0 - self.center[0] * self.scale,
+                          self.height() / 2.0 + self.center[1] * self.scale)
+
+    # ----------------------------------------------------------------------
+    def to_map(self, pos):
+        """Get map coordinates of the widget position."""
+        return (self.center[0] + (pos.x() - self.width() / 2.0) / self.scale,
+                self.center[1] - (pos.y() - self.height() / 2.0) / self.scale)
+
+    # ----------------------------------------------------------------------
+    def get_visible_extent(self):
+        """Get bounding box of the map area shown."""
+        xmin, ymax = self.to_map(QPoint(0, 0))
+        xmax, ymin = self.to_map(QPoint(self.width(), self.height()))
+        return xmin, ymin, xmax, ymax
+
+    # ----------------------------------------------------------------------
+    def start_drawing(self):
+        """Start drawing the visible features onto a new image."""
+        self.drag_offset = QPoint()
+        self.drawn_extent = self.extent
+        self.drawn_rows = self.indexed_rows
+        if self.index is None or self.width() <= 0 or self.height() <= 0:
+            return
+        self.image = QImage(self.size(), QImage.Format_ARGB32_Premultiplied)
+        self.image.fill(Qt.white)
+
+        # one level of detail per power of two of the pixel size
+        tolerance = 2**math.floor(math.log2(1.0 / self.scale))
+        if tolerance != self.paths_tolerance:
+            self.paths = {}
+            self.paths_tolerance = tolerance
+        self.pending_rows = self.index.query(self.get_visible_extent())
+        self.pending_rows.reverse()
+        self.schedule_work()
+        self.update()
+        return
+
+    # ----------------------------------------------------------------------
+    def draw_pending_rows(self):
+        """Draw the next batch of the visible features onto the image."""
+        painter = QPainter(self.image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setTransform(self.get_transform())
+        pen = QPen(LINE_COLOR)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        for _i in range(min(DRAW_BATCH_SIZE, len(self.pending_rows))):
+            row = self.pending_rows.pop()
+            shape = self.shapes.get(row)
+            if shape:
+                self.draw_shape(painter, row, shape)
+        painter.end()
+        self.update()
+        return
+
+    # ----------------------------------------------------------------------
+    def draw_shape(self, painter, row, shape):
+        """Draw the shape simplified for the current zoom level."""
+        xmin, ymin, xmax, ymax = shape.bbox
+        if shape.kind == POINT:
+            painter.setBrush(QBrush(LINE_COLOR))
+            radius = POINT_RADIUS / self.scale
+            for part in shape.parts:
+                painter.drawEllipse(QPointF(*part[0]), radius, radius)
+            return
+        if max(xmax - xmin, ymax - ymin) < self.paths_tolerance:
+            # features smaller than a pixel are drawn as a dot
+            painter.drawPoint(QPointF((xmin + xmax) / 2, (ymin + ymax) / 2))
+            return
+        if row not in self.paths:
+            self.paths[row] = self.make_path(shape, self.paths_tolerance)
+        painter.setBrush(Qt.NoBrush if shape.kind ==
+                         LINE else QBrush(FILL_COLOR))
+        painter.drawPath(self.paths[row])
+        return
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def make_path(shape, tolerance=0):
+        """Make painter path of the shape parts simplified by tolerance."""
+        path = QPainterPath()
+        path.setFillRule(Qt.OddEvenFill)
+        for part in shape.parts:
+            coords = simplify_part(part, tolerance)
+            path.moveTo(*coords[0])
+            for coord in coords[1:]:
+                path.lineTo(*coord)
+            if shape.kind != LINE:
+                path.closeSubpath()
+        return path
+
+    # ----------------------------------------------------------------------
+    def get_feature_at(self, pos):
+        """Get row of the topmost feature at the widget position or None."""
+        if self.index is None:
+            return None
+        x, y = self.to_map(pos)
+        tolerance = CLICK_TOLERANCE / self.scale
+        rows = self.index.query(
+            (x - tolerance, y - tolerance, x + tolerance, y + tolerance))
+        distances = [(get_shape_distance(self.shapes[row], x, y), -row)
+                     for row in rows]
+        distances = [item for item in distances if item[0] <= tolerance]
+        if not distances:
+            return None
+        # the closest feature; of the features containing the point, the
+        # one of the latest row as it is drawn on top
+        return -min(distances)[1]
+
+    # ----------------------------------------------------------------------
+    def set_selected_row(self, row):
+        """Highlight the feature of the row."""
+        self.selected_row = row
+        self.update()
+        return
+
+    # ----------------------------------------------------------------------
+    def paintEvent(self, event):  # noqa: N802
+        """Override built-in method."""
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        if self.image is None:
+            painter.drawText(self.rect(), Qt.AlignCenter,
+                             'No geometries to preview')
+            return
+        painter.drawImage(self.drag_offset, self.image)
+        total_rows = self.get_total_rows()
+        if self.indexed_rows < total_rows:
+            painter.drawText(
+                self.rect().adjusted(MARGIN, MARGIN, -MARGIN, -MARGIN),
+                Qt.AlignLeft | Qt.AlignBottom,
+                '{0} of {1} features'.format(self.indexed_rows, total_rows))
+
+        shape = self.shapes.get(self.selected_row)
+        if shape:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.translate(self.drag_offset)
+            painter.setTransform(self.get_transform(), True)
+            pen = QPen(SELECTION_COLOR, 2)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            if shape.kind == POINT:
+                radius = (POINT_RADIUS + 1) / self.scale
+                for part in shape.parts:
+                    painter.drawEllipse(QPointF(*part[0]), radius, radius)
+            else:
+                painter.drawPath(self.make_path(shape))
+        return
+
+    # ----------------------------------------------------------------------
+    def showEvent(self, event):  # noqa: N802
+        """Override built-in method."""
+        super(MapPreview, self).showEvent(event)
+        self.schedule_work()
+        return
+
+    # ----------------------------------------------------------------------
+    def resizeEvent(self, event):  # noqa: N802
+        """Override built-in method."""
+        super(MapPreview, self).resizeEvent(event)
+        if self.center is not None:
+            self.start_drawing()
+        return
+
+    # ----------------------------------------------------------------------
+    def wheelEvent(self, event):  # noqa: N802
+        """Zoom in or out keeping the point under the cursor in place."""
+        if self.center is None:
+            return
+        pos = event.pos()
+        x, y = self.to_map(pos)
+        steps = event.angleDelta().y() / 120.0
+        self.fit_extent = False
+        self.scale *= ZOOM_FACTOR**steps
+        self.center = (
+            x - (pos.x() - self.width() / 2.0) / self.scale,
+            y + (pos.y() - self.height() / 2.0) / self.scale)
+        self.start_drawing()
+        return
+
+    # ----------------------------------------------------------------------
+    def mousePressEvent(self, event):  # noqa: N802
+        """Override built-in method."""
+        if event.button() == Qt.LeftButton:
+            self.drag_start = event.pos()
+        return
+
+    # ----------------------------------------------------------------------
+    def mouseMoveEvent(self, event):  # noqa: N802
+        """Move the drawn image while dragging."""
+        if self.drag_start is not None:
+            self.drag_offset = event.pos() - self.drag_start
+            self.update()
+        return
+
+    # ----------------------------------------------------------------------
+    def mouseReleaseEvent(self, event):  # noqa: N802
+        """Select the feature clicked or pan the map dragged."""
+        if self.drag_start is None or self.center is None:
+            self.drag_start = None
+            return
+        offset = event.pos() - self.drag_start
+        self.drag_start = None
+        if offset.manhattanLength() < CLICK_TOLERANCE:
+            self.drag_offset = QPoint()
+            row = self.get_feature_at(event.pos())
+            if row is not None:
+                self.set_selected_row(row)
+                self.feature_selected.emit(row)
+            return
+        self.fit_extent = False
+        self.center = (self.center[0] - offset.x() / self.scale,
+                       self.center[1] + offset.y() / self.scale)
+        self.start_drawing()
+        return
+
+    # ----------------------------------------------------------------------
+    def mouseDoubleClickEvent(self, event):  # noqa: N802
+        """Zoom to all the features."""
+        self.fit_extent = True
+        self.zoom_to_extent()
+        return
@@ -0,0 +1,90 @@
+# -*- coding: UTF-8 -*-
+"""Text file read page by page for the export result viewer.
+
+Only the pages the user scrolls to are read and decoded; a page is a
+block of bytes ending at a line end so that lines and multibyte
+characters are never split between pages. Searching and copying stream
+through the file in blocks without loading it whole into the viewer.
+"""
+
+import codecs
+import io
+import os
+
+# bytes read at a time; a page extends to the end of its last line
+PAGE_SIZE = 256 * 1024
+
+
+########################################################################
+class PagedTextFile(object):
+    """UTF-8 text file with its pages read on request."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, path, page_size=PAGE_SIZE):
+        """Initialize PagedTextFile with no pages read."""
+        self.path = path
+        self.page_size = page_size
+        self.size = os.path.getsize(path)
+        # offset of the end of the pages read so far
+        self.loaded_size = 0
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def at_end(self):
+        """Check if all pages have been read."""
+        return self.loaded_size >= self.size
+
+    # ----------------------------------------------------------------------
+    def _read_block(self, f, offset):
+        """Read block of bytes at the offset completing its last line."""
+        f.seek(offset)
+        data = f.read(self.page_size)
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+        return data
+
+    # ----------------------------------------------------------------------
+    def read_next_page(self):
+        """Read the page following the pages read; '' at the end."""
+        with io.open(self.path, 'rb') as f:
+            data = self._read_block(f, self.loaded_size)
+        self.loaded_size += len(data)
+        return data.decode('utf-8', errors='replace')
+
+    # ----------------------------------------------------------------------
+    def find(self, text, offset=0, match_case=False):
+        """Find the text at or after the byte offset; -1 if not found.
+
+        Case is ignored for ASCII letters only unless `match_case` is set.
+        """
+        needle = text.encode('utf-8')
+        if not needle:
+            return -1
+        if not match_case:
+            needle = needle.lower()
+        block_size = max(self.page_size, 2 * len(needle))
+        with io.open(self.path, 'rb') as f:
+            while offset < self.size:
+                f.seek(offset)
+                block = f.read(block_size)
+                if not match_case:
+                    block = block.lower()
+                position = block.find(needle)
+                if position != -1:
+                    return offset + position
+                if len(block) < block_size:
+                    break
+                # the text may span the end of the block
+                offset += len(block) - len(needle) + 1
+        return -1
+
+    # ----------------------------------------------------------------------
+    def iter_text(self):
+        """Iterate the whole text in blocks."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        with io.open(self.path, 'rb') as f:
+            for data in iter(lambda: f.read(self.page_size), b''):
+                yield decoder.decode(data)
+        yield decoder.decode(b'', final=True)
+        return
@@ -0,0 +1,146 @@
+# -*- coding: UTF-8 -*-
+"""Dialog with the sets of values of the named query parameters."""
+
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QTableWidget, QTableWidgetItem, QPushButton,
+                             QDialogButtonBox, QFileDialog, QMessageBox,
+                             QComboBox)
+
+from query_params import PARAMETER_KINDS, read_parameter_sets
+
+
+########################################################################
+class ParametersDialog(QDialog):
+    """Dialog with a row of parameter values for every query execution."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, names, parent=None):
+        """Initialize ParametersDialog with the names of the parameters."""
+        super(ParametersDialog, self).__init__(parent)
+        self.names = names
+        self.setWindowTitle('Run query with parameters')
+
+        self.values_table = QTableWidget(1, len(names))
+        self.values_table.setHorizontalHeaderLabels(
+            [':' + name for name in names])
+
+        # every parameter is bound as text, as a number or as a number
+        # only if its value looks like one
+        self.kind_comboboxes = OrderedDict()
+        kinds_layout = QHBoxLayout()
+        kinds_layout.addWidget(QLabel('Put values as:'))
+        for name in names:
+            combobox = QComboBox()
+            combobox.addItems(PARAMETER_KINDS)
+            combobox.setToolTip(
+                'Put values of :{0} as text, as numbers or as numbers '
+                'if they look like numbers (auto)'.format(name))
+            kinds_layout.addWidget(QLabel(':' + name))
+            kinds_layout.addWidget(combobox)
+            self.kind_comboboxes[name] = combobox
+        kinds_layout.addStretch()
+
+        add_button = QPushButton('&Add row')
+        add_button.clicked.connect(self.add_row)
+        remove_button = QPushButton('&Remove row')
+        remove_button.clicked.connect(self.remove_rows)
+        load_button = QPushButton('&Load CSV...')
+        load_button.setToolTip(
+            'Load parameter sets from a .csv file with a column named '
+            'after every parameter')
+        load_button.clicked.connect(self.load_csv)
+        row_buttons = QHBoxLayout()
+        row_buttons.addWidget(add_button)
+        row_buttons.addWidget(remove_button)
+        row_buttons.addStretch()
+        row_buttons.addWidget(load_button)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok
+                                   | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText('&Run')
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(
+            QLabel('The query is executed once for every row of values; '
+                   'with auto, numbers are put as numbers and other values '
+                   'as strings'))
+        layout.addLayout(kinds_layout)
+        layout.addWidget(self.values_table)
+        layout.addLayout(row_buttons)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+        self.resize(600, 400)
+        return
+
+    # ----------------------------------------------------------------------
+    def add_row(self):
+        """Add an empty row of values."""
+        self.values_table.insertRow(self.values_table.rowCount())
+        return
+
+    # ----------------------------------------------------------------------
+    def remove_rows(self):
+        """Remove the selected rows of values."""
+        rows = {index.row() for index in self.values_table.selectedIndexes()}
+        for row in sorted(rows, reverse=True):
+            self.values_table.removeRow(row)
+        return
+
+    # ----------------------------------------------------------------------
+    def set_parameter_sets(self, parameter_sets):
+        """Fill the table with the parameter sets."""
+        self.values_table.setRowCount(len(parameter_sets))
+        for row, parameters in enumerate(parameter_sets):
+            for column, name in enumerate(self.names):
+                self.values_table.setItem(
+                    row, column, QTableWidgetItem(parameters.get(name, '')))
+        return
+
+    # ----------------------------------------------------------------------
+    def get_parameter_sets(self):
+        """Get list of OrderedDict with the values; empty rows are skipped."""
+        parameter_sets = []
+        for row in range(self.values_table.rowCount()):
+            items = [
+                self.values_table.item(row, column)
+                for column in range(len(self.names))
+            ]
+            values = [item.text() if item else '' for item in items]
+            if any(values):
+                parameter_sets.append(OrderedDict(zip(self.names, values)))
+        return parameter_sets
+
+    # ----------------------------------------------------------------------
+    def set_parameter_kinds(self, kinds):
+        """Set kinds the values of the named parameters are put as."""
+        for name, kind in kinds.items():
+            self.kind_comboboxes[name].setCurrentText(kind)
+        return
+
+    # ----------------------------------------------------------------------
+    def get_parameter_kinds(self):
+        """Get OrderedDict with the kind of every parameter."""
+        return OrderedDict(
+            (name, combobox.currentText())
+            for name, combobox in self.kind_comboboxes.items())
+
+    # ----------------------------------------------------------------------
+    def load_csv(self):
+        """Load parameter sets from a csv file chosen by the user."""
+        name = QFileDialog.getOpenFileName(
+            self, 'Open parameter sets', filter='CSV Files (*.csv)')
+        if not name[0]:
+            return
+        try:
+            self.set_parameter_sets(read_parameter_sets(name[0], self.names))
+        except (ValueError, IOError) as err:
+            msg = QMessageBox()
+            msg.setText(str(err))
+            msg.setWindowTitle('Validation error')
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec_()
+        return
@@ -0,0 +1,125 @@
+# -*- coding: UTF-8 -*-
+"""Shapes of the result geometries drawn by the map preview.
+
+The WKT of a geometry is parsed into a `Shape` with the coordinates of
+its points, line strings or polygon rings; the rings of all the polygons
+of a multipolygon are kept together and holes are told apart with the
+even-odd rule when drawing or testing whether a point is inside.
+"""
+
+import math
+import re
+from collections import namedtuple
+
+Shape = namedtuple('Shape', ['kind', 'parts', 'bbox'])
+
+POINT = 'point'
+LINE = 'line'
+POLYGON = 'polygon'
+
+TYPE_RE = re.compile(r'^\s*([A-Za-z]+)')
+PART_RE = re.compile(r'\(([^()]*)\)')
+
+
+# ----------------------------------------------------------------------
+def get_kind(geometry_type):
+    """Get kind of shape drawn for the WKT geometry type."""
+    geometry_type = geometry_type.upper()
+    if geometry_type.endswith('POLYGON') or geometry_type == 'MULTISURFACE':
+        return POLYGON
+    if geometry_type.endswith('POINT'):
+        return POINT
+    return LINE
+
+
+# ----------------------------------------------------------------------
+def parse_coords(text):
+    """Parse comma separated coordinates; Z and M values are ignored."""
+    coords = []
+    for coord in text.split(','):
+        values = coord.split()
+        if len(values) >= 2:
+            coords.append((float(values[0]), float(values[1])))
+    return coords
+
+
+# ----------------------------------------------------------------------
+def parse_wkt(wkt):
+    """Parse WKT of a geometry into a Shape; None if empty or invalid."""
+    if not isinstance(wkt, str):
+        return None
+    match = TYPE_RE.match(wkt)
+    if not match:
+        return None
+    try:
+        parts = [parse_coords(part) for part in PART_RE.findall(wkt)]
+    except ValueError:
+        return None
+    parts = [part for part in parts if part]
+    if not parts:
+        return None
+    kind = get_kind(match.group(1))
+    if kind == POINT:
+        # every coordinate of a multipoint is a part
+        parts = [[coord] for part in parts for coord in part]
+    xs = [x for part in parts for x, _y in part]
+    ys = [y for part in parts for _x, y in part]
+    return Shape(kind, parts, (min(xs), min(ys), max(xs), max(ys)))
+
+
+# ----------------------------------------------------------------------
+def simplify_part(coords, tolerance):
+    """Drop vertices closer than the tolerance to the last vertex kept.
+
+    The first and the last vertices are always kept so that rings stay
+    closed.
+    """
+    if len(coords) <= 2 or tolerance <= 0:
+        return coords
+    simplified = [coords[0]]
+    last_x, last_y = coords[0]
+    for x, y in coords[1:-1]:
+        if abs(x - last_x) >= tolerance or abs(y - last_y) >= tolerance:
+            simplified.append((x, y))
+            last_x, last_y = x, y
+    simplified.append(coords[-1])
+    return simplified
+
+
+# ----------------------------------------------------------------------
+def get_segment_distance(x, y, start, end):
+    """Get distance from the point to the line segment."""
+    (x1, y1), (x2, y2) = start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == dy == 0:
+        return math.hypot(x - x1, y - y1)
+    ratio = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) /
+                         (dx * dx + dy * dy)))
+    return math.hypot(x - (x1 + ratio * dx), y - (y1 + ratio * dy))
+
+
+# ----------------------------------------------------------------------
+def is_inside_rings(x, y, rings):
+    """Check if the point is inside the rings using the even-odd rule."""
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+            if (y1 > y) != (y2 > y) and (x < (x2 - x1) * (y - y1) /
+                                         (y2 - y1) + x1):
+                inside = not inside
+    return inside
+
+
+# ----------------------------------------------------------------------
+def get_shape_distance(shape, x, y):
+    """Get distance from the point to the shape; 0 if inside a polygon."""
+    if shape.kind == POLYGON and is_inside_rings(x, y, shape.parts):
+        return 0.0
+    distances = []
+    for part in shape.parts:
+        if len(part) == 1:
+            distances.append(math.hypot(x - part[0][0], y - part[0][1]))
+        distances.extend(
+            get_segment_distance(x, y, start, end)
+            for start, end in zip(part, part[1:]))
+    return min(distances)
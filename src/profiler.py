@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+"""Profiler capturing where the time of a slow query is spent.
+
+The query execution and the fetching of its rows are run under cProfile
+while the calls of selected methods (such as `ResultTableModel.data` and
+`fetchMore` called by Qt when painting the table) are counted and timed.
+The profile is saved into its own folder along with the query text and
+a summary of the top hotspots; the profile file can be explored with
+`python -m pstats` or tools such as snakeviz.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import time
+from collections import OrderedDict
+
+import cfg
+
+# folder with the saved profiles in the user data folder
+PROFILES_FOLDER = 'profiles'
+
+# number of functions listed in the summary of the hotspots
+TOP_FUNCTIONS = 30
+
+
+########################################################################
+class QueryProfiler(object):
+    """Profiler of a query execution counting calls of selected methods."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, counted_methods=()):
+        """Initialize QueryProfiler.
+
+        `counted_methods` is a sequence of (class, method name) pairs
+        whose calls are counted and timed while profiling.
+        """
+        self.counted_methods = list(counted_methods)
+        self.profile = cProfile.Profile()
+        self.call_counts = OrderedDict()
+        self.call_times = OrderedDict()
+        self.start_time = None
+        self.elapsed = 0.0
+        self._originals = []
+        return
+
+    # ----------------------------------------------------------------------
+    def __enter__(self):
+        """Start profiling when entering the context."""
+        self.start()
+        return self
+
+    # ----------------------------------------------------------------------
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop profiling when leaving the context."""
+        self.stop()
+        return False
+
+    # ----------------------------------------------------------------------
+    def start(self):
+        """Start profiling and counting calls of the selected methods."""
+        for cls, name in self.counted_methods:
+            original = cls.__dict__[name]
+            self._originals.append((cls, name, original))
+            setattr(cls, name, self._get_counting_method(cls, name, original))
+        self.start_time = time.perf_counter()
+        self.profile.enable()
+        return
+
+    # ----------------------------------------------------------------------
+    def stop(self):
+        """Stop profiling and restore the selected methods."""
+        if self.start_time is None:
+            return
+        self.profile.disable()
+        self.elapsed += time.perf_counter() - self.start_time
+        self.start_time = None
+        while self._originals:
+            cls, name, original = self._originals.pop()
+            setattr(cls, name, original)
+        return
+
+    # ----------------------------------------------------------------------
+    def get_summary(self, top=TOP_FUNCTIONS):
+        """Get text summary with the call counts and the top hotspots."""
+        lines = ['Profiled for {secs:.3f} secs'.format(secs=self.elapsed), '']
+        if self.call_counts:
+            lines.append('Counted calls:')
+            for key, count in self.call_counts.items():
+                lines.append('  {key}: {count} calls, {msecs:.1f} ms'.format(
+                    key=key, count=count, msecs=self.call_times[key] * 1000))
+            lines.append('')
+
+        for sort_key in ('cumulative', 'tottime'):
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats(sort_key).print_stats(top)
+            lines.append('Top {top} functions by {key} time:'.format(
+                top=top, key=sort_key))
+            lines.append(stream.getvalue().strip())
+            lines.append('')
+        return '\n'.join(lines)
+
+    # ----------------------------------------------------------------------
+    def save(self, sql, folder=None):
+        """Save profile, query text and summary; return the folder path.
+
+        A new timestamped folder within the profiles folder of the user
+        data folder is created unless `folder` is given.
+        """
+        if folder is None:
+            folder = os.path.join(cfg.user_data_dir, PROFILES_FOLDER,
+                                  time.strftime('%Y%m%d-%H%M%S'))
+            suffix = 1
+            base_folder = folder
+            while os.path.exists(folder):
+                suffix += 1
+                folder = '{base}-{suffix}'.format(
+                    base=base_folder, suffix=suffix)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        self.profile.dump_stats(os.path.join(folder, 'profile.pstats'))
+        with io.open(
+                os.path.join(folder, 'query.sql'), 'w',
+                encoding='utf-8') as f:
+            f.write(sql)
+        with io.open(
+                os.path.join(folder, 'summary.txt'), 'w',
+                encoding='utf-8') as f:
+            f.write(self.get_summary())
+        return folder
+
+    # ----------------------------------------------------------------------
+    def _get_counting_method(self, cls, name, original):
+        """Get method wrapper counting and timing the calls."""
+        key = '{cls}.{name}'.format(cls=cls.__name__, name=name)
+        self.call_counts[key] = 0
+        self.call_times[key] = 0.0
+
+        @functools.wraps(original)
+        def counting_method(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.call_counts[key] += 1
+                self.call_times[key] += time.perf_counter() - start_time
+
+        return counting_method
@@ -0,0 +1,145 @@
+# -*- coding: UTF-8 -*-
+"""Named parameters of query templates such as `:borough`.
+
+OGR executes SQL text only, so the parameter values are bound by
+replacing every parameter token found by the SQL lexer with a literal:
+numbers are put as they are, other values as string literals with the
+quotes escaped, so a value can never change the structure of the query.
+A parameter can be bound as text or as a number explicitly, so that a
+value such as `10001` can be compared to a text column.
+Parameters within string literals and comments are left as they are.
+"""
+
+import csv
+import io
+import re
+from collections import OrderedDict, namedtuple
+
+from sql_lexer import tokenize
+
+# prefix of the columns with the parameter values added in front of the
+# columns of the batch result table
+PARAMETER_COLUMN_PREFIX = 'param_'
+# values put into queries as numbers; others, such as '007', are strings
+NUMBER_RE = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?\Z')
+# kinds of the parameters; values of the auto kind are put as numbers if
+# they look like numbers
+AUTO_KIND = 'auto'
+TEXT_KIND = 'text'
+NUMBER_KIND = 'number'
+PARAMETER_KINDS = (AUTO_KIND, TEXT_KIND, NUMBER_KIND)
+
+# execution of the query template with one parameter set
+BatchRun = namedtuple(
+    'BatchRun',
+    ['parameters', 'rows_count', 'errors', 'exec_time', 'fetch_time'])
+
+
+# ----------------------------------------------------------------------
+def find_parameters(sql_query):
+    """Get names of the parameters of the query in order of appearance."""
+    names = []
+    for token in tokenize(sql_query):
+        name = token.value[1:]
+        if token.kind == 'parameter' and name not in names:
+            names.append(name)
+    return names
+
+
+# ----------------------------------------------------------------------
+def format_literal(value, kind=AUTO_KIND):
+    """Format parameter value as a SQL literal of the parameter kind.
+
+    ValueError is raised if a value of the number kind is not a number.
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        value = repr(value)
+    value = str(value)
+    if kind == NUMBER_KIND and not NUMBER_RE.match(value):
+        raise ValueError('{0!r} is not a number'.format(value))
+    if kind != TEXT_KIND and NUMBER_RE.match(value):
+        # `x -:value` must not become a comment
+        return '({0})'.format(value) if value.startswith('-') else value
+    return "'{0}'".format(value.replace("'", "''"))
+
+
+# ----------------------------------------------------------------------
+def bind_parameters(sql_query, values, kinds=None):
+    """Get query with the parameters replaced with the values.
+
+    `values` maps the parameter names to the values and `kinds` to the
+    kinds of the parameters, the auto kind by default; ValueError is
+    raised if a parameter has no value or a value of its kind.
+    """
+    kinds = kinds or {}
+    parts = []
+    pos = 0
+    for token in tokenize(sql_query, skip_whitespace=False):
+        if token.kind != 'parameter':
+            continue
+        name = token.value[1:]
+        if name not in values:
+            raise ValueError('No value for parameter :{0}'.format(name))
+        try:
+            literal = format_literal(values[name],
+                                     kinds.get(name, AUTO_KIND))
+        except ValueError as err:
+            raise ValueError('Parameter :{0}: {1}'.format(name, err))
+        parts.append(sql_query[pos:token.start])
+        parts.append(literal)
+        pos = token.start + len(token.value)
+    parts.append(sql_query[pos:])
+    return ''.join(parts)
+
+
+# ----------------------------------------------------------------------
+def read_parameter_sets(path, names):
+    """Read parameter sets from a csv file with the names in its header.
+
+    Return list of OrderedDict with the values of the named parameters;
+    ValueError is raised if the file has no column for a parameter.
+    """
+    with io.open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [
+            name for name in names if name not in (reader.fieldnames or [])
+        ]
+        if missing:
+            raise ValueError('No column for parameters {0} in {1}'.format(
+                ', '.join(missing), path))
+        return [
+            OrderedDict((name, row[name]) for name in names)
+            for row in reader
+        ]
+
+
+# ----------------------------------------------------------------------
+def format_parameters(parameters):
+    """Format parameter set as `name=value` pairs."""
+    return ', '.join('{0}={1}'.format(name, value)
+                     for name, value in parameters.items())
+
+
+# ----------------------------------------------------------------------
+def format_batch_report(runs, total_time):
+    """Get text report with execution time and errors per parameter set."""
+    lines = [
+        'Executed with {count} parameter sets in {secs:.1f} secs'.format(
+            count=len(runs), secs=total_time)
+    ]
+    for run in runs:
+        if run.errors:
+            details = 'failed: {err}'.format(err=run.errors)
+        else:
+            details = '{exec_time:.1f} secs execute | {fetch_time:.1f} secs ' \
+                'fetch | {rows} rows'.format(
+                    exec_time=run.exec_time,
+                    fetch_time=run.fetch_time,
+                    rows=run.rows_count)
+        lines.append('{params}: {details}'.format(
+            params=format_parameters(run.parameters), details=details))
+    return '\n'.join(lines)
@@ -0,0 +1,150 @@
+# -*- coding: UTF-8 -*-
+"""Timing of the phases of executing a query and drawing its result.
+
+The single execution time hides where the time is actually spent: a
+query may execute in no time and then take seconds to count its rows
+or to convert the geometries of the first rows into WKT. A `QueryTimer`
+records every phase of a query; the records are appended to a JSON lines
+file which can be loaded and aggregated with `summarize_timing_records`.
+"""
+
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import cfg
+
+# file with the timing records in the user data folder
+QUERY_TIMINGS_FILE = 'query_timings.jsonl'
+
+# phases in the order they happen
+PHASES = [
+    'strip',  # splitting the script and stripping the comments
+    'execute',  # executing the statement with the SQL dialect
+    'count',  # counting the result rows
+    'first_fetch',  # reading the first batch of rows (with WKT conversion)
+    'render',  # setting up the table view with the model
+    'column_sizing',  # resizing the columns to their contents
+]
+
+
+########################################################################
+class QueryTimer(object):
+    """Timer recording the time spent in each phase of a query."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        """Initialize QueryTimer without any recorded phases."""
+        self.phases = OrderedDict()
+        return
+
+    # ----------------------------------------------------------------------
+    @contextmanager
+    def measure(self, phase):
+        """Measure time of the code block adding it to the phase."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start_time)
+
+    # ----------------------------------------------------------------------
+    def add(self, phase, secs):
+        """Add time in seconds to the phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + secs
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def total(self):
+        """Get total time of all recorded phases in seconds."""
+        return sum(self.phases.values())
+
+    # ----------------------------------------------------------------------
+    def format_breakdown(self):
+        """Format the phase timings as lines of text."""
+        lines = [
+            '{phase}: {msecs:.1f} ms'.format(phase=phase, msecs=secs * 1000)
+            for phase, secs in self._ordered_phases()
+        ]
+        lines.append('total: {msecs:.1f} ms'.format(msecs=self.total * 1000))
+        return '\n'.join(lines)
+
+    # ----------------------------------------------------------------------
+    def to_record(self, **fields):
+        """Get record of the phase timings in msecs with the extra fields."""
+        record = OrderedDict([('timestamp', time.time())])
+        record.update(fields)
+        record['phases'] = OrderedDict(
+            (phase, round(secs * 1000, 3))
+            for phase, secs in self._ordered_phases())
+        record['total'] = round(self.total * 1000, 3)
+        return record
+
+    # ----------------------------------------------------------------------
+    def _ordered_phases(self):
+        """Get (phase, secs) pairs; known phases first in their order."""
+        known = [(p, self.phases[p]) for p in PHASES if p in self.phases]
+        others = [(p, s) for p, s in self.phases.items() if p not in PHASES]
+        return known + others
+
+
+# ----------------------------------------------------------------------
+def get_timings_path():
+    """Get path of the timing records file in the user data folder."""
+    return os.path.join(cfg.user_data_dir, QUERY_TIMINGS_FILE)
+
+
+# ----------------------------------------------------------------------
+def append_timing_record(record, path=None):
+    """Append record as a line of the JSON lines file.
+
+    The file in the user data folder is used if `path` is not given.
+    """
+    path = path or get_timings_path()
+    try:
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        with io.open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    except (IOError, OSError):
+        # timings are diagnostics only; never fail the query
+        pass
+    return
+
+
+# ----------------------------------------------------------------------
+def load_timing_records(path=None):
+    """Load records from the JSON lines file skipping malformed lines."""
+    path = path or get_timings_path()
+    records = []
+    if not os.path.exists(path):
+        return records
+    with io.open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+# ----------------------------------------------------------------------
+def summarize_timing_records(records):
+    """Aggregate phase timings of the records.
+
+    Return OrderedDict { phase: {'count': n, 'mean': ms, 'max': ms} }
+    """
+    values = OrderedDict((phase, []) for phase in PHASES)
+    for record in records:
+        for phase, msecs in record.get('phases', {}).items():
+            values.setdefault(phase, []).append(msecs)
+    return OrderedDict((phase, {
+        'count': len(msecs),
+        'mean': sum(msecs) / len(msecs),
+        'max': max(msecs)
+    }) for phase, msecs in values.items() if msecs)
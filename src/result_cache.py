@@ -0,0 +1,176 @@
+# -*- coding: UTF-8 -*-
+"""Memory budget for the result sets drawn in the query tabs.
+
+The approximate memory taken by the fetched rows of every result table is
+tracked as a running total updated with the size of a single table when
+it is viewed or fetches more rows; when the total exceeds the budget, the
+rows of the least recently viewed tables are spilled into compressed files
+in a temporary folder and their OGR cursors are released. A spilled table
+reloads its rows from the file when it is viewed again and re-executes its
+query only if more rows need to be fetched.
+
+The tables are duck-typed: they provide `memory_size()`, `is_spilled`,
+`spill(folder)`, `reload()` and `discard_spilled_rows()`.
+"""
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import zlib
+from collections import OrderedDict
+
+MB = 1024 * 1024
+
+# rows sampled to estimate the memory taken by the rows of a table
+SAMPLE_SIZE = 50
+
+
+# ----------------------------------------------------------------------
+def estimate_rows_size(rows, sample_size=SAMPLE_SIZE):
+    """Estimate memory in bytes taken by the rows (objects with fields)."""
+    if not rows:
+        return 0
+    step = max(len(rows) // sample_size, 1)
+    sample = rows[::step][:sample_size]
+    sample_bytes = 0
+    for row in sample:
+        values = row.__dict__
+        sample_bytes += sys.getsizeof(row) + sys.getsizeof(values) + sum(
+            sys.getsizeof(value) for value in values.values())
+    return sample_bytes * len(rows) // len(sample)
+
+
+# ----------------------------------------------------------------------
+def spill_rows(rows, headers, folder):
+    """Write values of the rows' columns into a file; return its path."""
+    handle, path = tempfile.mkstemp(suffix='.rows', dir=folder)
+    values = [
+        tuple(getattr(row, header, None) for header in headers)
+        for row in rows
+    ]
+    with os.fdopen(handle, 'wb') as f:
+        f.write(
+            zlib.compress(
+                pickle.dumps((list(headers), values),
+                             pickle.HIGHEST_PROTOCOL), 1))
+    return path
+
+
+# ----------------------------------------------------------------------
+def load_rows(path):
+    """Read spilled rows; return tuple (headers, list of value tuples)."""
+    with open(path, 'rb') as f:
+        return pickle.loads(zlib.decompress(f.read()))
+
+
+# ----------------------------------------------------------------------
+def skip_features(layer, count):
+    """Position the layer cursor on the feature with the index."""
+    layer.ResetReading()
+    if not count:
+        return
+    try:
+        # OGR error code other than 0 if the driver cannot do that
+        failed = layer.SetNextByIndex(count)
+    except Exception:
+        failed = True
+    if failed:
+        layer.ResetReading()
+        for _i in range(count):
+            layer.GetNextFeature()
+    return
+
+
+########################################################################
+class ResultMemoryManager(object):
+    """Tracker of result tables spilling the least recently viewed ones."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, budget_bytes):
+        """Initialize ResultMemoryManager with the budget in bytes."""
+        self.budget_bytes = budget_bytes
+        # tables in the order they were viewed, the latest last
+        self.tables = OrderedDict()
+        # memory sizes of the tables when last measured and their sum
+        self.sizes = {}
+        self._total_size = 0
+        self.folder = None
+        return
+
+    # ----------------------------------------------------------------------
+    @property
+    def total_size(self):
+        """Get memory in bytes taken by the rows of the tracked tables."""
+        return self._total_size
+
+    # ----------------------------------------------------------------------
+    def _measure(self, table):
+        """Measure the table again updating the running total."""
+        size = table.memory_size()
+        self._total_size += size - self.sizes.get(id(table), 0)
+        self.sizes[id(table)] = size
+        return
+
+    # ----------------------------------------------------------------------
+    def touch(self, table):
+        """Mark the table as viewed now; reload its rows if spilled."""
+        if table.is_spilled:
+            table.reload()
+        self.tables.pop(id(table), None)
+        self.tables[id(table)] = table
+        self._measure(table)
+        self.enforce(keep=table)
+        return
+
+    # ----------------------------------------------------------------------
+    def update(self, table):
+        """Measure the table after fetching more rows into it.
+
+        Other tables are spilled only if the running total gets over the
+        budget; return list of the tables spilled.
+        """
+        if id(table) not in self.tables:
+            return []
+        self._measure(table)
+        if self._total_size <= self.budget_bytes:
+            return []
+        return self.enforce(keep=table)
+
+    # ----------------------------------------------------------------------
+    def remove(self, table):
+        """Stop tracking the table removing its spilled rows if any."""
+        self.tables.pop(id(table), None)
+        self._total_size -= self.sizes.pop(id(table), 0)
+        if table.is_spilled:
+            table.discard_spilled_rows()
+        return
+
+    # ----------------------------------------------------------------------
+    def enforce(self, keep=None):
+        """Spill least recently viewed tables until within the budget.
+
+        Return list of the tables spilled; the `keep` table is never
+        spilled.
+        """
+        spilled = []
+        for table in list(self.tables.values()):
+            if self._total_size <= self.budget_bytes:
+                break
+            if table is keep or table.is_spilled:
+                continue
+            if not self.folder:
+                self.folder = tempfile.mkdtemp(prefix='gdbee-')
+            table.spill(self.folder)
+            self._measure(table)
+            spilled.append(table)
+        return spilled
+
+    # ----------------------------------------------------------------------
+    def cleanup(self):
+        """Remove the folder with the spilled rows."""
+        if self.folder:
+            shutil.rmtree(self.folder, ignore_errors=True)
+            self.folder = None
+        return
@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+"""Comparison of two result sets by the hashes of their rows.
+
+The rows are read in a single streaming pass over each result set and
+only a 128-bit digest of every row is kept (along with the key of the row
+if the rows are compared by a key column), so that result sets with
+millions of rows can be compared without keeping their rows. Rows with
+the same key and different hashes are changed; without a key the rows
+are compared as multisets and only the rows added and removed are
+counted.
+
+The digest is computed from the values encoded with their types rather
+than by the built-in `hash`, which is equal for values such as -1 and -2
+or 1, 1.0 and True; NaN values are all encoded the same so that a row
+with a NaN is equal to itself.
+"""
+
+import hashlib
+import itertools
+import math
+import struct
+from collections import Counter, namedtuple
+
+# keys of the rows added, removed and changed listed in the report
+MAX_SAMPLES = 100
+
+# rows read between the checks whether the comparison was interrupted
+DIFF_BATCH_SIZE = 10000
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# counts of the rows; `samples` maps a kind of change to the keys of the
+# rows (keyed comparison only); `duplicate_keys` counts the rows whose
+# key repeats a key seen before in the same result set
+ResultDiff = namedtuple('ResultDiff', [
+    'added', 'removed', 'changed', 'unchanged', 'samples', 'duplicate_keys'
+])
+
+
+########################################################################
+class DiffInterrupted(Exception):
+    """Raised while reading the rows once the comparison is interrupted."""
+
+
+# ----------------------------------------------------------------------
+def iter_interruptible(rows, is_interrupted, batch_size=DIFF_BATCH_SIZE):
+    """Yield the rows checking `is_interrupted()` before every batch."""
+    rows = iter(rows)
+    while True:
+        if is_interrupted():
+            raise DiffInterrupted()
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        for row in batch:
+            yield row
+    return
+
+
+# ----------------------------------------------------------------------
+def _new_digest():
+    """Get hash object for the row digests (BLAKE2 if available)."""
+    if hasattr(hashlib, 'blake2b'):
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.md5()
+
+
+# ----------------------------------------------------------------------
+def encode_value(value):
+    """Encode the value with its type as bytes for the row digest."""
+    if value is None:
+        return b'N'
+    if isinstance(value, bool):
+        return b'B1' if value else b'B0'
+    if isinstance(value, int):
+        data = str(value).encode('ascii')
+        tag = b'I'
+    elif isinstance(value, float):
+        data = b'nan' if math.isnan(value) else repr(value).encode('ascii')
+        tag = b'F'
+    elif isinstance(value, str):
+        data = value.encode('utf-8', 'surrogatepass')
+        tag = b'S'
+    elif isinstance(value, (bytes, bytearray)):
+        data = bytes(value)
+        tag = b'Y'
+    elif isinstance(value, (list, tuple)):
+        # list fields
+        data = b''.join(encode_value(item) for item in value)
+        tag = b'L'
+    else:
+        data = '{0}:{1!r}'.format(type(value).__name__,
+                                  value).encode('utf-8', 'surrogatepass')
+        tag = b'O'
+    # the length keeps the boundaries of the values unambiguous
+    return tag + struct.pack('<Q', len(data)) + data
+
+
+# ----------------------------------------------------------------------
+def hash_row(values):
+    """Get digest of the row values (bytes)."""
+    digest = _new_digest()
+    for value in values:
+        digest.update(encode_value(value))
+    return digest.digest()
+
+
+# ----------------------------------------------------------------------
+def get_common_columns(old_headers, new_headers):
+    """Get columns of both result sets in the order of the old one."""
+    return [header for header in old_headers if header in new_headers]
+
+
+# ----------------------------------------------------------------------
+def diff_rows(old_rows, new_rows, key_index=None, max_samples=MAX_SAMPLES):
+    """Compare two iterables of row value sequences.
+
+    The rows are matched by the value at `key_index` if it is given and
+    as a whole otherwise. Return ResultDiff.
+    """
+    if key_index is None:
+        return _diff_unkeyed(old_rows, new_rows)
+    return _diff_keyed(old_rows, new_rows, key_index, max_samples)
+
+
+# ----------------------------------------------------------------------
+def _diff_unkeyed(old_rows, new_rows):
+    """Compare rows as multisets of their hashes."""
+    old_counts = Counter(map(hash_row, old_rows))
+    added = unchanged = 0
+    for row_hash in map(hash_row, new_rows):
+        if old_counts[row_hash]:
+            old_counts[row_hash] -= 1
+            unchanged += 1
+        else:
+            added += 1
+    removed = sum(old_counts.values())
+    return ResultDiff(added, removed, 0, unchanged, {}, 0)
+
+
+# ----------------------------------------------------------------------
+def _diff_keyed(old_rows, new_rows, key_index, max_samples):
+    """Compare rows with the same key."""
+    samples = {ADDED: [], REMOVED: [], CHANGED: []}
+    duplicate_keys = 0
+    old_hashes = {}
+    for row in old_rows:
+        key = row[key_index]
+        if key in old_hashes:
+            duplicate_keys += 1
+        old_hashes[key] = hash_row(row)
+
+    added = changed = unchanged = 0
+    seen = set()
+    for row in new_rows:
+        key = row[key_index]
+        if key in seen:
+            duplicate_keys += 1
+            continue
+        seen.add(key)
+        old_hash = old_hashes.pop(key, None)
+        if old_hash is None:
+            added += 1
+            kind = ADDED
+        elif old_hash != hash_row(row):
+            changed += 1
+            kind = CHANGED
+        else:
+            unchanged += 1
+            continue
+        if len(samples[kind]) < max_samples:
+            samples[kind].append(key)
+
+    removed = len(old_hashes)
+    samples[REMOVED] = list(itertools.islice(old_hashes, max_samples))
+    return ResultDiff(added, removed, changed, unchanged, samples,
+                      duplicate_keys)
@@ -0,0 +1,93 @@
+# -*- coding: UTF-8 -*-
+"""In-memory OGR layer unioning rows of multiple result sets.
+
+The union layer behaves as any layer returned by `ExecuteSQL` so it can be
+drawn in the result table and exported as a regular result set.
+"""
+
+import ogr
+ogr.UseExceptions()
+
+FIELD_TYPES = {
+    'Integer': ogr.OFTInteger,
+    'Integer64': ogr.OFTInteger64,
+    'Real': ogr.OFTReal,
+}
+
+
+########################################################################
+class UnionLayerBuilder(object):
+    """Builder of an OGR memory layer with rows of several result sets."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name='union'):
+        """Initialize UnionLayerBuilder with an empty memory data source."""
+        self.name = name
+        self.ds = ogr.GetDriverByName('Memory').CreateDataSource(name)
+        self.layer = None
+        self.field_names = []
+        self.geom_col = None
+        return
+
+    # ----------------------------------------------------------------------
+    def add_rows(self, columns, rows, labels=None):
+        """Add rows to the union layer.
+
+        `columns` is a list of tuples (column name, column type name) as
+        returned by `geodatabase.get_layer_columns` and `rows` are dicts
+        with geometries as WKT; `labels` is an ordered list of tuples
+        (column name, value) put in front of the columns of every row, for
+        instance to tell which source the row comes from.
+        """
+        labels = labels or []
+        if self.layer is None:
+            self._create_layer(columns, labels)
+
+        defn = self.layer.GetLayerDefn()
+        for row in rows:
+            feat = ogr.Feature(defn)
+            for name, value in labels:
+                feat.SetField(name, value)
+            for name in self.field_names:
+                value = row.get(name)
+                if value is not None:
+                    feat.SetField(name, value)
+            if self.geom_col:
+                wkt = row.get(self.geom_col)
+                if wkt:
+                    feat.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+            self.layer.CreateFeature(feat)
+        return
+
+    # ----------------------------------------------------------------------
+    def get_layer(self):
+        """Get the union layer; None if no rows have been added."""
+        if self.layer is not None:
+            self.layer.ResetReading()
+        return self.layer
+
+    # ----------------------------------------------------------------------
+    def _create_layer(self, columns, labels):
+        """Create layer with the label fields followed by result columns."""
+        self.layer = self.ds.CreateLayer(self.name, geom_type=ogr.wkbNone)
+        for name, value in labels:
+            field_type = ogr.OFTString
+            if isinstance(value, int):
+                field_type = ogr.OFTInteger64
+            elif isinstance(value, float):
+                field_type = ogr.OFTReal
+            self.layer.CreateField(ogr.FieldDefn(name, field_type))
+
+        for name, type_name in columns:
+            if type_name == 'Geometry':
+                self.geom_col = name
+                continue
+            self.layer.CreateField(
+                ogr.FieldDefn(name, FIELD_TYPES.get(type_name,
+                                                    ogr.OFTString)))
+            self.field_names.append(name)
+
+        if self.geom_col:
+            self.layer.CreateGeomField(
+                ogr.GeomFieldDefn(self.geom_col, ogr.wkbUnknown))
+        return
@@ -0,0 +1,145 @@
+# -*- coding: UTF-8 -*-
+"""Writers streaming result set rows into CSV, NDJSON and Parquet files.
+
+Rows are dicts { column name: value } and are written in batches so that
+result sets of any size can be written without holding them in memory.
+"""
+
+import csv
+import json
+from collections import OrderedDict
+
+# number of rows buffered before being written as a Parquet row group
+PARQUET_BATCH_SIZE = 10000
+
+
+########################################################################
+class CsvWriter(object):
+    """Writer of rows into a CSV text stream."""
+
+    binary = False
+
+    # ----------------------------------------------------------------------
+    def __init__(self, out, columns):
+        """Initialize CsvWriter and write the header row."""
+        self.names = [name for name, _type in columns]
+        self.writer = csv.writer(out, lineterminator='\n')
+        self.writer.writerow(self.names)
+        return
+
+    # ----------------------------------------------------------------------
+    def write_rows(self, rows):
+        """Write rows into the stream."""
+        names = self.names
+        self.writer.writerows([row.get(name) for name in names]
+                              for row in rows)
+        return
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Finish writing; nothing to flush for CSV."""
+        return
+
+
+########################################################################
+class NdjsonWriter(object):
+    """Writer of rows into a newline-delimited JSON text stream."""
+
+    binary = False
+
+    # ----------------------------------------------------------------------
+    def __init__(self, out, columns):
+        """Initialize NdjsonWriter with the column names."""
+        self.out = out
+        self.names = [name for name, _type in columns]
+        return
+
+    # ----------------------------------------------------------------------
+    def write_rows(self, rows):
+        """Write each row as a JSON object on its own line."""
+        names = self.names
+        self.out.writelines(
+            json.dumps(
+                OrderedDict((name, row.get(name)) for name in names),
+                default=str,
+                ensure_ascii=False) + '\n' for row in rows)
+        return
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Finish writing; nothing to flush for NDJSON."""
+        return
+
+
+########################################################################
+class ParquetWriter(object):
+    """Writer of rows into a Parquet file; requires `pyarrow`."""
+
+    binary = True
+
+    # ----------------------------------------------------------------------
+    def __init__(self, out, columns):
+        """Initialize ParquetWriter with the schema based on column types."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(
+                'pyarrow package is required for exporting into Parquet.\n'
+                'Get it from https://pypi.python.org/pypi/pyarrow')
+
+        arrow_types = {
+            'Integer': pa.int32(),
+            'Integer64': pa.int64(),
+            'Real': pa.float64(),
+        }
+        self.pa = pa
+        self.names = [name for name, _type in columns]
+        self.schema = pa.schema([(name, arrow_types.get(type_, pa.string()))
+                                 for name, type_ in columns])
+        self.string_columns = {
+            name
+            for name, type_ in columns if type_ not in arrow_types
+        }
+        self.writer = pq.ParquetWriter(out, self.schema)
+        self.batch = []
+        return
+
+    # ----------------------------------------------------------------------
+    def write_rows(self, rows):
+        """Buffer rows and write them as row groups of fixed size."""
+        for row in rows:
+            self.batch.append(row)
+            if len(self.batch) >= PARQUET_BATCH_SIZE:
+                self._flush()
+        return
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Write the remaining buffered rows and close the file."""
+        self._flush()
+        self.writer.close()
+        return
+
+    # ----------------------------------------------------------------------
+    def _flush(self):
+        """Write the buffered rows as a row group."""
+        if not self.batch:
+            return
+        data = {}
+        for name in self.names:
+            values = [row.get(name) for row in self.batch]
+            if name in self.string_columns:
+                values = [None if v is None else str(v) for v in values]
+            data[name] = values
+        self.writer.write_table(
+            self.pa.Table.from_pydict(data, schema=self.schema))
+        self.batch = []
+        return
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'ndjson': NdjsonWriter,
+    'parquet': ParquetWriter,
+}
@@ -0,0 +1,244 @@
+# -*- coding: UTF-8 -*-
+"""Stores keeping the rows fetched from the OGR result layers.
+
+`InMemoryRowStore` keeps the rows as Python objects. `ArrowRowStore`
+writes the fetched rows in batches into Arrow IPC files in a temporary
+folder and reads the cell values from the memory-mapped files so that
+the operating system's page cache rather than the Python heap holds the
+rows of very large result sets; only the rows of the batch not yet
+written are kept as Python objects.
+
+Both stores are sequences of `Row` objects; `get_value` reads a single
+cell without building the row.
+"""
+
+import bisect
+import os
+import shutil
+import tempfile
+import weakref
+from importlib.util import find_spec
+
+from result_cache import estimate_rows_size
+
+MEMORY_STORE = 'memory'
+ARROW_STORE = 'arrow'
+
+# rows written into a single Arrow IPC file
+BATCH_SIZE = 10000
+
+# pyarrow is imported only when the Arrow store is used
+pyarrow_found = find_spec('pyarrow') is not None
+
+
+########################################################################
+class Row(object):
+    """Row of the returned database result set."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, **kwargs):
+        """Initialize Row with basic properties."""
+        self.__dict__.update(kwargs)
+
+
+# ----------------------------------------------------------------------
+def make_row_store(headers, kind=MEMORY_STORE):
+    """Create store of the kind; the rows are kept in memory by default.
+
+    The in-memory store is used if the Arrow store is requested but
+    pyarrow is not installed.
+    """
+    if kind == ARROW_STORE and pyarrow_found:
+        return ArrowRowStore(headers)
+    return InMemoryRowStore(headers)
+
+
+########################################################################
+class InMemoryRowStore(object):
+    """Store keeping the rows as Python objects."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, headers):
+        """Initialize InMemoryRowStore with the column names."""
+        self.headers = list(headers)
+        self.rows = []
+        return
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        """Get number of rows stored."""
+        return len(self.rows)
+
+    # ----------------------------------------------------------------------
+    def __getitem__(self, index):
+        """Get row with the index."""
+        return self.rows[index]
+
+    # ----------------------------------------------------------------------
+    def __iter__(self):
+        """Iterate over the rows."""
+        return iter(self.rows)
+
+    # ----------------------------------------------------------------------
+    def append(self, row):
+        """Add the row."""
+        self.rows.append(row)
+        return
+
+    # ----------------------------------------------------------------------
+    def extend(self, rows):
+        """Add the rows."""
+        self.rows.extend(rows)
+        return
+
+    # ----------------------------------------------------------------------
+    def get_value(self, index, column):
+        """Get value of the column (position in headers) in the row."""
+        return getattr(self.rows[index], self.headers[column], None)
+
+    # ----------------------------------------------------------------------
+    def memory_size(self):
+        """Get approximate memory in bytes taken by the rows."""
+        return estimate_rows_size(self.rows)
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Forget the rows."""
+        self.rows = []
+        return
+
+
+########################################################################
+class ArrowRowStore(object):
+    """Store writing the rows into memory-mapped Arrow IPC files."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, headers, batch_size=BATCH_SIZE, folder=None):
+        """Initialize ArrowRowStore with the column names.
+
+        The files are written into a new temporary folder within the
+        folder given (the system temporary folder by default) which is
+        removed when the store is closed or garbage collected.
+        """
+        import pyarrow
+        self.pa = pyarrow
+        self.headers = list(headers)
+        self.batch_size = batch_size
+        self.folder = tempfile.mkdtemp(prefix='gdbee-rows-', dir=folder)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.folder,
+                                           True)
+        # record batches read from the memory-mapped files
+        self.batches = []
+        # index of the first row of every batch
+        self.offsets = []
+        self.written_rows = 0
+        self.pending = []
+        return
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        """Get number of rows stored."""
+        return self.written_rows + len(self.pending)
+
+    # ----------------------------------------------------------------------
+    def __getitem__(self, index):
+        """Get row with the index."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('row index out of range')
+        if index >= self.written_rows:
+            return self.pending[index - self.written_rows]
+        return Row(**{
+            header: self.get_value(index, column)
+            for column, header in enumerate(self.headers)
+        })
+
+    # ----------------------------------------------------------------------
+    def __iter__(self):
+        """Iterate over the rows reading a batch at a time."""
+        for batch in self.batches:
+            for values in batch.to_pylist():
+                yield Row(**values)
+        for row in self.pending:
+            yield row
+
+    # ----------------------------------------------------------------------
+    def append(self, row):
+        """Add the row writing a batch into a file once it is full."""
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return
+
+    # ----------------------------------------------------------------------
+    def extend(self, rows):
+        """Add the rows."""
+        for row in rows:
+            self.append(row)
+        return
+
+    # ----------------------------------------------------------------------
+    def get_value(self, index, column):
+        """Get value of the column (position in headers) in the row."""
+        if index >= self.written_rows:
+            return getattr(self.pending[index - self.written_rows],
+                           self.headers[column], None)
+        batch_index = bisect.bisect_right(self.offsets, index) - 1
+        batch = self.batches[batch_index]
+        return batch.column(column)[index -
+                                    self.offsets[batch_index]].as_py()
+
+    # ----------------------------------------------------------------------
+    def memory_size(self):
+        """Get approximate memory in bytes taken by the rows not written."""
+        return estimate_rows_size(self.pending)
+
+    # ----------------------------------------------------------------------
+    def flush(self):
+        """Write the pending rows into a file and map it into memory."""
+        if not self.pending:
+            return
+        arrays = [
+            self._to_array([
+                getattr(row, header, None) for row in self.pending
+            ]) for header in self.headers
+        ]
+        batch = self.pa.RecordBatch.from_arrays(arrays, names=self.headers)
+        path = os.path.join(self.folder,
+                            'batch-{0:06d}.arrow'.format(len(self.batches)))
+        with self.pa.OSFile(path, 'wb') as sink:
+            with self.pa.ipc.new_file(sink, batch.schema) as writer:
+                writer.write_batch(batch)
+
+        # the values are read from the mapped file without copying
+        source = self.pa.memory_map(path, 'r')
+        self.batches.append(self.pa.ipc.open_file(source).get_batch(0))
+        self.offsets.append(self.written_rows)
+        self.written_rows += len(self.pending)
+        self.pending = []
+        return
+
+    # ----------------------------------------------------------------------
+    def _to_array(self, values):
+        """Convert column values into an Arrow array.
+
+        Values of mixed types which Arrow cannot infer a single type for
+        are stored as strings.
+        """
+        try:
+            return self.pa.array(values)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+            return self.pa.array(
+                [None if value is None else str(value) for value in values],
+                type=self.pa.string())
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Forget the rows and remove the files."""
+        self.batches = []
+        self.offsets = []
+        self.written_rows = 0
+        self.pending = []
+        self._finalizer()
+        return
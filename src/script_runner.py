@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+"""Execution of SQL scripts made of multiple statements."""
+
+import time
+
+from cfg import auto_dialect_name
+from dialect_selector import DialectSelector, get_dialect_timings_path
+from query_timing import QueryTimer
+from sql_lexer import split_statements, strip_comments
+
+
+# ----------------------------------------------------------------------
+def get_statements(sql_script):
+    """Split SQL script into statements with the comments stripped."""
+    return [
+        strip_comments(statement).strip()
+        for statement, _offset in split_statements(sql_script)
+    ]
+
+
+########################################################################
+class StatementResult(object):
+    """Result of executing a single statement of a SQL script."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, index, sql):
+        """Initialize StatementResult with basic properties."""
+        self.index = index
+        self.sql = sql
+        self.layer = None
+        self.errors = None
+        self.exec_time = 0.0
+        # dialect the statement was executed with
+        self.dialect = None
+        # how the geodatabase executed the statement, for instance,
+        # whether the spatial index was used
+        self.execution_path = None
+        # time spent in each phase of executing and drawing the statement
+        self.timer = QueryTimer()
+        return
+
+
+########################################################################
+class ScriptRunner(object):
+    """Runner executing statements one by one against a geodatabase.
+
+    All statements are executed using the same geodatabase connection
+    which has to be opened before the runner is used.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, gdb, dialect='sqlite', stop_on_error=True,
+                 include_geometry=True, dialect_selector=None):
+        """Initialize ScriptRunner with basic properties.
+
+        With the Auto dialect, `dialect_selector` chooses the dialect of
+        every statement; the selector with the timings recorded in the
+        user data folder is used if none is given.
+        """
+        self.gdb = gdb
+        self.dialect = dialect
+        self.stop_on_error = stop_on_error
+        self.include_geometry = include_geometry
+        self.dialect_selector = dialect_selector
+        if (self.dialect_selector is None and dialect
+                and dialect.lower() == auto_dialect_name.lower()):
+            self.dialect_selector = DialectSelector(
+                get_dialect_timings_path())
+        return
+
+    # ----------------------------------------------------------------------
+    def iter_results(self, statements):
+        """Execute statements in order yielding result of each statement.
+
+        With the Auto dialect, the time of a statement (including the
+        phases timed by the caller once its result is drawn) is recorded
+        when the next result is asked for.
+        """
+        for index, sql in enumerate(statements, 1):
+            result = StatementResult(index, sql)
+            start_time = time.time()
+            if self.dialect_selector:
+                (result.layer, result.errors,
+                 result.dialect) = self.dialect_selector.execute(
+                     self.gdb, sql, self.include_geometry)
+            else:
+                result.layer, result.errors = self.gdb.execute_sql(
+                    sql, self.dialect, include_geometry=self.include_geometry)
+                result.dialect = self.dialect
+            result.exec_time = time.time() - start_time
+            result.timer.add('execute', result.exec_time)
+            result.execution_path = getattr(self.gdb, 'last_execution_path',
+                                            None)
+            yield result
+
+            if self.dialect_selector and not result.errors:
+                self.dialect_selector.record_timer(sql, result.dialect,
+                                                   result.timer,
+                                                   result.execution_path)
+            if result.errors and self.stop_on_error:
+                break
+        return
@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+"""In-memory grid index of bounding boxes of the result features.
+
+The index is used by the map preview to find the features within the
+visible extent and under the mouse cursor without testing every feature.
+"""
+
+import math
+
+# bounding boxes spanning more cells are kept in a list checked on every
+# query instead of being put into every cell they span
+MAX_CELLS_PER_ITEM = 256
+
+
+# ----------------------------------------------------------------------
+def bboxes_intersect(a, b):
+    """Check if bounding boxes (xmin, ymin, xmax, ymax) intersect."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+########################################################################
+class GridIndex(object):
+    """Uniform grid of cells listing the keys of the boxes they overlap."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, cell_size):
+        """Initialize GridIndex with the size of a cell in map units."""
+        self.cell_size = float(cell_size) or 1.0
+        self.cells = {}
+        self.bboxes = {}
+        self.large_items = []
+        return
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        """Get number of the boxes indexed."""
+        return len(self.bboxes)
+
+    # ----------------------------------------------------------------------
+    def _get_cells_range(self, bbox):
+        """Get column and row ranges of the cells the box overlaps."""
+        xmin, ymin, xmax, ymax = [
+            math.floor(coord / self.cell_size) for coord in bbox
+        ]
+        return range(xmin, xmax + 1), range(ymin, ymax + 1)
+
+    # ----------------------------------------------------------------------
+    def insert(self, key, bbox):
+        """Add the box (xmin, ymin, xmax, ymax) under the key."""
+        self.bboxes[key] = bbox
+        columns, rows = self._get_cells_range(bbox)
+        if len(columns) * len(rows) > MAX_CELLS_PER_ITEM:
+            self.large_items.append(key)
+            return
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column, row), []).append(key)
+        return
+
+    # ----------------------------------------------------------------------
+    def query(self, bbox):
+        """Get sorted keys of the boxes intersecting the box."""
+        keys = set(key for key in self.large_items
+                   if bboxes_intersect(self.bboxes[key], bbox))
+        columns, rows = self._get_cells_range(bbox)
+        if len(columns) * len(rows) > len(self.cells):
+            # the box covers most of the grid; check the occupied cells
+            candidates = (key for (column, row), cell_keys in
+                          self.cells.items() if column in columns and
+                          row in rows for key in cell_keys)
+        else:
+            candidates = (key for column in columns for row in rows
+                          for key in self.cells.get((column, row), ()))
+        for key in candidates:
+            if key not in keys and bboxes_intersect(self.bboxes[key], bbox):
+                keys.add(key)
+        return sorted(keys)
@@ -0,0 +1,266 @@
+# -*- coding: UTF-8 -*-
+"""Detection of bounding box spatial predicates that can use a spatial index.
+
+A query such as
+
+    SELECT * FROM parcels
+    WHERE ST_Intersects(Shape, BuildMbr(1000, 2000, 3000, 4000))
+
+scans every feature of the layer when executed with the SQLite dialect.
+When the predicate is a top-level condition of a single layer query, the
+bounding box of the predicate can be applied as an OGR spatial filter on
+the source layer so that only candidate features are read (the file
+geodatabase driver uses its spatial index for that). The predicate is
+kept in the query so the result set is the same with or without the
+filter.
+"""
+
+import re
+from collections import namedtuple
+
+from sql_lexer import tokenize, COMMENT_KINDS, IDENTIFIER_KINDS
+from sql_context import NOT_ALIASES, unquote_identifier
+
+SpatialFilter = namedtuple('SpatialFilter', ['table', 'column', 'bbox'])
+
+# predicates true only for geometries intersecting the other geometry
+# (arguments order does not matter)
+INTERSECTS_FUNCTIONS = {
+    'st_intersects', 'intersects', 'mbrintersects', 'st_overlaps',
+    'overlaps', 'mbroverlaps', 'st_touches', 'touches', 'mbrtouches',
+    'st_crosses', 'crosses', 'st_equals', 'equals', 'mbrequal'
+}
+# predicates true only for geometries within the second argument
+WITHIN_FUNCTIONS = {
+    'st_within', 'within', 'mbrwithin', 'st_coveredby', 'coveredby'
+}
+# predicates true only for geometries within the first argument
+CONTAINS_FUNCTIONS = {
+    'st_contains', 'contains', 'mbrcontains', 'st_covers', 'covers'
+}
+# predicates taking the column followed by the bounding box coordinates
+ENVELOPE_FUNCTIONS = {'st_envintersects', 'st_envelopeintersects'}
+
+MBR_FUNCTIONS = {'buildmbr', 'st_makeenvelope'}
+WKT_FUNCTIONS = {
+    'st_geomfromtext', 'geomfromtext', 'st_polygonfromtext',
+    'polygonfromtext', 'st_polyfromtext', 'polyfromtext'
+}
+
+WKT_NUMBER_RE = re.compile(
+    r'[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?')
+WKT_MEASURED_RE = re.compile(r'^\s*[A-Za-z]+\s*(?:Z|M|ZM)\b', re.IGNORECASE)
+
+
+# ----------------------------------------------------------------------
+def find_spatial_filter(query):
+    """Find bounding box spatial predicate of a single layer query.
+
+    Return SpatialFilter(table, geometry column, (minx, miny, maxx, maxy))
+    or None if the query is not a single layer query or there is no
+    top-level bounding box predicate in its WHERE clause.
+    """
+    tokens = [t for t in tokenize(query) if t.kind not in COMMENT_KINDS]
+    table, where_pos = _get_single_table(tokens)
+    if table is None or where_pos is None:
+        return None
+
+    for condition in _split_conditions(tokens, where_pos + 1):
+        spatial_filter = _parse_predicate(condition)
+        if spatial_filter:
+            column, bbox = spatial_filter
+            return SpatialFilter(table, column, bbox)
+    return None
+
+
+# ----------------------------------------------------------------------
+def _get_single_table(tokens):
+    """Get table name and WHERE position of a query on a single table."""
+    words = [t.value.lower() for t in tokens if t.kind == 'word']
+    if words.count('from') != 1 or 'join' in words or words[0] != 'select':
+        return None, None
+
+    pos = next(idx for idx, token in enumerate(tokens)
+               if token.kind == 'word' and token.value.lower() == 'from') + 1
+    if pos >= len(tokens) or tokens[pos].kind not in IDENTIFIER_KINDS:
+        return None, None
+    table = unquote_identifier(tokens[pos].value)
+    pos += 1
+
+    if pos < len(tokens) and tokens[pos].value.lower() == 'as':
+        pos += 1
+    if (pos < len(tokens) and tokens[pos].kind in IDENTIFIER_KINDS
+            and tokens[pos].value.lower() not in NOT_ALIASES):
+        pos += 1
+    if pos < len(tokens) and tokens[pos].value in (',', '.', '('):
+        return None, None
+
+    for where_pos in range(pos, len(tokens)):
+        if (tokens[where_pos].kind == 'word'
+                and tokens[where_pos].value.lower() == 'where'):
+            return table, where_pos
+    return table, None
+
+
+# ----------------------------------------------------------------------
+def _split_conditions(tokens, start):
+    """Split WHERE clause into conditions joined with top-level AND."""
+    conditions, current = [], []
+    depth = 0
+    in_between = False
+    for token in tokens[start:]:
+        value = token.value.lower()
+        if token.value == '(':
+            depth += 1
+        elif token.value == ')':
+            depth -= 1
+        elif not depth and token.kind == 'word':
+            if value in ('group', 'order', 'limit', 'having', 'window',
+                         'union', 'except', 'intersect'):
+                break
+            if value == 'or':
+                # any top-level OR makes single conditions optional
+                return []
+            if value == 'between':
+                in_between = True
+            elif value == 'and':
+                if in_between:
+                    in_between = False
+                else:
+                    conditions.append(current)
+                    current = []
+                    continue
+        elif not depth and token.kind == 'separator':
+            break
+        current.append(token)
+    conditions.append(current)
+    return conditions
+
+
+# ----------------------------------------------------------------------
+def _parse_predicate(condition):
+    """Parse `func(args) [= 1]` condition; return (column, bbox) or None."""
+    call, pos = _parse_call(condition, 0)
+    if call is None:
+        return None
+    rest = [t.value.lower() for t in condition[pos:]]
+    if rest not in ([], ['=', '1'], ['<', '>', '0'], ['!', '=', '0']):
+        return None
+
+    name, args = call
+    if name in ENVELOPE_FUNCTIONS:
+        if len(args) == 5 and args[0][0] == 'column' and all(
+                kind == 'number' for kind, _value in args[1:]):
+            return args[0][1], _normalize_bbox([v for _k, v in args[1:]])
+        return None
+
+    if len(args) != 2:
+        return None
+    if name in INTERSECTS_FUNCTIONS:
+        pairs = [(args[0], args[1]), (args[1], args[0])]
+    elif name in WITHIN_FUNCTIONS:
+        pairs = [(args[0], args[1])]
+    elif name in CONTAINS_FUNCTIONS:
+        pairs = [(args[1], args[0])]
+    else:
+        return None
+
+    for column, shape in pairs:
+        if column[0] == 'column' and shape[0] == 'bbox':
+            return column[1], shape[1]
+    return None
+
+
+# ----------------------------------------------------------------------
+def _parse_call(tokens, pos):
+    """Parse function call at the position.
+
+    Return tuple ((lowercase function name, arguments), position after the
+    call) or (None, pos); every argument is a tuple (kind, value) where
+    kind is 'column', 'number', 'string', 'bbox' or 'other'.
+    """
+    if (pos + 1 >= len(tokens) or tokens[pos].kind != 'word'
+            or tokens[pos + 1].value != '('):
+        return None, pos
+    name = tokens[pos].value.lower()
+    pos += 2
+    args = []
+    while pos < len(tokens):
+        arg, pos = _parse_argument(tokens, pos)
+        args.append(arg)
+        if pos < len(tokens) and tokens[pos].value == ',':
+            pos += 1
+            continue
+        if pos < len(tokens) and tokens[pos].value == ')':
+            return (name, args), pos + 1
+        break
+    return None, pos
+
+
+# ----------------------------------------------------------------------
+def _parse_argument(tokens, pos):
+    """Parse a single function argument; return (argument, next position)."""
+    token = tokens[pos]
+    if token.value in ('-', '+') and pos + 1 < len(tokens) and tokens[
+            pos + 1].kind == 'number':
+        return ('number', float(token.value + tokens[pos + 1].value)), pos + 2
+    if token.kind == 'number':
+        return ('number', float(token.value)), pos + 1
+
+    call, next_pos = _parse_call(tokens, pos)
+    if call:
+        name, args = call
+        numbers = [value for kind, value in args if kind == 'number']
+        if name in MBR_FUNCTIONS and len(numbers) == len(args) and len(
+                numbers) in (4, 5):
+            return ('bbox', _normalize_bbox(numbers[:4])), next_pos
+        if name in WKT_FUNCTIONS and args and args[0][0] == 'string':
+            bbox = _get_wkt_bbox(args[0][1])
+            if bbox:
+                return ('bbox', bbox), next_pos
+        return ('other', None), next_pos
+
+    if token.kind == 'string':
+        return ('string', token.value[1:-1].replace("''", "'")), pos + 1
+    if token.kind in IDENTIFIER_KINDS:
+        # `alias.column` or `column`
+        if (pos + 2 < len(tokens) and tokens[pos + 1].value == '.'
+                and tokens[pos + 2].kind in IDENTIFIER_KINDS):
+            return ('column', unquote_identifier(
+                tokens[pos + 2].value)), pos + 3
+        return ('column', unquote_identifier(token.value)), pos + 1
+
+    # skip anything else up to the end of the argument
+    depth = 0
+    while pos < len(tokens):
+        value = tokens[pos].value
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            if not depth:
+                break
+            depth -= 1
+        elif value == ',' and not depth:
+            break
+        pos += 1
+    return ('other', None), pos
+
+
+# ----------------------------------------------------------------------
+def _normalize_bbox(coords):
+    """Get (minx, miny, maxx, maxy) of two corner points."""
+    x1, y1, x2, y2 = coords
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+
+# ----------------------------------------------------------------------
+def _get_wkt_bbox(wkt):
+    """Get bounding box of a 2D WKT geometry; None if cannot be parsed."""
+    if (WKT_MEASURED_RE.match(wkt) or 'EMPTY' in wkt.upper()
+            or 'SRID' in wkt.upper()):
+        return None
+    numbers = [float(n) for n in WKT_NUMBER_RE.findall(wkt)]
+    if not numbers or len(numbers) % 2:
+        return None
+    xs, ys = numbers[0::2], numbers[1::2]
+    return (min(xs), min(ys), max(xs), max(ys))
@@ -0,0 +1,131 @@
+# -*- coding: UTF-8 -*-
+"""Lightweight parse of a SQL statement used for context-aware completion.
+
+The parse is not a full SQL grammar; it only collects enough information
+to decide which tables are referenced in the FROM/JOIN clauses (along with
+their aliases) and which clause the text cursor is currently placed in.
+"""
+
+import re
+from collections import OrderedDict, namedtuple
+
+from sql_lexer import tokenize, COMMENT_KINDS, IDENTIFIER_KINDS
+
+# text right before the cursor is `alias.` or `alias.col` being typed
+QUALIFIED_PREFIX_RE = re.compile(
+    r'(?:([A-Za-z_][A-Za-z0-9_]*)|"([^"]+)")\.([A-Za-z0-9_]*)$')
+
+TABLE_CLAUSES = {'from', 'join'}
+COLUMN_CLAUSES = {'select', 'where', 'on', 'group', 'order', 'having', 'using'}
+
+# words that end a table reference and can never be used as an alias
+NOT_ALIASES = {
+    'where', 'join', 'inner', 'left', 'right', 'outer', 'cross', 'full',
+    'natural', 'on', 'using', 'group', 'order', 'having', 'limit', 'offset',
+    'union', 'except', 'intersect', 'as', 'window', 'select', 'from'
+}
+
+CompletionContext = namedtuple('CompletionContext',
+                               ['clause', 'tables', 'qualifier', 'prefix'])
+
+
+# ----------------------------------------------------------------------
+def get_current_statement(text, cursor_pos):
+    """Get the statement the cursor is in and the cursor offset inside it."""
+    start, end = 0, len(text)
+    for token in tokenize(text):
+        if token.kind == 'separator':
+            if token.start < cursor_pos:
+                start = token.start + 1
+            else:
+                end = token.start
+                break
+    return text[start:end], cursor_pos - start
+
+
+# ----------------------------------------------------------------------
+def get_referenced_tables(tokens):
+    """Get tables referenced in FROM/JOIN clauses.
+
+    Return OrderedDict { lowercase alias or name: table name }; each table
+    is registered under its own name as well as under its alias.
+    """
+    tables = OrderedDict()
+    tokens = [t for t in tokens if t.kind not in COMMENT_KINDS]
+    idx = 0
+    while idx < len(tokens):
+        token = tokens[idx]
+        idx += 1
+        if token.kind != 'word' or token.value.lower() not in TABLE_CLAUSES:
+            continue
+
+        # a comma separated list of tables may follow FROM
+        while idx < len(tokens) and tokens[idx].kind in IDENTIFIER_KINDS:
+            if tokens[idx].value.lower() in NOT_ALIASES:
+                break
+            name = unquote_identifier(tokens[idx].value)
+            idx += 1
+
+            # `schema.table` -> table
+            if (idx + 1 < len(tokens) and tokens[idx].value == '.'
+                    and tokens[idx + 1].kind in IDENTIFIER_KINDS):
+                name = unquote_identifier(tokens[idx + 1].value)
+                idx += 2
+
+            alias = None
+            if (idx < len(tokens) and tokens[idx].kind == 'word'
+                    and tokens[idx].value.lower() == 'as'):
+                idx += 1
+            if (idx < len(tokens) and tokens[idx].kind in IDENTIFIER_KINDS
+                    and tokens[idx].value.lower() not in NOT_ALIASES):
+                alias = unquote_identifier(tokens[idx].value)
+                idx += 1
+
+            tables.setdefault(name.lower(), name)
+            if alias:
+                tables[alias.lower()] = name
+
+            if (token.value.lower() == 'from' and idx < len(tokens)
+                    and tokens[idx].value == ','):
+                idx += 1
+            else:
+                break
+    return tables
+
+
+# ----------------------------------------------------------------------
+def get_completion_context(text, cursor_pos):
+    """Get completion context for the cursor position in the query text."""
+    statement, pos = get_current_statement(text, cursor_pos)
+    tokens = tokenize(statement)
+
+    clause = None
+    for token in tokens:
+        if token.start >= pos:
+            break
+        if token.kind == 'word':
+            word = token.value.lower()
+            if word in TABLE_CLAUSES or word in COLUMN_CLAUSES:
+                clause = word
+
+    qualifier, prefix = None, None
+    match = QUALIFIED_PREFIX_RE.search(statement[:pos])
+    if match:
+        qualifier = match.group(1) or match.group(2)
+        prefix = match.group(3)
+
+    return CompletionContext(
+        clause=clause,
+        tables=get_referenced_tables(tokens),
+        qualifier=qualifier,
+        prefix=prefix)
+
+
+# ----------------------------------------------------------------------
+def unquote_identifier(identifier):
+    """Remove quotes around a quoted identifier."""
+    if identifier.startswith('"'):
+        return identifier.strip('"').replace('""', '"')
+    if identifier.startswith('`'):
+        return identifier.strip('`')
+    return identifier
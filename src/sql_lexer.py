@@ -0,0 +1,148 @@
+# -*- coding: UTF-8 -*-
+"""SQL lexer shared by the query execution, highlighting and completion.
+
+The lexer recognizes string literals, quoted identifiers, single-line and
+block comments, and statement separators so that `--`, `/*` or `;` inside
+a string literal are never mistaken for a comment or a statement boundary.
+Named query parameters such as `:borough` are recognized as well.
+"""
+
+import re
+from collections import namedtuple
+
+Token = namedtuple('Token', ['kind', 'value', 'start'])
+
+COMMENT_KINDS = ('comment', 'block_comment')
+IDENTIFIER_KINDS = ('word', 'quoted_identifier')
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<whitespace>\s+)
+    |(?P<comment>--[^\n]*)
+    |(?P<block_comment>/\*.*?(?:\*/|\Z))
+    |(?P<string>'[^']*(?:''[^']*)*(?:'|\Z))
+    |(?P<quoted_identifier>"[^"]*(?:""[^"]*)*(?:"|\Z)|`[^`]*(?:`|\Z))
+    |(?P<number>(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<parameter>:[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<separator>;)
+    |(?P<punct>.)
+    """, re.VERBOSE | re.DOTALL)
+
+# cheaper pattern for the passes that only care about comments and separators
+STRUCTURE_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*)
+    |(?P<block_comment>/\*.*?(?:\*/|\Z))
+    |(?P<string>'[^']*(?:''[^']*)*(?:'|\Z))
+    |(?P<quoted_identifier>"[^"]*(?:""[^"]*)*(?:"|\Z)|`[^`]*(?:`|\Z))
+    |(?P<separator>;)
+    """, re.VERBOSE | re.DOTALL)
+
+BLOCK_COMMENT_END_RE = re.compile(r'.*?(?:\*/|\Z)', re.DOTALL)
+
+# rest of the line after a comment if there is only whitespace in it
+LINE_END_RE = re.compile(r'[ \t]*(?:\n|\Z)')
+
+
+# ----------------------------------------------------------------------
+def tokenize(sql_query, skip_whitespace=True):
+    """Split SQL query into a list of tokens."""
+    return [
+        Token(match.lastgroup, match.group(), match.start())
+        for match in TOKEN_RE.finditer(sql_query)
+        if not (skip_whitespace and match.lastgroup == 'whitespace')
+    ]
+
+
+# ----------------------------------------------------------------------
+def tokenize_block(text, in_block_comment=False):
+    """Tokenize a single text block (line) of a multi-line document.
+
+    Return tuple (tokens, ends_in_block_comment); `in_block_comment`
+    defines whether the block starts inside an unclosed block comment.
+    """
+    tokens = []
+    pos = 0
+    if in_block_comment:
+        match = BLOCK_COMMENT_END_RE.match(text)
+        pos = match.end()
+        if not match.group().endswith('*/'):
+            return [Token('block_comment', text, 0)], True
+        tokens.append(Token('block_comment', match.group(), 0))
+
+    ends_in_block_comment = False
+    for match in TOKEN_RE.finditer(text, pos):
+        kind, value = match.lastgroup, match.group()
+        if kind == 'whitespace':
+            continue
+        if kind == 'block_comment':
+            ends_in_block_comment = len(value) < 4 or not value.endswith('*/')
+        tokens.append(Token(kind, value, match.start()))
+    return tokens, ends_in_block_comment
+
+
+# ----------------------------------------------------------------------
+def strip_comments(sql_query):
+    """Strip single-line and block comments from SQL query.
+
+    Block comments spanning multiple lines are replaced with a line break,
+    other comments with a space. The whitespace around a comment up to the
+    line end is dropped along with the lines left blank by removing their
+    comments; the rest of the text (string literals in particular) is kept
+    as is.
+    """
+    parts = []
+    pos = 0
+    for match in STRUCTURE_RE.finditer(sql_query):
+        kind = match.lastgroup
+        if kind not in COMMENT_KINDS:
+            continue
+        # whitespace before a comment is never within a string literal
+        parts.append(sql_query[pos:match.start()])
+        while parts and not parts[-1].rstrip(' \t'):
+            parts.pop()
+        if parts:
+            parts[-1] = parts[-1].rstrip(' \t')
+        pos = match.end()
+        line_start = not parts or parts[-1].endswith('\n')
+        line_end = LINE_END_RE.match(sql_query, pos)
+        if line_start and line_end:
+            # the line consisted of the comment only
+            pos = line_end.end()
+            if pos == len(sql_query) and parts:
+                parts[-1] = parts[-1][:-1]
+        elif not line_start and not line_end and kind == 'block_comment':
+            if '\n' in match.group():
+                parts.append('\n')
+            elif not sql_query[pos].isspace():
+                parts.append(' ')
+    parts.append(sql_query[pos:])
+    return ''.join(parts)
+
+
+# ----------------------------------------------------------------------
+def split_statements(sql_query):
+    """Split SQL script into statements on the `;` separators.
+
+    Return list of tuples (statement, start offset in the script);
+    statements that are empty or contain comments only are skipped.
+    """
+    statements = []
+    start = 0
+    for match in STRUCTURE_RE.finditer(sql_query):
+        if match.lastgroup == 'separator':
+            statements.append(_get_statement(sql_query, start, match.start()))
+            start = match.end()
+    statements.append(_get_statement(sql_query, start, len(sql_query)))
+    return [
+        statement for statement in statements if strip_comments(statement[0])
+    ]
+
+
+# ----------------------------------------------------------------------
+def _get_statement(sql_query, start, end):
+    """Get statement text with surrounding whitespace removed."""
+    text = sql_query[start:end]
+    offset = len(text) - len(text.lstrip())
+    return text.strip(), start + offset
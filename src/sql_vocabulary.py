@@ -0,0 +1,39 @@
+# -*- coding: UTF-8 -*-
+"""SQL keywords and functions known to the completer and the highlighter.
+
+The lists are read from the `completer_data` files once per process and
+shared by all query tabs.
+"""
+
+import io
+import os
+from functools import lru_cache
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), 'completer_data')
+KEYWORDS_PATH = os.path.join(DATA_DIR, 'keywords.txt')
+FUNCTIONS_PATH = os.path.join(DATA_DIR, 'functions.txt')
+
+
+# ----------------------------------------------------------------------
+def _read_words(path):
+    """Read unique non-empty lines of the file keeping their order."""
+    with io.open(path, 'r', encoding='utf-8') as f:
+        # splitlines copes with files saved with any line endings
+        words = [line.strip() for line in f.read().splitlines()]
+    seen = set()
+    return tuple(w for w in words if w and not (w in seen or seen.add(w)))
+
+
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_keywords():
+    """Get SQL keywords in lower case."""
+    return tuple(keyword.lower() for keyword in _read_words(KEYWORDS_PATH))
+
+
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_functions():
+    """Get SQL function names in title case."""
+    return _read_words(FUNCTIONS_PATH)
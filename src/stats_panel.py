@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+"""Dockable panel with the statistics of the columns of a result table.
+
+The statistics are computed on a worker thread which executes the query
+of the result again over its own connection to the geodatabase (so that
+the cursor of the result table is not moved) and reads all its rows
+without the geometry. The panel is updated after every batch of rows.
+Results which cannot be executed again (such as those of the attached
+geodatabases or of the queries run across geodatabases) are described
+by the rows fetched into the table.
+"""
+
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QLabel,
+                             QTableWidget, QTableWidgetItem,
+                             QAbstractItemView)
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from column_stats import collect_column_stats
+from geodatabase import iter_query_rows
+
+STATS_HEADERS = ['Column', 'Count', 'Nulls', 'Min', 'Max', 'Mean',
+                 'Distinct (approx.)', 'Histogram']
+SPARK_BLOCKS = '▁▂▃▄▅▆▇█'
+
+
+# ----------------------------------------------------------------------
+def format_sparkline(counts):
+    """Format histogram counts as a line of block characters."""
+    if not counts:
+        return ''
+    top = max(counts)
+    return ''.join(SPARK_BLOCKS[(len(SPARK_BLOCKS) - 1) * count // top]
+                   if count else ' ' for count in counts)
+
+
+# ----------------------------------------------------------------------
+def format_value(value):
+    """Format statistic value for a cell."""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return '{0:.6g}'.format(value)
+    return str(value)
+
+
+########################################################################
+class StatsWorker(QThread):
+    """Thread computing the column statistics in batches."""
+
+    # emitted with the number of rows processed and the StatsSummary list
+    batch_processed = pyqtSignal(int, object)
+    failed = pyqtSignal(str)
+
+    # ----------------------------------------------------------------------
+    def __init__(self, columns, source=None, rows=None, parent=None):
+        """Initialize StatsWorker with the columns and the rows to read.
+
+        `source` is a tuple (geodatabase path, SQL query, dialect) of the
+        query to execute; `rows` are the value tuples used otherwise.
+        """
+        super(StatsWorker, self).__init__(parent)
+        self.columns = columns
+        self.source = source
+        self.rows = rows
+        return
+
+    # ----------------------------------------------------------------------
+    def run(self):
+        """Override built-in method."""
+        rows, source_rows = self.rows, None
+        if self.source:
+            source_rows = iter_query_rows(*self.source, include_geometry=False)
+            rows = (tuple(row.get(column) for column in self.columns)
+                    for row in source_rows)
+        try:
+            for processed, stats in collect_column_stats(rows, self.columns):
+                if self.isInterruptionRequested():
+                    break
+                self.batch_processed.emit(
+                    processed, [column.get_summary() for column in stats])
+        except Exception as err:
+            self.failed.emit(str(err))
+        finally:
+            if source_rows is not None:
+                # closes the connection if the rows were not all read
+                source_rows.close()
+        return
+
+
+########################################################################
+class StatsPanel(QDockWidget):
+    """Panel listing the statistics of the columns of a result table."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, parent=None):
+        """Initialize StatsPanel with no statistics."""
+        super(StatsPanel, self).__init__('Column statistics', parent)
+        self.worker = None
+        self.processed = 0
+
+        self.status_label = QLabel()
+        self.stats_table = QTableWidget(0, len(STATS_HEADERS))
+        self.stats_table.setHorizontalHeaderLabels(STATS_HEADERS)
+        self.stats_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.stats_table.verticalHeader().hide()
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.stats_table)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+        return
+
+    # ----------------------------------------------------------------------
+    def compute(self, table):
+        """Start computing statistics of the columns of the result table."""
+        self.stop()
+        table_data = table.table_data
+        columns = [
+            header for header in table_data.headers
+            if header != table_data.geom_column
+        ]
+        source = getattr(table, 'query_source', None)
+        rows = None
+        if source:
+            self.status_label.setText('Reading rows...')
+        else:
+            rows = [
+                tuple(getattr(row, column, None) for column in columns)
+                for row in table_data.rows
+            ]
+            self.status_label.setText(
+                'Statistics of the {0} rows fetched'.format(len(rows)))
+
+        self.processed = 0
+        self.stats_table.setRowCount(0)
+        self.worker = StatsWorker(columns, source, rows)
+        self.worker.batch_processed.connect(self.show_stats)
+        self.worker.failed.connect(self.show_error)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+        return
+
+    # ----------------------------------------------------------------------
+    def stop(self):
+        """Stop computing the statistics."""
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker.wait()
+            self.worker = None
+        return
+
+    # ----------------------------------------------------------------------
+    def show_stats(self, processed, summaries):
+        """Fill the table with the statistics of the rows processed."""
+        self.processed = processed
+        self.status_label.setText('Processed {0} rows...'.format(processed))
+        self.stats_table.setRowCount(len(summaries))
+        for row, summary in enumerate(summaries):
+            values = [
+                summary.name, summary.count, summary.nulls, summary.min,
+                summary.max, summary.mean, summary.distinct,
+                format_sparkline(summary.histogram_counts)
+            ]
+            for column, value in enumerate(values):
+                self.stats_table.setItem(
+                    row, column, QTableWidgetItem(format_value(value)))
+            if summary.histogram_counts:
+                self.stats_table.item(row, len(values) - 1).setToolTip(
+                    '\n'.join('{low:.6g} - {high:.6g}: {count}'.format(
+                        low=low, high=high, count=count)
+                              for low, high, count in zip(
+                                  summary.histogram_edges,
+                                  summary.histogram_edges[1:],
+                                  summary.histogram_counts)))
+        self.stats_table.resizeColumnsToContents()
+        return
+
+    # ----------------------------------------------------------------------
+    def show_error(self, errors):
+        """Show why the statistics could not be computed."""
+        self.status_label.setText('Failed: {0}'.format(errors))
+        return
+
+    # ----------------------------------------------------------------------
+    def on_finished(self):
+        """Show the number of rows the statistics describe."""
+        if not self.status_label.text().startswith('Failed'):
+            self.status_label.setText('Statistics of {0} rows'.format(
+                self.processed))
+        return
@@ -1,21 +1,30 @@
 # -*- coding: UTF-8 -*-
 """Tab in the tabbed window."""
 
-import re
 import time
 import itertools
 
 from highlighter import Highlighter
 from text_editor import TextEditor
 from completer import Completer
-from table import ResultTable
-from cfg import not_connected_to_gdb_message, sql_dialects_names
-from geodatabase import Geodatabase
+from table import ResultTable, ResultTableModel
+from cfg import (auto_dialect_name, log_query_timings,
+                 not_connected_to_gdb_message, sql_dialects_names)
+from geodatabase import Geodatabase, get_layer_columns, iter_layer_rows
+from federation import FederatedSession, get_default_alias
+from script_runner import ScriptRunner, StatementResult, get_statements
+from fanout import (SOURCE_COLUMN, format_fanout_report, get_source_name,
+                    iter_row_batches, run_fanout)
+from result_union import UnionLayerBuilder
+from query_params import (PARAMETER_COLUMN_PREFIX, BatchRun, bind_parameters,
+                          format_batch_report)
+from query_timing import QueryTimer, append_timing_record
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QAction, QPlainTextEdit,
                              QSplitter, QApplication, QStyleFactory, QLabel,
                              QPushButton, QToolBar, QFileDialog, QMessageBox,
-                             QTreeWidget, QTreeWidgetItem, QComboBox)
+                             QTreeWidget, QTreeWidgetItem, QComboBox,
+                             QTabWidget, QInputDialog)
 from PyQt5.QtCore import Qt, QMargins
 from PyQt5.QtGui import QKeySequence, QFont
 
@@ -29,11 +38,6 @@ class Tab(QWidget):
         """Initialize Tab with layout and behavior."""
         super(Tab, self).__init__()
 
-        # regex pattern for SQL query block comments
-        self.block_comment_re = re.compile(
-            r'(^)?[^\S\n]*/(?:\*(.*?)\*/[^\S\n]*|/[^\n]*)($)?',
-            re.DOTALL | re.MULTILINE)
-
         main_layout = QVBoxLayout(self)
 
         # define gdb props
@@ -42,6 +46,9 @@ class Tab(QWidget):
         self.gdb_columns_names = None
         self.gdb_schemas = None
 
+        # folder with the profile of the last profiled query
+        self.profile_folder = None
+
         # connected geodatabase path toolbar
         self.connected_gdb_path_label = QLabel('')
         self.connected_gdb_path_label.setTextInteractionFlags(
@@ -56,6 +63,12 @@ class Tab(QWidget):
             lambda evt, arg=True: self.connect_to_geodatabase(
                 evt, triggered_with_browse=True))
 
+        self.attach_gdb = QPushButton('Attach')
+        self.attach_gdb.setToolTip(
+            'Attach another geodatabase under a schema alias to query '
+            'its datasets as alias.dataset')
+        self.attach_gdb.clicked.connect(self.attach_geodatabase)
+
         self.gdb_sql_dialect_combobox = QComboBox()
         for dialect in sql_dialects_names:
             self.gdb_sql_dialect_combobox.addItem(dialect)
@@ -63,12 +76,16 @@ class Tab(QWidget):
         self.gdb_browse_toolbar = QToolBar()
         self.gdb_browse_toolbar.setMaximumHeight(50)
         self.gdb_browse_toolbar.addWidget(self.browse_to_gdb)
+        self.gdb_browse_toolbar.addWidget(self.attach_gdb)
         self.gdb_browse_toolbar.addWidget(self.connected_gdb_path_label)
         self.gdb_browse_toolbar.addSeparator()
         self.gdb_browse_toolbar.addWidget(self.gdb_sql_dialect_combobox)
 
-        # table with results
-        self.table = ResultTable()
+        # tables with results, one sub-tab per executed statement
+        self.result_tabs = QTabWidget()
+        self.result_tabs.setTabBarAutoHide(True)
+        self.result_tabs.currentChanged.connect(self._on_result_tab_changed)
+        self.result_tabs.addTab(ResultTable(), 'Result')
 
         # execute SQL query
         self.execute = QAction('Execute', self)
@@ -94,6 +111,8 @@ class Tab(QWidget):
         # TODO select block of text - Ctrl+/ and they become comments
         self.completer = Completer()
         self.query.set_completer(self.completer.completer)
+        self.query.set_completion_context_handler(
+            self.completer.update_completion_context)
 
         # errors panel to show if query fails to execute properly
         self.errors_panel = QPlainTextEdit()
@@ -107,7 +126,7 @@ class Tab(QWidget):
         splitter = QSplitter(Qt.Vertical)
         splitter.addWidget(self.gdb_browse_toolbar)
         splitter.addWidget(self.query)
-        splitter.addWidget(self.table)
+        splitter.addWidget(self.result_tabs)
         splitter.addWidget(self.errors_panel)
 
         # add the settings after the widget have been added
@@ -118,7 +137,7 @@ class Tab(QWidget):
         splitter.setStretchFactor(0, 3)
         splitter.setStretchFactor(1, 7)
         splitter.setSizes((100, 200, 300))
-        self.table.hide()
+        self.result_tabs.hide()
 
         # TOC
         self.toc = QTreeWidget()
@@ -177,6 +196,49 @@ class Tab(QWidget):
 
         return
 
+    # ----------------------------------------------------------------------
+    def attach_geodatabase(self):
+        """Attach geodatabase under a schema alias to the tab session.
+
+        The connected geodatabase becomes the first geodatabase of a
+        federated session so that queries can join datasets across them.
+        """
+        gdb_connect_dialog = QFileDialog(self)
+        gdb_connect_dialog.setFileMode(QFileDialog.Directory)
+        gdb_path = gdb_connect_dialog.getExistingDirectory()
+        if not gdb_path or not gdb_path.endswith('.gdb'):
+            return
+
+        alias, ok = QInputDialog.getText(
+            self, 'Attach geodatabase',
+            'Schema alias to reference its datasets as alias.dataset',
+            text=get_default_alias(gdb_path))
+        if not ok:
+            return
+
+        session = self.gdb
+        try:
+            if not isinstance(session, FederatedSession):
+                session = FederatedSession()
+                if self.gdb:
+                    session.attach(
+                        get_default_alias(self.gdb.path), self.gdb.path)
+            session.attach(alias, gdb_path)
+        except ValueError as err:
+            msg = QMessageBox()
+            msg.setText(str(err))
+            msg.setWindowTitle('Validation error')
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec_()
+            return
+
+        self.gdb = session
+        self.connected_gdb_path_label.setText(self.gdb.path)
+        self._set_gdb_items_highlight()
+        self._set_gdb_items_complete()
+        self._fill_toc()
+        return
+
     # ----------------------------------------------------------------------
     def wheelEvent(self, event):  # noqa: N802
         """Override built-in method to handle mouse wheel scrolling.
@@ -191,51 +253,210 @@ class Tab(QWidget):
                 self.query.zoomOut(1)
         return
 
+    # ----------------------------------------------------------------------
+    @property
+    def table(self):
+        """Get result table of the currently selected result sub-tab.
+
+        None if there are no result sub-tabs: the result tables are removed
+        when a script is run, so it is None until a statement returns a
+        result set.
+        """
+        return self.result_tabs.currentWidget()
+
+    # ----------------------------------------------------------------------
+    @property
+    def geometry_isin_query(self):
+        """Check if the current result table has the geometry column."""
+        return getattr(self.table, 'geometry_isin_query', False)
+
     # ----------------------------------------------------------------------
     def run_query(self):
-        """Run SQL query and draw the record set and call table drawing."""
+        """Run SQL script and draw the record set of each statement.
+
+        Every statement of the script is executed in order and its result
+        set is drawn in a separate sub-tab.
+        """
         if not self.gdb:
             self.print_sql_execute_errors(not_connected_to_gdb_message)
             return
+        profiler = None
         try:
             if not self.gdb.is_valid():
                 return
 
-            # use the text of what user selected, if none -> need to run the
-            # whole query
-            part_sql_query = self.query.textCursor().selection().toPlainText()
-
-            if part_sql_query:
-                sql_query = part_sql_query
-            else:
-                sql_query = self.query.toPlainText()
-
+            sql_query = self.get_query_text()
+            script_timer = QueryTimer()
             if sql_query:
                 # removing block comments and single line comments
-                sql_query = self.block_comment_re.sub(
-                    self._strip_block_comments, sql_query)
-                sql_query = self._strip_single_comments(sql_query)
+                with script_timer.measure('strip'):
+                    statements = get_statements(sql_query)
             else:
                 return
+            if not statements:
+                return
 
             # TODO: add threading to allow user to cancel a long running query
             QApplication.setOverrideCursor(Qt.WaitCursor)
-            start_time = time.time()
+            if self.query_should_be_profiled():
+                # cProfile and pstats are not needed unless profiling
+                from profiler import QueryProfiler
+                profiler = QueryProfiler([(ResultTableModel, 'data'),
+                                          (ResultTableModel, 'fetchMore')])
+                profiler.start()
             self.gdb.open_connection()
-            res, errors = self.gdb.execute_sql(
-                sql_query, self.gdb_sql_dialect_combobox.currentText())
-            end_time = time.time()
-            if errors:
-                self.print_sql_execute_errors(errors)
+            runner = ScriptRunner(
+                self.gdb,
+                self.gdb_sql_dialect_combobox.currentText(),
+                stop_on_error=self.script_should_stop_on_error(),
+                include_geometry=bool(self.result_should_include_geometry()))
+
+            self.clear_result_tables()
+            errors = []
+            for result in runner.iter_results(statements):
+                if result.errors:
+                    if len(statements) > 1:
+                        errors.append('Statement {idx}: {err}'.format(
+                            idx=result.index, err=result.errors))
+                    else:
+                        errors.append(result.errors)
+
+                if result.index == 1:
+                    # the script is stripped once for all its statements;
+                    # the time is counted with the first statement only
+                    result.timer.add('strip', script_timer.total)
+                rows = None
+                if result.layer:
+                    table = self.add_result_table(result)
+                    rows = table.table_data.number_layer_rows
+                    QApplication.processEvents()
+                self.add_to_query_history(result, rows)
 
-            if res:
-                self.table.show()
+            if errors:
+                self.print_sql_execute_errors('\n'.join(errors))
+            else:
                 self.errors_panel.hide()
-                self.draw_result_table(res)
-                msg = 'Executed in {exec_time:.1f} secs | {rows} rows'.format(
-                    exec_time=end_time - start_time,
-                    rows=self.table.table_data.number_layer_rows)
-                self.update_app_status_bar(msg)
+
+            if self.result_tabs.count():
+                self.result_tabs.show()
+                self._on_result_tab_changed(self.result_tabs.currentIndex())
+
+        except Exception as err:
+            print(err)
+        finally:
+            if profiler:
+                # let Qt paint the result tables while still profiling
+                QApplication.processEvents()
+                profiler.stop()
+                self.save_query_profile(profiler, sql_query)
+            QApplication.restoreOverrideCursor()
+        return
+
+    # ----------------------------------------------------------------------
+    def save_query_profile(self, profiler, sql_query):
+        """Save profile of the query and turn the profiling setting off."""
+        try:
+            self.profile_folder = profiler.save(sql_query)
+            self.update_app_status_bar(
+                'Profile saved to {folder}'.format(
+                    folder=self.profile_folder), profiler.get_summary(10))
+        except (IOError, OSError) as err:
+            self.print_sql_execute_errors(
+                'Could not save the profile: {err}'.format(err=err))
+        try:
+            self.parentWidget().parentWidget().parentWidget(
+            ).do_profile_next_query.setChecked(False)
+        except BaseException:
+            pass
+        return
+
+    # ----------------------------------------------------------------------
+    def run_query_fanout(self, gdb_paths):
+        """Run SQL query against multiple geodatabases in parallel.
+
+        The result sets are unioned into a single result table with the
+        name of the source geodatabase in an extra column.
+        """
+        statements = get_statements(self.get_query_text())
+        if len(statements) != 1:
+            self.print_sql_execute_errors(
+                'Exactly one SQL statement can be run across geodatabases')
+            return
+
+        try:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            builder = UnionLayerBuilder('fanout')
+            results = []
+            start_time = time.time()
+            for result in run_fanout(
+                    gdb_paths, statements[0],
+                    self.gdb_sql_dialect_combobox.currentText(),
+                    bool(self.result_should_include_geometry())):
+                results.append(result)
+                # the union layer is built batch by batch
+                for rows in iter_row_batches(result):
+                    builder.add_rows(
+                        result.columns, rows,
+                        [(SOURCE_COLUMN, get_source_name(result.path))])
+                    QApplication.processEvents()
+                self.update_app_status_bar(
+                    'Queried {done} of {count} geodatabases'.format(
+                        done=len(results), count=len(gdb_paths)))
+                QApplication.processEvents()
+
+            report = format_fanout_report(results, time.time() - start_time)
+            self.draw_union_result(builder, statements[0], start_time, report,
+                                   any(result.errors for result in results))
+
+        except Exception as err:
+            print(err)
+        finally:
+            QApplication.restoreOverrideCursor()
+        return
+
+    # ----------------------------------------------------------------------
+    def run_query_batch(self, parameter_sets, kinds=None):
+        """Run SQL query template once for every set of parameter values.
+
+        The template is executed over the connection of the tab and the
+        result sets are unioned into a single result table with the values
+        of the parameters in extra columns. `kinds` maps the parameter names
+        to the kinds the values are bound as.
+        """
+        if not self.gdb:
+            self.print_sql_execute_errors(not_connected_to_gdb_message)
+            return
+        statements = get_statements(self.get_query_text())
+        if len(statements) != 1:
+            self.print_sql_execute_errors(
+                'Exactly one SQL statement can be run with parameters')
+            return
+
+        include_geometry = bool(self.result_should_include_geometry())
+        try:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            self.gdb.open_connection()
+            runner = ScriptRunner(
+                self.gdb,
+                self.gdb_sql_dialect_combobox.currentText(),
+                stop_on_error=False,
+                include_geometry=include_geometry)
+            builder = UnionLayerBuilder('batch')
+            runs = []
+            start_time = time.time()
+            for parameters in parameter_sets:
+                runs.append(
+                    self._run_with_parameters(runner, builder, statements[0],
+                                              parameters, kinds,
+                                              include_geometry))
+                self.update_app_status_bar(
+                    'Executed with {done} of {count} parameter sets'.format(
+                        done=len(runs), count=len(parameter_sets)))
+                QApplication.processEvents()
+
+            report = format_batch_report(runs, time.time() - start_time)
+            self.draw_union_result(builder, statements[0], start_time, report,
+                                   any(run.errors for run in runs))
 
         except Exception as err:
             print(err)
@@ -243,6 +464,154 @@ class Tab(QWidget):
             QApplication.restoreOverrideCursor()
         return
 
+    # ----------------------------------------------------------------------
+    def _run_with_parameters(self, runner, builder, template, parameters,
+                             kinds, include_geometry):
+        """Execute query template adding its rows to the union layer.
+
+        Return BatchRun with the number of rows and the timings.
+        """
+        try:
+            sql_query = bind_parameters(template, parameters, kinds)
+        except ValueError as err:
+            return BatchRun(parameters, 0, str(err), 0.0, 0.0)
+        # the runner records the timings of the Auto dialect once the
+        # result is done with, so the results are iterated to the end
+        for result in runner.iter_results([sql_query]):
+            if result.errors or not result.layer:
+                run = BatchRun(parameters, 0, result.errors, result.exec_time,
+                               0.0)
+                continue
+            start_time = time.time()
+            rows = list(iter_layer_rows(result.layer, include_geometry))
+            builder.add_rows(
+                get_layer_columns(result.layer, include_geometry), rows,
+                [(PARAMETER_COLUMN_PREFIX + name, value)
+                 for name, value in parameters.items()])
+            release_result = getattr(self.gdb, 'release_result', None)
+            if release_result:
+                release_result(result.layer)
+            fetch_time = time.time() - start_time
+            result.timer.add('fetch', fetch_time)
+            run = BatchRun(parameters, len(rows), None, result.exec_time,
+                           fetch_time)
+        return run
+
+    # ----------------------------------------------------------------------
+    def draw_union_result(self, builder, sql_query, start_time, report,
+                          has_errors):
+        """Draw rows of the union layer in a single result table.
+
+        The report of the executions is shown in the tooltip of the result
+        sub-tab and in the errors panel if any execution has failed.
+        """
+        self.clear_result_tables()
+        layer = builder.get_layer()
+        if layer is not None:
+            union_result = StatementResult(1, sql_query)
+            union_result.layer = layer
+            union_result.exec_time = time.time() - start_time
+            union_result.timer.add('execute', union_result.exec_time)
+            table = self.add_result_table(union_result, can_reexecute=False)
+            # the memory data source has to outlive the drawn layer
+            table.union_builder = builder
+            self.result_tabs.setTabToolTip(
+                self.result_tabs.indexOf(table), report)
+            self.result_tabs.show()
+            self._on_result_tab_changed(self.result_tabs.currentIndex())
+
+        if has_errors:
+            self.print_sql_execute_errors(report)
+        else:
+            self.errors_panel.hide()
+        return
+
+    # ----------------------------------------------------------------------
+    def get_query_text(self):
+        """Get SQL query text selected by user or the whole text if none."""
+        part_sql_query = self.query.textCursor().selection().toPlainText()
+        if part_sql_query:
+            return part_sql_query
+        return self.query.toPlainText()
+
+    # ----------------------------------------------------------------------
+    def clear_result_tables(self):
+        """Remove result tables of the previously executed statements.
+
+        Their result layers are released so that the data sources opened
+        for them are closed.
+        """
+        result_memory = self._get_result_memory()
+        release_result = getattr(self.gdb, 'release_result', None)
+        # spilled rows of the remaining tables are not to be reloaded
+        self.result_tabs.blockSignals(True)
+        while self.result_tabs.count():
+            table = self.result_tabs.widget(0)
+            self.result_tabs.removeTab(0)
+            if hasattr(table, 'table_data'):
+                if result_memory:
+                    result_memory.remove(table)
+                # files of the rows stored on disk are removed
+                table.table_data.rows.close()
+                if release_result and table.table_data.result is not None:
+                    release_result(table.table_data.result)
+            table.deleteLater()
+        self.result_tabs.blockSignals(False)
+        return
+
+    # ----------------------------------------------------------------------
+    def add_result_table(self, result, can_reexecute=True):
+        """Add sub-tab with the result table of an executed statement.
+
+        Unless `can_reexecute` is off, the statement may be executed again
+        against the connected geodatabase to continue fetching the rows
+        after the rows have been spilled to disk.
+        """
+        table = ResultTable()
+        self.result_tabs.addTab(
+            table, 'Result {idx} ({exec_time:.1f} secs)'.format(
+                idx=result.index, exec_time=result.exec_time))
+        self.draw_result_table(result.layer, table, result.timer)
+        self._track_result_memory(table, result, can_reexecute)
+        if can_reexecute and not isinstance(self.gdb, FederatedSession):
+            table.query_source = (self.gdb.path, result.sql, result.dialect)
+
+        table.status_message = 'Executed in {exec_time:.1f} secs | ' \
+            '{rows} rows'.format(
+                exec_time=result.exec_time,
+                rows=table.table_data.number_layer_rows)
+        if result.execution_path:
+            table.status_message += ' | {path}'.format(
+                path=result.execution_path)
+        if self.gdb_sql_dialect_combobox.currentText() == auto_dialect_name:
+            table.status_message += ' | {auto}: {dialect}'.format(
+                auto=auto_dialect_name, dialect=result.dialect)
+        table.timing_breakdown = result.timer.format_breakdown()
+        self.result_tabs.setTabToolTip(
+            self.result_tabs.indexOf(table), '{msg}\n\n{timing}\n\n{sql}'.
+            format(msg=table.status_message,
+                   timing=table.timing_breakdown,
+                   sql=result.sql))
+
+        if log_query_timings:
+            append_timing_record(
+                result.timer.to_record(
+                    sql=result.sql,
+                    gdb=getattr(self.gdb, 'path', None),
+                    dialect=result.dialect,
+                    execution_path=result.execution_path,
+                    rows=table.table_data.number_layer_rows))
+        return table
+
+    # ----------------------------------------------------------------------
+    def script_should_stop_on_error(self):
+        """Get the setting defining whether to stop script on first error."""
+        try:
+            return self.parentWidget().parentWidget().parentWidget(
+            ).do_stop_script_on_error.isChecked()
+        except BaseException:
+            return True
+
     # ----------------------------------------------------------------------
     def result_should_include_geometry(self):
         """Get the setting defining whether to include the geometry column."""
@@ -253,35 +622,110 @@ class Tab(QWidget):
             return True
 
     # ----------------------------------------------------------------------
-    def update_app_status_bar(self, message):
-        """Update app status bar with the execution result details."""
+    def add_to_query_history(self, result, rows=None):
+        """Record the executed statement in the query history."""
         try:
-            self.parentWidget().parentWidget().parentWidget().statusBar(
-            ).showMessage(message)
+            self.parentWidget().parentWidget().parentWidget().record_query(
+                result.sql, getattr(self.gdb, 'path', None), result.dialect,
+                rows, result.timer.to_record()['phases'], result.errors)
         except BaseException:
             pass
         return
 
     # ----------------------------------------------------------------------
-    def draw_result_table(self, res):
+    def query_should_be_profiled(self):
+        """Get the setting defining whether to profile the next query."""
+        try:
+            return self.parentWidget().parentWidget().parentWidget(
+            ).do_profile_next_query.isChecked()
+        except BaseException:
+            return False
+
+    # ----------------------------------------------------------------------
+    def update_app_status_bar(self, message, details=''):
+        """Update app status bar with the execution result details.
+
+        The details such as the timings of the query phases are shown
+        in the tooltip of the status bar.
+        """
+        try:
+            status_bar = self.parentWidget().parentWidget().parentWidget(
+            ).statusBar()
+            status_bar.showMessage(message)
+            status_bar.setToolTip(details)
+        except BaseException:
+            pass
+        return
+
+    # ----------------------------------------------------------------------
+    def draw_result_table(self, res, table, timer=None):
         """Draw table with the record set received from the geodatabase."""
         geom_col_name = res.GetGeometryColumn(
         )  # shape col was in the sql query
-        self.geometry_isin_query = bool(geom_col_name)
-
-        self.table.draw_result(
-            res, show_shapes=bool(self.result_should_include_geometry()))
-        self.table.view.resizeColumnsToContents()
+        table.geometry_isin_query = bool(geom_col_name)
+
+        table.draw_result(
+            res,
+            show_shapes=bool(self.result_should_include_geometry()),
+            timer=timer)
+        with table.timer.measure('column_sizing'):
+            table.view.resizeColumnsToContents()
         return
 
     # ----------------------------------------------------------------------
     def print_sql_execute_errors(self, err):
         """Print to a special panel errors that occurred during execution."""
-        self.table.hide()
+        if not self.result_tabs.count():
+            self.result_tabs.hide()
         self.errors_panel.show()
         self.errors_panel.setPlainText(err)
         return
 
+    # ----------------------------------------------------------------------
+    def _get_result_memory(self):
+        """Get the app memory manager of the result tables if available."""
+        try:
+            return self.parentWidget().parentWidget().parentWidget(
+            ).result_memory
+        except BaseException:
+            return None
+
+    # ----------------------------------------------------------------------
+    def _track_result_memory(self, table, result, can_reexecute=True):
+        """Let the app memory manager spill the table rows when over budget."""
+        result_memory = self._get_result_memory()
+        if not result_memory:
+            return
+
+        gdb, sql, dialect = self.gdb, result.sql, result.dialect
+        include_geometry = bool(self.result_should_include_geometry())
+        # a federated session replaces its data source for every query
+        if can_reexecute and not isinstance(gdb, FederatedSession):
+            table.table_data.reopen_result = lambda: gdb.execute_sql(
+                sql, dialect, include_geometry=include_geometry)
+            table.table_data.release_result = getattr(
+                gdb, 'release_result', None)
+        table.table_data.rowsInserted.connect(
+            lambda *args: result_memory.update(table))
+        result_memory.touch(table)
+        return
+
+    # ----------------------------------------------------------------------
+    def _on_result_tab_changed(self, index):
+        """Show execution details of the selected result in the status bar.
+
+        Rows of the result spilled to disk to free memory are reloaded.
+        """
+        table = self.result_tabs.widget(index)
+        result_memory = self._get_result_memory()
+        if result_memory and hasattr(table, 'table_data'):
+            result_memory.touch(table)
+        message = getattr(table, 'status_message', None)
+        if message:
+            self.update_app_status_bar(
+                message, getattr(table, 'timing_breakdown', ''))
+        return
+
     # ----------------------------------------------------------------------
     def _set_gdb_items_highlight(self):
         """Set completer and highlight properties for geodatabase items."""
@@ -301,6 +745,7 @@ class Tab(QWidget):
         """Update completer rules to include geodatabase items."""
         self.completer.update_completer_string_list(self.gdb_items +
                                                     self.gdb_columns_names)
+        self.completer.set_gdb_schemas(self.gdb_schemas)
         self.highlighter.set_highlight_rules_gdb_items(self.gdb_columns_names,
                                                        'Column')
         return
@@ -340,30 +785,3 @@ class Tab(QWidget):
         else:
             self.toc.setVisible(True)
         return
-
-    # ----------------------------------------------------------------------
-    def _strip_block_comments(self, sql_query):
-        """Strip the block comments in SQL query."""
-        start, mid, end = sql_query.group(1, 2, 3)
-        if mid is None:
-            # this is a single-line comment
-            return ''
-        elif start is not None or end is not None:
-            # this is a multi-line comment at start/end of a line
-            return ''
-        elif '\n' in mid:
-            # this is a multi-line comment with line break
-            return '\n'
-        else:
-            # this is a multi-line comment without line break
-            return ' '
-
-    # ----------------------------------------------------------------------
-    def _strip_single_comments(self, sql_query):
-        """Strip the single line comments in SQL query."""
-        clean_query = []
-        for line in sql_query.rstrip().split('\n'):
-            clean_line = line.split('--')[0]
-            if clean_line:
-                clean_query.append(clean_line)
-        return ' '.join([line for line in clean_query])
@@ -82,7 +82,7 @@ class TabWidget(QTabWidget):
         if tab_to_close.query.document().toPlainText():
             self.close_tab_handler(index)
         else:
-            self.removeTab(index)
+            self.remove_tab(index)
         return
 
     # ----------------------------------------------------------------------
@@ -102,7 +102,18 @@ class TabWidget(QTabWidget):
     def close_tab(self, evt, index):
         """Close tab method."""
         if evt.text() == 'OK':
-            self.removeTab(index)
+            self.remove_tab(index)
+        return
+
+    # ----------------------------------------------------------------------
+    def remove_tab(self, index):
+        """Remove the tab releasing its result tables.
+
+        The tables stop counting towards the memory budget of the result
+        sets and their result layers and spilled rows are released.
+        """
+        self.widget(index).clear_result_tables()
+        self.removeTab(index)
         return
 
     # ----------------------------------------------------------------------
@@ -113,5 +124,5 @@ class TabWidget(QTabWidget):
         if tab_to_close.query.document().toPlainText():
             self.close_tab_handler(index)
         else:
-            self.removeTab(index)
+            self.remove_tab(index)
         return
@@ -1,27 +1,57 @@
 # -*- coding: UTF-8 -*-
 """Table with result set."""
 
+import os
 from collections import OrderedDict
-import pandas as pd
 
 from PyQt5.Qt import QApplication
 from PyQt5.Qt import QMainWindow, QAbstractTableModel, QModelIndex
 from PyQt5.Qt import Qt, QVariant
 from PyQt5 import QtGui
 from PyQt5 import QtCore
-from PyQt5.QtWidgets import QTableView, QAbstractItemView
+from PyQt5.QtWidgets import (QTableView, QAbstractItemView, QDockWidget,
+                             QStyledItemDelegate)
+
+from cfg import result_row_store
+from map_preview import MapPreview
+from query_timing import QueryTimer
+from result_cache import load_rows, skip_features, spill_rows
+from row_store import Row, make_row_store
 
 QMODEL_INDEX = QModelIndex()
 
+# role of the text drawn in a cell; long values are shown truncated
+PREVIEW_ROLE = Qt.UserRole + 1
+# characters of a long value (such as WKT of a polygon) shown in a cell
+PREVIEW_LENGTH = 100
+# cell previews cached before the cache is cleared
+PREVIEW_CACHE_SIZE = 100000
+
+
+# ----------------------------------------------------------------------
+def get_preview(value, length=PREVIEW_LENGTH):
+    """Get text of the value to show in a cell; long text is truncated."""
+    if not isinstance(value, str) or len(value) <= length:
+        return value
+    return value[:length].replace('\n', ' ') + '\u2026'
+
 
 ########################################################################
-class Row(object):
-    """Row of the returned database result set."""
+class PreviewDelegate(QStyledItemDelegate):
+    """Delegate drawing cells with the preview of their values.
+
+    Laying out and eliding the full text of multi-kilobyte values
+    while scrolling is slow; the cell is drawn and sized with the short
+    preview cached by the model instead.
+    """
 
     # ----------------------------------------------------------------------
-    def __init__(self, **kwargs):
-        """Initialize Row with basic properties."""
-        self.__dict__.update(kwargs)
+    def initStyleOption(self, option, index):  # noqa: N802
+        """Override built-in method."""
+        super(PreviewDelegate, self).initStyleOption(option, index)
+        preview = index.data(PREVIEW_ROLE)
+        option.text = '' if preview is None else str(preview)
+        return
 
 
 ########################################################################
@@ -34,19 +64,34 @@ class ResultTable(QMainWindow):
         super(ResultTable, self).__init__(parent)
         self.view = QTableView()
         self.view.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.view.setItemDelegate(PreviewDelegate(self.view))
+        self.map_dock = None
+        # tuple (geodatabase path, SQL query, dialect) to execute the query
+        # of the result again; None if it cannot be executed again
+        self.query_source = None
 
     # ----------------------------------------------------------------------
-    def draw_result(self, result, show_shapes=True):
-        """Load and draw result set into the table."""
-        self.table_data = ResultTableModel(result, show_shapes)
-        self.view.setModel(self.table_data)
-        self.setCentralWidget(self.view)
-        self.view.installEventFilter(self)
+    def draw_result(self, result, show_shapes=True, timer=None):
+        """Load and draw result set into the table.
+
+        The time of counting the rows, reading the first batch of rows
+        and setting up the view is recorded with the timer if given.
+        """
+        self.timer = timer or QueryTimer()
+        with self.timer.measure('count'):
+            self.table_data = ResultTableModel(result, show_shapes)
+        with self.timer.measure('first_fetch'):
+            if self.table_data.canFetchMore():
+                self.table_data.fetchMore()
+        with self.timer.measure('render'):
+            self.view.setModel(self.table_data)
+            self.setCentralWidget(self.view)
+            self.view.installEventFilter(self)
         return
 
     # ----------------------------------------------------------------------
-    def get_selected_data_as_df(self):
-        """Get selected data as pandas data frame."""
+    def get_all_rows(self):
+        """Get all layer rows as dicts without loading them into the view."""
         # need to read all OGR layer features that were not read yet
         if (self.table_data.number_of_fetched_layer_rows <
                 self.table_data.number_layer_rows):
@@ -55,7 +100,7 @@ class ResultTable(QMainWindow):
                  self.table_data.number_layer_rows -
                  self.table_data.number_of_fetched_layer_rows)
 
-            internal_rows = self.table_data.rows.copy()
+            internal_rows = list(self.table_data.rows)
             for row in rows_fetched:
                 internal_rows.append(row)
             rows_to_export = internal_rows
@@ -69,12 +114,43 @@ class ResultTable(QMainWindow):
         else:
             rows_to_export = self.table_data.rows
 
-        df = pd.DataFrame.from_records(
-            data=[row.__dict__ for row in rows_to_export],
-            columns=self.table_data.headers,
-            index=range(1,
-                        len(rows_to_export) + 1))
-        return df
+        return [row.__dict__ for row in rows_to_export]
+
+    # ----------------------------------------------------------------------
+    @property
+    def is_spilled(self):
+        """Check if the fetched rows have been spilled to disk."""
+        table_data = getattr(self, 'table_data', None)
+        return bool(table_data and table_data.spill_path)
+
+    # ----------------------------------------------------------------------
+    def memory_size(self):
+        """Get approximate memory in bytes taken by the fetched rows."""
+        table_data = getattr(self, 'table_data', None)
+        return table_data.memory_size() if table_data else 0
+
+    # ----------------------------------------------------------------------
+    def spill(self, folder):
+        """Write the fetched rows into a file in the folder freeing them."""
+        self.spilled_scroll_position = self.view.verticalScrollBar().value()
+        self.table_data.spill(folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def reload(self):
+        """Read the spilled rows back restoring the scroll position."""
+        self.table_data.reload()
+        position = getattr(self, 'spilled_scroll_position', 0)
+        # the scroll bar range is updated once the view is laid out
+        QtCore.QTimer.singleShot(
+            0, lambda: self.view.verticalScrollBar().setValue(position))
+        return
+
+    # ----------------------------------------------------------------------
+    def discard_spilled_rows(self):
+        """Remove the file with the spilled rows."""
+        self.table_data.discard_spilled_rows()
+        return
 
     # ----------------------------------------------------------------------
     def eventFilter(self, src, evt):  # noqa: N802
@@ -90,6 +166,35 @@ class ResultTable(QMainWindow):
             return True
         return super(ResultTable, self).eventFilter(src, evt)
 
+    # ----------------------------------------------------------------------
+    def toggle_map_preview(self):
+        """Show or hide map of the result geometries; False if none."""
+        table_data = getattr(self, 'table_data', None)
+        if (not table_data or not table_data.geom_column
+                or table_data.geom_column not in table_data.headers):
+            return False
+        if self.map_dock is None:
+            self.map_preview = MapPreview()
+            self.map_preview.set_model(
+                table_data, table_data.headers.index(table_data.geom_column))
+            self.map_preview.feature_selected.connect(self.select_row)
+            self.view.selectionModel().currentRowChanged.connect(
+                lambda current, previous: self.map_preview.set_selected_row(
+                    current.row()))
+            self.map_dock = QDockWidget('Map preview', self)
+            self.map_dock.setWidget(self.map_preview)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.map_dock)
+        else:
+            self.map_dock.setVisible(not self.map_dock.isVisible())
+        return True
+
+    # ----------------------------------------------------------------------
+    def select_row(self, row):
+        """Select the row scrolling to it."""
+        self.view.selectRow(row)
+        self.view.scrollTo(self.table_data.index(row, 0))
+        return
+
     # ----------------------------------------------------------------------
     def load_all_rows(self):
         """Load all layer rows into the table view."""
@@ -147,11 +252,77 @@ class ResultTableModel(QAbstractTableModel):
         self.number_layer_rows = self.get_layer_number_of_rows()
         self.geom_column = self.get_geom_column()
         self.headers = self.get_layer_columns(show_shapes)
-        self.rows = []
+        self.rows = make_row_store(self.headers, result_row_store)
         self.headers_index_mapper = {
             idx: header
             for idx, header in enumerate(self.headers)
         }
+        # previews of the cells drawn keyed by (row, column)
+        self.previews = {}
+        self.modelReset.connect(self.clear_previews)
+
+        # file with the fetched rows spilled to disk to free memory
+        self.spill_path = None
+        self._memory_size = None
+        # callables re-executing the query (returning tuple (layer,
+        # errors)) and releasing the result layer once rows are spilled
+        self.reopen_result = None
+        self.release_result = None
+
+    # ----------------------------------------------------------------------
+    def memory_size(self):
+        """Get approximate memory in bytes taken by the fetched rows."""
+        if self.spill_path:
+            return 0
+        if self._memory_size is None:
+            self._memory_size = self.rows.memory_size()
+        return self._memory_size
+
+    # ----------------------------------------------------------------------
+    def spill(self, folder):
+        """Write the fetched rows into a file and release the OGR layer."""
+        self.spill_path = spill_rows(self.rows, self.headers, folder)
+        self.beginResetModel()
+        self.rows.close()
+        self.rows = make_row_store(self.headers, result_row_store)
+        self.endResetModel()
+        # the layer can be released only if the query can be re-executed
+        if self.reopen_result and self.result is not None:
+            if self.release_result:
+                self.release_result(self.result)
+            self.result = None
+        return
+
+    # ----------------------------------------------------------------------
+    def reload(self):
+        """Read the spilled rows back; the layer is re-opened on demand."""
+        headers, values = load_rows(self.spill_path)
+        self.discard_spilled_rows()
+        self.beginResetModel()
+        self.rows.extend(Row(**dict(zip(headers, row))) for row in values)
+        self.endResetModel()
+        self._memory_size = None
+        return
+
+    # ----------------------------------------------------------------------
+    def discard_spilled_rows(self):
+        """Remove the file with the spilled rows."""
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
+        return
+
+    # ----------------------------------------------------------------------
+    def reopen_layer(self):
+        """Execute the query again to continue fetching the rows."""
+        if not self.reopen_result:
+            return
+        layer, errors = self.reopen_result()
+        if errors or layer is None:
+            return
+        skip_features(layer, len(self.rows))
+        self.result = layer
+        return
 
     # ----------------------------------------------------------------------
     def get_layer_number_of_rows(self):
@@ -183,6 +354,11 @@ class ResultTableModel(QAbstractTableModel):
         """Fetch result rows from an OGR layer, push into table data object."""
         rows_fetched = []
         number_of_fetched_layer_rows = 0
+        if self.result is None:
+            # the layer has been released when the rows were spilled
+            self.reopen_layer()
+            if self.result is None:
+                return rows_fetched, number_of_fetched_layer_rows
         for _i in range(limit):
             feat = self.result.GetNextFeature()
             if feat:
@@ -212,6 +388,8 @@ class ResultTableModel(QAbstractTableModel):
     # ----------------------------------------------------------------------
     def canFetchMore(self, index=QMODEL_INDEX):  # noqa: N802
         """Override built-in method."""
+        if self.spill_path:
+            return False
         if self.number_layer_rows > len(self.rows):
             return True
         else:
@@ -222,15 +400,22 @@ class ResultTableModel(QAbstractTableModel):
         """Override built-in method."""
         remainder = self.number_layer_rows - len(self.rows)
         items_to_fetch = min(remainder, self.chunk_size)
+        if items_to_fetch <= 0 or self.spill_path:
+            return
 
         rows_fetched, number_of_fetched_layer_rows = self.get_layer_rows(
-            limit=self.chunk_size)
+            limit=items_to_fetch)
         self.number_of_fetched_layer_rows += number_of_fetched_layer_rows
-        for row in rows_fetched:
-            self.add_row(row)
+        if not rows_fetched:
+            # the layer has fewer features than it reported
+            self.number_layer_rows = len(self.rows)
+            return
 
         self.beginInsertRows(QModelIndex(), len(self.rows),
-                             len(self.rows) + items_to_fetch - 1)
+                             len(self.rows) + len(rows_fetched) - 1)
+        for row in rows_fetched:
+            self.add_row(row)
+        self._memory_size = None
         self.endInsertRows()
         return
 
@@ -250,10 +435,33 @@ class ResultTableModel(QAbstractTableModel):
     # ----------------------------------------------------------------------
     def data(self, index, role=Qt.DisplayRole):  # noqa: N802
         """Override built-in method."""
-        col = index.column()
-        row = self.rows[index.row()]
         if role == Qt.DisplayRole:
-            return getattr(row, self.headers_index_mapper[col], None)
+            return self.rows.get_value(index.row(), index.column())
+        if role == PREVIEW_ROLE:
+            return self.get_preview(index.row(), index.column())
+        if role == Qt.ToolTipRole:
+            # full text of the values which are shown truncated
+            value = self.rows.get_value(index.row(), index.column())
+            if isinstance(value, str) and len(value) > PREVIEW_LENGTH:
+                return value
+        return None
+
+    # ----------------------------------------------------------------------
+    def get_preview(self, row, column):
+        """Get cached preview of the value of the cell."""
+        key = (row, column)
+        if key not in self.previews:
+            if len(self.previews) >= PREVIEW_CACHE_SIZE:
+                self.previews.clear()
+            self.previews[key] = get_preview(self.rows.get_value(
+                row, column))
+        return self.previews[key]
+
+    # ----------------------------------------------------------------------
+    def clear_previews(self):
+        """Forget the cached previews once the rows have changed."""
+        self.previews.clear()
+        return
 
     # ----------------------------------------------------------------------
     def headerData(self, section, orientation,  # noqa: N802
@@ -50,6 +50,8 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import (QTextCursor, QTextFormat, QColor)
 from PyQt5.QtWidgets import (QApplication, QCompleter, QTextEdit)
 
+from sql_context import QUALIFIED_PREFIX_RE
+
 
 ########################################################################
 class TextEditor(QTextEdit):
@@ -70,6 +72,9 @@ class TextEditor(QTextEdit):
         # excluding `_` as this is often in SQL spatial functions
         self.special_chars = "~!@#$%^&*()+{}|:\"<>?,./;'[]\\-="
         self.completion_after_chars = 3
+
+        # callable narrowing down the completer items for the cursor position
+        self._completion_context_handler = None
         return
 
     # ----------------------------------------------------------------------
@@ -120,6 +125,16 @@ class TextEditor(QTextEdit):
             completer.activated.connect(self.insert_completion)
         return
 
+    # ----------------------------------------------------------------------
+    def set_completion_context_handler(self, handler):
+        """Set callable updating completer items for the cursor position.
+
+        The handler is called with the editor text and the cursor position
+        and returns a `sql_context.CompletionContext`.
+        """
+        self._completion_context_handler = handler
+        return
+
     # ----------------------------------------------------------------------
     def insert_completion(self, completion):
         """Insert complete word after user accepted a suggestion."""
@@ -127,6 +142,12 @@ class TextEditor(QTextEdit):
             return
 
         cur = self.textCursor()
+        if not self._completer.completionPrefix():
+            # completing right after `alias.`
+            cur.insertText(completion)
+            self.setTextCursor(cur)
+            return
+
         extra_length = len(completion) - len(self._completer.completionPrefix())
         cur.movePosition(QTextCursor.Left)
         cur.movePosition(QTextCursor.EndOfWord)
@@ -192,13 +213,30 @@ class TextEditor(QTextEdit):
         has_modifier = (evt.modifiers() != Qt.NoModifier) and not ctrl_shift
         cmpl_prefix = self.get_text_under_cursor()
 
+        # typing `alias.` or `alias.col` -> suggest columns of aliased table
+        cur = self.textCursor()
+        is_qualified = bool(
+            QUALIFIED_PREFIX_RE.search(
+                cur.block().text()[:cur.positionInBlock()]))
+
         # if no text entered or text is yet too short -> no completion
-        if not is_shortcut and (has_modifier or len(evt.text()) == 0 or
-                                len(cmpl_prefix) < self.completion_after_chars
-                                or evt.text()[-1] in self.special_chars):
+        if is_qualified:
+            skip_completion = has_modifier or len(evt.text()) == 0
+        else:
+            skip_completion = (
+                has_modifier or len(evt.text()) == 0
+                or len(cmpl_prefix) < self.completion_after_chars
+                or evt.text()[-1] in self.special_chars)
+        if not is_shortcut and skip_completion:
             self._completer.popup().hide()
             return
 
+        if self._completion_context_handler is not None:
+            context = self._completion_context_handler(self.toPlainText(),
+                                                       cur.position())
+            if context.qualifier is not None:
+                cmpl_prefix = context.prefix
+
         # if what user enters already matches the suggestion -> reset
         if cmpl_prefix != self._completer.completionPrefix():
             self._completer.setCompletionPrefix(cmpl_prefix)
@@ -3,44 +3,140 @@
 
 import io
 import os
-import tempfile
-
-import pkg_resources
-try:
-    pkg_resources.get_distribution('tabulate')
-    from tabulate import tabulate
-except BaseException:
-    pkg_resources.DistributionNotFound
-    tabulate_found = False
-else:
-    tabulate_found = True
-
-from PyQt5.QtWidgets import (QMainWindow, QAction, QFileDialog, QTextEdit,
-                             QApplication)
+
+from PyQt5.QtWidgets import (QMainWindow, QAction, QFileDialog,
+                             QPlainTextEdit, QLineEdit, QApplication,
+                             QInputDialog, QMessageBox)
 from PyQt5.Qt import Qt
-from PyQt5.QtGui import QIcon, QKeySequence
+from PyQt5.QtGui import QIcon, QKeySequence, QTextCursor
 from tab_widget import TabWidget
 
-from cfg import project_name, test_mode
+from cfg import project_name, result_memory_budget_mb, test_mode
+from diff_panel import DiffPanel
+from export_jobs import (QGIS_EXPORT, ARCMAP_EXPORT, DATAFRAME_EXPORT,
+                         MARKDOWN_EXPORT, ExportJob, ExportJobQueue)
+from fanout import resolve_gdb_paths
+from geodatabase import Geodatabase
+from history import QueryHistory
+from history_panel import HistoryPanel
+from jobs_panel import JobsPanel
+from paged_file import PagedTextFile
+from params_dialog import ParametersDialog
+from query_params import find_parameters
+from result_cache import MB, ResultMemoryManager
+from result_diff import get_common_columns
+
+EXPORT_FORMATS = {
+    '&QGIS': QGIS_EXPORT,
+    '&ArcMap': ARCMAP_EXPORT,
+    '&DataFrame': DATAFRAME_EXPORT,
+    '&Markdown': MARKDOWN_EXPORT,
+}
 
 
 ########################################################################
 class ExportResultWindow(QMainWindow):
-    """Window with the result of exporting the data."""
+    """Window with the result of exporting the data.
+
+    The output file is shown as plain text page by page; the next page
+    is read as the user scrolls to the end of the pages shown.
+    """
 
     def __init__(self, parent=None):
         """Initialize ExportResultWindow with basic properties."""
         super(ExportResultWindow, self).__init__(parent)
-        self.result = QTextEdit()
+        self.paged_file = None
+        self.result = QPlainTextEdit()
+        self.result.setReadOnly(True)
+        self.result.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.result.setTabStopWidth(20)
         font = self.result.font()
         font.setPointSize(11)
         self.result.setFont(font)
+        self.result.verticalScrollBar().valueChanged.connect(
+            self._on_scrolled)
+
+        toolbar = self.addToolBar('Export result')
+        toolbar.setMovable(False)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText('Find')
+        self.search.returnPressed.connect(self.find_next)
+        toolbar.addWidget(self.search)
+        toolbar.addAction('Find &next', self.find_next)
+        toolbar.addSeparator()
+        toolbar.addAction('&Copy all', self.copy_all)
+
         self.setWindowTitle('Export result')
         self.setCentralWidget(self.result)
         self.setGeometry(300, 300, 900, 300)
         return
 
+    # ----------------------------------------------------------------------
+    def open_file(self, path):
+        """Show the first pages of the output file."""
+        self.paged_file = PagedTextFile(path)
+        self.result.clear()
+        self.load_next_page()
+        # fill the view so that it can be scrolled to load more pages
+        while (not self.result.verticalScrollBar().maximum()
+               and not self.paged_file.at_end):
+            self.load_next_page()
+        self.result.moveCursor(QTextCursor.Start)
+        self.setWindowTitle('Export result - {0}'.format(path))
+        return
+
+    # ----------------------------------------------------------------------
+    def load_next_page(self):
+        """Append the next page of the output file to the text shown."""
+        if self.paged_file is None or self.paged_file.at_end:
+            return False
+        cursor = QTextCursor(self.result.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(self.paged_file.read_next_page())
+        self.statusBar().showMessage('Shown {0} of {1} KB'.format(
+            self.paged_file.loaded_size // 1024,
+            self.paged_file.size // 1024))
+        return True
+
+    # ----------------------------------------------------------------------
+    def _on_scrolled(self, value):
+        """Load the next page once the end of the text shown is reached."""
+        if value == self.result.verticalScrollBar().maximum():
+            self.load_next_page()
+        return
+
+    # ----------------------------------------------------------------------
+    def find_next(self):
+        """Select the next occurrence of the searched text.
+
+        The pages not shown yet are searched on disk and shown up to the
+        page with the text.
+        """
+        text = self.search.text()
+        if not text or self.paged_file is None:
+            return
+        if self.result.find(text):
+            return
+        offset = self.paged_file.find(text, self.paged_file.loaded_size)
+        if offset != -1:
+            while self.paged_file.loaded_size <= offset:
+                self.load_next_page()
+            self.result.find(text)
+            return
+        # search again from the start
+        self.result.moveCursor(QTextCursor.Start)
+        if not self.result.find(text):
+            self.statusBar().showMessage('{0} is not found'.format(text))
+        return
+
+    # ----------------------------------------------------------------------
+    def copy_all(self):
+        """Copy the whole output reading it from disk."""
+        if self.paged_file is not None:
+            QApplication.clipboard().setText(''.join(
+                self.paged_file.iter_text()))
+        return
+
 
 ########################################################################
 class Window(QMainWindow):
@@ -61,7 +157,11 @@ class Window(QMainWindow):
         menus = [
             ('&New query', 'Ctrl+N', self.open_new_tab, False),
             ('&Save query', 'Ctrl+S', self.save_query_to_file, False),
-            ('&Open query', 'Ctrl+O', self.open_query_from_file, False),
+            ('&Open query', 'Ctrl+O', self.open_query_from_file, True),
+            ('Run query across &geodatabases...', 'Ctrl+Shift+G',
+             self.run_query_across_gdbs, False),
+            ('Run query with &parameters...', 'Ctrl+Shift+P',
+             self.run_query_with_parameters, False),
         ]
         for cmd_name, shortcut, connected_func, separator in menus:
             action = QAction(cmd_name, self)
@@ -121,6 +221,28 @@ class Window(QMainWindow):
             lambda evt, arg=option: self.export_result(
                 evt, export_action_md.text()))
 
+        map_preview_action = result_menu.addAction('&Map preview')
+        map_preview_action.setShortcut('Ctrl+M')
+        map_preview_action.triggered.connect(self._do_map_preview_hide_show)
+        stats_action = result_menu.addAction('Column &statistics')
+        stats_action.setShortcut('Ctrl+Shift+S')
+        stats_action.triggered.connect(self.show_column_stats)
+        self.stats_panel = None
+        compare_action = result_menu.addAction('Co&mpare with...')
+        compare_action.setToolTip(
+            'Count rows added, removed and changed since the result of '
+            'another tab')
+        compare_action.triggered.connect(self.compare_results)
+        self.diff_panel = None
+        jobs_action = result_menu.addAction('Export &jobs')
+        jobs_action.triggered.connect(self._do_jobs_hide_show)
+
+        # exports run in the background; tests wait for them to finish
+        self.export_jobs = ExportJobQueue(synchronous=test_mode)
+        self.jobs_panel = JobsPanel(self.export_jobs, self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.jobs_panel)
+        self.jobs_panel.hide()
+
         settings_menu = menu.addMenu('&Settings')
         settings_menu.setToolTipsVisible(True)
         self.do_include_geometry = QAction(
@@ -131,7 +253,48 @@ class Window(QMainWindow):
         settings_menu.addAction(self.do_include_geometry)
         self.do_include_geometry.setChecked(True)
 
+        self.do_stop_script_on_error = QAction(
+            'Stop script execution on first error', self, checkable=True)
+        self.do_stop_script_on_error.setToolTip(
+            """Will not execute the rest of the statements
+            of the script once a statement fails""")
+        settings_menu.addAction(self.do_stop_script_on_error)
+        self.do_stop_script_on_error.setChecked(True)
+
+        self.do_profile_next_query = QAction(
+            'Profile next query', self, checkable=True)
+        self.do_profile_next_query.setToolTip(
+            """Will profile execution of the next query and fetching
+            its rows and save the profile into the .gdbee folder""")
+        settings_menu.addAction(self.do_profile_next_query)
+
+        # rows of all result tables are kept within the memory budget
+        self.result_memory = ResultMemoryManager(result_memory_budget_mb * MB)
+
+        # History menu
+        try:
+            self.query_history = QueryHistory()
+        except Exception as err:
+            print(err)
+            self.query_history = None
+        self.history_panel = None
+        if self.query_history:
+            self.history_panel = HistoryPanel(self.query_history, self)
+            self.history_panel.query_rerun_requested.connect(self.rerun_query)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.history_panel)
+            self.history_panel.hide()
+
+            history_menu = menu.addMenu('&History')
+            history_hide_action = QAction('&Hide/show panel', self)
+            history_hide_action.setShortcut('Ctrl+H')
+            history_hide_action.triggered.connect(self._do_history_hide_show)
+            history_clear_action = QAction('&Clear history', self)
+            history_clear_action.triggered.connect(self.clear_query_history)
+            history_menu.addAction(history_hide_action)
+            history_menu.addAction(history_clear_action)
+
         self.tab_widget = TabWidget()
+        self.tab_widget.currentChanged.connect(self._on_tab_changed)
         self.setCentralWidget(self.tab_widget)
         self.setGeometry(100, 100, 1000, 900)
         self.show()
@@ -139,74 +302,73 @@ class Window(QMainWindow):
         self.export_result_window = None
         return
 
+    # ----------------------------------------------------------------------
+    def closeEvent(self, event):  # noqa: N802
+        """Override built-in method to remove spilled rows and stop workers."""
+        self.export_jobs.cancel_all()
+        self.export_jobs.remove_outputs()
+        self.result_memory.cleanup()
+        if self.stats_panel:
+            self.stats_panel.stop()
+        if self.diff_panel:
+            self.diff_panel.stop()
+        super(Window, self).closeEvent(event)
+        return
+
     # ----------------------------------------------------------------------
     def export_result(self, evt, option):
         """Export result set into an output format."""
-        current_tab = self.tab_widget.widget(self.tab_widget.currentIndex())
-        try:
-            if not test_mode:
-                if not current_tab.table.table_data.rowCount():
-                    raise
-            else:
-                if not current_tab.table.table_data.number_layer_rows:
-                    raise
-        except BaseException:
+        table = self.get_result_table(self.tab_widget.currentWidget())
+        if table is None:
+            return
+        table_data = table.table_data
+        if not (table_data.number_layer_rows
+                if test_mode else table_data.rowCount()):
             return
 
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        df = current_tab.table.get_selected_data_as_df()
+        geom_column = (table_data.geom_column
+                       if table_data.geom_column in table_data.headers else
+                       None)
+        source, rows = getattr(table, 'query_source', None), None
+        if source:
+            source += (table_data.show_shapes, )
+        else:
+            # the query cannot be executed again; export the rows read
+            rows = table.get_all_rows()
+
+        job = ExportJob(EXPORT_FORMATS[option], table_data.headers,
+                        table_data.number_layer_rows, geom_column, source,
+                        rows)
+        title = '{0} - {1}'.format(
+            option.replace('&', ''),
+            self.tab_widget.tabText(self.tab_widget.currentIndex()))
+        job.signals.finished.connect(self.show_export_result)
+        job.signals.cancelled.connect(
+            lambda: self.statusBar().showMessage(
+                'Export cancelled: {0}'.format(title)))
+        job.signals.failed.connect(
+            lambda errors: self.statusBar().showMessage(
+                'Export failed: {0}: {1}'.format(title, errors)))
+        self.jobs_panel.add_job(job, title)
+        self.jobs_panel.show()
+        self.statusBar().showMessage('Exporting: {0}'.format(title))
+        self.export_jobs.submit(job)
+        return
 
+    # ----------------------------------------------------------------------
+    def show_export_result(self, path):
+        """Show the output file of an export job that is done."""
         if not self.export_result_window:
             self.export_result_window = ExportResultWindow()
-
-        if option == '&QGIS':
-            if self.window().tab_widget.currentWidget(
-            ).geometry_isin_query and self.window(
-            ).do_include_geometry.isChecked():
-                s = '\n'.join(df[df.columns[-1]].tolist())
-                self.export_result_window.result.setText(s)
-            else:
-                self.export_result_window.result.setText('')
-
-        if option == '&ArcMap':
-            if self.window().tab_widget.currentWidget(
-            ).geometry_isin_query and self.window(
-            ).do_include_geometry.isChecked():
-                # TODO: get the fields data along with the geometries/dump csv
-                snippet = self._get_arcmap_snippet(
-                    geoms=df[df.columns[-1]].tolist())
-                self.export_result_window.result.setText(snippet)
-            else:
-                self.export_result_window.result.setText('')
-
-        if option == '&DataFrame':
-            out_csv = os.path.join(tempfile.gettempdir(), 'data.csv')
-            df.to_csv(out_csv, sep=';')
-            s = '{0}{1}'.format(
-                'import pandas as pd\n',
-                'df = pd.read_csv(r"{out_csv}", sep=";", index_col=0)'.format(
-                    out_csv=out_csv))
-            self.export_result_window.result.setText(s)
-
-        if option == '&Markdown':
-            if not tabulate_found:
-                self.export_result_window.result.setText(
-                    'Tabulate package is not installed.\n'
-                    'Get it from https://pypi.python.org/pypi/tabulate')
-            else:
-                s = tabulate(
-                    df, headers='keys', tablefmt='pipe', floatfmt='.4f')
-                if len(df) > 1000:
-                    out_md = os.path.join(tempfile.gettempdir(), 'data.md')
-                    with io.open(out_md, 'w', encoding='utf-8') as f:
-                        f.write(s)
-                    self.export_result_window.result.setText(
-                        'Markdown file is saved at {0}'.format(out_md))
-                else:
-                    self.export_result_window.result.setText(s)
-
-        QApplication.restoreOverrideCursor()
+        self.export_result_window.open_file(path)
         self.export_result_window.show()
+        self.statusBar().showMessage('Export is done')
+        return
+
+    # ----------------------------------------------------------------------
+    def _do_jobs_hide_show(self):
+        """Hide or show the export jobs panel."""
+        self.jobs_panel.setVisible(not self.jobs_panel.isVisible())
         return
 
     # ----------------------------------------------------------------------
@@ -245,6 +407,107 @@ class Window(QMainWindow):
                 current_tab.query.document().setPlainText(''.join(query))
         return
 
+    # ----------------------------------------------------------------------
+    def run_query_across_gdbs(self):
+        """Run query of the focused tab against multiple geodatabases."""
+        current_tab = self.tab_widget.widget(self.tab_widget.currentIndex())
+        if not current_tab:
+            return
+
+        default_pattern = ''
+        if current_tab.gdb:
+            default_pattern = os.path.join(
+                os.path.dirname(current_tab.gdb.path), '*.gdb')
+        patterns, ok = QInputDialog.getText(
+            self, 'Run query across geodatabases',
+            'Geodatabase paths or glob patterns separated by ";"',
+            text=default_pattern)
+        if not ok:
+            return
+
+        gdb_paths = resolve_gdb_paths(patterns.split(';'))
+        if not gdb_paths:
+            msg = QMessageBox()
+            msg.setText('No geodatabases match {0}'.format(patterns))
+            msg.setWindowTitle('Validation error')
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec_()
+            return
+        current_tab.run_query_fanout(gdb_paths)
+        return
+
+    # ----------------------------------------------------------------------
+    def run_query_with_parameters(self):
+        """Run query template of the focused tab for every parameter set."""
+        current_tab = self.tab_widget.widget(self.tab_widget.currentIndex())
+        if not current_tab:
+            return
+
+        names = find_parameters(current_tab.get_query_text())
+        if not names:
+            msg = QMessageBox()
+            msg.setText('Use named parameters such as :borough in the query '
+                        'to run it for every set of parameter values.')
+            msg.setWindowTitle('No parameters')
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec_()
+            return
+        dialog = ParametersDialog(names, self)
+        if not dialog.exec_():
+            return
+        parameter_sets = dialog.get_parameter_sets()
+        if parameter_sets:
+            current_tab.run_query_batch(parameter_sets,
+                                        dialog.get_parameter_kinds())
+        return
+
+    # ----------------------------------------------------------------------
+    def record_query(self, sql, gdb, dialect, rows, phases, errors=None):
+        """Record executed statement in the query history."""
+        if not self.query_history:
+            return
+        self.query_history.add(sql, gdb, dialect, rows, phases, errors)
+        if self.history_panel.isVisible():
+            self.history_panel.refresh()
+        return
+
+    # ----------------------------------------------------------------------
+    def rerun_query(self, sql, gdb_path):
+        """Run query from the history again.
+
+        The query is run in the focused tab unless it was run against
+        another geodatabase; a new tab connected to it is opened then.
+        """
+        current_tab = self.tab_widget.widget(self.tab_widget.currentIndex())
+        current_path = getattr(getattr(current_tab, 'gdb', None), 'path', '')
+        if not current_tab or (gdb_path and gdb_path != current_path
+                               and os.path.isdir(gdb_path)):
+            self.open_new_tab()
+            current_tab = self.tab_widget.widget(
+                self.tab_widget.currentIndex())
+            if gdb_path and os.path.isdir(gdb_path):
+                current_tab.gdb = Geodatabase(gdb_path)
+                current_tab.connected_gdb_path_label.setText(gdb_path)
+                current_tab.connect_to_geodatabase(
+                    evt=None, triggered_with_browse=False)
+                current_tab._fill_toc()
+
+        current_tab.query.setPlainText(sql)
+        current_tab.run_query()
+        return
+
+    # ----------------------------------------------------------------------
+    def clear_query_history(self):
+        """Remove all queries from the history confirming first."""
+        msg = QMessageBox()
+        msg.setText('Are you sure you want to clear the query history?')
+        msg.setWindowTitle('Clear history')
+        msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
+        if msg.exec_() == QMessageBox.Ok:
+            self.query_history.clear()
+            self.history_panel.refresh()
+        return
+
     # ----------------------------------------------------------------------
     def toc_expand_all(self):
         """Expand all items in the schemas panel."""
@@ -270,15 +533,115 @@ class Window(QMainWindow):
             pass
 
     # ----------------------------------------------------------------------
-    def _get_arcmap_snippet(self, geoms):
-        """Get arcpy code with received table rows ready to load into ArcMap."""
-        gp_call = "arcpy.CopyFeatures_management(geoms,'in_memory\GDBeeLayer')"
-        base_string = '{geoms}{for_loop}{build_geom}{append_geom}{copy_feats}'
-        snippet = base_string.format(
-            geoms='geoms = []\n',
-            for_loop='for wkt_str in {0}:\n'.format(geoms),
-            build_geom='\tg = arcpy.FromWKT(wkt_str)\n',
-            append_geom='\tgeoms.append(g)\n',
-            copy_feats=gp_call,
-        )
-        return snippet
+    def get_result_table(self, tab):
+        """Get the current result table of the query tab.
+
+        Return None if the tab has no result table, for instance, when no
+        statement of the last executed script returned a result set.
+        """
+        table = getattr(tab, 'table', None)
+        if table is None or not hasattr(table, 'table_data'):
+            return None
+        return table
+
+    # ----------------------------------------------------------------------
+    def _do_map_preview_hide_show(self):
+        """Hide or show map preview of the current result geometries."""
+        table = self.get_result_table(self.tab_widget.currentWidget())
+        if table is None:
+            return
+        if not table.toggle_map_preview():
+            msg = QMessageBox()
+            msg.setText('Include the geometry column into the result set '
+                        'to preview the geometries on a map.')
+            msg.setWindowTitle('No geometries')
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec_()
+        return
+
+    # ----------------------------------------------------------------------
+    def show_column_stats(self):
+        """Show statistics of the columns of the current result table."""
+        table = self.get_result_table(self.tab_widget.currentWidget())
+        if table is None:
+            return
+        if self.stats_panel is None:
+            # NumPy takes long to import; it is needed only for statistics
+            from stats_panel import StatsPanel
+            self.stats_panel = StatsPanel(self)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.stats_panel)
+        self.stats_panel.show()
+        self.stats_panel.compute(table)
+        return
+
+    # ----------------------------------------------------------------------
+    def compare_results(self):
+        """Compare the current result with the result of another tab."""
+        current_tab = self.tab_widget.currentWidget()
+        new_table = self.get_result_table(current_tab)
+        if new_table is None:
+            return
+        tables = {}
+        for index in range(self.tab_widget.count()):
+            tab = self.tab_widget.widget(index)
+            table = self.get_result_table(tab)
+            if tab is not current_tab and table is not None:
+                tables[self.tab_widget.tabText(index)] = table
+        if not tables:
+            msg = QMessageBox()
+            msg.setText('Execute a query in another tab to compare its '
+                        'result with the current result.')
+            msg.setWindowTitle('No result to compare with')
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec_()
+            return
+
+        old_name, ok = QInputDialog.getItem(self, 'Compare results',
+                                            'Compare with the result of',
+                                            list(tables), 0, False)
+        if not ok:
+            return
+        old_table = tables[old_name]
+        whole_rows = '(whole rows)'
+        key_column, ok = QInputDialog.getItem(
+            self, 'Compare results', 'Match rows by the key column',
+            [whole_rows] + get_common_columns(old_table.table_data.headers,
+                                              new_table.table_data.headers),
+            0, False)
+        if not ok:
+            return
+        self.compare_tables(
+            old_table, new_table,
+            None if key_column == whole_rows else key_column,
+            '{0} to {1}'.format(
+                old_name,
+                self.tab_widget.tabText(self.tab_widget.currentIndex())))
+        return
+
+    # ----------------------------------------------------------------------
+    def compare_tables(self, old_table, new_table, key_column=None, title=''):
+        """Show differences between the rows of the result tables."""
+        if self.diff_panel is None:
+            self.diff_panel = DiffPanel(self)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.diff_panel)
+        self.diff_panel.show()
+        self.diff_panel.compare(old_table, new_table, key_column, title)
+        return
+
+    # ----------------------------------------------------------------------
+    def _on_tab_changed(self, index):
+        """Show details of the current result of the tab that got selected."""
+        tab = self.tab_widget.widget(index)
+        if tab:
+            tab._on_result_tab_changed(tab.result_tabs.currentIndex())
+        return
+
+    # ----------------------------------------------------------------------
+    def _do_history_hide_show(self):
+        """Hide or show the query history panel."""
+        if self.history_panel.isVisible():
+            self.history_panel.hide()
+        else:
+            self.history_panel.refresh()
+            self.history_panel.show()
+        return
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the command-line batch runner."""
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from cli import parse_args, get_output_path, run
+from result_writers import CsvWriter, NdjsonWriter
+
+
+########################################################################
+class TestCli(unittest.TestCase):
+    """Test the command-line runner and the result writers."""
+
+    # ----------------------------------------------------------------------
+    def test_parse_args(self):
+        """Parse arguments matching the dialect name case-insensitively."""
+        args = parse_args(['NYC.gdb', __file__, '-d', 'ogrsql'])
+        self.assertEqual(args.dialect, 'OGRSQL')
+        self.assertEqual(args.format, 'csv')
+        self.assertEqual(parse_args(['NYC.gdb']).sql_file, '-')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_missing_sql_file(self):
+        """Exit with code 2 if the SQL file cannot be read."""
+        missing = os.path.join(SRC_DIR, 'missing.sql')
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            with self.assertRaises(SystemExit) as context:
+                parse_args(['NYC.gdb', missing])
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(context.exception.code, 2)
+
+        os.chdir(SRC_DIR)
+        args = parse_args(['NYC.gdb'])
+        args.sql_file = missing
+        stdout, stderr = io.StringIO(), io.StringIO()
+        self.assertEqual(run(args, io.StringIO(), stdout, stderr), 2)
+        self.assertIn('missing.sql', stderr.getvalue())
+        return
+
+    # ----------------------------------------------------------------------
+    def test_output_path(self):
+        """Append statement number to output file name for scripts."""
+        self.assertEqual(get_output_path('out.csv', 1, 1), 'out.csv')
+        self.assertEqual(get_output_path('out.csv', 2, 3), 'out_2.csv')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_writers(self):
+        """Write rows as CSV and NDJSON keeping the column order."""
+        columns = [('NAME', 'String'), ('ID', 'Integer')]
+        rows = [{'ID': 1, 'NAME': 'a'}, {'ID': 2, 'NAME': None}]
+
+        out = io.StringIO()
+        CsvWriter(out, columns).write_rows(rows)
+        self.assertEqual(out.getvalue(), 'NAME,ID\na,1\n,2\n')
+
+        out = io.StringIO()
+        NdjsonWriter(out, columns).write_rows(rows)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], '{"NAME": "a", "ID": 1}')
+        self.assertEqual(json.loads(lines[1]), {'NAME': None, 'ID': 2})
+        return
+
+    # ----------------------------------------------------------------------
+    def test_run_script(self):
+        """Run a script against a geodatabase streaming CSV to stdout."""
+        os.chdir(SRC_DIR)
+        stdin = io.StringIO('SELECT name FROM streets LIMIT 2; -- one\n'
+                            'SELECT id FROM homicides LIMIT 3')
+        stdout, stderr = io.StringIO(), io.StringIO()
+        exit_code = run(
+            parse_args(['NYC.gdb', '--format', 'csv']), stdin, stdout, stderr)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 3 + 1 + 4)
+        self.assertIn('Statement 2', stderr.getvalue())
+        return
+
+    # ----------------------------------------------------------------------
+    def test_no_qt_imported(self):
+        """Import the runner without importing PyQt5."""
+        output = subprocess.check_output(
+            [
+                sys.executable, '-c',
+                "import sys, cli; print('PyQt5' in sys.modules)"
+            ],
+            cwd=SRC_DIR)
+        self.assertEqual(output.strip(), b'False')
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the streaming statistics of the result columns."""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from column_stats import (Histogram, HyperLogLog, collect_column_stats,
+                          get_hashes)
+
+
+########################################################################
+class TestColumnStats(unittest.TestCase):
+    """Test statistics updated batch by batch."""
+
+    # ----------------------------------------------------------------------
+    def test_collect_column_stats(self):
+        """Compute statistics of numeric and text columns in batches."""
+        rows = [(i, None if i % 4 == 0 else 'street {0}'.format(i % 50),
+                 None if i % 10 == 0 else i / 2.0) for i in range(1000)]
+        progress = list(
+            collect_column_stats(rows, ['ID', 'NAME', 'LENGTH'],
+                                 batch_size=300))
+        self.assertEqual([processed for processed, _stats in progress],
+                         [300, 600, 900, 1000])
+
+        id_stats, name_stats, length_stats = progress[-1][1]
+        self.assertEqual((id_stats.count, id_stats.nulls), (1000, 0))
+        self.assertEqual((id_stats.min, id_stats.max), (0, 999))
+        self.assertIsInstance(id_stats.max, int)
+        self.assertAlmostEqual(id_stats.mean, 499.5)
+        self.assertAlmostEqual(id_stats.distinct_count, 1000, delta=30)
+
+        self.assertEqual((name_stats.count, name_stats.nulls), (750, 250))
+        self.assertEqual((name_stats.min, name_stats.max),
+                         ('street 0', 'street 9'))
+        self.assertIsNone(name_stats.mean)
+        self.assertAlmostEqual(name_stats.distinct_count, 50, delta=2)
+
+        summary = length_stats.get_summary()
+        self.assertEqual((summary.count, summary.nulls), (900, 100))
+        self.assertEqual(summary.max, 499.5)
+        self.assertEqual(sum(summary.histogram_counts), 900)
+        self.assertLessEqual(summary.histogram_edges[0], 0.5)
+        self.assertGreater(summary.histogram_edges[-1], 499.5)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_histogram_widening(self):
+        """Merge bins when values beyond the range are added."""
+        histogram = Histogram(bins=4)
+        histogram.add(np.array([0.0, 1.0, 2.0, 3.0]))
+        self.assertEqual(histogram.counts.tolist(), [1, 1, 1, 1])
+        histogram.add(np.array([-4.0, 7.5]))
+        self.assertEqual(histogram.edges, [-9.0, -3.0, 3.0, 9.0, 15.0])
+        self.assertEqual(histogram.counts.tolist(), [1, 4, 1, 0])
+        self.assertEqual(histogram.get_bins(),
+                         ([-9.0, -3.0, 3.0, 9.0], [1, 4, 1]))
+        edges, counts = Histogram(bins=4).get_bins()
+        self.assertEqual((edges, counts), ([], []))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_hyperloglog(self):
+        """Estimate distinct count of many values within a few percent."""
+        hll = HyperLogLog()
+        for start in range(0, 200000, 50000):
+            hll.add_hashes(get_hashes(list(range(start, start + 50000))))
+        # values added again do not change the estimate
+        estimate = hll.estimate()
+        hll.add_hashes(get_hashes(list(range(1000))))
+        self.assertEqual(hll.estimate(), estimate)
+        self.assertAlmostEqual(estimate, 200000, delta=200000 * 0.05)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the automatic SQL dialect selection."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from dialect_selector import (OGRSQL, SQLITE, DialectSelector,
+                              get_query_features, get_query_shape,
+                              is_query_dialect_neutral)
+
+AGGREGATE_QUERY = "SELECT count(*) FROM streets WHERE Type = 'residential'"
+NEUTRAL_QUERY = 'SELECT count(*), max(Shape_Length) FROM streets'
+
+
+########################################################################
+class DialectsLog(object):
+    """Geodatabase stand-in failing statements with unsupported dialects."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, failing_dialects=()):
+        """Initialize DialectsLog with dialects that fail every statement."""
+        self.failing_dialects = failing_dialects
+        self.executed = []
+        self.field_types = {'id': 'Integer', 'name': 'String'}
+
+    # ----------------------------------------------------------------------
+    def get_field_types(self, table):
+        """Get types of the fields of any table."""
+        return self.field_types
+
+    # ----------------------------------------------------------------------
+    def execute_sql(self, query, dialect='sqlite', include_geometry=True):
+        """Record the dialect used to execute the statement."""
+        self.executed.append(dialect)
+        if dialect in self.failing_dialects:
+            return None, 'Undefined function'
+        return query, None
+
+
+########################################################################
+class TestDialectSelector(unittest.TestCase):
+    """Test inspecting statements and learning from execution times."""
+
+    # ----------------------------------------------------------------------
+    def test_query_features(self):
+        """Detect features the OGR SQL dialect does not support."""
+        self.assertEqual(
+            get_query_features(
+                'SELECT ST_X(Shape), count(*) FROM homicides h JOIN '
+                'streets s ON h.ID = s.ID GROUP BY 1 LIMIT 5'),
+            {'spatial_functions', 'join', 'group_by', 'limit'})
+        self.assertEqual(get_query_features(AGGREGATE_QUERY), set())
+        self.assertEqual(
+            get_query_features('SELECT rank() OVER (ORDER BY a) FROM t'),
+            {'functions', 'window'})
+        return
+
+    # ----------------------------------------------------------------------
+    def test_query_shape(self):
+        """Ignore literals, case and comments in the query shape."""
+        self.assertEqual(
+            get_query_shape("select count(*) from STREETS where type = 'a'"),
+            get_query_shape(AGGREGATE_QUERY + ' -- residential only'))
+        self.assertNotEqual(
+            get_query_shape(AGGREGATE_QUERY),
+            get_query_shape(AGGREGATE_QUERY.replace('Type', 'Oneway')))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_choose_faster_dialect(self):
+        """Measure both dialects, then keep using the faster one."""
+        selector = DialectSelector()
+        self.assertEqual(selector.choose('SELECT ST_X(Shape) FROM t'), SQLITE)
+        self.assertEqual(selector.choose(NEUTRAL_QUERY), OGRSQL)
+        selector.record(NEUTRAL_QUERY, OGRSQL, 2.0)
+        self.assertEqual(selector.choose(NEUTRAL_QUERY), SQLITE)
+        selector.record(NEUTRAL_QUERY, SQLITE, 1.0)
+        self.assertEqual(selector.choose(NEUTRAL_QUERY), SQLITE)
+        for _i in range(5):
+            selector.record(NEUTRAL_QUERY, SQLITE, 4.0)
+        self.assertEqual(selector.choose(NEUTRAL_QUERY), OGRSQL)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_dialect_specific_conditions(self):
+        """Use SQLite for statements whose rows depend on the dialect."""
+        field_types = {'id': 'Integer', 'name': 'String'}
+        self.assertTrue(is_query_dialect_neutral(NEUTRAL_QUERY))
+        self.assertFalse(is_query_dialect_neutral(AGGREGATE_QUERY))
+        self.assertFalse(
+            is_query_dialect_neutral('SELECT count(*) FROM t WHERE id > 5'))
+        self.assertTrue(
+            is_query_dialect_neutral('SELECT * FROM t WHERE id > 5',
+                                     field_types))
+        self.assertFalse(
+            is_query_dialect_neutral('SELECT * FROM t WHERE name > 5',
+                                     field_types))
+
+        selector = DialectSelector()
+        for _i in range(3):
+            selector.record(AGGREGATE_QUERY, OGRSQL, 1.0)
+            selector.record(AGGREGATE_QUERY, SQLITE, 5.0)
+        self.assertEqual(selector.choose(AGGREGATE_QUERY), SQLITE)
+
+        gdb = DialectsLog()
+        selector.execute(gdb, 'SELECT * FROM t WHERE id > 5')
+        selector.execute(gdb, 'SELECT * FROM t WHERE name = 5')
+        self.assertEqual(gdb.executed, [OGRSQL, SQLITE])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_fall_back_to_sqlite(self):
+        """Execute with SQLite when OGR SQL fails and remember it."""
+        selector = DialectSelector()
+        gdb = DialectsLog(failing_dialects=(OGRSQL, ))
+        layer, errors, dialect = selector.execute(gdb, NEUTRAL_QUERY)
+        self.assertEqual((layer, errors, dialect),
+                         (NEUTRAL_QUERY, None, SQLITE))
+        self.assertEqual(gdb.executed, [OGRSQL, SQLITE])
+        self.assertEqual(selector.choose(NEUTRAL_QUERY), SQLITE)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_persist_timings(self):
+        """Load timings recorded by another session."""
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'gdbee', 'dialect_timings.json')
+            selector = DialectSelector(path)
+            selector.record(NEUTRAL_QUERY, OGRSQL, 3.0)
+            selector.record(NEUTRAL_QUERY, SQLITE, 1.0)
+            self.assertEqual(
+                DialectSelector(path).choose(NEUTRAL_QUERY), SQLITE)
+        finally:
+            shutil.rmtree(folder)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for running a query across multiple geodatabases."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SRC_DIR = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from fanout import (ROWS_BATCH_SIZE, SOURCE_COLUMN, FanoutResult,
+                    format_fanout_report, iter_row_batches, resolve_gdb_paths,
+                    run_fanout, write_row_batches)
+from result_union import UnionLayerBuilder
+
+
+########################################################################
+class TestFanout(unittest.TestCase):
+    """Test parallel execution and union of the result sets."""
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def setUpClass(cls):
+        """Copy the sample geodatabase to have multiple geodatabases."""
+        super(TestFanout, cls).setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+        for name in ('Bronx.gdb', 'Queens.gdb'):
+            shutil.copytree(
+                os.path.join(SRC_DIR, 'NYC.gdb'),
+                os.path.join(cls.tmp_dir, name))
+        return
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the copied geodatabases."""
+        shutil.rmtree(cls.tmp_dir)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_resolve_gdb_paths(self):
+        """Expand glob patterns into sorted unique geodatabase paths."""
+        pattern = os.path.join(self.tmp_dir, '*.gdb')
+        paths = resolve_gdb_paths([pattern, pattern, ''])
+        self.assertEqual([os.path.basename(p) for p in paths],
+                         ['Bronx.gdb', 'Queens.gdb'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_run_fanout_union(self):
+        """Run query in worker processes and union the result sets."""
+        paths = resolve_gdb_paths([os.path.join(self.tmp_dir, '*.gdb')])
+        paths.append(os.path.join(self.tmp_dir, 'Missing.gdb'))
+        builder = UnionLayerBuilder()
+        results = []
+        for result in run_fanout(paths, 'SELECT name, shape FROM streets '
+                                 'LIMIT 3', processes=2):
+            results.append(result)
+            for rows in iter_row_batches(result):
+                builder.add_rows(result.columns, rows,
+                                 [(SOURCE_COLUMN, os.path.basename(
+                                     result.path))])
+            # the rows file is removed once read
+            self.assertFalse(result.rows_path
+                             and os.path.exists(result.rows_path))
+
+        layer = builder.get_layer()
+        self.assertEqual(len(layer), 6)
+        self.assertTrue(layer.GetGeometryColumn())
+        sources = {feat.GetField(SOURCE_COLUMN) for feat in layer}
+        self.assertEqual(sources, {'Bronx.gdb', 'Queens.gdb'})
+
+        report = format_fanout_report(results, 1.0)
+        self.assertIn('Missing.gdb: failed', report)
+        self.assertIn('Bronx.gdb:', report)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_run_fanout_stopped(self):
+        """Remove the rows files not read once the iteration is stopped."""
+        paths = resolve_gdb_paths([os.path.join(self.tmp_dir, '*.gdb')])
+        results = run_fanout(paths, 'SELECT name FROM streets LIMIT 3',
+                             processes=1)
+        result = next(results)
+        self.assertTrue(os.path.exists(result.rows_path))
+        results.close()
+        self.assertFalse(os.path.exists(result.rows_path))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_row_batches(self):
+        """Write rows into a file in batches and read them back."""
+        rows = [{'ID': i} for i in range(ROWS_BATCH_SIZE * 2 + 1)]
+        path, rows_count = write_row_batches(iter(rows))
+        self.assertEqual(rows_count, len(rows))
+        result = FanoutResult('a.gdb', [('ID', 'Integer')], path, rows_count,
+                              None, 0.0, 0.0)
+        batches = list(iter_row_batches(result))
+        self.assertEqual([len(batch) for batch in batches],
+                         [ROWS_BATCH_SIZE, ROWS_BATCH_SIZE, 1])
+        self.assertEqual(sum(batches, []), rows)
+        self.assertFalse(os.path.exists(path))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
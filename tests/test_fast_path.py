@@ -0,0 +1,123 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for recognizing queries served directly from the layer."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from fast_path import (FilteredLayer, SimpleQuery, is_dialect_neutral,
+                       parse_simple_query)
+
+
+########################################################################
+class SourceLayer(object):
+    """OGR layer stand-in iterating over a list of features."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, features):
+        """Initialize SourceLayer with the features."""
+        self.features = features
+        self.pos = 0
+
+    # ----------------------------------------------------------------------
+    def GetFeatureCount(self):  # noqa: N802
+        """Get number of features."""
+        return len(self.features)
+
+    # ----------------------------------------------------------------------
+    def GetNextFeature(self):  # noqa: N802
+        """Get next feature; None when exhausted."""
+        if self.pos >= len(self.features):
+            return None
+        self.pos += 1
+        return self.features[self.pos - 1]
+
+    # ----------------------------------------------------------------------
+    def ResetReading(self):  # noqa: N802
+        """Start reading from the first feature."""
+        self.pos = 0
+
+
+########################################################################
+class TestFastPath(unittest.TestCase):
+    """Test parsing simple queries and limiting the filtered layer."""
+
+    # ----------------------------------------------------------------------
+    def test_simple_queries(self):
+        """Parse columns, filter and limit of simple queries."""
+        self.assertEqual(
+            parse_simple_query('SELECT Name, "Type" FROM streets LIMIT 3;'),
+            SimpleQuery('streets', ['Name', 'Type'], None, [], 3))
+        self.assertEqual(
+            parse_simple_query(
+                "select * from streets -- all columns\n"
+                "where Oneway = 'yes' and ID between 1 and 5"),
+            SimpleQuery('streets', None,
+                        "Oneway = 'yes' and ID between 1 and 5",
+                        ['Oneway', 'ID'], None))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_not_simple_queries(self):
+        """Leave anything but simple queries to the SQL dialect."""
+        queries = [
+            'SELECT count(*) FROM streets',
+            'SELECT Name AS n FROM streets',
+            'SELECT DISTINCT Name FROM streets',
+            'SELECT s.Name FROM streets s',
+            'SELECT Name FROM streets ORDER BY Name',
+            "SELECT Name FROM streets WHERE Name LIKE 'A%'",
+            'SELECT Name FROM streets WHERE upper(Name) = 1',
+            'SELECT Name FROM streets WHERE ID == 1',
+            'SELECT Name FROM streets WHERE ID IN (SELECT ID FROM roads)',
+            'SELECT Name FROM streets LIMIT 5 OFFSET 10',
+            'SELECT Name FROM streets JOIN roads ON streets.ID = roads.ID',
+        ]
+        for query in queries:
+            self.assertIsNone(parse_simple_query(query), query)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_dialect_neutral_filters(self):
+        """Serve only numeric comparisons for the dialects but OGR SQL."""
+        field_types = {'id': 'Integer', 'area': 'Real', 'name': 'String'}
+        neutral = [
+            'SELECT Name FROM streets',
+            'SELECT Name FROM streets WHERE ID = 5 AND Area > 1.5',
+            'SELECT Name FROM streets WHERE ID IN (1, 2) OR Area IS NULL',
+        ]
+        for query in neutral:
+            self.assertTrue(
+                is_dialect_neutral(parse_simple_query(query), field_types),
+                query)
+        dependent = [
+            'SELECT Name FROM streets WHERE Name = 5',
+            "SELECT Name FROM streets WHERE Name < 'b'",
+            "SELECT Name FROM streets WHERE ID = '5'",
+        ]
+        for query in dependent:
+            self.assertFalse(
+                is_dialect_neutral(parse_simple_query(query), field_types),
+                query)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_filtered_layer_limit(self):
+        """Stop reading features at the limit and start over on reset."""
+        layer = FilteredLayer(SourceLayer(['a', 'b', 'c']), [], '', limit=2)
+        self.assertEqual(len(layer), 2)
+        self.assertEqual(
+            [layer.GetNextFeature() for _i in range(3)], ['a', 'b', None])
+        layer.ResetReading()
+        self.assertEqual(layer.GetNextFeature(), 'a')
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
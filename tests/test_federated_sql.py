@@ -0,0 +1,120 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for planning queries against several geodatabases."""
+import os
+import sys
+import unittest
+from collections import OrderedDict
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from federated_sql import (FederatedSource, build_vrt_xml,
+                           plan_federated_query)
+
+
+########################################################################
+class TestFederatedSql(unittest.TestCase):
+    """Test rewriting queries and pushing conditions down to sources."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Prepare two attached geodatabases."""
+        self.sources = OrderedDict()
+        self.sources['db1'] = FederatedSource('DB1', 'DB1.gdb', {
+            'parcels': 'Parcels',
+            'roads': 'Roads'
+        })
+        self.sources['db2'] = FederatedSource('DB2', 'DB2.gdb',
+                                              {'parcels': 'Parcels'})
+        return
+
+    # ----------------------------------------------------------------------
+    def test_rewrite_qualified_datasets(self):
+        """Reference VRT layers keeping dataset names usable as qualifiers."""
+        query = plan_federated_query(
+            'SELECT * FROM DB1.Parcels WHERE Parcels.ID IN '
+            '(SELECT ID FROM db2.parcels)', self.sources)
+        self.assertEqual(
+            query.sql, 'SELECT * FROM "DB1_Parcels" AS "Parcels" WHERE '
+            'Parcels.ID IN (SELECT ID FROM "DB2_Parcels" AS "Parcels")')
+        self.assertEqual([(l.name, l.source.alias, l.table, l.filters)
+                          for l in query.layers],
+                         [('DB1_Parcels', 'DB1', 'Parcels', []),
+                          ('DB2_Parcels', 'DB2', 'Parcels', [])])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_push_down_conditions(self):
+        """Push single-dataset conditions down to each source."""
+        query = plan_federated_query(
+            "SELECT a.ID FROM DB1.Parcels a JOIN DB2.Parcels AS b "
+            "ON a.ID = b.ID WHERE a.Area > 100 AND b.Name = 'x' "
+            "AND a.ID = b.ID AND a.Zone BETWEEN 1 AND 5 "
+            "AND upper(b.Owner) = 'Y'", self.sources)
+        self.assertEqual([l.filters for l in query.layers],
+                         [['Area > 100', 'Zone BETWEEN 1 AND 5'],
+                          ["Name = 'x'"]])
+        self.assertIn("WHERE a.Area > 100 AND b.Name = 'x'", query.sql)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_no_push_down_of_dialect_specific_conditions(self):
+        """Keep conditions OGR SQL evaluates differently in the query."""
+        conditions = [
+            "Name LIKE 'a%'",
+            "Name GLOB 'a*'",
+            "Name = 'a' COLLATE NOCASE",
+            'CASE WHEN Area > 1 THEN 1 ELSE 0 END = 1',
+            'CAST(Area AS INTEGER) = 1',
+            'Area / 2 = 1',
+            'Area % 2 = 1',
+        ]
+        for condition in conditions:
+            query = plan_federated_query(
+                'SELECT * FROM DB1.Parcels WHERE {0} AND ID > 1'.format(
+                    condition), self.sources)
+            self.assertEqual(query.layers[0].filters, ['ID > 1'], condition)
+            self.assertIn(condition, query.sql)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_no_push_down_to_outer_joined_dataset(self):
+        """Keep conditions on the nullable side of a LEFT JOIN in place."""
+        query = plan_federated_query(
+            "SELECT * FROM Roads r LEFT JOIN DB2.Parcels p ON r.ID = p.ID "
+            "WHERE p.ID IS NULL AND r.Type = 'A'", self.sources)
+        self.assertEqual(query.sql.split(' WHERE')[0],
+                         'SELECT * FROM "Roads" r LEFT JOIN "DB2_Parcels" p '
+                         'ON r.ID = p.ID')
+        self.assertEqual([l.filters for l in query.layers],
+                         [["Type = 'A'"], []])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_self_join_layers(self):
+        """Give every reference of the same dataset its own layer."""
+        query = plan_federated_query(
+            'SELECT * FROM DB1.Parcels p, DB1.Parcels q '
+            'WHERE p.ID = 1 AND q.ID = 2', self.sources)
+        self.assertEqual([(l.name, l.filters) for l in query.layers],
+                         [('DB1_Parcels', ['ID = 1']),
+                          ('DB1_Parcels_2', ['ID = 2'])])
+        vrt = build_vrt_xml(query.layers)
+        self.assertIn('<SrcSQL dialect="OGRSQL">SELECT * FROM "Parcels" '
+                      'WHERE (ID = 2)</SrcSQL>', vrt)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_unknown_dataset(self):
+        """Report datasets missing in the attached geodatabase."""
+        with self.assertRaises(ValueError):
+            plan_federated_query('SELECT * FROM DB2.Roads', self.sources)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
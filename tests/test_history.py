@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the query history."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from history import QueryHistory
+
+
+########################################################################
+class TestQueryHistory(unittest.TestCase):
+    """Test recording, searching and aggregating the executed queries."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Create history in a temporary folder."""
+        self.folder = tempfile.mkdtemp()
+        self.history = QueryHistory(
+            os.path.join(self.folder, 'data', 'history.sqlite'))
+        self.history.add(
+            "SELECT * FROM streets WHERE Type = 'residential'",
+            'C:/data/NYC.gdb', 'SQLite', 10, {'execute': 40.0,
+                                              'count': 10.0})
+        self.history.add(
+            "SELECT * FROM streets WHERE Type = 'primary'",
+            'C:/data/NYC.gdb', 'SQLite', 5, {'execute': 20.0})
+        self.history.add('SELECT name FROM homicides', 'C:/data/Other.gdb',
+                         'OGRSQL', 3, {'execute': 1.0})
+        self.history.add(
+            'SELECT nonsense FROM homicides',
+            'C:/data/Other.gdb',
+            'OGRSQL',
+            errors='no such column')
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove folder with the history."""
+        self.history.close()
+        shutil.rmtree(self.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def _check_search(self):
+        """Search by word prefixes; latest entries first."""
+        self.assertEqual(len(self.history), 4)
+        self.assertEqual(len(self.history.search('')), 4)
+        self.assertEqual(
+            [e.rows for e in self.history.search('street resid')], [10])
+        self.assertEqual(
+            [e.sql for e in self.history.search('homicides other')], [
+                'SELECT nonsense FROM homicides',
+                'SELECT name FROM homicides'
+            ])
+        self.assertEqual(self.history.search('parcels'), [])
+        self.assertEqual(len(self.history.search('streets', limit=1)), 1)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_search(self):
+        """Search the query text and the geodatabase path."""
+        self._check_search()
+        entry = self.history.search('residential')[0]
+        self.assertEqual(entry.phases, {'execute': 40.0, 'count': 10.0})
+        self.assertEqual(entry.total_ms, 50.0)
+        self.assertEqual(self.history.get(entry.id), entry)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_search_without_fts(self):
+        """Search with LIKE if FTS5 is not available."""
+        self.history.use_fts = False
+        self._check_search()
+        return
+
+    # ----------------------------------------------------------------------
+    def test_slowest_shapes(self):
+        """Group successful queries by shape, slowest on average first."""
+        shapes = self.history.get_slowest_shapes()
+        self.assertEqual([s.runs for s in shapes], [2, 1])
+        self.assertEqual(shapes[0].mean_ms, 35.0)
+        self.assertEqual(shapes[0].max_ms, 50.0)
+        self.assertEqual(shapes[0].last_ms, 20.0)
+        self.assertIn("'primary'", shapes[0].sql)
+        self.assertEqual(len(self.history.get_slowest_shapes(min_runs=2)), 1)
+
+        self.history.clear()
+        self.assertEqual(len(self.history), 0)
+        self.assertEqual(self.history.search('streets'), [])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
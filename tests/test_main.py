@@ -1,12 +1,17 @@
 # -*- coding: UTF-8 -*-
 """Unit tests for the application."""
+import csv
+import io
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 import pkgutil
 
+import ogr
 from PyQt5.Qt import Qt
-from PyQt5.Qt import QTextCursor, QModelIndex, QItemSelectionModel
+from PyQt5.Qt import QTextCursor, QModelIndex, QItemSelectionModel, QPointF
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtTest import QTest
 
@@ -18,13 +23,17 @@ sys.path.insert(
     ))
 os.chdir(sys.path[0])
 
-from cfg import test_mode, dev_mode
+import cfg
+from cfg import test_mode, dev_mode, auto_dialect_name
 if not test_mode or dev_mode:
     raise ValueError(
         'Set test/dev mode in config to True before running unit tests')
 
 from window import Window
 from geodatabase import Geodatabase
+from federation import FederatedSession
+from dialect_selector import get_dialect_timings_path
+from table import PREVIEW_LENGTH, PREVIEW_ROLE
 
 
 ########################################################################
@@ -42,6 +51,10 @@ class TestMainWindow(unittest.TestCase):
     # ----------------------------------------------------------------------
     def setUp(self):
         """Restart application before each unit test."""
+        # the files the application records into are kept out of the
+        # user data folder
+        self.user_data_dir = cfg.user_data_dir
+        cfg.user_data_dir = tempfile.mkdtemp()
         self.app = QApplication([])
         self.ui = Window()
         self.menu = self.ui.menuBar()
@@ -55,7 +68,12 @@ class TestMainWindow(unittest.TestCase):
     # ----------------------------------------------------------------------
     def tearDown(self):
         """Clean up after the tests."""
-        pass
+        self.ui.close()
+        if self.ui.query_history:
+            self.ui.query_history.close()
+        shutil.rmtree(cfg.user_data_dir, ignore_errors=True)
+        cfg.user_data_dir = self.user_data_dir
+        return
 
     # ----------------------------------------------------------------------
     def test_create_new_query_tab(self):
@@ -187,6 +205,31 @@ class TestMainWindow(unittest.TestCase):
         self.ui.export_result_window.close()
         return
 
+    # ----------------------------------------------------------------------
+    def test_export_arcmap_to_file(self):
+        """Export geometries and attributes into a csv file for arcpy."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT Name, Oneway, Shape FROM streets')
+        total = self.tab.table.table_data.number_layer_rows
+        self.ui.export_result(None, '&ArcMap')
+        text = self.ui.export_result_window.result.toPlainText()
+        self.ui.export_result_window.close()
+
+        # the geometries are not put into the code
+        self.assertNotIn('MULTILINESTRING', text)
+        self.assertIn("'POLYLINE'", text)
+        self.assertIn("arcpy.AddField_management(fc, 'NAME', 'TEXT'", text)
+        job = self.ui.export_jobs.jobs[-1]
+        out_csv = job.data_paths[0]
+        self.assertIn(out_csv, text)
+        with io.open(out_csv, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['WKB', 'NAME', 'ONEWAY'])
+        self.assertEqual(len(rows), total + 1)
+        geom = ogr.CreateGeometryFromWkb(bytes(bytearray.fromhex(rows[1][0])))
+        self.assertEqual(geom.GetGeometryName(), 'MULTILINESTRING')
+        return
+
     # ----------------------------------------------------------------------
     def test_export_before_execute_sql(self):
         """Export result table before any SQL query is executed."""
@@ -195,6 +238,21 @@ class TestMainWindow(unittest.TestCase):
         self.ui.export_result(None, '&DataFrame')
         return
 
+    # ----------------------------------------------------------------------
+    def test_result_actions_without_result_table(self):
+        """Ignore result actions after a script returning no result set."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT invalid_column FROM streets')
+        self.assertIsNone(self.tab.table)
+        self.assertIsNone(self.ui.get_result_table(self.tab))
+        self.ui.export_result(None, '&DataFrame')
+        self.ui._do_map_preview_hide_show()
+        self.ui.show_column_stats()
+        self.ui.compare_results()
+        self.assertEqual(self.ui.export_jobs.jobs, [])
+        self.assertIsNone(self.ui.stats_panel)
+        return
+
     # ----------------------------------------------------------------------
     def test_export_md_with_no_tabulate_installed(self):
         """Export to markdown table with no tabulate package installed."""
@@ -216,6 +274,132 @@ class TestMainWindow(unittest.TestCase):
         self.ui.export_result_window.close()
         return
 
+    # ----------------------------------------------------------------------
+    def test_export_job_progress(self):
+        """Export all result rows as a job reporting its progress."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT Name, Type, Oneway, Shape FROM streets')
+        total = self.tab.table.table_data.number_layer_rows
+        self.ui.export_result(None, '&DataFrame')
+
+        job = self.ui.export_jobs.jobs[-1]
+        self.assertTrue(job.is_done)
+        self.assertEqual(job.rows_read, total)
+        # the rows of the result table are not read by the job
+        self.assertLess(len(self.tab.table.table_data.rows), total)
+        item = self.ui.jobs_panel.jobs_list.topLevelItem(0)
+        self.assertEqual(
+            self.ui.jobs_panel.jobs_list.itemWidget(item, 1).value(), total)
+        self.assertIn('.csv', self.ui.export_result_window.result.toPlainText())
+        self.ui.export_result_window.close()
+
+        self.ui.jobs_panel.clear_done_jobs()
+        self.assertEqual(self.ui.jobs_panel.jobs_list.topLevelItemCount(), 0)
+        self.assertEqual(self.ui.export_jobs.jobs, [])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_export_job_cancelled(self):
+        """Cancel export job before it writes all rows."""
+        from export_jobs import EXPORT_BATCH_SIZE, MARKDOWN_EXPORT, ExportJob
+        rows = [{'NAME': str(i)} for i in range(EXPORT_BATCH_SIZE * 3)]
+        job = ExportJob(MARKDOWN_EXPORT, ['NAME'], len(rows), rows=rows)
+        cancelled = []
+        job.signals.cancelled.connect(lambda: cancelled.append(True))
+        job.signals.finished.connect(lambda text: cancelled.append(False))
+        # cancel once the first batch has been read
+        job.signals.progress.connect(lambda read, total: job.cancel())
+        self.ui.export_jobs.submit(job)
+
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(job.rows_read, EXPORT_BATCH_SIZE)
+        self.assertIsNone(job.output_path)
+        self.assertEqual(job.data_paths, [])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_export_jobs_own_files(self):
+        """Write the rows of every export job into files of its own."""
+        from export_jobs import DATAFRAME_EXPORT, ExportJob
+        jobs = []
+        for name in ('first', 'second'):
+            rows = [{'NAME': name}]
+            jobs.append(ExportJob(DATAFRAME_EXPORT, ['NAME'], 1, rows=rows))
+            self.ui.export_jobs.submit(jobs[-1])
+        paths = [job.data_paths[0] for job in jobs]
+        self.assertNotEqual(paths[0], paths[1])
+        for name, path in zip(('first', 'second'), paths):
+            with io.open(path, 'r', encoding='utf-8') as f:
+                self.assertIn(name, f.read())
+
+        # the files are referred to by the code pasted from the output
+        output_paths = [job.output_path for job in jobs]
+        self.ui.export_jobs.remove_done_jobs()
+        self.ui.export_jobs.remove_outputs()
+        for path in output_paths:
+            self.assertFalse(os.path.exists(path))
+        for path in paths:
+            self.assertTrue(os.path.exists(path))
+            os.remove(path)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_export_arcmap_invalid_wkt(self):
+        """Write empty WKB for the rows with geometries that are invalid."""
+        from export_jobs import ARCMAP_EXPORT, ExportJob
+        rows = [{
+            'NAME': 'valid',
+            'Shape': 'POINT (1 2)'
+        }, {
+            'NAME': 'invalid',
+            'Shape': 'POINT (1'
+        }]
+        job = ExportJob(
+            ARCMAP_EXPORT, ['NAME', 'Shape'], 2, geom_column='Shape',
+            rows=rows)
+        finished = []
+        job.signals.finished.connect(finished.append)
+        self.ui.export_jobs.submit(job)
+        self.assertEqual(len(finished), 1)
+        with io.open(job.data_paths[0], 'r', encoding='utf-8',
+                     newline='') as f:
+            csv_rows = list(csv.reader(f))
+        self.assertEqual([row[1:] for row in csv_rows[1:]],
+                         [['valid'], ['invalid']])
+        self.assertTrue(csv_rows[1][0])
+        self.assertEqual(csv_rows[2][0], '')
+        job.remove_output()
+        return
+
+    # ----------------------------------------------------------------------
+    def test_export_result_pages(self):
+        """Show large export output page by page."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT Name, Shape FROM streets')
+        self.ui.export_result(None, '&QGIS')
+        viewer = self.ui.export_result_window
+        paged_file = viewer.paged_file
+        with io.open(paged_file.path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        self.assertEqual(
+            len(text.split('\n')), self.tab.table.table_data.number_layer_rows)
+        self.assertLess(paged_file.loaded_size, paged_file.size)
+        self.assertLess(len(viewer.result.toPlainText()), len(text))
+
+        # searching shows the pages up to the text found
+        last_line = text.rsplit('\n', 1)[-1]
+        viewer.search.setText(last_line[:60])
+        viewer.find_next()
+        self.assertTrue(paged_file.at_end)
+        self.assertEqual(viewer.result.textCursor().selectedText(),
+                         last_line[:60])
+        self.assertEqual(viewer.result.toPlainText(), text)
+
+        viewer.copy_all()
+        self.assertEqual(QApplication.clipboard().text(), text)
+        viewer.close()
+        return
+
     # ----------------------------------------------------------------------
     def test_add_new_tab_after_gdb_is_set(self):
         """Add a tab, set its gdb, and then add another tab."""
@@ -352,6 +536,129 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(cp, 'Zwicky Ave')
         return
 
+    # ----------------------------------------------------------------------
+    def test_preview_long_cell_values(self):
+        """Draw truncated WKT; show and copy the full value."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT name, Shape FROM neighborhoods LIMIT 1')
+        tm = self.tab.table.view.model()
+        idx = tm.index(0, 1, QModelIndex())
+        wkt = tm.data(idx)
+        self.assertIn('POLYGON', wkt.split('(')[0])
+        preview = tm.data(idx, PREVIEW_ROLE)
+        self.assertEqual(len(preview), PREVIEW_LENGTH + 1)
+        self.assertTrue(wkt.startswith(preview[:-1]))
+        self.assertEqual(tm.data(idx, Qt.ToolTipRole), wkt)
+        self.assertIn((0, 1), tm.previews)
+        self.assertEqual(tm.data(tm.index(0, 0, QModelIndex()), PREVIEW_ROLE),
+                         tm.data(tm.index(0, 0, QModelIndex())))
+
+        self.tab.table.view.selectionModel().select(
+            idx, QItemSelectionModel.Select)
+        QTest.keyPress(self.tab.table.view, Qt.Key_C, Qt.ControlModifier)
+        self.assertEqual(self.app.clipboard().text(), wkt)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_map_preview(self):
+        """Draw result geometries; clicking a feature selects its row."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT name, Shape FROM neighborhoods')
+        table = self.tab.table
+        table.load_all_rows()
+        self.ui.show()
+        self.ui._do_map_preview_hide_show()
+        map_preview = table.map_preview
+        self.assertTrue(table.map_dock.isVisible())
+        while map_preview.is_busy:
+            map_preview.do_work()
+        self.assertEqual(
+            len(map_preview.shapes), table.table_data.number_layer_rows)
+
+        vertex = map_preview.shapes[10].parts[0][0]
+        pos = map_preview.get_transform().map(QPointF(*vertex)).toPoint()
+        row = map_preview.get_feature_at(pos)
+        self.assertIsNotNone(row)
+        QTest.mouseClick(map_preview, Qt.LeftButton, pos=pos)
+        self.assertEqual(table.view.currentIndex().row(), row)
+        self.assertEqual(map_preview.selected_row, row)
+
+        self.ui._do_map_preview_hide_show()
+        self.assertFalse(table.map_dock.isVisible())
+        return
+
+    # ----------------------------------------------------------------------
+    def test_map_preview_fetches_all_rows(self):
+        """Fetch and draw the rows not fetched into the table yet."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT name, Shape FROM streets')
+        table = self.tab.table
+        total = table.table_data.number_layer_rows
+        self.assertLess(len(table.table_data.rows), total)
+        self.ui.show()
+        self.ui._do_map_preview_hide_show()
+        map_preview = table.map_preview
+        while map_preview.is_busy:
+            map_preview.do_work()
+        self.assertEqual(len(table.table_data.rows), total)
+        self.assertEqual(map_preview.indexed_rows, total)
+        self.assertEqual(map_preview.drawn_extent, map_preview.extent)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_column_stats(self):
+        """Compute statistics of all rows of the result columns."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT name, oneway, Shape FROM streets')
+        self.assertLess(
+            len(self.tab.table.table_data.rows),
+            self.tab.table.table_data.number_layer_rows)
+        self.ui.show_column_stats()
+        panel = self.ui.stats_panel
+        panel.worker.wait()
+        self.app.processEvents()
+
+        self.assertEqual(panel.processed,
+                         self.tab.table.table_data.number_layer_rows)
+        self.assertEqual(panel.stats_table.rowCount(), 2)
+        self.assertEqual(panel.stats_table.item(0, 0).text(), 'NAME')
+        self.assertEqual(
+            int(panel.stats_table.item(0, 1).text()) +
+            int(panel.stats_table.item(0, 2).text()), panel.processed)
+        # the rows of the result table are not read by the worker
+        self.assertEqual(len(self.tab.table.table_data.rows), 200)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_compare_results(self):
+        """Compare the results of two tabs by a key column."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT OBJECTID, Name, Oneway FROM streets')
+        old_table = self.tab.table
+        total = old_table.table_data.number_layer_rows
+        self.tab = self._add_new_query_tab()
+        self._execute_sql(
+            "SELECT OBJECTID, CASE WHEN OBJECTID = 10 THEN 'renamed' "
+            'ELSE Name END AS NAME, Oneway FROM streets WHERE OBJECTID > 5')
+        new_table = self.tab.table
+
+        self.ui.compare_tables(old_table, new_table, 'OBJECTID')
+        panel = self.ui.diff_panel
+        panel.worker.wait()
+        self.app.processEvents()
+        diff = panel.diff
+        self.assertEqual((diff.added, diff.removed, diff.changed),
+                         (0, 5, 1))
+        self.assertEqual(diff.unchanged, total - 6)
+        self.assertEqual(panel.samples.topLevelItemCount(), 6)
+
+        self.ui.compare_tables(old_table, new_table)
+        panel.worker.wait()
+        self.app.processEvents()
+        self.assertEqual((panel.diff.added, panel.diff.removed),
+                         (1, 6))
+        return
+
     # ----------------------------------------------------------------------
     def test_filling_toc(self):
         """Fill the toc with gdb tables and their columns."""
@@ -406,6 +713,319 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(self.tab.table.table_data.number_layer_rows, 5)
         return
 
+    # ----------------------------------------------------------------------
+    def test_context_aware_completion(self):
+        """Suggest only the columns of the aliased table after `alias.`."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT name FROM streets LIMIT 3')
+        self.tab._set_gdb_items_highlight()
+        self.tab._set_gdb_items_complete()
+
+        sql_query_string = 'SELECT h. FROM homicides h'
+        self.tab.completer.update_completion_context(sql_query_string, 9)
+        items = self.tab.completer.completer.model().stringList()
+        self.assertIn('WEAPON', items)
+        self.assertNotIn('ONEWAY', items)
+        self.assertNotIn('SELECT', items)
+
+        self.tab.completer.update_completion_context(sql_query_string, 20)
+        items = self.tab.completer.completer.model().stringList()
+        self.assertIn('streets', items)
+        self.assertNotIn('WEAPON', items)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_execute_sql_script(self):
+        """Execute script with multiple statements; result per sub-tab."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT name FROM streets LIMIT 3; -- first\n'
+                          'SELECT * FROM homicides LIMIT 5;')
+        self.assertEqual(self.tab.result_tabs.count(), 2)
+        self.assertEqual(self.tab.table.table_data.number_layer_rows, 3)
+        self.tab.result_tabs.setCurrentIndex(1)
+        self.assertEqual(self.tab.table.table_data.number_layer_rows, 5)
+        self.assertIn('5 rows', self.tab.table.status_message)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_execute_sql_script_with_errors(self):
+        """Stop script on first error or continue depending on setting."""
+        self.tab = self._add_new_query_tab()
+        sql_query_string = ('SELECT invalid_column FROM streets;'
+                            'SELECT name FROM streets LIMIT 3')
+        self._execute_sql(sql_query_string)
+        self.assertEqual(self.tab.result_tabs.count(), 0)
+        self.assertIn('Statement 1', self.tab.errors_panel.toPlainText())
+
+        self.ui.do_stop_script_on_error.setChecked(False)
+        self._execute_sql(sql_query_string)
+        self.assertEqual(self.tab.result_tabs.count(), 1)
+        self.assertTrue(self.tab.errors_panel.isVisible())
+        self.assertEqual(self.tab.table.table_data.number_layer_rows, 3)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_run_query_with_parameters(self):
+        """Run query template for every parameter set into one table."""
+        from params_dialog import ParametersDialog
+        self.tab = self._add_new_query_tab()
+        self.tab.gdb = self.local_gdb
+        self.tab.query.setPlainText(
+            'SELECT OBJECTID, Name FROM streets '
+            'WHERE OBJECTID >= :low AND OBJECTID < :high')
+        dialog = ParametersDialog(['low', 'high'])
+        dialog.set_parameter_sets([{'low': '1', 'high': '3'},
+                                   {'low': '10', 'high': '13'},
+                                   {'low': '', 'high': ''}])
+        parameter_sets = dialog.get_parameter_sets()
+        self.assertEqual(len(parameter_sets), 2)
+
+        self.tab.run_query_batch(parameter_sets)
+        table_data = self.tab.table.table_data
+        self.assertEqual(table_data.headers[:2], ['param_low', 'param_high'])
+        self.assertEqual(table_data.number_layer_rows, 5)
+        self.assertEqual(
+            table_data.data(table_data.index(4, 0), Qt.DisplayRole), '10')
+        report = self.tab.result_tabs.tabToolTip(0)
+        self.assertIn('low=10, high=13:', report)
+        self.assertIn('3 rows', report)
+        self.assertFalse(self.tab.errors_panel.isVisible())
+        return
+
+    # ----------------------------------------------------------------------
+    def test_run_query_with_parameter_kinds(self):
+        """Put values by parameter kind and record the Auto timings."""
+        from params_dialog import ParametersDialog
+        self.tab = self._add_new_query_tab()
+        self.tab.gdb = self.local_gdb
+        self.tab.gdb_sql_dialect_combobox.setCurrentText(auto_dialect_name)
+        self.tab.query.setPlainText(
+            'SELECT OBJECTID FROM streets WHERE OBJECTID < :high')
+        dialog = ParametersDialog(['high'])
+        dialog.set_parameter_kinds({'high': 'number'})
+        self.assertEqual(dialog.get_parameter_kinds(), {'high': 'number'})
+
+        self.tab.run_query_batch([{'high': '3'}, {'high': 'x'}],
+                                 dialog.get_parameter_kinds())
+        self.assertEqual(self.tab.table.table_data.number_layer_rows, 2)
+        self.assertIn("'x' is not a number",
+                      self.tab.errors_panel.toPlainText())
+        self.assertTrue(os.path.exists(get_dialect_timings_path()))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_execute_federated_query(self):
+        """Join datasets of geodatabases attached under schema aliases."""
+        self.tab = self._add_new_query_tab()
+        session = FederatedSession()
+        session.attach('DB1', 'NYC.gdb')
+        session.attach('DB2', 'NYC.gdb')
+        self.assertIn('DB2.homicides', session.get_items())
+
+        self.tab.gdb = session
+        self.tab.query.setPlainText(
+            "SELECT Name FROM DB1.streets WHERE streets.Name IN "
+            "(SELECT Name FROM DB2.streets) "
+            "AND streets.Type = 'residential' LIMIT 10")
+        self.tab.run_query()
+        self.assertEqual(self.tab.table.table_data.number_layer_rows, 10)
+        layers = session.last_query.layers
+        self.assertEqual([l.filters for l in layers],
+                         [["Type = 'residential'"], []])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_federated_script_results(self):
+        """Keep results of every statement of a federated script open."""
+        self.tab = self._add_new_query_tab()
+        session = FederatedSession()
+        session.attach('DB1', 'NYC.gdb')
+        self.tab.gdb = session
+        self.tab.query.setPlainText(
+            'SELECT Name FROM DB1.streets; SELECT Name FROM DB1.streets;')
+        for _i in range(2):
+            self.tab.run_query()
+            self.assertEqual(len(session.result_sets), 2)
+        # rows of the first result are fetched after the second query
+        first = self.tab.result_tabs.widget(0).table_data
+        rows_fetched = len(first.rows)
+        first.fetchMore(QModelIndex())
+        self.assertGreater(len(first.rows), rows_fetched)
+        session.close_connection()
+        self.assertEqual(session.result_sets, [])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_spatial_filter_pushdown(self):
+        """Use spatial index for bounding box predicates; same result set."""
+        self.tab = self._add_new_query_tab()
+        predicate = ('ST_Intersects(Shape, '
+                     'BuildMbr(583000, 4506000, 586000, 4509000))')
+        self._execute_sql(
+            'SELECT Name FROM streets WHERE {0}'.format(predicate))
+        rows_with_index = self.tab.table.table_data.number_layer_rows
+        self.assertIn('spatial index on streets', self.tab.table.status_message)
+
+        # a top-level OR prevents using the spatial filter
+        self._execute_sql(
+            'SELECT Name FROM streets WHERE {0} OR 0'.format(predicate))
+        self.assertNotIn('spatial index', self.tab.table.status_message)
+        self.assertEqual(self.tab.table.table_data.number_layer_rows,
+                         rows_with_index)
+        self.assertGreater(rows_with_index, 0)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_simple_query_fast_path(self):
+        """Serve simple queries from the layer; same result as the SQL."""
+        self.tab = self._add_new_query_tab()
+        self.tab.gdb_sql_dialect_combobox.setCurrentText('OGRSQL')
+        self._execute_sql(
+            "SELECT Name, Type FROM streets WHERE Oneway = 'yes'")
+        self.assertIn('attribute filter on streets',
+                      self.tab.table.status_message)
+        self.assertEqual(self.tab.table.table_data.headers, ['NAME', 'TYPE'])
+        rows_fast_path = self.tab.table.table_data.number_layer_rows
+        self.assertGreater(rows_fast_path, 0)
+
+        # string concatenation is not supported by attribute filters
+        self._execute_sql(
+            "SELECT Name, Type FROM streets WHERE Oneway || '' = 'yes'")
+        self.assertNotIn('attribute filter', self.tab.table.status_message)
+        self.assertEqual(self.tab.table.table_data.number_layer_rows,
+                         rows_fast_path)
+
+        # SQLite compares strings by its own rules; numbers are the same
+        self.tab.gdb_sql_dialect_combobox.setCurrentText('SQLite')
+        self._execute_sql(
+            "SELECT Name, Type FROM streets WHERE Oneway = 'yes'")
+        self.assertNotIn('attribute filter', self.tab.table.status_message)
+        self.assertEqual(self.tab.table.table_data.number_layer_rows,
+                         rows_fast_path)
+        self._execute_sql(
+            'SELECT Name, Type FROM streets WHERE Shape_Length < 100')
+        self.assertIn('attribute filter on streets',
+                      self.tab.table.status_message)
+        self.assertGreater(self.tab.table.table_data.number_layer_rows, 0)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_fast_path_sources_closed(self):
+        """Close data sources of the previous results on running again."""
+        self.tab = self._add_new_query_tab()
+        self.tab.gdb = Geodatabase('NYC.gdb')
+        self.tab.gdb_sql_dialect_combobox.setCurrentText('OGRSQL')
+        self.tab.query.setPlainText(
+            "SELECT Name FROM streets WHERE Oneway = 'yes'")
+        for _i in range(3):
+            self.tab.run_query()
+            self.assertIn('attribute filter', self.tab.table.status_message)
+        # only the data source of the shown result is kept open
+        self.assertEqual(len(self.tab.gdb.extra_sources), 1)
+        self.assertEqual(len(self.tab.gdb.result_sets), 1)
+        self.tab.gdb.close_connection()
+        return
+
+    # ----------------------------------------------------------------------
+    def test_query_timing_breakdown(self):
+        """Record time of every phase of executing and drawing a query."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT * FROM homicides LIMIT 5')
+        self.assertEqual(
+            list(self.tab.table.timer.phases), [
+                'strip', 'execute', 'count', 'first_fetch', 'render',
+                'column_sizing'
+            ])
+        self.assertEqual(len(self.tab.table.table_data.rows), 5)
+        self.assertIn('column_sizing:', self.tab.table.timing_breakdown)
+
+        # the script is stripped once; its time is not counted twice
+        self._execute_sql(
+            'SELECT * FROM homicides LIMIT 5; SELECT * FROM streets LIMIT 5')
+        self.assertIn('strip', self.tab.result_tabs.widget(0).timer.phases)
+        self.assertNotIn('strip',
+                         self.tab.result_tabs.widget(1).timer.phases)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_profile_next_query(self):
+        """Profile the next query only and save the profile files."""
+        self.tab = self._add_new_query_tab()
+        self.ui.do_profile_next_query.setChecked(True)
+        self._execute_sql('SELECT * FROM homicides LIMIT 5')
+        self.assertFalse(self.ui.do_profile_next_query.isChecked())
+        # the profile is saved into the user data folder of the test
+        self.assertTrue(
+            self.tab.profile_folder.startswith(cfg.user_data_dir))
+        for name in ('profile.pstats', 'query.sql', 'summary.txt'):
+            self.assertTrue(
+                os.path.exists(os.path.join(self.tab.profile_folder, name)))
+        with open(os.path.join(self.tab.profile_folder, 'summary.txt')) as f:
+            self.assertIn('ResultTableModel.fetchMore', f.read())
+        return
+
+    # ----------------------------------------------------------------------
+    def test_query_history_rerun(self):
+        """Record executed queries and run a query from the history."""
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT * FROM homicides LIMIT 7')
+        # the history of the tests is kept out of the user history
+        self.assertTrue(
+            self.ui.query_history.path.startswith(cfg.user_data_dir))
+        entry = self.ui.query_history.search('homicides')[0]
+        self.assertEqual(entry.sql, 'SELECT * FROM homicides LIMIT 7')
+        self.assertEqual(entry.rows, 7)
+        self.assertIn('execute', entry.phases)
+
+        self._execute_sql('SELECT * FROM streets LIMIT 3')
+        self.ui.rerun_query(entry.sql, self.local_gdb.path)
+        self.assertEqual(self.tab.table.table_data.number_layer_rows, 7)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_spill_result_rows_over_memory_budget(self):
+        """Spill rows of the tables not viewed; reload them when viewed."""
+        self.ui.result_memory.budget_bytes = 1
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT * FROM streets LIMIT 300; '
+                          'SELECT * FROM homicides LIMIT 5;')
+        first = self.tab.result_tabs.widget(0)
+        second = self.tab.result_tabs.widget(1)
+        self.assertFalse(first.is_spilled)
+        self.assertTrue(second.is_spilled)
+        self.assertEqual(second.table_data.rowCount(), 0)
+
+        self.tab.result_tabs.setCurrentIndex(1)
+        self.assertTrue(first.is_spilled)
+        self.assertEqual(second.table_data.rowCount(), 5)
+
+        # the layer of the first table is re-opened to fetch more rows
+        self.tab.result_tabs.setCurrentIndex(0)
+        self.assertEqual(first.table_data.rowCount(), 200)
+        first.load_all_rows()
+        self.assertEqual(first.table_data.rowCount(), 300)
+        self.assertEqual(
+            len({row.OBJECTID for row in first.table_data.rows}), 300)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_close_tab_untracks_result_tables(self):
+        """Stop tracking the result tables of a closed tab."""
+        self.ui.result_memory.budget_bytes = 1
+        self.tab = self._add_new_query_tab()
+        self._execute_sql('SELECT * FROM streets LIMIT 300; '
+                          'SELECT * FROM homicides LIMIT 5;')
+        spilled = self.tab.result_tabs.widget(1)
+        spill_path = spilled.table_data.spill_path
+        self.assertTrue(os.path.exists(spill_path))
+        self.assertEqual(len(self.ui.result_memory.tables), 2)
+
+        self.ui.tab_widget.remove_tab(self.ui.tab_widget.indexOf(self.tab))
+        self.assertEqual(self.ui.result_memory.tables, {})
+        self.assertEqual(self.ui.result_memory.total_size, 0)
+        self.assertFalse(os.path.exists(spill_path))
+        return
+
     # ----------------------------------------------------------------------
     def _prepare_query_text(self, sql_query):
         """Put SQL query string into a tab."""
@@ -0,0 +1,88 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for reading the export output page by page."""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from paged_file import PagedTextFile
+
+
+########################################################################
+class TestPagedTextFile(unittest.TestCase):
+    """Test reading, searching and copying the text of a file."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Write a text file with lines of several lengths."""
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'export.txt')
+        self.lines = [
+            'POINT ({0} {1}) ÿ'.format(i, 'x' * (i % 7)) for i in range(500)
+        ]
+        self.text = '\n'.join(self.lines)
+        with io.open(self.path, 'w', encoding='utf-8', newline='') as f:
+            f.write(self.text)
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove the text file."""
+        shutil.rmtree(self.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_pages_end_with_whole_lines(self):
+        """Read the pages one by one until the end of the file."""
+        paged = PagedTextFile(self.path, page_size=100)
+        pages = []
+        while not paged.at_end:
+            pages.append(paged.read_next_page())
+        self.assertGreater(len(pages), 10)
+        self.assertTrue(all(page.endswith('\n') for page in pages[:-1]))
+        self.assertEqual(''.join(pages), self.text)
+        self.assertEqual(paged.read_next_page(), '')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_find(self):
+        """Find text after an offset ignoring case."""
+        paged = PagedTextFile(self.path, page_size=64)
+        data = self.text.encode('utf-8')
+        offset = paged.find('point (250 ')
+        self.assertEqual(offset, data.find(b'POINT (250 '))
+        self.assertEqual(paged.find('POINT (250 ', offset + 1), -1)
+        self.assertEqual(paged.find('point (250 ', match_case=True), -1)
+        self.assertEqual(paged.find('POINT (1', 10), data.find(b'POINT (1'))
+        self.assertEqual(paged.find('LINESTRING'), -1)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_find_across_blocks(self):
+        """Find text spanning the end of a block."""
+        paged = PagedTextFile(self.path, page_size=10)
+        needle = '\n'.join(self.lines[100:103])
+        self.assertEqual(
+            paged.find(needle), self.text.encode('utf-8').find(
+                needle.encode('utf-8')))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_iter_text(self):
+        """Iterate the text in blocks splitting multibyte characters."""
+        paged = PagedTextFile(self.path, page_size=7)
+        self.assertEqual(''.join(paged.iter_text()), self.text)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the shapes drawn by the map preview."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from preview_shapes import (LINE, POINT, POLYGON, get_shape_distance,
+                            parse_wkt, simplify_part)
+
+
+########################################################################
+class TestPreviewShapes(unittest.TestCase):
+    """Test parsing, simplifying and clicking the shapes."""
+
+    # ----------------------------------------------------------------------
+    def test_parse_wkt(self):
+        """Parse points, lines and polygons with holes."""
+        shape = parse_wkt('POINT Z (1 2 3)')
+        self.assertEqual(shape.kind, POINT)
+        self.assertEqual(shape.parts, [[(1, 2)]])
+
+        shape = parse_wkt('MULTIPOINT ((1 2), (3 4))')
+        self.assertEqual(shape.parts, [[(1, 2)], [(3, 4)]])
+        self.assertEqual(shape.bbox, (1, 2, 3, 4))
+
+        shape = parse_wkt('MULTILINESTRING ((0 0, 1 1), (2 2, 3 -1))')
+        self.assertEqual(shape.kind, LINE)
+        self.assertEqual(shape.bbox, (0, -1, 3, 2))
+
+        shape = parse_wkt('MULTIPOLYGON (((0 0, 10 0, 10 10, 0 10, 0 0), '
+                          '(4 4, 6 4, 6 6, 4 6, 4 4)))')
+        self.assertEqual(shape.kind, POLYGON)
+        self.assertEqual(len(shape.parts), 2)
+
+        self.assertIsNone(parse_wkt('POLYGON EMPTY'))
+        self.assertIsNone(parse_wkt(None))
+        self.assertIsNone(parse_wkt('Broadway'))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_simplify_part(self):
+        """Drop vertices closer than the tolerance keeping the ends."""
+        coords = [(0, 0), (0.1, 0), (0.2, 0.1), (1, 0), (1.05, 0), (2, 0)]
+        self.assertEqual(
+            simplify_part(coords, 0.5), [(0, 0), (1, 0), (2, 0)])
+        self.assertEqual(simplify_part(coords, 0), coords)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_get_shape_distance(self):
+        """Measure distance to lines and to polygons with holes."""
+        polygon = parse_wkt('POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0), '
+                            '(4 4, 6 4, 6 6, 4 6, 4 4))')
+        self.assertEqual(get_shape_distance(polygon, 2, 2), 0)
+        self.assertEqual(get_shape_distance(polygon, 5, 5), 1)
+        self.assertEqual(get_shape_distance(polygon, 12, 5), 2)
+
+        line = parse_wkt('LINESTRING (0 0, 10 0)')
+        self.assertEqual(get_shape_distance(line, 5, 0.5), 0.5)
+        self.assertEqual(get_shape_distance(line, 13, 4), 5)
+        self.assertEqual(
+            get_shape_distance(parse_wkt('MULTIPOINT (1 1, 5 1)'), 4, 1), 1)
+        return
+
+if __name__ == '__main__':
+    unittest.main()
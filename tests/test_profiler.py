@@ -0,0 +1,82 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the query profiler."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from profiler import QueryProfiler
+
+
+########################################################################
+class RowsModel(object):
+    """Model stand-in with methods to count the calls of."""
+
+    # ----------------------------------------------------------------------
+    def data(self, row):
+        """Get value of the row."""
+        return row * 2
+
+    # ----------------------------------------------------------------------
+    def fetchMore(self):  # noqa: N802
+        """Fetch nothing."""
+        return
+
+
+########################################################################
+class TestQueryProfiler(unittest.TestCase):
+    """Test profiling the query and counting calls of model methods."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Create folder for the profiles."""
+        self.folder = tempfile.mkdtemp()
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove folder with the profiles."""
+        shutil.rmtree(self.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_count_calls(self):
+        """Count calls while profiling and restore the methods after."""
+        original = RowsModel.data
+        model = RowsModel()
+        with QueryProfiler([(RowsModel, 'data'),
+                            (RowsModel, 'fetchMore')]) as profiler:
+            self.assertEqual([model.data(i) for i in range(3)], [0, 2, 4])
+        model.data(4)
+        self.assertIs(RowsModel.data, original)
+        self.assertEqual(profiler.call_counts['RowsModel.data'], 3)
+        self.assertEqual(profiler.call_counts['RowsModel.fetchMore'], 0)
+        self.assertIn('RowsModel.data: 3 calls', profiler.get_summary())
+        return
+
+    # ----------------------------------------------------------------------
+    def test_save(self):
+        """Save profile, query text and summary into the folder."""
+        with QueryProfiler() as profiler:
+            sorted(range(1000), reverse=True)
+        folder = profiler.save('SELECT 1', os.path.join(self.folder, 'p'))
+        self.assertEqual(
+            sorted(os.listdir(folder)),
+            ['profile.pstats', 'query.sql', 'summary.txt'])
+        with open(os.path.join(folder, 'query.sql')) as f:
+            self.assertEqual(f.read(), 'SELECT 1')
+        with open(os.path.join(folder, 'summary.txt')) as f:
+            self.assertIn('Top 30 functions by cumulative time', f.read())
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
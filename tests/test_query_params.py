@@ -0,0 +1,120 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the named parameters of query templates."""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from query_params import (BatchRun, bind_parameters, find_parameters,
+                          format_batch_report, format_literal,
+                          read_parameter_sets)
+
+
+########################################################################
+class TestQueryParams(unittest.TestCase):
+    """Test finding, binding and reading the parameters."""
+
+    # ----------------------------------------------------------------------
+    def test_find_parameters(self):
+        """Find parameters outside strings and comments in order."""
+        sql_query = ("SELECT ':skip' FROM streets WHERE type = :type "
+                     'AND oneway = :oneway OR type = :type -- :skip')
+        self.assertEqual(find_parameters(sql_query), ['type', 'oneway'])
+        self.assertEqual(find_parameters('SELECT 1'), [])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_format_literal(self):
+        """Format numbers as numbers and other values as strings."""
+        self.assertEqual(format_literal(None), 'NULL')
+        self.assertEqual(format_literal(5), '5')
+        self.assertEqual(format_literal(1.5), '1.5')
+        self.assertEqual(format_literal('42'), '42')
+        self.assertEqual(format_literal('-3'), '(-3)')
+        self.assertEqual(format_literal('007'), "'007'")
+        self.assertEqual(format_literal("O'Neil"), "'O''Neil'")
+        self.assertEqual(format_literal(True), '1')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_format_literal_kinds(self):
+        """Format values as text or numbers by the parameter kind."""
+        self.assertEqual(format_literal('10001', 'text'), "'10001'")
+        self.assertEqual(format_literal(5, 'text'), "'5'")
+        self.assertEqual(format_literal('-3', 'number'), '(-3)')
+        self.assertEqual(format_literal(None, 'text'), 'NULL')
+        with self.assertRaises(ValueError):
+            format_literal('007', 'number')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_bind_parameters(self):
+        """Replace parameters with the literals of the values."""
+        sql_query = ("SELECT name, ':name' FROM streets "
+                     'WHERE name = :name AND id < :id_max')
+        self.assertEqual(
+            bind_parameters(sql_query, {
+                'name': "x' OR 1=1 --",
+                'id_max': '10'
+            }), "SELECT name, ':name' FROM streets "
+            "WHERE name = 'x'' OR 1=1 --' AND id < 10")
+        with self.assertRaises(ValueError):
+            bind_parameters(sql_query, {'name': 'x'})
+        self.assertEqual(bind_parameters('SELECT 1', {}), 'SELECT 1')
+
+        values = {'name': '10001', 'id_max': '10'}
+        self.assertEqual(
+            bind_parameters(sql_query, values, {'name': 'text'}),
+            "SELECT name, ':name' FROM streets "
+            "WHERE name = '10001' AND id < 10")
+        with self.assertRaisesRegex(ValueError, ':name'):
+            bind_parameters(sql_query, {'name': 'x', 'id_max': '10'},
+                            {'name': 'number'})
+        return
+
+    # ----------------------------------------------------------------------
+    def test_read_parameter_sets(self):
+        """Read parameter sets from the columns of a csv file."""
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'params.csv')
+            with io.open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write('\ufeffboro,extra,type\nManhattan,1,ST\n'
+                        'Bronx,2,"AVE, E"\n')
+            sets = read_parameter_sets(path, ['type', 'boro'])
+            self.assertEqual([list(s.items()) for s in sets],
+                             [[('type', 'ST'), ('boro', 'Manhattan')],
+                              [('type', 'AVE, E'), ('boro', 'Bronx')]])
+            with self.assertRaises(ValueError):
+                read_parameter_sets(path, ['zip'])
+        finally:
+            shutil.rmtree(folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_format_batch_report(self):
+        """Report timings and errors of every run."""
+        runs = [
+            BatchRun({'type': 'ST'}, 12, None, 0.5, 0.25),
+            BatchRun({'type': 'AVE'}, 0, 'no such column', 0.0, 0.0),
+        ]
+        report = format_batch_report(runs, 1.0).split('\n')
+        self.assertEqual(report[0],
+                         'Executed with 2 parameter sets in 1.0 secs')
+        self.assertEqual(
+            report[1], 'type=ST: 0.5 secs execute | 0.2 secs fetch | 12 rows')
+        self.assertEqual(report[2], 'type=AVE: failed: no such column')
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
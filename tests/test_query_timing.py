@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the timing of the query phases."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from query_timing import (QueryTimer, append_timing_record,
+                          load_timing_records, summarize_timing_records)
+
+
+########################################################################
+class TestQueryTiming(unittest.TestCase):
+    """Test recording, logging and aggregating the phase timings."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Create folder for the timings log."""
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'logs', 'timings.jsonl')
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove folder with the timings log."""
+        shutil.rmtree(self.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_measure_phases(self):
+        """Measure phases keeping their order in the breakdown."""
+        timer = QueryTimer()
+        timer.add('count', 0.5)
+        with timer.measure('execute'):
+            pass
+        timer.add('count', 0.25)
+        self.assertEqual(timer.phases['count'], 0.75)
+        self.assertGreaterEqual(timer.total, 0.75)
+        lines = timer.format_breakdown().splitlines()
+        self.assertTrue(lines[0].startswith('execute: '))
+        self.assertEqual(lines[1], 'count: 750.0 ms')
+        self.assertTrue(lines[-1].startswith('total: '))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_log_and_summarize(self):
+        """Append records to the log and aggregate them per phase."""
+        for secs in (0.1, 0.3):
+            timer = QueryTimer()
+            timer.add('execute', secs)
+            timer.add('render', 0.01)
+            append_timing_record(
+                timer.to_record(sql='select 1', rows=1), self.path)
+        with open(self.path, 'a') as f:
+            f.write('not json\n')
+
+        records = load_timing_records(self.path)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['sql'], 'select 1')
+        self.assertEqual(records[1]['phases']['execute'], 300.0)
+
+        summary = summarize_timing_records(records)
+        self.assertEqual(list(summary), ['execute', 'render'])
+        self.assertEqual(summary['execute']['count'], 2)
+        self.assertAlmostEqual(summary['execute']['mean'], 200.0)
+        self.assertEqual(summary['execute']['max'], 300.0)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the memory budget of the result tables."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from result_cache import (ResultMemoryManager, estimate_rows_size,
+                          load_rows, skip_features, spill_rows)
+
+
+########################################################################
+class Record(object):
+    """Row stand-in with the values as attributes."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, **kwargs):
+        """Initialize Record with the values."""
+        self.__dict__.update(kwargs)
+
+
+########################################################################
+class SizedTable(object):
+    """Result table stand-in taking the given amount of memory."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, size):
+        """Initialize SizedTable with its memory size."""
+        self.size = size
+        self.is_spilled = False
+        self.reloads = 0
+        self.measures = 0
+
+    # ----------------------------------------------------------------------
+    def memory_size(self):
+        """Get memory size; nothing once spilled."""
+        self.measures += 1
+        return 0 if self.is_spilled else self.size
+
+    # ----------------------------------------------------------------------
+    def spill(self, folder):
+        """Mark the table as spilled."""
+        self.is_spilled = True
+
+    # ----------------------------------------------------------------------
+    def reload(self):
+        """Mark the table as loaded."""
+        self.is_spilled = False
+        self.reloads += 1
+
+    # ----------------------------------------------------------------------
+    def discard_spilled_rows(self):
+        """Forget the spilled rows."""
+        self.is_spilled = False
+
+
+########################################################################
+class FeaturesCursor(object):
+    """Layer stand-in which cannot move the cursor to a feature index."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, count):
+        """Initialize FeaturesCursor with the number of features."""
+        self.count = count
+        self.position = 0
+
+    # ----------------------------------------------------------------------
+    def ResetReading(self):  # noqa: N802
+        """Move the cursor to the first feature."""
+        self.position = 0
+
+    # ----------------------------------------------------------------------
+    def SetNextByIndex(self, index):  # noqa: N802
+        """Fail as OGR drivers without random reading do."""
+        return 6
+
+    # ----------------------------------------------------------------------
+    def GetNextFeature(self):  # noqa: N802
+        """Get index of the next feature; None when exhausted."""
+        if self.position >= self.count:
+            return None
+        self.position += 1
+        return self.position - 1
+
+
+########################################################################
+class TestResultCache(unittest.TestCase):
+    """Test spilling the rows of the least recently viewed tables."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Create folder for the spilled rows."""
+        self.folder = tempfile.mkdtemp()
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove folder with the spilled rows."""
+        shutil.rmtree(self.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_spill_and_load_rows(self):
+        """Write values of the columns and read them back."""
+        rows = [Record(NAME='Broadway', ID=i, SHAPE=None) for i in range(500)]
+        self.assertGreater(estimate_rows_size(rows), 500 * 100)
+        self.assertEqual(estimate_rows_size([]), 0)
+
+        path = spill_rows(rows, ['ID', 'NAME'], self.folder)
+        headers, values = load_rows(path)
+        self.assertEqual(headers, ['ID', 'NAME'])
+        self.assertEqual(len(values), 500)
+        self.assertEqual(values[7], (7, 'Broadway'))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_skip_features(self):
+        """Skip features one by one if the driver cannot seek."""
+        layer = FeaturesCursor(10)
+        skip_features(layer, 4)
+        self.assertEqual(layer.GetNextFeature(), 4)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_spill_least_recently_viewed(self):
+        """Spill the least recently viewed tables when over budget."""
+        manager = ResultMemoryManager(budget_bytes=250)
+        first, second, third = SizedTable(100), SizedTable(100), SizedTable(
+            100)
+        manager.touch(first)
+        manager.touch(second)
+        manager.touch(first)
+        self.assertEqual(manager.total_size, 200)
+
+        manager.touch(third)
+        self.assertTrue(second.is_spilled)
+        self.assertFalse(first.is_spilled or third.is_spilled)
+        self.assertTrue(os.path.isdir(manager.folder))
+
+        # viewing a spilled table reloads it and spills another one
+        manager.touch(second)
+        self.assertEqual(second.reloads, 1)
+        self.assertTrue(first.is_spilled)
+        self.assertEqual(manager.total_size, 200)
+
+        # the viewed table is kept even if it alone exceeds the budget
+        manager.remove(first)
+        huge = SizedTable(1000)
+        manager.touch(huge)
+        self.assertFalse(huge.is_spilled)
+        self.assertTrue(second.is_spilled and third.is_spilled)
+
+        manager.cleanup()
+        self.assertIsNone(manager.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_update_running_total(self):
+        """Measure only the table fetching rows; spill only over budget."""
+        manager = ResultMemoryManager(budget_bytes=250)
+        first, second = SizedTable(100), SizedTable(50)
+        manager.touch(first)
+        manager.touch(second)
+        first.measures = second.measures = 0
+
+        second.size = 100
+        self.assertEqual(manager.update(second), [])
+        self.assertEqual(manager.total_size, 200)
+        self.assertEqual((first.measures, second.measures), (0, 1))
+
+        second.size = 200
+        self.assertEqual(manager.update(second), [first])
+        self.assertEqual(manager.total_size, 200)
+
+        # tables no longer tracked are not measured
+        manager.remove(second)
+        self.assertEqual(manager.total_size, 0)
+        self.assertEqual(manager.update(second), [])
+        self.assertEqual(manager.total_size, 0)
+        manager.cleanup()
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
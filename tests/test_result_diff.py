@@ -0,0 +1,138 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for comparing result sets by the hashes of their rows."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from result_diff import (ADDED, CHANGED, REMOVED, DiffInterrupted,
+                         diff_rows, get_common_columns, hash_row,
+                         iter_interruptible)
+
+
+########################################################################
+class TestResultDiff(unittest.TestCase):
+    """Test comparing rows with and without a key column."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Prepare rows before and after a data refresh."""
+        self.old_rows = [(i, 'street {0}'.format(i), i * 1.5)
+                         for i in range(1000)]
+        self.new_rows = list(self.old_rows)
+        # rows 10 and 11 removed, row 20 changed and two rows added
+        del self.new_rows[10:12]
+        self.new_rows[18] = (20, 'renamed', 30.0)
+        self.new_rows.extend([(1000, 'new', 0.0), (1001, 'new', 0.0)])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_hash_row(self):
+        """Hash rows with values of several types."""
+        self.assertEqual(hash_row((1, 'a', None)), hash_row([1, 'a', None]))
+        self.assertNotEqual(hash_row((1, 'a')), hash_row(('1', 'a')))
+        self.assertNotEqual(hash_row((1, 'a')), hash_row((1, 'a', None)))
+        self.assertEqual(hash_row((1, [2, 3])), hash_row((1, [2, 3])))
+        self.assertNotEqual(hash_row((1, [2, 3])), hash_row((1, [3, 2])))
+        self.assertNotEqual(hash_row((1, 'ab', 'c')), hash_row((1, 'a', 'bc')))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_hash_row_equal_builtin_hashes(self):
+        """Tell apart values with the same built-in hash; equal NaNs."""
+        self.assertNotEqual(hash_row((-1, )), hash_row((-2, )))
+        self.assertNotEqual(hash_row((1, )), hash_row((1.0, )))
+        self.assertNotEqual(hash_row((1, )), hash_row((True, )))
+        self.assertEqual(hash_row((float('nan'), )), hash_row((float('nan'), )))
+
+        diff = diff_rows([(1, -1)], [(1, -2)], key_index=0)
+        self.assertEqual((diff.changed, diff.unchanged), (1, 0))
+        diff = diff_rows([(1, -1)], [(1, -2)])
+        self.assertEqual((diff.added, diff.removed, diff.unchanged), (1, 1, 0))
+        diff = diff_rows([(1, 1)], [(1, 1.0)], key_index=0)
+        self.assertEqual(diff.changed, 1)
+        diff = diff_rows([(1, float('nan'))], [(1, float('nan'))], key_index=0)
+        self.assertEqual((diff.changed, diff.unchanged), (0, 1))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_diff_keyed(self):
+        """Compare rows with the same key."""
+        diff = diff_rows(iter(self.old_rows), iter(self.new_rows), 0)
+        self.assertEqual(
+            (diff.added, diff.removed, diff.changed, diff.unchanged),
+            (2, 2, 1, 997))
+        self.assertEqual(diff.samples[ADDED], [1000, 1001])
+        self.assertEqual(diff.samples[REMOVED], [10, 11])
+        self.assertEqual(diff.samples[CHANGED], [20])
+        self.assertEqual(diff.duplicate_keys, 0)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_diff_unkeyed(self):
+        """Compare rows as a whole; a changed row is removed and added."""
+        diff = diff_rows(iter(self.old_rows), iter(self.new_rows))
+        self.assertEqual(
+            (diff.added, diff.removed, diff.changed, diff.unchanged),
+            (3, 3, 0, 997))
+        self.assertEqual(diff.samples, {})
+        return
+
+    # ----------------------------------------------------------------------
+    def test_diff_unkeyed_repeated_rows(self):
+        """Count rows repeated a different number of times."""
+        diff = diff_rows([(1, ), (1, ), (2, )], [(1, ), (2, ), (2, )])
+        self.assertEqual((diff.added, diff.removed, diff.unchanged),
+                         (1, 1, 2))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_diff_duplicate_keys(self):
+        """Count rows with keys repeated within a result set."""
+        diff = diff_rows([(1, 'a'), (1, 'b')], [(1, 'b'), (1, 'c')], 0)
+        self.assertEqual(diff.duplicate_keys, 2)
+        self.assertEqual((diff.changed, diff.unchanged), (0, 1))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_max_samples(self):
+        """Limit the number of keys listed."""
+        diff = diff_rows([], [(i, ) for i in range(50)], 0, max_samples=5)
+        self.assertEqual(diff.added, 50)
+        self.assertEqual(diff.samples[ADDED], list(range(5)))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_get_common_columns(self):
+        """Get the columns of both result sets."""
+        self.assertEqual(
+            get_common_columns(['ID', 'NAME', 'Shape'], ['NAME', 'ID']),
+            ['ID', 'NAME'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_interrupted(self):
+        """Stop reading the rows before the batch after an interruption."""
+        self.assertEqual(
+            list(iter_interruptible(self.old_rows, lambda: False, 300)),
+            self.old_rows)
+
+        read = []
+        rows = (read.append(row) or row for row in self.old_rows)
+        checks = []
+        with self.assertRaises(DiffInterrupted):
+            diff_rows(
+                iter_interruptible(rows, lambda: checks.append(1) or
+                                   len(checks) > 2, 300), self.new_rows)
+        self.assertEqual(len(read), 600)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the stores of the fetched rows."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from row_store import (ARROW_STORE, ArrowRowStore, InMemoryRowStore, Row,
+                       make_row_store, pyarrow_found)
+
+HEADERS = ['ID', 'NAME', 'VALUE']
+
+
+# ----------------------------------------------------------------------
+def make_rows(count):
+    """Create rows; the values of the VALUE column are of mixed types."""
+    return [
+        Row(ID=i, NAME='street {0}'.format(i),
+            VALUE=i if i % 2 else 'n/a') for i in range(count)
+    ]
+
+
+########################################################################
+class TestRowStore(unittest.TestCase):
+    """Test reading rows and cell values from the stores."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Create folder for the Arrow files."""
+        self.folder = tempfile.mkdtemp()
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove folder for the Arrow files."""
+        shutil.rmtree(self.folder)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_in_memory_store(self):
+        """Keep rows as Python objects."""
+        store = InMemoryRowStore(HEADERS)
+        store.extend(make_rows(5))
+        store.append(Row(ID=5, NAME=None))
+        self.assertEqual(len(store), 6)
+        self.assertEqual(store.get_value(3, 1), 'street 3')
+        self.assertIsNone(store.get_value(5, 2))
+        self.assertEqual([row.ID for row in store], list(range(6)))
+        self.assertGreater(store.memory_size(), 0)
+        return
+
+    # ----------------------------------------------------------------------
+    @unittest.skipUnless(pyarrow_found, 'pyarrow is not installed')
+    def test_arrow_store(self):
+        """Write full batches into files and read values from them."""
+        store = ArrowRowStore(HEADERS, batch_size=10, folder=self.folder)
+        store.extend(make_rows(25))
+        self.assertEqual(len(store), 25)
+        self.assertEqual(len(os.listdir(store.folder)), 2)
+        # only the rows of the batch not written are kept in memory
+        self.assertEqual(len(store.pending), 5)
+
+        self.assertEqual(store.get_value(13, 0), 13)
+        self.assertEqual(store.get_value(13, 2), '13')
+        self.assertEqual(store.get_value(14, 2), 'n/a')
+        self.assertEqual(store.get_value(22, 2), 'n/a')
+        self.assertEqual(store[11].NAME, 'street 11')
+        self.assertEqual(store[-1].ID, 24)
+        self.assertEqual([row.ID for row in store], list(range(25)))
+        with self.assertRaises(IndexError):
+            store[25]
+
+        folder = store.folder
+        store.close()
+        self.assertEqual(len(store), 0)
+        self.assertFalse(os.path.exists(folder))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_make_row_store(self):
+        """Fall back to the in-memory store if pyarrow is not installed."""
+        self.assertIsInstance(make_row_store(HEADERS), InMemoryRowStore)
+        store = make_row_store(HEADERS, ARROW_STORE)
+        self.assertIsInstance(
+            store, ArrowRowStore if pyarrow_found else InMemoryRowStore)
+        store.close()
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
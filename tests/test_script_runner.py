@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the SQL script runner."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from dialect_selector import DialectSelector
+from script_runner import ScriptRunner, get_statements
+
+
+########################################################################
+class StatementsLog(object):
+    """Geodatabase stand-in recording the statements it executes."""
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        """Initialize StatementsLog with an empty log."""
+        self.executed = []
+
+    # ----------------------------------------------------------------------
+    def execute_sql(self, query, dialect='sqlite', include_geometry=True):
+        """Record the statement; statements with `fail` produce an error."""
+        self.executed.append((query, dialect))
+        if 'fail' in query:
+            return None, 'failed: {0}'.format(query)
+        return query, None
+
+
+########################################################################
+class TestScriptRunner(unittest.TestCase):
+    """Test splitting scripts and executing statements in order."""
+
+    # ----------------------------------------------------------------------
+    def test_get_statements(self):
+        """Split script into statements with comments stripped."""
+        script = 'select 1; -- comment only;\n/* x */ select 2 -- two\n'
+        self.assertEqual(get_statements(script), ['select 1', 'select 2'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_stop_on_error(self):
+        """Stop executing statements after the first failing one."""
+        gdb = StatementsLog()
+        runner = ScriptRunner(gdb, 'OGRSQL', stop_on_error=True)
+        results = list(runner.iter_results(['a', 'fail', 'b']))
+        self.assertEqual([r.index for r in results], [1, 2])
+        self.assertEqual(results[0].layer, 'a')
+        self.assertEqual(results[1].errors, 'failed: fail')
+        self.assertEqual(gdb.executed, [('a', 'OGRSQL'), ('fail', 'OGRSQL')])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_continue_on_error(self):
+        """Execute all statements when not stopping on errors."""
+        runner = ScriptRunner(StatementsLog(), stop_on_error=False)
+        results = list(runner.iter_results(['a', 'fail', 'b']))
+        self.assertEqual([r.layer for r in results], ['a', None, 'b'])
+        self.assertTrue(all(r.exec_time >= 0 for r in results))
+        self.assertTrue(all('execute' in r.timer.phases for r in results))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_auto_dialect(self):
+        """Choose dialect of every statement with the Auto dialect."""
+        gdb = StatementsLog()
+        runner = ScriptRunner(
+            gdb, 'Auto', dialect_selector=DialectSelector())
+        results = list(
+            runner.iter_results(
+                ['select st_x(shape) from t', 'select count(*) from t']))
+        self.assertEqual([r.dialect for r in results], ['SQLite', 'OGRSQL'])
+        self.assertEqual([d for _q, d in gdb.executed], ['SQLite', 'OGRSQL'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_auto_dialect_timings(self):
+        """Record time of execution and first fetch with the Auto dialect."""
+        selector = DialectSelector()
+        runner = ScriptRunner(
+            StatementsLog(), 'Auto', dialect_selector=selector)
+        for result in runner.iter_results(['select count(*) from t']):
+            # phase timed by the caller drawing the result
+            result.timer.add('first_fetch', 10.0)
+        timings = list(selector.timings.values())[0]['OGRSQL']
+        self.assertGreaterEqual(timings['ewma'], 10.0)
+
+        # statements served without the dialect are not recorded
+        gdb = StatementsLog()
+        gdb.last_execution_path = 'spatial index on t'
+        selector = DialectSelector()
+        runner = ScriptRunner(gdb, 'Auto', dialect_selector=selector)
+        list(runner.iter_results(['select count(*) from t']))
+        self.assertEqual(selector.timings, {})
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the grid index of the feature bounding boxes."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from spatial_index import MAX_CELLS_PER_ITEM, GridIndex
+
+
+########################################################################
+class TestSpatialIndex(unittest.TestCase):
+    """Test finding boxes intersecting a box."""
+
+    # ----------------------------------------------------------------------
+    def test_query(self):
+        """Find boxes of a 10 by 10 grid of unit squares."""
+        index = GridIndex(cell_size=2.5)
+        for x in range(10):
+            for y in range(10):
+                index.insert((x, y), (x, y, x + 0.5, y + 0.5))
+        self.assertEqual(len(index), 100)
+        self.assertEqual(
+            index.query((2.6, 2.6, 4.2, 3.2)), [(3, 3), (4, 3)])
+        self.assertEqual(index.query((-5, -5, -1, -1)), [])
+        self.assertEqual(len(index.query((-100, -100, 100, 100))), 100)
+        # boxes touching the query box are found
+        self.assertEqual(index.query((9.5, 9.5, 11, 11)), [(9, 9)])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_large_items(self):
+        """Keep boxes spanning many cells out of the cells."""
+        index = GridIndex(cell_size=1)
+        index.insert('small', (0, 0, 1, 1))
+        index.insert('large', (-1000, -1000, 1000, 1000))
+        self.assertEqual(index.large_items, ['large'])
+        self.assertLessEqual(len(index.cells), MAX_CELLS_PER_ITEM)
+        self.assertEqual(index.query((0.5, 0.5, 0.6, 0.6)),
+                         ['large', 'small'])
+        self.assertEqual(index.query((500, 500, 501, 501)), ['large'])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for detecting spatial predicates that can use an index."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from spatial_pushdown import SpatialFilter, find_spatial_filter
+
+
+########################################################################
+class TestSpatialPushdown(unittest.TestCase):
+    """Test finding bounding box predicates of single layer queries."""
+
+    # ----------------------------------------------------------------------
+    def test_bbox_predicates(self):
+        """Find bounding box of predicates with the geometry column."""
+        queries = [
+            'SELECT * FROM parcels WHERE ST_Intersects(Shape, '
+            'BuildMbr(3, 4, 1, 2))',
+            "SELECT p.ID FROM parcels p WHERE p.Type = 'A' AND "
+            'MbrIntersects(BuildMbr(1, 2, 3, 4, 2263), p.Shape) = 1',
+            'SELECT * FROM parcels WHERE ST_EnvIntersects(Shape, 1, 2, 3, 4)',
+            'SELECT * FROM parcels WHERE ST_Contains(BuildMbr(1, 2, 3, 4), '
+            'Shape) LIMIT 10',
+        ]
+        for query in queries:
+            self.assertEqual(
+                find_spatial_filter(query),
+                SpatialFilter('parcels', 'Shape', (1.0, 2.0, 3.0, 4.0)))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_wkt_geometry_bbox(self):
+        """Use the extent of a WKT geometry as the bounding box."""
+        spatial_filter = find_spatial_filter(
+            "SELECT * FROM parcels WHERE ST_Within(Shape, ST_GeomFromText("
+            "'POLYGON((0 0, 10 -5, 10 5, 0 0))'))")
+        self.assertEqual(spatial_filter.bbox, (0.0, -5.0, 10.0, 5.0))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_not_applicable(self):
+        """Ignore predicates which do not limit the result to a bbox."""
+        queries = [
+            'SELECT * FROM parcels WHERE Area > 10 OR '
+            'ST_Intersects(Shape, BuildMbr(1, 2, 3, 4))',
+            'SELECT * FROM parcels a JOIN roads b ON a.ID = b.ID '
+            'WHERE ST_Intersects(a.Shape, BuildMbr(1, 2, 3, 4))',
+            'SELECT * FROM parcels WHERE ST_Within(BuildMbr(1, 2, 3, 4), '
+            'Shape)',
+            'SELECT * FROM parcels WHERE NOT ST_Intersects(Shape, '
+            'BuildMbr(1, 2, 3, 4))',
+            'SELECT * FROM parcels WHERE ST_Intersects(Shape, '
+            'BuildMbr(1, 2, 3, Area))',
+            'SELECT * FROM parcels WHERE ID IN (SELECT ID FROM roads '
+            'WHERE ST_Intersects(Shape, BuildMbr(1, 2, 3, 4)))',
+        ]
+        for query in queries:
+            self.assertIsNone(find_spatial_filter(query))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the SQL parse used by the context-aware completion."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from sql_context import (get_completion_context, get_current_statement,
+                         get_referenced_tables)
+from sql_lexer import tokenize
+
+
+########################################################################
+class TestSqlContext(unittest.TestCase):
+    """Test collecting tables, aliases and the clause at the cursor."""
+
+    # ----------------------------------------------------------------------
+    def test_tables_with_aliases(self):
+        """Collect tables from FROM and JOIN clauses with their aliases."""
+        sql_query = """
+        SELECT Polys.Name, Count(*) AS CrimeCount
+        FROM Homicides AS Points
+        JOIN Neighborhoods Polys ON ST_Contains(Polys.Shape, Points.Shape)
+        """
+        tables = get_referenced_tables(tokenize(sql_query))
+        self.assertEqual(tables['points'], 'Homicides')
+        self.assertEqual(tables['polys'], 'Neighborhoods')
+        self.assertEqual(tables['homicides'], 'Homicides')
+        self.assertNotIn('on', tables)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_comma_separated_tables(self):
+        """Collect tables listed in FROM separated by commas."""
+        sql_query = 'select * from streets s, "census blocks" b where 1'
+        tables = get_referenced_tables(tokenize(sql_query))
+        self.assertEqual(tables['s'], 'streets')
+        self.assertEqual(tables['b'], 'census blocks')
+        self.assertNotIn('where', tables)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_tables_in_comments_are_ignored(self):
+        """Ignore table names mentioned in comments."""
+        sql_query = 'select * -- from streets\nfrom homicides'
+        tables = get_referenced_tables(tokenize(sql_query))
+        self.assertEqual(list(tables.values()), ['homicides'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_current_statement(self):
+        """Get the statement the cursor is placed in."""
+        text = 'select 1 from a; select b. from b; select 3'
+        statement, pos = get_current_statement(text, text.index('b.') + 2)
+        self.assertEqual(statement, ' select b. from b')
+        self.assertEqual(statement[:pos], ' select b.')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_qualified_prefix(self):
+        """Recognize the alias the user types the column name after."""
+        text = 'select p.na from parcels p'
+        context = get_completion_context(text, text.index('na') + 2)
+        self.assertEqual(context.qualifier, 'p')
+        self.assertEqual(context.prefix, 'na')
+        self.assertEqual(context.clause, 'select')
+        self.assertEqual(context.tables['p'], 'parcels')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_clause_at_cursor(self):
+        """Get the clause the cursor is placed in."""
+        text = 'select name from streets where type = 1'
+        context = get_completion_context(text, text.index('stre') + 4)
+        self.assertEqual(context.clause, 'from')
+        self.assertIsNone(context.qualifier)
+        context = get_completion_context(text, len(text))
+        self.assertEqual(context.clause, 'where')
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the SQL lexer."""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from sql_lexer import (tokenize, tokenize_block, strip_comments,
+                       split_statements)
+
+
+########################################################################
+class TestSqlLexer(unittest.TestCase):
+    """Test tokenizing, comment stripping and statement splitting."""
+
+    # ----------------------------------------------------------------------
+    def test_tokenize(self):
+        """Split query into tokens of the right kinds."""
+        tokens = tokenize("select \"my col\", 'it''s' from t -- note\n;")
+        self.assertEqual([t.kind for t in tokens], [
+            'word', 'quoted_identifier', 'punct', 'string', 'word', 'word',
+            'comment', 'separator'
+        ])
+        self.assertEqual(tokens[3].value, "'it''s'")
+        return
+
+    # ----------------------------------------------------------------------
+    def test_tokenize_parameters(self):
+        """Find named parameters outside strings and comments."""
+        tokens = tokenize("select ':no' from t where id = :id_1 -- :no")
+        self.assertEqual([t.value for t in tokens if t.kind == 'parameter'],
+                         [':id_1'])
+        self.assertEqual([t.kind for t in tokenize('a : b')],
+                         ['word', 'punct', 'word'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_strip_comments(self):
+        """Strip comments keeping comment markers inside string literals."""
+        sql_query = """
+        select name --table
+        from streets
+        /*
+        block comment
+        */ where name = '--not a comment' /* inline */ limit 3 """
+        self.assertEqual(
+            strip_comments(sql_query), '\n        select name\n'
+            '        from streets\n'
+            " where name = '--not a comment' limit 3 ")
+        return
+
+    # ----------------------------------------------------------------------
+    def test_strip_comments_keeps_literals(self):
+        """Keep blank lines and trailing spaces within string literals."""
+        self.assertEqual(
+            strip_comments("select 'p\n\nq  ' -- c\n-- d\nfrom t"),
+            "select 'p\n\nq  '\nfrom t")
+        self.assertEqual(
+            strip_comments("select 'a  \n' /* x */ from t"),
+            "select 'a  \n' from t")
+        self.assertEqual(strip_comments('select 1 /* a\nb */ from t'),
+                         'select 1\n from t')
+        self.assertEqual(strip_comments('-- only\n/* comments */'), '')
+        self.assertEqual(strip_comments('select/* x */1'), 'select 1')
+        return
+
+    # ----------------------------------------------------------------------
+    def test_split_statements(self):
+        """Split script on separators outside strings and comments."""
+        script = ("select ';' from a;\n-- only a comment;\n"
+                  "select 2 /* ; */ from b;;  ")
+        statements = split_statements(script)
+        self.assertEqual([s for s, _ in statements], [
+            "select ';' from a", '-- only a comment;\nselect 2 /* ; */ from b'
+        ])
+        self.assertEqual(statements[1][1], script.index('-- only'))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_tokenize_block_comment_state(self):
+        """Carry the open block comment state over the text blocks."""
+        tokens, in_comment = tokenize_block('select 1 /* open')
+        self.assertTrue(in_comment)
+        self.assertEqual(tokens[-1].kind, 'block_comment')
+
+        tokens, in_comment = tokenize_block('still comment', True)
+        self.assertTrue(in_comment)
+        self.assertEqual(len(tokens), 1)
+
+        tokens, in_comment = tokenize_block('end */ from t', True)
+        self.assertFalse(in_comment)
+        self.assertEqual([t.kind for t in tokens],
+                         ['block_comment', 'word', 'word'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_large_script_performance(self):
+        """Strip comments and split a 1 MB script well under a second."""
+        statement = ("SELECT name, 'a -- b; c' AS txt /* block\n comment */\n"
+                     'FROM streets WHERE oneway = 1 -- trailing; comment\n;\n')
+        script = statement * (1024 * 1024 // len(statement) + 1)
+        start_time = time.time()
+        strip_comments(script)
+        statements = split_statements(script)
+        self.assertLess(time.time() - start_time, 1)
+        self.assertEqual(len(statements), script.count('SELECT'))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
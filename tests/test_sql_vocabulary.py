@@ -0,0 +1,42 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the SQL keywords and functions data."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'src',
+    ))
+
+from sql_vocabulary import get_functions, get_keywords
+
+
+########################################################################
+class TestSqlVocabulary(unittest.TestCase):
+    """Test reading keywords and functions once per process."""
+
+    # ----------------------------------------------------------------------
+    def test_keywords(self):
+        """Read unique lowercase keywords."""
+        keywords = get_keywords()
+        self.assertIn('select', keywords)
+        self.assertEqual(len(keywords), len(set(keywords)))
+        self.assertTrue(all(k == k.lower() for k in keywords))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_functions(self):
+        """Read functions regardless of the line endings of the file."""
+        functions = get_functions()
+        self.assertIn('ST_Area', functions)
+        self.assertTrue(all('\r' not in f and f for f in functions))
+        # the data is read once and shared
+        self.assertIs(get_functions(), functions)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
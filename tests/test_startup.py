@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the application start-up time."""
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'benchmarks',
+    ))
+
+from bench_startup import (DEFAULT_BUDGETS, find_regressions, get_limits,
+                           measure_startup)
+
+
+########################################################################
+class TestStartup(unittest.TestCase):
+    """Test the start-up time stays within the budgets."""
+
+    # ----------------------------------------------------------------------
+    def test_find_regressions(self):
+        """Report phases slower than the baseline and lazy modules loaded."""
+        limits = get_limits({'import': 1.0, 'window': 0.5, 'new_tab': 0.1},
+                            tolerance=0.5)
+        medians = {'import': 1.4, 'window': 0.8, 'new_tab': 0.1}
+        self.assertEqual(find_regressions(medians, [], limits),
+                         ['window: 0.800 secs exceeds 0.750 secs'])
+        self.assertEqual(
+            find_regressions(medians, ['pandas'], get_limits()),
+            ['imported at start-up: pandas'])
+        return
+
+    # ----------------------------------------------------------------------
+    def test_cold_start_without_lazy_modules(self):
+        """Start the application without importing pandas and the like."""
+        _medians, lazy_modules_loaded = measure_startup(runs=1, tabs=1)
+        self.assertEqual(lazy_modules_loaded, [])
+        return
+
+    # ----------------------------------------------------------------------
+    @unittest.skipUnless(
+        os.environ.get('GDBEE_STARTUP_BUDGETS'),
+        'wall-clock budgets depend on the machine; set GDBEE_STARTUP_BUDGETS '
+        'or run benchmarks/bench_startup.py')
+    def test_cold_start_within_budget(self):
+        """Start the application within the budgets without pandas."""
+        medians, lazy_modules_loaded = measure_startup(runs=3, tabs=3)
+        self.assertEqual(
+            find_regressions(medians, lazy_modules_loaded, DEFAULT_BUDGETS),
+            [])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
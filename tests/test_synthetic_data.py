@@ -0,0 +1,97 @@
+# -*- coding: UTF-8 -*-
+"""Unit tests for the generator of synthetic geodatabases."""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        'benchmarks',
+    ))
+
+import ogr
+from synthetic_data import SCHEMAS, benchmark_gdb, main
+
+
+########################################################################
+class TestSyntheticData(unittest.TestCase):
+    """Test creating synthetic geodatabases."""
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        """Create a temporary folder for the geodatabases."""
+        self.folder = tempfile.mkdtemp()
+        return
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.folder, ignore_errors=True)
+        return
+
+    # ----------------------------------------------------------------------
+    def _open(self, name):
+        """Open the geodatabase created in the folder."""
+        for ext in ('.gdb', '.gpkg'):
+            path = os.path.join(self.folder, name + ext)
+            if os.path.exists(path):
+                return ogr.Open(path)
+        self.fail('{name} was not created'.format(name=name))
+        return
+
+    # ----------------------------------------------------------------------
+    def test_rows(self):
+        """Create the given number of features in every dataset."""
+        main([os.path.join(self.folder, 'small.gdb'), '--rows', '100'])
+        ds = self._open('small')
+        self.assertEqual(
+            sorted(ds.GetLayer(i).GetName()
+                   for i in range(ds.GetLayerCount())), sorted(SCHEMAS))
+        for name in SCHEMAS:
+            self.assertEqual(ds.GetLayerByName(name).GetFeatureCount(), 100)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_geometry_type_and_vertices(self):
+        """Write geometries of the given type with the given vertices."""
+        main([
+            os.path.join(self.folder, 'lines.gdb'), '--datasets', 'homicides',
+            '--rows', '10', '--geometry-type', 'line', '--vertices', '25'
+        ])
+        layer = self._open('lines').GetLayerByName('homicides')
+        self.assertEqual(layer.GetFeatureCount(), 10)
+        for feat in layer:
+            geom = feat.GetGeometryRef()
+            self.assertEqual(geom.GetGeometryName(), 'MULTILINESTRING')
+            self.assertEqual(geom.GetGeometryRef(0).GetPointCount(), 25)
+        return
+
+    # ----------------------------------------------------------------------
+    def test_benchmark_gdb(self):
+        """Create a synthetic geodatabase for a benchmark and remove it."""
+        args = argparse.Namespace(
+            gdb='NYC.gdb',
+            synthetic_rows=None,
+            synthetic_vertices=None,
+            synthetic_geometry_type='point')
+        with benchmark_gdb(args) as path:
+            self.assertEqual(path, 'NYC.gdb')
+
+        args.synthetic_rows = 5
+        with benchmark_gdb(args, datasets=['streets']) as path:
+            ds = ogr.Open(path)
+            layer = ds.GetLayerByName('streets')
+            self.assertEqual(layer.GetFeatureCount(), 5)
+            self.assertEqual(layer.GetGeomType(), ogr.wkbPoint)
+            ds = None
+        self.assertFalse(os.path.exists(path))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()